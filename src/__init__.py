@@ -1,56 +1,81 @@
 """
 2026上半年奖金计算引擎 - 包初始化
 Package initialization
+
+导出的名称在首次访问时才导入对应模块（PEP 562 模块级 __getattr__），
+只做计算的场景不会为Excel导出等重依赖付出启动开销
 """
-from config import (
-    GlobalConfig,
-    RoleConfig,
-    Role,
-    CompletionBonusMode,
-    CompletionRateMode,
-    DEFAULT_GLOBAL_CONFIG,
-    DEFAULT_ROLE_CONFIG
-)
-
-from models import (
-    PersonData,
-    BonusDetail,
-    ValidationResult
-)
-
-from validators import (
-    BonusValidator,
-    validate_input_data
-)
-
-from bonus_engine import (
-    BonusCalculator,
-    calculate_bonus,
-    calculate_bonus_batch
-)
+import importlib
 
-__version__ = "1.0.0"
-__all__ = [
+# 名称 -> 所在模块
+_LAZY_ATTRS = {
     # Config
-    "GlobalConfig",
-    "RoleConfig", 
-    "Role",
-    "CompletionBonusMode",
-    "CompletionRateMode",
-    "DEFAULT_GLOBAL_CONFIG",
-    "DEFAULT_ROLE_CONFIG",
-    
+    "GlobalConfig": "config",
+    "RoleConfig": "config",
+    "Role": "config",
+    "CompletionBonusMode": "config",
+    "CompletionRateMode": "config",
+    "PeriodConfig": "config",
+    "DEFAULT_GLOBAL_CONFIG": "config",
+    "DEFAULT_ROLE_CONFIG": "config",
+
     # Models
-    "PersonData",
-    "BonusDetail",
-    "ValidationResult",
-    
+    "PersonData": "models",
+    "BonusDetail": "models",
+    "ValidationResult": "models",
+
     # Validators
-    "BonusValidator",
-    "validate_input_data",
-    
+    "BonusValidator": "validators",
+    "validate_input_data": "validators",
+
     # Calculator
-    "BonusCalculator",
-    "calculate_bonus",
-    "calculate_bonus_batch",
-]
+    "BonusCalculator": "bonus_engine",
+    "calculate_bonus": "bonus_engine",
+    "calculate_bonus_batch": "bonus_engine",
+    "MultiPeriodCalculator": "period_engine",
+    "OrgAggregator": "org_aggregation",
+    "aggregate_orgs": "org_aggregation",
+    "CompletionRollup": "hierarchy_rollup",
+    "derive_completion_flags": "hierarchy_rollup",
+    "BudgetSolver": "budget_solver",
+    "solve_budget": "budget_solver",
+    "PayoutForecaster": "payout_forecast",
+    "RevenueModel": "payout_forecast",
+    "SensitivityAnalyzer": "sensitivity",
+    "analyze_sensitivity": "sensitivity",
+    "RuleCalculator": "rule_dsl",
+    "RuleVectorizedCalculator": "rule_dsl",
+    "compile_rules": "rule_dsl",
+    "explain_person": "explain",
+    "ResultDiff": "result_diff",
+    "diff_results": "result_diff",
+    "FixedPointCalculator": "fixed_point",
+    "FixedPointVectorizedCalculator": "fixed_point",
+    "RunStore": "run_store",
+
+    # Excel (openpyxl在首次使用ExcelExporter时才导入)
+    "ExcelExporter": "excel_exporter",
+    "create_excel_template": "excel_exporter",
+    "export_to_excel": "excel_exporter",
+
+    # Columnar (pyarrow在首次导出/读取时才导入)
+    "export_to_parquet": "columnar_export",
+    "export_to_arrow": "columnar_export",
+    "read_results": "columnar_export",
+}
+
+__version__ = "1.0.0"
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # 缓存，后续访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,369 @@
+"""
+2026上半年奖金计算引擎 - 批量计算命令行
+Command-line batch runner with streaming input/output
+
+使用：
+    python batch_cli.py roster.csv -o results.parquet
+    python batch_cli.py 人员数据.xlsx -o results.csv --engine parallel --workers 8
+    python batch_cli.py roster.ndjson -o results.xlsx --config overrides.json
+    python batch_cli.py roster.csv -o results.csv --org-aggregate --orgs orgs.csv
+    python batch_cli.py roster.csv -o results.csv --derive-flags
+    python batch_cli.py roster.csv -o results.csv --rules rules/default_rules.json
+    python batch_cli.py roster.csv -o results.csv --money fen
+    python batch_cli.py roster.csv -o results.csv --store runs.db --label "6月初版"
+
+配置文件格式见 config.load_config_file：
+    {"global": {"threshold_90": 0.8}, "role": {"incentive_rates": {"DM": 0.005}}}
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from config import GlobalConfig, RoleConfig, PeriodConfig, DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG, load_config_file
+from models import PersonData, ValidationResult
+from bonus_engine import BonusCalculator
+from batch_io import iter_roster, open_result_writer, detail_to_row
+from org_aggregation import OrgSummary, read_org_inputs
+from hierarchy_rollup import CompletionRollup
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENGINES = ('scalar', 'vectorized', 'parallel')
+MONEY_MODES = ('float', 'fen')
+
+
+@dataclass
+class BatchStats:
+    """批量运行统计"""
+    rows: int = 0
+    invalid_rows: int = 0
+    grand_total: float = 0.0
+    elapsed: float = 0.0
+    peak_memory_mb: Optional[float] = None
+    group_warnings: List[str] = field(default_factory=list)  # 组织单元分配比例超过100%
+    notices: List[str] = field(default_factory=list)         # 其他运行提示（如完成标志按汇总结果改写）
+    run_id: Optional[int] = None  # 计算记录id（run_store）
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        memory = f"{self.peak_memory_mb:,.1f} MB" if self.peak_memory_mb is not None else "n/a"
+        lines = [
+            f"处理人数: {self.rows:,}  校验未通过: {self.invalid_rows:,}",
+            f"奖金合计: ¥{self.grand_total:,.2f}",
+            f"耗时: {self.elapsed:.2f}s  速度: {self.rows_per_second:,.0f} 行/秒  峰值内存: {memory}",
+        ]
+        if self.run_id is not None:
+            lines.append(f"计算记录: #{self.run_id}")
+        lines.extend(f"⚠️ {n}" for n in self.notices)
+        lines.extend(f"⚠️ {w}" for w in self.group_warnings[:10])
+        if len(self.group_warnings) > 10:
+            lines.append(f"⚠️ ……共{len(self.group_warnings)}个组织单元分配比例合计超过100%")
+        return "\n".join(lines)
+
+
+def peak_memory_mb() -> Optional[float]:
+    """本进程及已结束子进程的峰值常驻内存（MB）"""
+    if resource is None:
+        return None
+    # Linux下 ru_maxrss 单位为KB，macOS为字节
+    scale = 1 / 1024 / 1024 if sys.platform == 'darwin' else 1 / 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def calculate_chunk_scalar(
+    persons: List[PersonData],
+    global_config: GlobalConfig,
+    role_config: RoleConfig,
+    validate: bool = True,
+    orgs: Optional[Dict[str, OrgSummary]] = None,
+    rules: Optional[Dict] = None,
+    money: str = 'float'
+) -> List[Dict]:
+    """标量引擎计算一块，返回结果行（也用作并行引擎的工作进程函数）"""
+    if rules is not None:
+        from rule_dsl import RuleCalculator
+        calculator = RuleCalculator(rules, global_config, role_config, orgs=orgs)
+    elif money == 'fen':
+        from fixed_point import FixedPointCalculator
+        calculator = FixedPointCalculator(global_config, role_config, orgs=orgs)
+    else:
+        calculator = BonusCalculator(global_config=global_config, role_config=role_config, orgs=orgs)
+    rows = []
+    for person in persons:
+        detail, _ = calculator.calculate_person(person, skip_validation=True)
+        validation = calculator.validator.validate_person(person) if validate else ValidationResult()
+        detail.warnings.extend(validation.warnings)
+        rows.append(detail_to_row(detail, validation))
+    return rows
+
+
+def _iter_result_chunks(
+    chunks: Iterator[List[PersonData]],
+    engine: str,
+    global_config: GlobalConfig,
+    role_config: RoleConfig,
+    validate: bool,
+    workers: Optional[int],
+    orgs: Optional[Dict[str, OrgSummary]] = None,
+    rules: Optional[Dict] = None,
+    money: str = 'float'
+) -> Iterator[List[Dict]]:
+    """按块产出结果行，保持输入顺序"""
+    if engine == 'scalar':
+        for chunk in chunks:
+            yield calculate_chunk_scalar(chunk, global_config, role_config, validate, orgs, rules, money)
+
+    elif engine == 'vectorized':
+        from vectorized_engine import VectorizedCalculator, RosterArrays
+        if rules is not None:
+            from rule_dsl import RuleVectorizedCalculator
+            calculator = RuleVectorizedCalculator(rules, global_config, role_config, orgs=orgs)
+        elif money == 'fen':
+            from fixed_point import FixedPointVectorizedCalculator
+            calculator = FixedPointVectorizedCalculator(global_config, role_config, orgs=orgs)
+        else:
+            calculator = VectorizedCalculator(global_config=global_config, role_config=role_config, orgs=orgs)
+        for chunk in chunks:
+            roster = RosterArrays.from_persons(chunk)
+            validations = ([calculator.validator.validate_person(p) for p in chunk] if validate
+                           else [ValidationResult() for _ in chunk])
+            yield calculator.result_rows(roster, calculator.calculate_arrays(roster), validations)
+
+    else:
+        # 在途任务数有上限，读取速度快于计算时也不会把整个名单堆进内存
+        workers = workers or os.cpu_count() or 1
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in chunks:
+                pending.append(executor.submit(
+                    calculate_chunk_scalar, chunk, global_config, role_config, validate, orgs, rules, money
+                ))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    engine: str = 'vectorized',
+    global_config: GlobalConfig = None,
+    role_config: RoleConfig = None,
+    chunk_size: int = 5000,
+    workers: Optional[int] = None,
+    validate: bool = True,
+    progress: bool = False,
+    org_aggregate: bool = False,
+    org_inputs_path: Optional[str] = None,
+    derive_flags: bool = False,
+    rules_path: Optional[str] = None,
+    money: str = 'float',
+    store_path: Optional[str] = None,
+    label: Optional[str] = None
+) -> BatchStats:
+    """
+    流式批量计算：读取名单 -> 分块计算 -> 分块写出
+
+    Args:
+        input_path: 名单文件（csv/xlsx/ndjson/brst）
+        output_path: 结果文件（csv/xlsx/ndjson/parquet/arrow）
+        engine: scalar / vectorized / parallel
+        chunk_size: 每块人数
+        workers: parallel引擎的进程数
+        validate: 是否逐人校验
+        org_aggregate: 先读一遍名单按组织单元汇总（org_aggregation），第二遍计算时读取共享值
+        org_inputs_path: 组织单元级输入文件（分公司产值/目标/完成率），给出时隐含 org_aggregate
+        derive_flags: 区域/全国完成标志按名单逐级汇总的结果计算（hierarchy_rollup），忽略手填值
+        rules_path: 规则文件（rule_dsl），给出时按规则定义计算；批量计算固定为上半年，规则中不能有 period 段
+        money: 金额精度，float（浮点）/ fen（整数分，fixed_point，按组件舍入规则取整）
+        store_path: 计算记录库（run_store），给出时保存输入名单、参数与结果快照，运行id见 stats.run_id
+        label: 计算记录的备注
+
+    Returns:
+        运行统计
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"未知的计算引擎: {engine}（可选: {', '.join(ENGINES)}）")
+    if money not in MONEY_MODES:
+        raise ValueError(f"未知的金额精度: {money}（可选: {', '.join(MONEY_MODES)}）")
+    global_config = global_config or DEFAULT_GLOBAL_CONFIG
+    role_config = role_config or DEFAULT_ROLE_CONFIG
+    rules = None
+    if rules_path:
+        if money != 'float':
+            raise ValueError("规则文件按浮点计算，不能与 --money fen 同时使用")
+        from rule_dsl import compile_rules, load_rules
+        rules = load_rules(rules_path)
+        if 'period' in rules:
+            raise ValueError("批量计算按上半年输出，规则文件中不能定义 period")
+        compile_rules(rules, global_config, role_config)  # 先编译一次，规则有误时在读名单前报错
+
+    stats = BatchStats()
+    start = time.perf_counter()
+
+    org_aggregate = org_aggregate or bool(org_inputs_path)
+    org_inputs = read_org_inputs(org_inputs_path) if org_inputs_path else None
+    rollup = None
+    if org_aggregate or derive_flags:
+        # 第一遍：只保留组织单元/区域/全国的累计量
+        months = PeriodConfig.from_global_config(global_config).months
+        rollup = CompletionRollup(months, global_config, role_config, org_inputs, incremental=False)
+        rollup.add_all(iter_roster(input_path))
+    orgs = rollup.orgs if org_aggregate else None
+    stale_flags = 0
+    # 分配比例合计跨块累计，最后统一提示（同 BonusValidator._validate_group_allocation）
+    org_allocations: Dict[str, float] = {}
+
+    def tracked(persons: Iterator[PersonData]) -> Iterator[PersonData]:
+        nonlocal stale_flags
+        for person in persons:
+            if derive_flags:
+                if rollup.stale_flags(person):
+                    stale_flags += 1
+                person = rollup.apply(person)
+            if person.personal_allocation_ratio is not None:
+                org_allocations[person.org_unit] = (
+                    org_allocations.get(person.org_unit, 0.0) + person.personal_allocation_ratio
+                )
+            yield person
+
+    store = recorder = None
+    if store_path:
+        from run_store import RunStore
+        options = {
+            'engine': engine, 'money': money, 'validate': validate,
+            'org_aggregate': org_aggregate, 'derive_flags': derive_flags, 'rules': rules,
+            'org_inputs': {k: asdict(v) for k, v in org_inputs.items()} if org_inputs else None,
+        }
+        store = RunStore(store_path)
+        recorder = store.begin_run(global_config, role_config, options, label)
+    # 保存记录时结果行需与输入配对（各引擎都按块的提交顺序返回结果）
+    calculated: deque = deque()
+
+    def remembered(chunks: Iterator[List[PersonData]]) -> Iterator[List[PersonData]]:
+        for chunk in chunks:
+            calculated.append(chunk)
+            yield chunk
+
+    chunks = _chunks(tracked(iter_roster(input_path)), chunk_size)
+    if recorder is not None:
+        chunks = remembered(chunks)
+    try:
+        with open_result_writer(output_path) as writer:
+            for rows in _iter_result_chunks(chunks, engine, global_config, role_config, validate, workers,
+                                            orgs, rules, money):
+                writer.write_rows(rows)
+                if recorder is not None:
+                    recorder.add(calculated.popleft(), rows)
+                stats.rows += len(rows)
+                stats.invalid_rows += sum(1 for r in rows if not r['is_valid'])
+                stats.grand_total += sum(r['grand_total'] for r in rows)
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"\r已处理 {stats.rows:,} 行 ({stats.rows / elapsed:,.0f} 行/秒)",
+                          end='', file=sys.stderr, flush=True)
+        if progress:
+            print(file=sys.stderr)
+
+        if stale_flags:
+            stats.notices.append(f"{stale_flags:,}人手填的区域/全国完成标志与名单汇总结果不一致，已按汇总结果计算")
+        for org, total in org_allocations.items():
+            if total > 1.0:
+                stats.group_warnings.append(f"组织单元'{org}'内分配比例合计为{total*100:.1f}%，超过100%")
+
+        stats.elapsed = time.perf_counter() - start
+        stats.peak_memory_mb = peak_memory_mb()
+        if recorder is not None:
+            stats.run_id = recorder.finish(stats.invalid_rows, stats.grand_total, {
+                'input': input_path,
+                'group_warnings': stats.group_warnings,
+                'notices': stats.notices,
+                'elapsed': stats.elapsed,
+            })
+    except BaseException:
+        if recorder is not None:
+            recorder.abort()
+        raise
+    finally:
+        if store is not None:
+            store.close()
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="奖金批量计算（流式读写）")
+    parser.add_argument("input", help="人员名单文件（.csv/.xlsx/.ndjson/.brst）")
+    parser.add_argument("-o", "--output", required=True, help="结果文件（.csv/.xlsx/.ndjson/.parquet/.arrow）")
+    parser.add_argument("-c", "--config", help="参数覆盖文件（JSON）")
+    parser.add_argument("-e", "--engine", choices=ENGINES, default='vectorized', help="计算引擎")
+    parser.add_argument("-w", "--workers", type=int, help="parallel引擎进程数（默认CPU核数）")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="每块人数")
+    parser.add_argument("--no-validate", action="store_true", help="跳过逐人校验")
+    parser.add_argument("--org-aggregate", action="store_true",
+                        help="按组织单元汇总分公司产值、完成率后再计算（多读一遍名单）")
+    parser.add_argument("--orgs", help="组织单元级输入文件（.csv/.xlsx/.ndjson），隐含 --org-aggregate")
+    parser.add_argument("--derive-flags", action="store_true",
+                        help="区域/全国完成标志按名单逐级汇总得出（多读一遍名单）")
+    parser.add_argument("--rules", help="规则文件（.json，装有PyYAML时也可用.yaml），按规则定义计算")
+    parser.add_argument("--money", choices=MONEY_MODES, default='float',
+                        help="金额精度：float（浮点）/ fen（整数分，按组件舍入规则逐分精确）")
+    parser.add_argument("--store", help="计算记录库（SQLite），保存本次的输入名单、参数与结果快照")
+    parser.add_argument("--label", help="计算记录的备注")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不显示进度")
+    args = parser.parse_args(argv)
+
+    try:
+        global_config, role_config = load_config_file(args.config) if args.config else (None, None)
+        stats = run_batch(
+            args.input,
+            args.output,
+            engine=args.engine,
+            global_config=global_config,
+            role_config=role_config,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            validate=not args.no_validate,
+            progress=not args.quiet,
+            org_aggregate=args.org_aggregate,
+            org_inputs_path=args.orgs,
+            derive_flags=args.derive_flags,
+            rules_path=args.rules,
+            money=args.money,
+            store_path=args.store,
+            label=args.label
+        )
+    except (ValueError, ImportError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    print(f"结果已导出: {args.output}")
+    print(stats.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+2026上半年奖金计算引擎 - 批量输入输出模块
+Streaming roster readers and result writers for batch runs
+
+【支持格式】
+- 输入：CSV / XLSX / NDJSON，表头可用英文字段名或模板中文列名；也可读取二进制名单（.brst）
+- 输出：CSV / XLSX / NDJSON / Parquet / Arrow IPC，逐块写出，内存占用与总行数无关
+"""
+import csv
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Role
+from models import PersonData, BonusDetail, ValidationResult
+
+MONTHS = list(range(1, 7))
+YEAR_MONTHS = list(range(1, 13))
+
+# PersonData字段 -> 可接受的列名（英文字段名、Web接口字段名、模板中文列名）
+FIELD_ALIASES: Dict[str, List[str]] = {
+    'name': ['name', '姓名'],
+    'role': ['role', '岗位'],
+    'region': ['region', '区域'],
+    'org_unit': ['org_unit', 'org', '组织单元'],
+    'company_total_revenue': ['company_total_revenue', 'company_revenue', '分公司产值', '分公司总产值'],
+    'annual_target': ['annual_target', 'target', '年度目标'],
+    'completion_rate_manual': ['completion_rate_manual', '完成率(手填)'],
+    'collection_rate': ['collection_rate', '回款率'],
+    'region_completed_90': ['region_completed_90', 'region_90', '区域90%', '区域完成90%'],
+    'region_completed_100': ['region_completed_100', 'region_100', '区域100%', '区域完成100%'],
+    'national_completed_90': ['national_completed_90', 'national_90', '全国90%', '全国完成90%'],
+    'national_completed_100': ['national_completed_100', 'national_100', '全国100%', '全国完成100%'],
+    'personal_allocation_ratio': ['personal_allocation_ratio', 'ratio', '分配比例', '个人分配比例'],
+    'ceo_bonus': ['ceo_bonus', 'CEO奖金'],
+}
+for _m in YEAR_MONTHS:
+    FIELD_ALIASES[f'revenue_{_m}'] = [f'revenue_{_m}', f'm{_m}', f'{_m}月产值']
+
+_ALIAS_LOOKUP = {alias.lower(): f for f, aliases in FIELD_ALIASES.items() for alias in aliases}
+# 其他月份键（跨年期间的 month_key，如 revenue_202507）的产值列
+_REVENUE_COLUMN = re.compile(r'revenue_(\d+)')
+
+
+@lru_cache(maxsize=1024)
+def _resolve_column(key: str) -> Tuple[Optional[str], Optional[int]]:
+    """列名 -> (PersonData字段, 产值列的月份键)（不区分大小写、忽略首尾空格），无法识别时字段为None"""
+    key = key.strip().lower()
+    field_name = _ALIAS_LOOKUP.get(key)
+    if field_name is None:
+        match = _REVENUE_COLUMN.fullmatch(key)
+        if match and int(match.group(1)) > 0:
+            field_name = f'revenue_{int(match.group(1))}'
+    if field_name is not None and field_name.startswith('revenue_'):
+        return field_name, int(field_name[8:])
+    return field_name, None
+
+
+def _field_name(key: str) -> Optional[str]:
+    return _resolve_column(key)[0]
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'y', '是', '✓'}
+
+ROSTER_FORMATS = ('csv', 'xlsx', 'ndjson', 'brst')
+RESULT_FORMATS = ('csv', 'xlsx', 'ndjson', 'parquet', 'arrow')
+
+def result_fields(months: List[int] = MONTHS) -> List[str]:
+    """结果行字段（顺序即输出列顺序），每个月份一列过程激励"""
+    return (
+        ['name', 'role', 'region', 'org_unit']
+        + [f'incentive_m{m}' for m in months]
+        + ['incentive_total', 'incentive_immediate', 'incentive_after_collection',
+           'completion_bonus_90', 'completion_bonus_100', 'completion_bonus_total',
+           'region_bonus_90', 'region_bonus_100', 'region_bonus_total',
+           'national_bonus_90', 'national_bonus_100', 'national_bonus_total',
+           'fixed_subsidy', 'ceo_bonus', 'grand_total',
+           'completion_bonus_mode', 'completion_rate', 'collection_rate', 'personal_allocation_ratio',
+           'is_valid', 'errors', 'warnings', 'pending_confirmations']
+    )
+
+
+# 上半年结果行字段
+RESULT_FIELDS: List[str] = result_fields()
+RESULT_TEXT_FIELDS = {'name', 'role', 'region', 'org_unit', 'completion_bonus_mode',
+                      'errors', 'warnings', 'pending_confirmations'}
+RESULT_BOOL_FIELDS = {'is_valid'}
+
+
+def detect_format(path: str, supported) -> str:
+    """按扩展名判断文件格式"""
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    fmt = {'jsonl': 'ndjson', 'json': 'ndjson', 'pq': 'parquet', 'feather': 'arrow', 'ipc': 'arrow'}.get(ext, ext)
+    if fmt not in supported:
+        raise ValueError(f"不支持的文件格式: {path}（支持: {', '.join(supported)}）")
+    return fmt
+
+
+# ========== 读取 ==========
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def to_float(value) -> Optional[float]:
+    """单元格 -> 浮点数（空为None，支持千分位和百分号）"""
+    if _blank(value):
+        return None
+    if isinstance(value, str):
+        text = value.strip().replace(',', '')
+        if text.endswith('%'):
+            return float(text[:-1]) / 100
+        return float(text)
+    return float(value)
+
+
+def _to_bool(value) -> bool:
+    if _blank(value):
+        return False
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_VALUES
+    return bool(value)
+
+
+def record_to_person(record: Dict) -> PersonData:
+    """
+    原始记录 -> PersonData
+
+    列名不区分大小写；月度产值既可以分列给出（revenue_<月份键>，1-12月另可用 m7、7月产值 等列名），
+    也可以是Web接口的 revenue 数组（从1月起）
+    """
+    fields = {}
+    revenue_columns = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        field_name, month = _resolve_column(str(key))
+        if month is not None:
+            revenue_columns[month] = value
+        elif field_name is not None:
+            fields[field_name] = value
+
+    month_revenue = {}
+    revenue_list = record.get('revenue')
+    if isinstance(revenue_list, list):
+        for m, value in zip(YEAR_MONTHS, revenue_list):
+            if not _blank(value):
+                month_revenue[m] = float(value)
+    for m, raw in revenue_columns.items():
+        value = to_float(raw)
+        if value is not None:
+            month_revenue[m] = value
+
+    role = str(fields.get('role', '')).strip()
+    try:
+        role = Role(role)
+    except ValueError:
+        raise ValueError(f"无效的岗位代码: {role!r}")
+
+    collection = to_float(fields.get('collection_rate'))
+    return PersonData(
+        name=str(fields.get('name', '')).strip(),
+        role=role,
+        region=str(fields.get('region') or '').strip(),
+        org_unit=str(fields.get('org_unit') or '').strip(),
+        month_revenue=month_revenue,
+        company_total_revenue=to_float(fields.get('company_total_revenue')),
+        annual_target=to_float(fields.get('annual_target')),
+        completion_rate_manual=to_float(fields.get('completion_rate_manual')),
+        collection_rate=collection if collection is not None else 0.0,
+        region_completed_90=_to_bool(fields.get('region_completed_90')),
+        region_completed_100=_to_bool(fields.get('region_completed_100')),
+        national_completed_90=_to_bool(fields.get('national_completed_90')),
+        national_completed_100=_to_bool(fields.get('national_completed_100')),
+        personal_allocation_ratio=to_float(fields.get('personal_allocation_ratio')),
+        ceo_bonus=to_float(fields.get('ceo_bonus')),
+    )
+
+
+def person_to_record(person: PersonData) -> Dict:
+    """PersonData -> 原始记录（record_to_person 的逆过程，可写成 ndjson 名单）"""
+    record = {
+        'name': person.name,
+        'role': person.role.value,
+        'region': person.region,
+        'org_unit': person.org_unit,
+    }
+    for m in sorted(person.month_revenue):
+        record[f'revenue_{m}'] = person.month_revenue[m]
+    record.update({
+        'company_total_revenue': person.company_total_revenue,
+        'annual_target': person.annual_target,
+        'completion_rate_manual': person.completion_rate_manual,
+        'collection_rate': person.collection_rate,
+        'region_completed_90': person.region_completed_90,
+        'region_completed_100': person.region_completed_100,
+        'national_completed_90': person.national_completed_90,
+        'national_completed_100': person.national_completed_100,
+        'personal_allocation_ratio': person.personal_allocation_ratio,
+        'ceo_bonus': person.ceo_bonus,
+    })
+    return record
+
+
+def _iter_csv(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def _iter_ndjson(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _iter_xlsx(path: str, sheet: Optional[str] = None) -> Iterator[Dict]:
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet is None:
+            sheet = '人员数据' if '人员数据' in wb.sheetnames else wb.sheetnames[0]
+        rows = wb[sheet].iter_rows(values_only=True)
+        headers = next(rows, None) or []
+        for values in rows:
+            yield dict(zip(headers, values))
+    finally:
+        wb.close()
+
+
+def iter_records(path: str, fmt: str, sheet: Optional[str] = None) -> Iterator[Dict]:
+    """逐行读取表格文件（csv/xlsx/ndjson）为 {列名: 值}"""
+    if fmt == 'csv':
+        return _iter_csv(path)
+    if fmt == 'ndjson':
+        return _iter_ndjson(path)
+    if fmt == 'xlsx':
+        return _iter_xlsx(path, sheet)
+    raise ValueError(f"不支持的表格格式: {fmt}")
+
+
+def iter_roster(path: str, fmt: Optional[str] = None, sheet: Optional[str] = None) -> Iterator[PersonData]:
+    """
+    流式读取人员名单（跳过姓名为空的行）
+
+    Raises:
+        ValueError: 行数据无法解析时，附带行号
+    """
+    fmt = fmt or detect_format(path, ROSTER_FORMATS)
+    if fmt == 'brst':
+        from binary_roster import load_binary_roster
+        with load_binary_roster(path) as roster:
+            yield from roster.iter_persons()
+        return
+    records = iter_records(path, fmt, sheet)
+
+    for line_no, record in enumerate(records, start=2 if fmt != 'ndjson' else 1):
+        # 与 record_to_person 同样按别名匹配（忽略大小写、首尾空格），Name、' 姓名 ' 等表头也能识别
+        name = next((value for key, value in record.items()
+                     if _field_name(str(key)) == 'name'), None)
+        if _blank(name):
+            continue
+        try:
+            yield record_to_person(record)
+        except ValueError as e:
+            raise ValueError(f"{path} 第{line_no}行: {e}") from e
+
+
+# ========== 结果行 ==========
+def join_messages(messages: List[str]) -> str:
+    """多条提示合并为一个单元格文本"""
+    return "; ".join(messages)
+
+
+def detail_to_row(detail: BonusDetail, validation: ValidationResult, months: List[int] = MONTHS) -> Dict:
+    """BonusDetail -> 结果行（months 为计算期间的月份）"""
+    row = {
+        'name': detail.name,
+        'role': detail.role.value,
+        'region': detail.region,
+        'org_unit': detail.org_unit,
+    }
+    for m in months:
+        row[f'incentive_m{m}'] = detail.monthly_incentives.get(m, 0.0)
+    row.update({
+        'incentive_total': detail.incentive_total,
+        'incentive_immediate': detail.incentive_immediate,
+        'incentive_after_collection': detail.incentive_after_collection,
+        'completion_bonus_90': detail.completion_bonus_90,
+        'completion_bonus_100': detail.completion_bonus_100,
+        'completion_bonus_total': detail.completion_bonus_total,
+        'region_bonus_90': detail.region_bonus_90,
+        'region_bonus_100': detail.region_bonus_100,
+        'region_bonus_total': detail.region_bonus_total,
+        'national_bonus_90': detail.national_bonus_90,
+        'national_bonus_100': detail.national_bonus_100,
+        'national_bonus_total': detail.national_bonus_total,
+        'fixed_subsidy': detail.fixed_subsidy,
+        'ceo_bonus': detail.ceo_bonus,
+        'grand_total': detail.grand_total,
+        'completion_bonus_mode': detail.completion_bonus_mode,
+        'completion_rate': detail.completion_rate,
+        'collection_rate': detail.collection_rate,
+        'personal_allocation_ratio': detail.personal_allocation_ratio,
+        'is_valid': validation.is_valid,
+        'errors': join_messages(validation.errors),
+        'warnings': join_messages(detail.warnings),
+        'pending_confirmations': join_messages(detail.pending_confirmations),
+    })
+    return row
+
+
+# ========== 写出 ==========
+class ResultWriter:
+    """结果写出器基类（支持 with 语句）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+
+    def write_rows(self, rows: List[Dict]):
+        self._write(rows)
+        self.rows_written += len(rows)
+
+    def _write(self, rows: List[Dict]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvResultWriter(ResultWriter):
+    def __init__(self, path: str):
+        super().__init__(path)
+        # utf-8-sig 便于Excel直接打开中文
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+        self._writer.writeheader()
+
+    def _write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class NdjsonResultWriter(ResultWriter):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write(self, rows):
+        self._file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxResultWriter(ResultWriter):
+    """openpyxl write_only 流式写出"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        import openpyxl
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("明细")
+        self._ws.append(RESULT_FIELDS)
+
+    def _write(self, rows):
+        for row in rows:
+            self._ws.append([row[f] for f in RESULT_FIELDS])
+
+    def close(self):
+        self._wb.save(self.path)
+
+
+_WRITERS = {
+    'csv': CsvResultWriter,
+    'ndjson': NdjsonResultWriter,
+    'xlsx': XlsxResultWriter,
+}
+
+
+def open_result_writer(path: str, fmt: Optional[str] = None) -> ResultWriter:
+    """按格式创建结果写出器"""
+    fmt = fmt or detect_format(path, RESULT_FORMATS)
+    if fmt in ('parquet', 'arrow'):
+        from columnar_export import ColumnarResultWriter
+        return ColumnarResultWriter(path, fmt=fmt)
+    return _WRITERS[fmt](path)
@@ -0,0 +1,304 @@
+"""
+2026上半年奖金计算引擎 - 二进制名单模块
+Memory-mapped fixed-record binary roster format
+
+同一份半年名单一天内要按不同方案反复计算，每次从Excel/JSON解析并构造
+PersonData 代价远大于计算本身。本模块把名单保存为定长记录的二进制文件，
+加载时 mmap 映射并直接视作 NumPy 结构化数组，不逐人构造对象。
+
+【文件布局】（小端）
+    文件头   magic(4s) 版本(H) 保留(H) 记录数(I) 字符串数(I) 记录偏移(Q) 字符串表偏移(Q)
+    记录区   RECORD_DTYPE × 记录数，8字节对齐
+    字符串表 偏移数组(uint32 × (字符串数+1)) + UTF-8 字节
+姓名、岗位、区域、组织单元存为字符串表下标，相同文本只存一次；
+数值缺失（含未填的月份）以 NaN 表示。
+
+使用：
+    python binary_roster.py roster.csv -o roster.brst
+"""
+import argparse
+import math
+import mmap
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import Role
+from models import PersonData
+from vectorized_engine import MONTHS, ROLE_CODES, RosterArrays
+
+MAGIC = b'BRST'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIIQQ')
+
+# 标志位
+FLAG_REGION_90 = 1
+FLAG_REGION_100 = 2
+FLAG_NATIONAL_90 = 4
+FLAG_NATIONAL_100 = 8
+
+RECORD_DTYPE = np.dtype([
+    ('name', '<u4'),
+    ('role', '<u4'),
+    ('region', '<u4'),
+    ('org_unit', '<u4'),
+    ('revenue', '<f8', (len(MONTHS),)),
+    ('company_revenue', '<f8'),
+    ('annual_target', '<f8'),
+    ('completion_rate_manual', '<f8'),
+    ('collection_rate', '<f8'),
+    ('allocation_ratio', '<f8'),
+    ('ceo_bonus', '<f8'),
+    ('flags', 'u1'),
+])
+
+
+def _align8(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class StringTable:
+    """字符串驻留表：文本 -> 下标"""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def intern(self, text: str) -> int:
+        idx = self._index.get(text)
+        if idx is None:
+            idx = self._index[text] = len(self.strings)
+            self.strings.append(text)
+        return idx
+
+    def to_bytes(self) -> bytes:
+        encoded = [s.encode('utf-8') for s in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return offsets.tobytes() + b''.join(encoded)
+
+
+# ========== 写出 ==========
+def persons_to_records(persons: List[PersonData], strings: Optional[StringTable] = None) -> np.ndarray:
+    """PersonData 列表 -> 结构化记录数组（文本写入 strings）"""
+    def opt(value):
+        return np.nan if value is None else value
+
+    strings = strings if strings is not None else StringTable()
+    records = np.zeros(len(persons), dtype=RECORD_DTYPE)
+    for i, p in enumerate(persons):
+        revenue = [np.nan] * len(MONTHS)
+        for month, value in p.month_revenue.items():
+            if not 1 <= month <= len(MONTHS):
+                raise ValueError(f"人员'{p.name}'的月份{month}超出二进制名单范围（1-{len(MONTHS)}月）")
+            revenue[month - 1] = value
+        flags = ((FLAG_REGION_90 if p.region_completed_90 else 0)
+                 | (FLAG_REGION_100 if p.region_completed_100 else 0)
+                 | (FLAG_NATIONAL_90 if p.national_completed_90 else 0)
+                 | (FLAG_NATIONAL_100 if p.national_completed_100 else 0))
+        records[i] = (
+            strings.intern(p.name), strings.intern(p.role.value),
+            strings.intern(p.region), strings.intern(p.org_unit),
+            revenue, opt(p.company_total_revenue), opt(p.annual_target),
+            opt(p.completion_rate_manual), p.collection_rate,
+            opt(p.personal_allocation_ratio), opt(p.ceo_bonus), flags,
+        )
+    return records
+
+
+def write_binary_roster(path: str, persons: Iterable[PersonData], chunk_size: int = 50000) -> int:
+    """
+    写出二进制名单（按块转换，输入可为流式迭代器）
+
+    Returns:
+        写出人数
+    """
+    strings = StringTable()
+    count = 0
+    with open(path, 'wb') as f:
+        records_offset = _align8(HEADER.size)
+        f.write(b'\0' * records_offset)
+        chunk: List[PersonData] = []
+        for person in persons:
+            chunk.append(person)
+            if len(chunk) >= chunk_size:
+                f.write(persons_to_records(chunk, strings).tobytes())
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            f.write(persons_to_records(chunk, strings).tobytes())
+            count += len(chunk)
+
+        strings_offset = records_offset + count * RECORD_DTYPE.itemsize
+        f.write(strings.to_bytes())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, len(strings.strings),
+                            records_offset, strings_offset))
+    return count
+
+
+# ========== 读取 ==========
+class BinaryRoster:
+    """
+    mmap 映射的二进制名单
+
+    records 为直接引用文件页的只读结构化数组；字符串表在首次需要文本时才解码。
+    用完调用 close()（或用 with）释放映射
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER.size:
+                raise ValueError(f"不是有效的二进制名单文件: {path}")
+            magic, version, _, count, string_count, records_offset, strings_offset = HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"不是有效的二进制名单文件: {path}")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"不支持的二进制名单版本: {version}（当前支持: {FORMAT_VERSION}）")
+        except ValueError:
+            self._mmap.close()
+            raise
+
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=count, offset=records_offset)
+        self._string_offsets = np.frombuffer(self._mmap, dtype='<u4', count=string_count + 1,
+                                             offset=strings_offset)
+        self._strings_base = strings_offset + (string_count + 1) * 4
+        self._strings: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __enter__(self) -> 'BinaryRoster':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        释放文件映射
+
+        to_arrays 返回的数值列是映射的视图；这些数组仍被引用时，映射在它们释放后才解除
+        """
+        if self._mmap is None:
+            return
+        self.records = self._string_offsets = None
+        mapped, self._mmap = self._mmap, None
+        try:
+            mapped.close()
+        except BufferError:
+            pass
+
+    @property
+    def strings(self) -> np.ndarray:
+        """字符串表（object数组，便于按下标数组批量取值）"""
+        if self._strings is None:
+            blob = self._mmap[self._strings_base:self._strings_base + int(self._string_offsets[-1])]
+            bounds = self._string_offsets.tolist()
+            self._strings = np.array(
+                [blob[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)],
+                dtype=object
+            )
+        return self._strings
+
+    def _texts(self, field: str, rows=slice(None)) -> List[str]:
+        return self.strings[self.records[field][rows]].tolist()
+
+    def role_codes(self, rows=slice(None)) -> np.ndarray:
+        """岗位 -> ROLE_ORDER 下标（只对出现过的岗位文本查一次表）"""
+        ids = self.records['role'][rows]
+        unique_ids = np.unique(ids)
+        lookup = np.zeros(int(unique_ids.max()) + 1 if len(unique_ids) else 0, dtype=np.int8)
+        for idx in unique_ids.tolist():
+            lookup[idx] = ROLE_CODES[Role(self.strings[idx])]
+        return lookup[ids]
+
+    def to_arrays(self, start: int = 0, stop: Optional[int] = None) -> RosterArrays:
+        """转为 RosterArrays（除月度产值需把NaN置0外，数值列均为文件映射的视图）"""
+        rows = slice(start, stop)
+        rec = self.records[rows]
+        flags = rec['flags']
+        return RosterArrays(
+            names=self._texts('name', rows),
+            roles=self.role_codes(rows),
+            regions=self._texts('region', rows),
+            org_units=self._texts('org_unit', rows),
+            revenue=np.nan_to_num(rec['revenue'], nan=0.0),
+            company_revenue=rec['company_revenue'],
+            annual_target=rec['annual_target'],
+            completion_rate_manual=rec['completion_rate_manual'],
+            collection_rate=rec['collection_rate'],
+            region_90=(flags & FLAG_REGION_90).astype(bool),
+            region_100=(flags & FLAG_REGION_100).astype(bool),
+            national_90=(flags & FLAG_NATIONAL_90).astype(bool),
+            national_100=(flags & FLAG_NATIONAL_100).astype(bool),
+            allocation_ratio=rec['allocation_ratio'],
+            ceo_bonus=rec['ceo_bonus'],
+        )
+
+    def iter_persons(self) -> Iterable[PersonData]:
+        """逐人还原为 PersonData"""
+        def opt(value):
+            return None if math.isnan(value) else value
+
+        strings = self.strings.tolist()
+        roles = {role.value: role for role in Role}
+        for rec in self.records.tolist():
+            name, role, region, org_unit, revenue, company, target, manual, collection, ratio, ceo, flags = rec
+            yield PersonData(
+                name=strings[name],
+                role=roles[strings[role]],
+                region=strings[region],
+                org_unit=strings[org_unit],
+                month_revenue={m: v for m, v in zip(MONTHS, revenue) if not math.isnan(v)},
+                company_total_revenue=opt(company),
+                annual_target=opt(target),
+                completion_rate_manual=opt(manual),
+                collection_rate=collection,
+                region_completed_90=bool(flags & FLAG_REGION_90),
+                region_completed_100=bool(flags & FLAG_REGION_100),
+                national_completed_90=bool(flags & FLAG_NATIONAL_90),
+                national_completed_100=bool(flags & FLAG_NATIONAL_100),
+                personal_allocation_ratio=opt(ratio),
+                ceo_bonus=opt(ceo),
+            )
+
+    def to_persons(self) -> List[PersonData]:
+        return list(self.iter_persons())
+
+
+def load_binary_roster(path: str) -> BinaryRoster:
+    """便捷函数：mmap 加载二进制名单"""
+    return BinaryRoster(path)
+
+
+def read_binary_roster(path: str) -> List[PersonData]:
+    """便捷函数：二进制名单 -> PersonData 列表"""
+    with load_binary_roster(path) as roster:
+        return roster.to_persons()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from batch_io import iter_roster
+
+    parser = argparse.ArgumentParser(description="人员名单转换为二进制格式（.brst）")
+    parser.add_argument("input", help="人员名单文件（.csv/.xlsx/.ndjson）")
+    parser.add_argument("-o", "--output", required=True, help="输出的二进制名单文件")
+    args = parser.parse_args(argv)
+
+    try:
+        count = write_binary_roster(args.output, iter_roster(args.input))
+    except (ValueError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    print(f"已写出 {count:,} 人: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,15 +8,17 @@ Core calculation engine for bonus computation
 3. 计算过程透明，返回明细
 4. 对歧义规则标记"待确认"
 """
+import copy
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from models import PersonData, BonusDetail, ValidationResult
 from config import (
-    GlobalConfig, RoleConfig, Role,
+    GlobalConfig, RoleConfig, Role, PeriodConfig, month_label,
     CompletionBonusMode, CompletionRateMode,
     DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
 )
 from validators import BonusValidator
+from org_aggregation import OrgAggregator, OrgInput, OrgSummary
 
 
 class BonusCalculator:
@@ -25,11 +27,17 @@ class BonusCalculator:
     def __init__(
         self, 
         global_config: GlobalConfig = None,
-        role_config: RoleConfig = None
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        orgs: Optional[Dict[str, OrgSummary]] = None
     ):
         self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
         self.role_config = role_config or DEFAULT_ROLE_CONFIG
-        self.validator = BonusValidator(self.global_config)
+        # 计算期间：默认上半年，系数取自 global_config.time_coefficients
+        self.period = period or PeriodConfig.from_global_config(self.global_config)
+        # 组织单元汇总（org_aggregation）：给出时完成率、分公司产值、完成奖基数取组织单元共享值
+        self.orgs = orgs
+        self.validator = BonusValidator(self.global_config, valid_months=self.period.months)
     
     def calculate_person(
         self, 
@@ -49,21 +57,27 @@ class BonusCalculator:
         # 数据校验
         validation = ValidationResult() if skip_validation else self.validator.validate_person(person)
         
-        # 根据岗位调用对应计算方法
-        if person.role == Role.CP:
-            detail = self._calculate_cp(person)
-        elif person.role == Role.DM:
-            detail = self._calculate_dm(person)
-        elif person.role in [Role.VP, Role.MGR]:
-            detail = self._calculate_management(person)
-        else:  # SALES_*
-            detail = self._calculate_sales(person)
+        detail = self._calculate(person)
         
         # 合并校验警告到明细
+        org = self._org(person)
+        if org is not None:
+            detail.warnings.extend(org.warnings)
         detail.warnings.extend(validation.warnings)
         
         return detail, validation
     
+    def _calculate(self, person: PersonData) -> BonusDetail:
+        """根据岗位调用对应计算方法（rule_dsl.RuleCalculator 改为按规则定义计算）"""
+        if person.role == Role.CP:
+            return self._calculate_cp(person)
+        elif person.role == Role.DM:
+            return self._calculate_dm(person)
+        elif person.role in [Role.VP, Role.MGR]:
+            return self._calculate_management(person)
+        else:  # SALES_*
+            return self._calculate_sales(person)
+    
     def calculate_batch(
         self, 
         persons: List[PersonData]
@@ -83,13 +97,79 @@ class BonusCalculator:
         
         return results
     
+    def with_orgs(
+        self,
+        persons: List[PersonData],
+        org_inputs: Optional[Dict[str, OrgInput]] = None
+    ) -> 'BonusCalculator':
+        """按名单汇总组织单元，返回读取共享值的计算器（配置、期间不变）"""
+        orgs = OrgAggregator(self.period.months, self.global_config, self.role_config,
+                             org_inputs).add_all(persons).finalize()
+        calculator = copy.copy(self)  # 保留子类（如 RuleCalculator）的规则
+        calculator.orgs = orgs
+        return calculator
+    
+    def calculate_binary_roster(self, path: str):
+        """
+        计算二进制名单（mmap加载，不构造PersonData，按列向量化计算）
+        
+        Args:
+            path: binary_roster 写出的 .brst 文件
+        
+        Returns:
+            (RosterArrays, 字段名 -> 数组)，数组含义同 VectorizedCalculator.calculate_arrays；
+            RosterArrays 的数值列引用文件映射，映射在它们释放后解除
+        """
+        from binary_roster import load_binary_roster
+        from vectorized_engine import VectorizedCalculator
+        
+        calculator = VectorizedCalculator(self.global_config, self.role_config, self.period, self.orgs)
+        with load_binary_roster(path) as binary:
+            roster = binary.to_arrays()
+            return roster, calculator.calculate_arrays(roster)
+    
+    def forecast(
+        self,
+        persons: List[PersonData],
+        actual_months: List[int],
+        simulations: int = 10000,
+        model=None,
+        seed: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        """
+        按已发生月份实际产值蒙特卡洛预测奖金总额（配置、期间同本计算器）
+        
+        Args:
+            actual_months: 已发生月份，其余月份按 model（payout_forecast.RevenueModel）抽样
+        
+        Returns:
+            payout_forecast.ForecastResult，percentile_rows() 给出总额及按岗位、区域的分位数
+        """
+        from payout_forecast import PayoutForecaster
+        
+        forecaster = PayoutForecaster(persons, actual_months, self.global_config, self.role_config,
+                                      self.period, model=model)
+        return forecaster.simulate(simulations, seed, workers)
+    
+    def explain(self, person: PersonData):
+        """
+        单人计算过程说明（按需推导，批量计算不生成）
+        
+        Returns:
+            explain.AuditTrace，to_dict() 为 export_to_dict 格式，另含"输入数据"、"计算过程"
+        """
+        from explain import explain_person
+        
+        return explain_person(person, self)
+    
     # ========== 常委CP计算 ==========
     def _calculate_cp(self, person: PersonData) -> BonusDetail:
         """
         常委奖金计算
         
         规则：
-        - 固定补贴：60000（按月10000*6）
+        - 固定补贴：60000（按月10000*6，非半年期间按补贴月数折算）
         - 大区90%奖：30000（若区域完成90%）
         - 大区100%奖：30000（若区域完成100%）
         - 全国90%奖：40000（若全国完成90%）
@@ -106,8 +186,8 @@ class BonusCalculator:
         
         cfg = self.global_config
         
-        # 固定补贴
-        detail.fixed_subsidy = cfg.cp_subsidy
+        # 固定补贴（cp_subsidy为半年额，按期间补贴月数折算）
+        detail.fixed_subsidy = cfg.cp_subsidy * self.period.cp_subsidy_factor
         
         # 大区奖
         if person.region_completed_90:
@@ -167,15 +247,17 @@ class BonusCalculator:
             detail.incentive_immediate = detail.incentive_total * 0.5
             detail.incentive_after_collection = detail.incentive_total * 0.5
         
-        # 计算完成率
-        completion_rate = self._get_completion_rate(person)
+        # 计算完成率（有组织单元汇总时取分公司共享值）
+        org = self._org(person)
+        completion_rate = org.completion_rate if org else self._get_completion_rate(person)
         detail.completion_rate = completion_rate
         
         # 分公司产值
-        company_revenue = person.get_company_revenue()
+        company_revenue = org.company_revenue if org else person.get_company_revenue(self.period.months)
         
         # 分公司完成奖
-        bonus_base = min(company_revenue * role_cfg.dm_completion_bonus_rate, cfg.dm_completion_bonus_cap)
+        bonus_base = (org.dm_bonus_base if org else
+                      min(company_revenue * role_cfg.dm_completion_bonus_rate, cfg.dm_completion_bonus_cap))
         
         # 90%档
         if completion_rate >= 0.9 and person.collection_rate >= cfg.threshold_90:
@@ -244,15 +326,16 @@ class BonusCalculator:
             detail.incentive_immediate = detail.incentive_total * 0.5
             detail.incentive_after_collection = detail.incentive_total * 0.5
         
-        # 计算完成率
-        completion_rate = self._get_completion_rate(person)
+        # 计算完成率（有组织单元汇总时取分公司共享值）
+        org = self._org(person)
+        completion_rate = org.completion_rate if org else self._get_completion_rate(person)
         detail.completion_rate = completion_rate
         
         # 分公司产值
-        company_revenue = person.get_company_revenue()
+        company_revenue = org.company_revenue if org else person.get_company_revenue(self.period.months)
         
         # 完成奖基数
-        bonus_base = company_revenue * role_cfg.completion_bonus_rate
+        bonus_base = org.bonus_base if org else company_revenue * role_cfg.completion_bonus_rate
         
         # 90%档
         if completion_rate >= 0.9 and person.collection_rate >= cfg.threshold_90:
@@ -327,17 +410,18 @@ class BonusCalculator:
         
         # 固定补贴 (新购/高校)
         if role_cfg.has_fixed_subsidy.get(person.role, False):
-            detail.fixed_subsidy = cfg.sales_monthly_subsidy * 6  # 半年
+            detail.fixed_subsidy = cfg.sales_monthly_subsidy * self.period.subsidy_month_count
         
-        # 计算完成率
-        completion_rate = self._get_completion_rate(person)
+        # 计算完成率（有组织单元汇总时取分公司共享值）
+        org = self._org(person)
+        completion_rate = org.completion_rate if org else self._get_completion_rate(person)
         detail.completion_rate = completion_rate
         
         # 分公司产值
-        company_revenue = person.get_company_revenue()
+        company_revenue = org.company_revenue if org else person.get_company_revenue(self.period.months)
         
         # 完成奖基数
-        bonus_base = company_revenue * role_cfg.completion_bonus_rate
+        bonus_base = org.bonus_base if org else company_revenue * role_cfg.completion_bonus_rate
         
         # 90%档
         if completion_rate >= 0.9 and person.collection_rate >= cfg.threshold_90:
@@ -382,17 +466,23 @@ class BonusCalculator:
     ) -> Dict[int, float]:
         """计算月度过程激励"""
         result = {}
-        for month in range(1, 7):
+        for month in self.period.months:
             revenue = month_revenue.get(month, 0.0)
-            coeff = self.global_config.time_coefficients.get(month, 1.0)
+            coeff = self.period.coefficient(month)
             result[month] = revenue * rate * coeff
         return result
     
+    def _org(self, person: PersonData) -> Optional[OrgSummary]:
+        """人员所属组织单元的汇总（CP不参与）"""
+        if not self.orgs or person.role == Role.CP:
+            return None
+        return self.orgs.get(person.org_unit)
+    
     def _get_completion_rate(self, person: PersonData) -> float:
         """获取完成率（根据配置模式）"""
         if self.global_config.completion_rate_mode == CompletionRateMode.FROM_TARGET:
             if person.annual_target and person.annual_target > 0:
-                return person.get_total_revenue() / person.annual_target
+                return person.get_total_revenue(self.period.months) / person.annual_target
             return 0.0
         else:
             return person.completion_rate_manual or 0.0
@@ -408,12 +498,7 @@ class BonusCalculator:
                 "组织单元": detail.org_unit
             },
             "过程激励": {
-                "1月": detail.monthly_incentives.get(1, 0),
-                "2月": detail.monthly_incentives.get(2, 0),
-                "3月": detail.monthly_incentives.get(3, 0),
-                "4月": detail.monthly_incentives.get(4, 0),
-                "5月": detail.monthly_incentives.get(5, 0),
-                "6月": detail.monthly_incentives.get(6, 0),
+                **{month_label(m): detail.monthly_incentives.get(m, 0) for m in self.period.months},
                 "小计": detail.incentive_total,
                 "即时发放(50%)": detail.incentive_immediate,
                 "回款后发放(50%)": detail.incentive_after_collection
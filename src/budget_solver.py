@@ -0,0 +1,364 @@
+"""
+2026上半年奖金计算引擎 - 预算求解模块
+Budget-constrained parameter solver on the vectorized engine
+
+领导给定奖金总预算，问回款门槛、叠加模式、完成奖比例取多少才不超预算。
+本模块在可调参数上搜索总额不超过预算、且最接近预算的取值：
+
+【二分】单调参数（门槛越高总额越低；比例、金额越高总额越高），在给定区间内二分
+【网格】叠加模式等离散参数、给出取值列表的参数，逐一组合；每个组合内再对各二分参数求解
+
+名单只转换一次（RosterArrays），期间产值合计各候选共用，每个候选只做一次 calculate_arrays。
+
+使用：
+    python budget_solver.py roster.csv --budget 9e9 --bisect threshold_90=0.5:1 --modes
+    python budget_solver.py roster.csv --budget 9e9 --bisect completion_bonus_rate=0:0.03 \\
+        --grid threshold_100=0.9,0.95
+"""
+import argparse
+import itertools
+import sys
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from config import (
+    GlobalConfig, RoleConfig, PeriodConfig, CompletionBonusMode,
+    DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG, global_config_from_dict, role_config_from_dict
+)
+from models import PersonData
+from vectorized_engine import RosterArrays, VectorizedCalculator, period_total
+
+# 单调参数的方向：+1 取值越大总额越高，-1 取值越大总额越低（按岗位的字典参数按字段名查）
+MONOTONE_PARAMS = {
+    'threshold_90': -1,
+    'threshold_100': -1,
+    'completion_bonus_rate': 1,
+    'dm_completion_bonus_rate': 1,
+    'dm_completion_bonus_cap': 1,
+    'incentive_rates': 1,
+    'time_coefficients': 1,
+    'cp_subsidy': 1,
+    'sales_monthly_subsidy': 1,
+    'region_90_bonus': 1,
+    'region_100_bonus': 1,
+    'national_90_bonus': 1,
+    'national_100_bonus': 1,
+    'dm_region_bonus': 1,
+}
+
+# --modes 加入网格的叠加模式参数
+MODE_PARAMS = {
+    'dm_completion_bonus_mode': [m.value for m in CompletionBonusMode],
+    'other_completion_bonus_mode': [m.value for m in CompletionBonusMode],
+}
+
+GLOBAL_FIELDS = {f.name for f in fields(GlobalConfig)}
+ROLE_FIELDS = {f.name for f in fields(RoleConfig)}
+# 按键取值的字典型参数（岗位、月份 -> 值），须用点号指定键
+DICT_FIELDS = ({f for f in GLOBAL_FIELDS if isinstance(getattr(DEFAULT_GLOBAL_CONFIG, f), dict)}
+               | {f for f in ROLE_FIELDS if isinstance(getattr(DEFAULT_ROLE_CONFIG, f), dict)})
+
+
+def split_params(params: Dict[str, object]) -> Tuple[Dict, Dict]:
+    """
+    扁平参数 -> (全局参数覆盖, 岗位参数覆盖)
+
+    字典型参数用点号指定键，如 "incentive_rates.DM"、"time_coefficients.1"；
+    缺少键或对非字典参数加键时抛出 ValueError
+    """
+    global_values: Dict = {}
+    role_values: Dict = {}
+    for key, value in params.items():
+        name, _, sub = key.partition('.')
+        if name in GLOBAL_FIELDS:
+            target = global_values
+        elif name in ROLE_FIELDS:
+            target = role_values
+        else:
+            raise ValueError(f"未知的参数: {key}")
+        if name in DICT_FIELDS and not sub:
+            raise ValueError(f"参数 {name} 按键取值，需用点号指定键，如 {name}.{_example_key(name)}")
+        if sub and name not in DICT_FIELDS:
+            raise ValueError(f"参数 {name} 不是字典型参数，不能指定键: {key}")
+        if sub:
+            target.setdefault(name, {})[sub] = value
+        else:
+            target[name] = value
+    return global_values, role_values
+
+
+def _example_key(name: str) -> str:
+    config = DEFAULT_GLOBAL_CONFIG if name in GLOBAL_FIELDS else DEFAULT_ROLE_CONFIG
+    key = next(iter(getattr(config, name)), '')
+    return getattr(key, 'value', key)
+
+
+def param_direction(key: str) -> int:
+    direction = MONOTONE_PARAMS.get(key.partition('.')[0])
+    if direction is None:
+        raise ValueError(f"参数 {key} 不是单调参数，不能二分（可放入网格）")
+    split_params({key: 0})  # 字典型参数须带键
+    return direction
+
+
+@dataclass
+class BudgetCandidate:
+    """一组参数及其总额"""
+    params: Dict[str, object]
+    total: float
+    budget: float
+
+    @property
+    def feasible(self) -> bool:
+        return self.total <= self.budget
+
+    @property
+    def slack(self) -> float:
+        """预算余量（负数为超支）"""
+        return self.budget - self.total
+
+
+@dataclass
+class BudgetSolution:
+    """求解结果"""
+    budget: float
+    metric: str
+    candidates: List[BudgetCandidate] = field(default_factory=list)
+    evaluations: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def feasible(self) -> List[BudgetCandidate]:
+        """不超预算的候选，按余量从小到大"""
+        return sorted((c for c in self.candidates if c.feasible), key=lambda c: c.slack)
+
+    @property
+    def best(self) -> Optional[BudgetCandidate]:
+        feasible = self.feasible
+        return feasible[0] if feasible else None
+
+
+class BudgetSolver:
+    """预算求解器"""
+
+    def __init__(
+        self,
+        roster: Union[RosterArrays, List[PersonData]],
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        metric: str = 'grand_total'
+    ):
+        """
+        Args:
+            roster: 名单（PersonData 列表或 RosterArrays）
+            period: 计算期间；不指定时按各候选的 time_coefficients 取上半年
+            metric: 与预算比较的金额字段（calculate_arrays 的结果字段，如 completion_bonus_total）
+        """
+        self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
+        self.role_config = role_config or DEFAULT_ROLE_CONFIG
+        self.period = period
+        self.metric = metric
+        months = (period or PeriodConfig.from_global_config(self.global_config)).months
+        if not isinstance(roster, RosterArrays):
+            roster = RosterArrays.from_persons(roster, months)
+        self.roster = roster
+        self._revenue = roster.period_revenue(months)
+        self._total_revenue = period_total(self._revenue)
+        self._cache: Dict[Tuple, float] = {}
+
+    @property
+    def evaluations(self) -> int:
+        return len(self._cache)
+
+    def configs(self, params: Dict[str, object]) -> Tuple[GlobalConfig, RoleConfig]:
+        """在基准配置上应用参数覆盖"""
+        global_values, role_values = split_params(params)
+        return (global_config_from_dict(global_values, self.global_config),
+                role_config_from_dict(role_values, self.role_config))
+
+    def evaluate(self, params: Dict[str, object]) -> float:
+        """一组参数下的总额（同一组参数只算一次）"""
+        key = tuple(sorted((k, str(v)) for k, v in params.items()))
+        total = self._cache.get(key)
+        if total is None:
+            global_config, role_config = self.configs(params)
+            period = self.period or PeriodConfig.from_global_config(global_config)
+            calculator = VectorizedCalculator(global_config, role_config, period)
+            results = calculator.calculate_arrays(self.roster, self._revenue, self._total_revenue)
+            if self.metric not in results:
+                raise ValueError(f"未知的金额字段: {self.metric}")
+            total = self._cache[key] = float(results[self.metric].sum())
+        return total
+
+    def bisect(
+        self,
+        name: str,
+        low: float,
+        high: float,
+        budget: float,
+        fixed: Optional[Dict[str, object]] = None,
+        tol: float = 1e-4,
+        max_iter: int = 60
+    ) -> BudgetCandidate:
+        """
+        单调参数二分：在 [low, high] 内找不超预算且总额最大的取值
+
+        tol 为相对区间宽度的精度；区间内都超预算时返回总额最小的端点（feasible为False）
+        """
+        if low > high:
+            raise ValueError(f"参数 {name} 的区间下限大于上限: {low} > {high}")
+        fixed = dict(fixed or {})
+        direction = param_direction(name)
+
+        def candidate(x: float) -> BudgetCandidate:
+            params = {**fixed, name: x}
+            return BudgetCandidate(params, self.evaluate(params), budget)
+
+        # 总额最高、最低的两端
+        rich, lean = (high, low) if direction > 0 else (low, high)
+        at_rich = candidate(rich)
+        if at_rich.feasible:
+            return at_rich
+        at_lean = candidate(lean)
+        if not at_lean.feasible:
+            return at_lean
+
+        # 不变式：lean 端不超预算，rich 端超预算
+        precision = (high - low) * tol
+        for _ in range(max_iter):
+            if abs(rich - lean) <= precision:
+                break
+            mid = (lean + rich) / 2
+            at_mid = candidate(mid)
+            if at_mid.feasible:
+                lean, at_lean = mid, at_mid
+            else:
+                rich = mid
+        return at_lean
+
+    def solve(
+        self,
+        budget: float,
+        bisect: Optional[Dict[str, Tuple[float, float]]] = None,
+        grid: Optional[Dict[str, Sequence]] = None,
+        tol: float = 1e-4
+    ) -> BudgetSolution:
+        """
+        网格 × 二分搜索
+
+        Args:
+            budget: 总预算
+            bisect: {单调参数: (下限, 上限)}，每个网格组合内对各参数分别二分（其余参数取基准值）
+            grid: {参数: 取值列表}，逐一组合；不给 bisect 时只评估网格本身
+
+        Returns:
+            BudgetSolution，best 为不超预算且最接近预算的候选
+        """
+        start = time.perf_counter()
+        evaluations = self.evaluations
+        solution = BudgetSolution(budget, self.metric)
+        grid = grid or {}
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            fixed = dict(zip(keys, values))
+            if bisect:
+                for name, (low, high) in bisect.items():
+                    solution.candidates.append(self.bisect(name, low, high, budget, fixed, tol))
+            else:
+                solution.candidates.append(BudgetCandidate(fixed, self.evaluate(fixed), budget))
+        solution.evaluations = self.evaluations - evaluations
+        solution.elapsed = time.perf_counter() - start
+        return solution
+
+
+def solve_budget(
+    persons: List[PersonData],
+    budget: float,
+    bisect: Optional[Dict[str, Tuple[float, float]]] = None,
+    grid: Optional[Dict[str, Sequence]] = None,
+    config: GlobalConfig = None
+) -> BudgetSolution:
+    """便捷函数：预算求解"""
+    return BudgetSolver(persons, global_config=config).solve(budget, bisect, grid)
+
+
+# ========== 命令行 ==========
+def _parse_value(text: str):
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _parse_range(spec: str) -> Tuple[str, Tuple[float, float]]:
+    name, _, bounds = spec.partition('=')
+    low, sep, high = bounds.partition(':')
+    if not name or not sep:
+        raise ValueError(f"二分参数格式应为 名称=下限:上限，收到: {spec}")
+    return name, (float(low), float(high))
+
+
+def _parse_grid(spec: str) -> Tuple[str, List]:
+    name, sep, values = spec.partition('=')
+    if not name or not sep or not values:
+        raise ValueError(f"网格参数格式应为 名称=取值1,取值2，收到: {spec}")
+    return name, [_parse_value(v) for v in values.split(',')]
+
+
+def _format_params(params: Dict[str, object]) -> str:
+    return ', '.join(f"{k}={v:.6g}" if isinstance(v, float) else f"{k}={v}" for k, v in params.items())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from batch_io import iter_roster
+    from config import load_config_file
+
+    parser = argparse.ArgumentParser(description="按总预算搜索参数取值")
+    parser.add_argument("input", help="人员名单文件（.csv/.xlsx/.ndjson/.brst）")
+    parser.add_argument("-b", "--budget", type=float, required=True, help="总预算（元）")
+    parser.add_argument("--bisect", action="append", default=[], metavar="名称=下限:上限",
+                        help="二分的单调参数，可重复")
+    parser.add_argument("--grid", action="append", default=[], metavar="名称=取值1,取值2",
+                        help="网格参数，可重复")
+    parser.add_argument("--modes", action="store_true", help="叠加模式加入网格（DM/其他岗位 × exclusive/stack）")
+    parser.add_argument("--metric", default='grand_total', help="与预算比较的金额字段")
+    parser.add_argument("--tol", type=float, default=1e-4, help="二分精度（相对区间宽度）")
+    parser.add_argument("-c", "--config", help="基准参数覆盖文件（JSON）")
+    parser.add_argument("-n", "--top", type=int, default=10, help="显示的候选数")
+    args = parser.parse_args(argv)
+
+    try:
+        bisect = dict(_parse_range(s) for s in args.bisect)
+        grid = dict(_parse_grid(s) for s in args.grid)
+        if args.modes:
+            grid.update({k: v for k, v in MODE_PARAMS.items() if k not in grid})
+        global_config, role_config = load_config_file(args.config) if args.config else (None, None)
+        with ExitStack() as stack:
+            if args.input.endswith('.brst'):
+                from binary_roster import load_binary_roster
+                roster = stack.enter_context(load_binary_roster(args.input)).to_arrays()
+            else:
+                roster = list(iter_roster(args.input))
+            solver = BudgetSolver(roster, global_config, role_config, metric=args.metric)
+            solution = solver.solve(args.budget, bisect, grid, args.tol)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    per_candidate = solution.elapsed / solution.evaluations * 1000 if solution.evaluations else 0.0
+    print(f"预算: ¥{args.budget:,.2f}  评估 {solution.evaluations} 次，"
+          f"耗时 {solution.elapsed:.2f}s（{per_candidate:.1f} ms/次）")
+    feasible = solution.feasible
+    if not feasible:
+        print("没有不超预算的参数组合")
+        return 1
+    for candidate in feasible[:args.top]:
+        print(f"¥{candidate.total:,.2f}  余量 ¥{candidate.slack:,.2f}  {_format_params(candidate.params)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+2026上半年奖金计算引擎 - 列式导出模块
+Export calculation results to Apache Arrow IPC / Parquet
+
+【说明】
+- 列与 batch_io.RESULT_FIELDS 一致，金额/比率为float64，is_valid为bool；
+  Parquet中岗位、区域、组织单元、完成奖模式及提示信息为字典编码字符串（重复值只存一次）
+- 写出按 row_group_size 攒批，每批一个 row group（Parquet）/ record batch（Arrow），
+  内存占用与总行数无关
+- Arrow IPC 不压缩，读取时通过 mmap 零拷贝；Parquet 默认zstd压缩，读取时同样走 mmap
+"""
+import importlib.util
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from models import BonusDetail, ValidationResult
+from batch_io import (
+    MONTHS, RESULT_FIELDS, RESULT_TEXT_FIELDS, RESULT_BOOL_FIELDS,
+    ResultWriter, detect_format, detail_to_row,
+)
+
+# pyarrow 延迟到首次导出/读取时导入
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+pa = None
+pq = None
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+# 取值种类少、重复多的文本列
+DICTIONARY_FIELDS = {'role', 'region', 'org_unit', 'completion_bonus_mode',
+                     'errors', 'warnings', 'pending_confirmations'}
+# 可能为空的数值列（CP无即时/回款后拆分；回款率、分配比例可不填）
+NULLABLE_FIELDS = {'incentive_immediate', 'incentive_after_collection',
+                   'collection_rate', 'personal_allocation_ratio'}
+
+
+def _load_pyarrow():
+    """导入pyarrow并绑定本模块使用的名称（仅首次调用生效）"""
+    global pa, pq
+    if pa is not None:
+        return
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Arrow/Parquet export. Install it with: pip install pyarrow")
+    import pyarrow as _pa
+    import pyarrow.parquet as _pq
+    pa, pq = _pa, _pq
+
+
+def result_schema(dictionary: bool = True):
+    """
+    结果表的Arrow schema
+
+    Args:
+        dictionary: 文本列是否字典编码（Arrow IPC 文件格式不支持跨批次替换字典，写IPC时用普通字符串）
+    """
+    _load_pyarrow()
+    fields = []
+    for name in RESULT_FIELDS:
+        if dictionary and name in DICTIONARY_FIELDS:
+            dtype = pa.dictionary(pa.int32(), pa.string())
+        elif name in RESULT_TEXT_FIELDS:
+            dtype = pa.string()
+        elif name in RESULT_BOOL_FIELDS:
+            dtype = pa.bool_()
+        else:
+            dtype = pa.float64()
+        nullable = name in NULLABLE_FIELDS or name in RESULT_TEXT_FIELDS
+        fields.append(pa.field(name, dtype, nullable=nullable))
+    metadata = {b'months': ','.join(str(m) for m in MONTHS).encode()}
+    return pa.schema(fields, metadata=metadata)
+
+
+def rows_to_record_batch(rows: Sequence[Dict], schema=None):
+    """结果行 -> RecordBatch（按列构造）"""
+    _load_pyarrow()
+    schema = schema or result_schema()
+    arrays = []
+    for f in schema:
+        values = [row[f.name] for row in rows]
+        if pa.types.is_dictionary(f.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=f.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+# ========== 写出 ==========
+class ColumnarResultWriter(ResultWriter):
+    """Arrow IPC / Parquet 流式写出器，攒满 row_group_size 行写一个 row group"""
+
+    def __init__(
+        self,
+        path: str,
+        fmt: Optional[str] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        compression: str = 'zstd'
+    ):
+        super().__init__(path)
+        _load_pyarrow()
+        self.fmt = fmt or detect_format(path, COLUMNAR_FORMATS)
+        if self.fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"不支持的列式格式: {self.fmt}（支持: {', '.join(COLUMNAR_FORMATS)}）")
+        self.row_group_size = row_group_size
+        self.schema = result_schema(dictionary=self.fmt == 'parquet')
+        # 到达的块立即转为列式批次暂存，攒满一个 row group 再写出
+        self._pending = []
+        self._pending_rows = 0
+        if self.fmt == 'parquet':
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+        else:
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def _write(self, rows):
+        if not rows:
+            return
+        self._pending.append(rows_to_record_batch(rows, self.schema))
+        self._pending_rows += len(rows)
+        while self._pending_rows >= self.row_group_size:
+            table = pa.Table.from_batches(self._pending, schema=self.schema)
+            self._flush(table.slice(0, self.row_group_size))
+            rest = table.slice(self.row_group_size)
+            self._pending = rest.to_batches()
+            self._pending_rows = rest.num_rows
+
+    def write_details(self, results: Sequence[Tuple[BonusDetail, ValidationResult]]):
+        """写出 (BonusDetail, ValidationResult) 列表，与 export_to_excel 的入参一致"""
+        self.write_rows([detail_to_row(detail, validation) for detail, validation in results])
+
+    def _flush(self, table):
+        if self.fmt == 'parquet':
+            self._writer.write_table(table, row_group_size=table.num_rows)
+        else:
+            self._writer.write_batch(table.combine_chunks().to_batches()[0])
+
+    def close(self):
+        if self._pending_rows:
+            self._flush(pa.Table.from_batches(self._pending, schema=self.schema))
+            self._pending = []
+            self._pending_rows = 0
+        self._writer.close()
+        if self.fmt == 'arrow':
+            self._sink.close()
+
+
+def export_columnar(
+    results: Sequence[Tuple[BonusDetail, ValidationResult]],
+    filepath: str,
+    fmt: Optional[str] = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+):
+    """便捷函数：导出计算结果为列式文件（格式按扩展名判断）"""
+    with ColumnarResultWriter(filepath, fmt=fmt, row_group_size=row_group_size) as writer:
+        for start in range(0, len(results), row_group_size):
+            writer.write_details(results[start:start + row_group_size])
+
+
+def export_to_parquet(
+    results: Sequence[Tuple[BonusDetail, ValidationResult]],
+    filepath: str = "bonus_results.parquet",
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+):
+    """便捷函数：导出计算结果为Parquet"""
+    export_columnar(results, filepath, fmt='parquet', row_group_size=row_group_size)
+
+
+def export_to_arrow(
+    results: Sequence[Tuple[BonusDetail, ValidationResult]],
+    filepath: str = "bonus_results.arrow",
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+):
+    """便捷函数：导出计算结果为Arrow IPC文件"""
+    export_columnar(results, filepath, fmt='arrow', row_group_size=row_group_size)
+
+
+# ========== 读取 ==========
+def read_results(path: str, columns: Optional[List[str]] = None, fmt: Optional[str] = None):
+    """
+    读取列式结果文件为 pyarrow.Table
+
+    Arrow IPC 通过 mmap 零拷贝映射，返回的表直接引用文件页；
+    Parquet 通过 mmap 读取后解码，只解码 columns 指定的列
+    """
+    _load_pyarrow()
+    fmt = fmt or detect_format(path, COLUMNAR_FORMATS)
+    if fmt == 'parquet':
+        return pq.read_table(path, columns=columns, memory_map=True)
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.select(columns) if columns else table
+
+
+def iter_result_batches(path: str, columns: Optional[List[str]] = None, fmt: Optional[str] = None) -> Iterator:
+    """按 row group / record batch 逐批读取，适合大于内存的结果文件"""
+    _load_pyarrow()
+    fmt = fmt or detect_format(path, COLUMNAR_FORMATS)
+    if fmt == 'parquet':
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for i in range(parquet_file.num_row_groups):
+            yield from parquet_file.read_row_group(i, columns=columns).to_batches()
+        return
+    reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        yield batch.select(columns) if columns else batch
@@ -3,7 +3,7 @@
 Configuration module for bonus calculation
 """
 from dataclasses import dataclass, field
-from typing import Dict, List, Literal
+from typing import Dict, List, Literal, Optional, Tuple
 from enum import Enum
 
 
@@ -130,6 +130,162 @@ class RoleConfig:
     })
 
 
+# 常委固定补贴(cp_subsidy)按半年核定，其他期间按补贴月数折算
+CP_SUBSIDY_BASE_MONTHS = 6
+
+
+def month_key(year: int, month: int) -> int:
+    """跨年期间的月份键：年*100+月，如 202507"""
+    return year * 100 + month
+
+
+def month_label(month: int) -> str:
+    """月份键 -> 显示文本（1 -> "1月"，202507 -> "2025年7月"）"""
+    return f"{month // 100}年{month % 100}月" if month > 100 else f"{month}月"
+
+
+@dataclass
+class PeriodConfig:
+    """
+    计算期间定义
+
+    months 为该期间包含的月份键（与 PersonData.month_revenue 的键一致）：
+    单一年度内直接用1-12，跨年期间用 month_key(年, 月)
+    """
+    name: str = "H1"
+    months: List[int] = field(default_factory=lambda: list(range(1, 7)))
+    time_coefficients: Dict[int, float] = field(default_factory=dict)  # 未列出的月份系数为1.0
+    subsidy_months: Optional[int] = None  # 补贴月数，默认等于月份数
+
+    @property
+    def subsidy_month_count(self) -> int:
+        return self.subsidy_months if self.subsidy_months is not None else len(self.months)
+
+    @property
+    def cp_subsidy_factor(self) -> float:
+        return self.subsidy_month_count / CP_SUBSIDY_BASE_MONTHS
+
+    def coefficient(self, month: int) -> float:
+        return self.time_coefficients.get(month, 1.0)
+
+    @classmethod
+    def from_global_config(cls, config: "GlobalConfig") -> "PeriodConfig":
+        """上半年期间（1-6月，系数取自 GlobalConfig.time_coefficients）"""
+        return cls(name="H1", months=list(range(1, 7)), time_coefficients=dict(config.time_coefficients))
+
+    @classmethod
+    def half_year(cls, half: int, time_coefficients: Dict[int, float] = None, year: int = None) -> "PeriodConfig":
+        """半年期间：half=1 为1-6月，half=2 为7-12月"""
+        if half not in (1, 2):
+            raise ValueError(f"half 只能为1或2: {half}")
+        months = list(range(1, 7)) if half == 1 else list(range(7, 13))
+        name = f"{year}H{half}" if year else f"H{half}"
+        return cls(name=name, months=months, time_coefficients=dict(time_coefficients or {}))
+
+    @classmethod
+    def full_year(cls, time_coefficients: Dict[int, float] = None, year: int = None) -> "PeriodConfig":
+        """全年期间（1-12月）"""
+        return cls(name=str(year) if year else "FY", months=list(range(1, 13)),
+                   time_coefficients=dict(time_coefficients or {}))
+
+    @classmethod
+    def rolling(cls, start_year: int, start_month: int, count: int = 12,
+                time_coefficients: Dict[int, float] = None, name: str = None) -> "PeriodConfig":
+        """跨年滚动期间，月份键为 month_key(年, 月)"""
+        months = []
+        year, month = start_year, start_month
+        for _ in range(count):
+            months.append(month_key(year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return cls(name=name or f"{months[0]}-{months[-1]}", months=months,
+                   time_coefficients=dict(time_coefficients or {}))
+
+
 # 默认配置实例
 DEFAULT_GLOBAL_CONFIG = GlobalConfig()
 DEFAULT_ROLE_CONFIG = RoleConfig()
+DEFAULT_PERIOD = PeriodConfig.from_global_config(DEFAULT_GLOBAL_CONFIG)
+
+
+# ========== 配置加载 ==========
+def _coerce_enum(enum_cls, value):
+    return value if isinstance(value, enum_cls) else enum_cls(value)
+
+
+def global_config_from_dict(data: Dict, base: GlobalConfig = None) -> GlobalConfig:
+    """
+    由字典覆盖全局参数（未出现的字段沿用base）
+
+    时间系数的键可为字符串月份，如 {"time_coefficients": {"1": 1.2}}，
+    只覆盖给出的月份
+    """
+    base = base or GlobalConfig()
+    values = dict(base.__dict__)
+    values['time_coefficients'] = dict(base.time_coefficients)
+    for key, value in data.items():
+        if key not in values:
+            raise ValueError(f"未知的全局参数: {key}")
+        if key == 'time_coefficients':
+            values[key].update({int(m): float(c) for m, c in value.items()})
+        elif key in ('dm_completion_bonus_mode', 'other_completion_bonus_mode'):
+            values[key] = _coerce_enum(CompletionBonusMode, value)
+        elif key == 'completion_rate_mode':
+            values[key] = _coerce_enum(CompletionRateMode, value)
+        else:
+            values[key] = value
+    return GlobalConfig(**values)
+
+
+def role_config_from_dict(data: Dict, base: RoleConfig = None) -> RoleConfig:
+    """
+    由字典覆盖岗位参数（未出现的字段沿用base）
+
+    按岗位的字典以岗位代码为键，如 {"incentive_rates": {"DM": 0.005}}
+    """
+    base = base or RoleConfig()
+    values = {k: (dict(v) if isinstance(v, dict) else v) for k, v in base.__dict__.items()}
+    for key, value in data.items():
+        if key not in values:
+            raise ValueError(f"未知的岗位参数: {key}")
+        if isinstance(values[key], dict):
+            values[key].update({_coerce_enum(Role, r): v for r, v in value.items()})
+        else:
+            values[key] = value
+    return RoleConfig(**values)
+
+
+def _plain(value):
+    """枚举 -> 取值，字典键同样处理（供JSON序列化）"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {_plain(k): _plain(v) for k, v in value.items()}
+    return value
+
+
+def config_to_dict(global_config: GlobalConfig = None, role_config: RoleConfig = None) -> Dict:
+    """配置 -> 配置文件格式的字典（load_config_file 的逆过程，各字段完整列出）"""
+    global_config = global_config or DEFAULT_GLOBAL_CONFIG
+    role_config = role_config or DEFAULT_ROLE_CONFIG
+    return {
+        'global': {k: _plain(v) for k, v in global_config.__dict__.items()},
+        'role': {k: _plain(v) for k, v in role_config.__dict__.items()},
+    }
+
+
+def load_config_file(path: str) -> Tuple[GlobalConfig, RoleConfig]:
+    """
+    从JSON文件加载配置覆盖项
+
+    文件格式：{"global": {...GlobalConfig字段}, "role": {...RoleConfig字段}}
+    """
+    import json
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    unknown = set(data) - {'global', 'role'}
+    if unknown:
+        raise ValueError(f"配置文件只支持 global / role 两节，发现: {sorted(unknown)}")
+    return (
+        global_config_from_dict(data.get('global', {})),
+        role_config_from_dict(data.get('role', {}))
+    )
@@ -1,285 +1,404 @@
-"""创建带完整Excel公式的模板"""
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.datavalidation import DataValidation
-
-wb = openpyxl.Workbook()
-wb.remove(wb.active)
-
-# 样式
-HEADER_FILL = PatternFill(start_color='1976D2', end_color='1976D2', fill_type='solid')
-HEADER_FONT = Font(color='FFFFFF', bold=True)
-INPUT_FILL = PatternFill(start_color='FFFDE7', end_color='FFFDE7', fill_type='solid')
-CALC_FILL = PatternFill(start_color='E8F5E9', end_color='E8F5E9', fill_type='solid')
-RESULT_FILL = PatternFill(start_color='E3F2FD', end_color='E3F2FD', fill_type='solid')
-THIN_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                     top=Side(style='thin'), bottom=Side(style='thin'))
-
-# ========== 1. 参数表 ==========
-ws_param = wb.create_sheet('参数设置')
-params = [
-    ['参数名称', '参数值', '说明'],
-    ['1月时间系数', 1.15, ''],
-    ['2月时间系数', 1.15, ''],
-    ['3月时间系数', 1.10, ''],
-    ['4月时间系数', 1.00, ''],
-    ['5月时间系数', 0.90, ''],
-    ['6月时间系数', 0.85, ''],
-    ['90%回款门槛', 0.85, '回款率>=此值才发90%奖'],
-    ['100%回款门槛', 0.90, '回款率>=此值才发100%奖'],
-    ['常委固定补贴', 60000, '半年总额'],
-    ['销售月补贴', 800, '新购/高校每月'],
-    ['DM叠加模式', 'exclusive', 'exclusive=只发最高档, stack=叠加'],
-    ['其他叠加模式', 'stack', 'exclusive=只发最高档, stack=叠加'],
+"""
+2026上半年奖金计算引擎 - 带公式Excel模板生成模块
+Generate the Excel template with live formulas
+
+【设计要点】
+1. 行数、输出路径可配置，可作为模块导入，也可命令行运行
+2. 参数通过定义名称(Defined Name)引用，公式短小，不再嵌套重复的时间系数展开
+3. 人员数据区登记为Excel表格(Table)，汇总使用整列引用，与行数无关
+4. 支持write_only流式写入，2万行模板也能快速生成
+"""
+import argparse
+import importlib.util
+import warnings
+from typing import Dict, List, Optional
+
+from config import GlobalConfig, RoleConfig, Role, DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+
+# openpyxl 延迟到首次创建生成器时导入；公式构造函数不依赖openpyxl
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+openpyxl = None
+
+
+def _load_openpyxl():
+    """导入openpyxl并绑定本模块使用的名称（仅首次调用生效）"""
+    global openpyxl, WriteOnlyCell, Font, PatternFill, Border, Side, NamedStyle
+    global get_column_letter, DefinedName, DataValidation, Table, TableColumn, TableStyleInfo
+    if openpyxl is not None:
+        return
+    import openpyxl as _openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Border, Side, NamedStyle
+    from openpyxl.utils import get_column_letter
+    from openpyxl.workbook.defined_name import DefinedName
+    from openpyxl.worksheet.datavalidation import DataValidation
+    from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+    openpyxl = _openpyxl
+
+
+PARAM_SHEET = '参数设置'
+DATA_SHEET = '人员数据'
+RESULT_SHEET = '计算结果'
+SUMMARY_SHEET = '汇总'
+DATA_TABLE_NAME = 'PersonData'
+
+DEFAULT_ROWS = 50
+
+DATA_HEADERS = ['序号', '姓名', '岗位', '区域', '组织单元',
+                '1月产值', '2月产值', '3月产值', '4月产值', '5月产值', '6月产值',
+                '分公司产值', '年度目标', '回款率',
+                '区域90%', '区域100%', '全国90%', '全国100%',
+                '分配比例', 'CEO奖金']
+
+RESULT_HEADERS = ['序号', '姓名', '岗位', '产值合计', '完成率',
+                  '过程激励', '完成奖90%', '完成奖100%', '完成奖小计',
+                  '区域奖', '全国奖', '固定补贴', 'CEO奖金', '奖金合计']
+
+RESULT_WIDTHS = [6, 10, 12, 12, 10, 12, 12, 12, 12, 10, 10, 10, 10, 12]
+
+# 岗位费率表位置（参数设置!E:F）
+ROLE_TABLE_NAME = 'ROLE_RATES'
+
+ROLE_SUMMARY = [
+    ('常委CP', Role.CP),
+    ('总经理DM', Role.DM),
+    ('副总经理VP', Role.VP),
+    ('部门经理MGR', Role.MGR),
+    ('销售(用户)', Role.SALES_USER),
+    ('销售(新购)', Role.SALES_NEW),
+    ('销售(高校)', Role.SALES_EDU),
 ]
-for r, row in enumerate(params, 1):
-    for c, val in enumerate(row, 1):
-        cell = ws_param.cell(row=r, column=c, value=val)
-        cell.border = THIN_BORDER
-        if r == 1:
-            cell.fill = HEADER_FILL
-            cell.font = HEADER_FONT
-        elif c == 2 and r > 1:
-            cell.fill = INPUT_FILL
-ws_param.column_dimensions['A'].width = 15
-ws_param.column_dimensions['B'].width = 12
-ws_param.column_dimensions['C'].width = 30
-
-# ========== 2. 人员数据表 ==========
-ws_data = wb.create_sheet('人员数据')
-headers = ['序号','姓名','岗位','区域','组织单元',
-           '1月产值','2月产值','3月产值','4月产值','5月产值','6月产值',
-           '分公司产值','年度目标','回款率',
-           '区域90%','区域100%','全国90%','全国100%',
-           '分配比例','CEO奖金']
-
-for c, h in enumerate(headers, 1):
-    cell = ws_data.cell(row=1, column=c, value=h)
-    cell.fill = HEADER_FILL
-    cell.font = HEADER_FONT
-    cell.border = THIN_BORDER
-
-# 预填50行输入区
-for r in range(2, 52):
-    for c in range(1, 21):
-        cell = ws_data.cell(row=r, column=c)
-        cell.fill = INPUT_FILL
-        cell.border = THIN_BORDER
-
-# 数据验证 - 岗位下拉
-role_dv = DataValidation(type='list', formula1='"CP,DM,VP,MGR,SALES_USER,SALES_NEW,SALES_EDU"')
-ws_data.add_data_validation(role_dv)
-role_dv.add('C2:C51')
-
-# 数据验证 - 是否下拉
-yesno_dv = DataValidation(type='list', formula1='"是,否"')
-ws_data.add_data_validation(yesno_dv)
-yesno_dv.add('O2:R51')
-
-for c in range(1, 21):
-    ws_data.column_dimensions[get_column_letter(c)].width = 10 if c < 5 else 9
-
-# ========== 3. 计算结果表(带公式) ==========
-ws_result = wb.create_sheet('计算结果')
-result_headers = ['序号','姓名','岗位','产值合计','完成率',
-                  '过程激励','完成奖90%','完成奖100%','完成奖小计',
-                  '区域奖','全国奖','固定补贴','CEO奖金','奖金合计']
-
-for c, h in enumerate(result_headers, 1):
-    cell = ws_result.cell(row=1, column=c, value=h)
-    cell.fill = HEADER_FILL
-    cell.font = HEADER_FONT
-    cell.border = THIN_BORDER
-
-# 写入公式 (行2-51)
-for r in range(2, 52):
-    row_str = str(r)
-    
-    # A: 序号
-    ws_result.cell(row=r, column=1).value = f'=IF(人员数据!B{row_str}<>"",人员数据!A{row_str},"")'
-    ws_result.cell(row=r, column=1).border = THIN_BORDER
-    
-    # B: 姓名
-    ws_result.cell(row=r, column=2).value = f'=IF(人员数据!B{row_str}<>"",人员数据!B{row_str},"")'
-    ws_result.cell(row=r, column=2).border = THIN_BORDER
-    
-    # C: 岗位
-    ws_result.cell(row=r, column=3).value = f'=IF(人员数据!B{row_str}<>"",人员数据!C{row_str},"")'
-    ws_result.cell(row=r, column=3).border = THIN_BORDER
-    
-    # D: 产值合计
-    cell = ws_result.cell(row=r, column=4)
-    cell.value = f'=IF(人员数据!B{row_str}<>"",SUM(人员数据!F{row_str}:K{row_str}),"")'
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # E: 完成率 (分公司产值/年度目标)
-    cell = ws_result.cell(row=r, column=5)
-    cell.value = f'=IF(AND(人员数据!B{row_str}<>"",人员数据!M{row_str}>0),人员数据!L{row_str}/人员数据!M{row_str},"")'
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '0.0%'
-    
-    # F: 过程激励
-    # CP=0, DM/VP=0.4%, MGR=1%, SALES_USER=2%, SALES_NEW/EDU=3%
-    incentive = f'''=IF(人员数据!B{row_str}="","",
-IF(人员数据!C{row_str}="CP",0,
-IF(OR(人员数据!C{row_str}="DM",人员数据!C{row_str}="VP"),
-(人员数据!F{row_str}*参数设置!$B$2+人员数据!G{row_str}*参数设置!$B$3+人员数据!H{row_str}*参数设置!$B$4+人员数据!I{row_str}*参数设置!$B$5+人员数据!J{row_str}*参数设置!$B$6+人员数据!K{row_str}*参数设置!$B$7)*0.004,
-IF(人员数据!C{row_str}="MGR",
-(人员数据!F{row_str}*参数设置!$B$2+人员数据!G{row_str}*参数设置!$B$3+人员数据!H{row_str}*参数设置!$B$4+人员数据!I{row_str}*参数设置!$B$5+人员数据!J{row_str}*参数设置!$B$6+人员数据!K{row_str}*参数设置!$B$7)*0.01,
-IF(人员数据!C{row_str}="SALES_USER",
-(人员数据!F{row_str}*参数设置!$B$2+人员数据!G{row_str}*参数设置!$B$3+人员数据!H{row_str}*参数设置!$B$4+人员数据!I{row_str}*参数设置!$B$5+人员数据!J{row_str}*参数设置!$B$6+人员数据!K{row_str}*参数设置!$B$7)*0.02,
-(人员数据!F{row_str}*参数设置!$B$2+人员数据!G{row_str}*参数设置!$B$3+人员数据!H{row_str}*参数设置!$B$4+人员数据!I{row_str}*参数设置!$B$5+人员数据!J{row_str}*参数设置!$B$6+人员数据!K{row_str}*参数设置!$B$7)*0.03)))))'''
-    cell = ws_result.cell(row=r, column=6)
-    cell.value = incentive.replace('\n', '')
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # G: 完成奖90%
-    bonus90 = f'''=IF(人员数据!B{row_str}="","",
-IF(人员数据!C{row_str}="CP",0,
-IF(AND(E{row_str}>=0.9,人员数据!N{row_str}>=参数设置!$B$8),
-IF(人员数据!C{row_str}="DM",MIN(人员数据!L{row_str}*0.004,40000),
-人员数据!L{row_str}*0.015*IF(人员数据!S{row_str}<>"",人员数据!S{row_str},1)),0)))'''
-    cell = ws_result.cell(row=r, column=7)
-    cell.value = bonus90.replace('\n', '')
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # H: 完成奖100%
-    bonus100 = f'''=IF(人员数据!B{row_str}="","",
-IF(人员数据!C{row_str}="CP",0,
-IF(AND(E{row_str}>=1,人员数据!N{row_str}>=参数设置!$B$9),
-IF(人员数据!C{row_str}="DM",MIN(人员数据!L{row_str}*0.004,40000),
-人员数据!L{row_str}*0.015*IF(人员数据!S{row_str}<>"",人员数据!S{row_str},1)),0)))'''
-    cell = ws_result.cell(row=r, column=8)
-    cell.value = bonus100.replace('\n', '')
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # I: 完成奖小计 (根据叠加模式)
-    bonus_total = f'''=IF(人员数据!B{row_str}="","",
-IF(人员数据!C{row_str}="DM",
-IF(参数设置!$B$12="exclusive",MAX(G{row_str},H{row_str}),G{row_str}+H{row_str}),
-IF(参数设置!$B$13="exclusive",MAX(G{row_str},H{row_str}),G{row_str}+H{row_str})))'''
-    cell = ws_result.cell(row=r, column=9)
-    cell.value = bonus_total.replace('\n', '')
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # J: 区域奖
-    region = f'''=IF(人员数据!B{row_str}="","",
-IF(人员数据!C{row_str}="CP",IF(人员数据!O{row_str}="是",30000,0)+IF(人员数据!P{row_str}="是",30000,0),
-IF(人员数据!C{row_str}="DM",IF(OR(人员数据!O{row_str}="是",人员数据!P{row_str}="是"),40000,0),0)))'''
-    cell = ws_result.cell(row=r, column=10)
-    cell.value = region.replace('\n', '')
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # K: 全国奖 (仅CP)
-    national = f'''=IF(人员数据!B{row_str}="","",
-IF(人员数据!C{row_str}="CP",IF(人员数据!Q{row_str}="是",40000,0)+IF(人员数据!R{row_str}="是",40000,0),0))'''
-    cell = ws_result.cell(row=r, column=11)
-    cell.value = national.replace('\n', '')
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # L: 固定补贴
-    subsidy = f'''=IF(人员数据!B{row_str}="","",
-IF(人员数据!C{row_str}="CP",参数设置!$B$10,
-IF(OR(人员数据!C{row_str}="SALES_NEW",人员数据!C{row_str}="SALES_EDU"),参数设置!$B$11*6,0)))'''
-    cell = ws_result.cell(row=r, column=12)
-    cell.value = subsidy.replace('\n', '')
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # M: CEO奖金
-    cell = ws_result.cell(row=r, column=13)
-    cell.value = f'=IF(人员数据!B{row_str}<>"",IF(人员数据!T{row_str}<>"",人员数据!T{row_str},0),"")'
-    cell.border = THIN_BORDER
-    cell.fill = CALC_FILL
-    cell.number_format = '#,##0'
-    
-    # N: 奖金合计
-    cell = ws_result.cell(row=r, column=14)
-    cell.value = f'=IF(人员数据!B{row_str}<>"",F{row_str}+I{row_str}+J{row_str}+K{row_str}+L{row_str}+M{row_str},"")'
-    cell.border = THIN_BORDER
-    cell.fill = RESULT_FILL
-    cell.number_format = '#,##0'
-    cell.font = Font(bold=True)
-
-# 设置列宽
-widths = [6,10,12,12,10,12,12,12,12,10,10,10,10,12]
-for c, w in enumerate(widths, 1):
-    ws_result.column_dimensions[get_column_letter(c)].width = w
-
-# ========== 4. 汇总表 ==========
-ws_sum = wb.create_sheet('汇总')
-ws_sum['A1'] = '2026上半年奖金汇总'
-ws_sum['A1'].font = Font(size=16, bold=True)
-
-ws_sum['A3'] = '总人数:'
-ws_sum['B3'] = '=COUNTA(计算结果!B2:B51)'
-ws_sum['B3'].font = Font(bold=True)
-
-ws_sum['A4'] = '奖金总额:'
-ws_sum['B4'] = '=SUM(计算结果!N2:N51)'
-ws_sum['B4'].number_format = '¥#,##0'
-ws_sum['B4'].font = Font(bold=True, size=14, color='1976D2')
-
-ws_sum['A6'] = '按岗位汇总'
-ws_sum['A6'].font = Font(bold=True)
-ws_sum['A7'] = '常委CP'
-ws_sum['B7'] = '=SUMIF(计算结果!C:C,"CP",计算结果!N:N)'
-ws_sum['B7'].number_format = '#,##0'
-ws_sum['A8'] = '总经理DM'
-ws_sum['B8'] = '=SUMIF(计算结果!C:C,"DM",计算结果!N:N)'
-ws_sum['B8'].number_format = '#,##0'
-ws_sum['A9'] = '副总经理VP'
-ws_sum['B9'] = '=SUMIF(计算结果!C:C,"VP",计算结果!N:N)'
-ws_sum['B9'].number_format = '#,##0'
-ws_sum['A10'] = '部门经理MGR'
-ws_sum['B10'] = '=SUMIF(计算结果!C:C,"MGR",计算结果!N:N)'
-ws_sum['B10'].number_format = '#,##0'
-ws_sum['A11'] = '销售(用户)'
-ws_sum['B11'] = '=SUMIF(计算结果!C:C,"SALES_USER",计算结果!N:N)'
-ws_sum['B11'].number_format = '#,##0'
-ws_sum['A12'] = '销售(新购)'
-ws_sum['B12'] = '=SUMIF(计算结果!C:C,"SALES_NEW",计算结果!N:N)'
-ws_sum['B12'].number_format = '#,##0'
-ws_sum['A13'] = '销售(高校)'
-ws_sum['B13'] = '=SUMIF(计算结果!C:C,"SALES_EDU",计算结果!N:N)'
-ws_sum['B13'].number_format = '#,##0'
-
-ws_sum.column_dimensions['A'].width = 15
-ws_sum.column_dimensions['B'].width = 15
-
-# ========== 5. 填入测试数据 ==========
-test_data = [
-    [1, '王总', 'CP', '全国', '总部', 0,0,0,0,0,0, 0, 0, 0.95, '是','是','是','否', '', 50000],
-    [2, '李总', 'DM', '华北', '北京分公司', 500000,600000,700000,800000,750000,650000, 4000000, 3800000, 0.92, '是','否','否','否', '', 20000],
-    [3, '张经理', 'MGR', '华东', '上海分公司', 150000,180000,200000,220000,190000,160000, 3000000, 2800000, 0.91, '否','否','否','否', 0.25, 5000],
-    [4, '陈销售', 'SALES_NEW', '华东', '上海分公司', 80000,90000,100000,110000,95000,85000, 3000000, 500000, 0.88, '否','否','否','否', 0.15, 0],
-    [5, '刘副总', 'VP', '华南', '深圳分公司', 200000,250000,280000,300000,270000,230000, 2500000, 2300000, 0.93, '否','否','否','否', 0.4, 10000],
-    [6, '赵销售', 'SALES_EDU', '西南', '成都分公司', 60000,70000,85000,90000,80000,65000, 1800000, 400000, 0.90, '否','否','否','否', 0.2, 0],
+
+SAMPLE_DATA = [
+    [1, '王总', 'CP', '全国', '总部', 0, 0, 0, 0, 0, 0, 0, 0, 0.95, '是', '是', '是', '否', '', 50000],
+    [2, '李总', 'DM', '华北', '北京分公司', 500000, 600000, 700000, 800000, 750000, 650000, 4000000, 3800000, 0.92, '是', '否', '否', '否', '', 20000],
+    [3, '张经理', 'MGR', '华东', '上海分公司', 150000, 180000, 200000, 220000, 190000, 160000, 3000000, 2800000, 0.91, '否', '否', '否', '否', 0.25, 5000],
+    [4, '陈销售', 'SALES_NEW', '华东', '上海分公司', 80000, 90000, 100000, 110000, 95000, 85000, 3000000, 500000, 0.88, '否', '否', '否', '否', 0.15, 0],
+    [5, '刘副总', 'VP', '华南', '深圳分公司', 200000, 250000, 280000, 300000, 270000, 230000, 2500000, 2300000, 0.93, '否', '否', '否', '否', 0.4, 10000],
+    [6, '赵销售', 'SALES_EDU', '西南', '成都分公司', 60000, 70000, 85000, 90000, 80000, 65000, 1800000, 400000, 0.90, '否', '否', '否', '否', 0.2, 0],
 ]
 
-for row_idx, row_data in enumerate(test_data, 2):
-    for col_idx, value in enumerate(row_data, 1):
-        ws_data.cell(row=row_idx, column=col_idx, value=value)
 
-# 保存
-output_path = r'c:\Users\EDWD\PG2\bonus_calculator\bonus_with_formulas.xlsx'
-wb.save(output_path)
-print(f'带公式的Excel已生成: {output_path}')
-print('包含6条测试数据，在腾讯文档打开后可直接查看计算结果')
+def build_param_rows(
+    global_config: GlobalConfig = None,
+    role_config: RoleConfig = None
+) -> List[tuple]:
+    """
+    参数表内容：(参数名称, 定义名称, 参数值, 说明)
+
+    定义名称指向参数值所在单元格，公式中直接按名称引用
+    """
+    cfg = global_config or DEFAULT_GLOBAL_CONFIG
+    role_cfg = role_config or DEFAULT_ROLE_CONFIG
+    rows = [
+        (f'{m}月时间系数', f'COEFF_{m}', cfg.time_coefficients.get(m, 1.0), '')
+        for m in range(1, 7)
+    ]
+    rows += [
+        ('90%回款门槛', 'THRESHOLD_90', cfg.threshold_90, '回款率>=此值才发90%奖'),
+        ('100%回款门槛', 'THRESHOLD_100', cfg.threshold_100, '回款率>=此值才发100%奖'),
+        ('常委固定补贴', 'CP_SUBSIDY', cfg.cp_subsidy, '半年总额'),
+        ('销售月补贴', 'SALES_SUBSIDY', cfg.sales_monthly_subsidy, '新购/高校每月'),
+        ('DM叠加模式', 'DM_MODE', cfg.dm_completion_bonus_mode.value, 'exclusive=只发最高档, stack=叠加'),
+        ('其他叠加模式', 'OTHER_MODE', cfg.other_completion_bonus_mode.value, 'exclusive=只发最高档, stack=叠加'),
+        ('完成奖比例', 'COMPLETION_RATE', role_cfg.completion_bonus_rate, '分公司产值乘数'),
+        ('DM完成奖比例', 'DM_COMPLETION_RATE', role_cfg.dm_completion_bonus_rate, '分公司产值乘数'),
+        ('DM完成奖上限', 'DM_COMPLETION_CAP', cfg.dm_completion_bonus_cap, '单档上限'),
+        ('大区90%奖', 'REGION_90_BONUS', cfg.region_90_bonus, '常委'),
+        ('大区100%奖', 'REGION_100_BONUS', cfg.region_100_bonus, '常委'),
+        ('全国90%奖', 'NATIONAL_90_BONUS', cfg.national_90_bonus, '常委'),
+        ('全国100%奖', 'NATIONAL_100_BONUS', cfg.national_100_bonus, '常委'),
+        ('DM大区完成奖', 'DM_REGION_BONUS', cfg.dm_region_bonus, '总经理'),
+    ]
+    return rows
+
+
+def build_role_rows(role_config: RoleConfig = None) -> List[tuple]:
+    """岗位费率表内容：(岗位代码, 过程激励比例)"""
+    role_cfg = role_config or DEFAULT_ROLE_CONFIG
+    return [(role.value, role_cfg.incentive_rates.get(role, 0.0)) for role in Role]
+
+
+def build_defined_names(param_rows: List[tuple], role_rows: List[tuple]) -> Dict[str, str]:
+    """定义名称 -> 绝对引用"""
+    sheet = f"'{PARAM_SHEET}'"
+    names = {
+        code: f'{sheet}!$B${r}'
+        for r, (_, code, _, _) in enumerate(param_rows, start=2)
+    }
+    names[ROLE_TABLE_NAME] = f'{sheet}!$E$2:$F${len(role_rows) + 1}'
+    return names
+
+
+def build_result_formulas(r: int) -> List[str]:
+    """
+    生成计算结果表第r行的公式（与RESULT_HEADERS一一对应）
+
+    公式只引用同一行的人员数据和定义名称，单元格之间无跨行依赖，
+    重算成本与行数成线性关系
+    """
+    d = f'{DATA_SHEET}!'
+    name, role = f'{d}B{r}', f'{d}C{r}'
+    blank = f'{name}=""'
+    weighted = '+'.join(
+        f'{d}{chr(ord("E") + m)}{r}*COEFF_{m}' for m in range(1, 7)
+    )
+    ratio = f'IF({d}S{r}<>"",{d}S{r},1)'
+    # 分公司产值：未填时取个人产值合计（同 PersonData.get_company_revenue）
+    company = f'IF({d}L{r}<>"",{d}L{r},D{r})'
+    tier = (
+        f'IF({role}="DM",MIN({company}*DM_COMPLETION_RATE,DM_COMPLETION_CAP),'
+        f'{company}*COMPLETION_RATE*{ratio})'
+    )
+    return [
+        # A: 序号 / B: 姓名 / C: 岗位
+        f'=IF({blank},"",{d}A{r})',
+        f'=IF({blank},"",{name})',
+        f'=IF({blank},"",{role})',
+        # D: 产值合计
+        f'=IF({blank},"",SUM({d}F{r}:K{r}))',
+        # E: 完成率 (个人产值合计/年度目标，同引擎 FROM_TARGET 模式)，CP或无目标时为0，避免空串参与比较
+        f'=IF({blank},"",IF(OR({role}="CP",NOT({d}M{r}>0)),0,D{r}/{d}M{r}))',
+        # F: 过程激励 = sum(月产值 * 时间系数) * 岗位比例
+        f'=IF({blank},"",({weighted})*VLOOKUP({role},{ROLE_TABLE_NAME},2,FALSE))',
+        # G: 完成奖90%
+        f'=IF({blank},"",IF({role}="CP",0,'
+        f'IF(AND(E{r}>=0.9,{d}N{r}>=THRESHOLD_90),{tier},0)))',
+        # H: 完成奖100%
+        f'=IF({blank},"",IF({role}="CP",0,'
+        f'IF(AND(E{r}>=1,{d}N{r}>=THRESHOLD_100),{tier},0)))',
+        # I: 完成奖小计 (根据叠加模式)
+        f'=IF({blank},"",IF(IF({role}="DM",DM_MODE,OTHER_MODE)="exclusive",'
+        f'MAX(G{r},H{r}),G{r}+H{r}))',
+        # J: 区域奖
+        f'=IF({blank},"",IF({role}="CP",'
+        f'IF({d}O{r}="是",REGION_90_BONUS,0)+IF({d}P{r}="是",REGION_100_BONUS,0),'
+        f'IF({role}="DM",IF(OR({d}O{r}="是",{d}P{r}="是"),DM_REGION_BONUS,0),0)))',
+        # K: 全国奖 (仅CP)
+        f'=IF({blank},"",IF({role}="CP",'
+        f'IF({d}Q{r}="是",NATIONAL_90_BONUS,0)+IF({d}R{r}="是",NATIONAL_100_BONUS,0),0))',
+        # L: 固定补贴
+        f'=IF({blank},"",IF({role}="CP",CP_SUBSIDY,'
+        f'IF(OR({role}="SALES_NEW",{role}="SALES_EDU"),SALES_SUBSIDY*6,0)))',
+        # M: CEO奖金
+        f'=IF({blank},"",IF({d}T{r}<>"",{d}T{r},0))',
+        # N: 奖金合计
+        f'=IF({blank},"",F{r}+I{r}+J{r}+K{r}+L{r}+M{r})',
+    ]
+
+
+class FormulaTemplateGenerator:
+    """带公式的Excel模板生成器"""
+
+    def __init__(
+        self,
+        rows: int = DEFAULT_ROWS,
+        write_only: bool = False,
+        include_sample_data: bool = True,
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None
+    ):
+        if not OPENPYXL_AVAILABLE:
+            raise ImportError("openpyxl is required for Excel export. Install it with: pip install openpyxl")
+        _load_openpyxl()
+        if rows < 1:
+            raise ValueError(f"模板行数必须大于0: {rows}")
+
+        self.rows = rows
+        self.write_only = write_only
+        self.include_sample_data = include_sample_data
+        self.param_rows = build_param_rows(global_config, role_config)
+        self.role_rows = build_role_rows(role_config)
+
+        # 样式：预先注册为命名样式，逐单元格只引用名称，大模板生成更快
+        thin = Side(style='thin')
+        border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+        def fill(color):
+            return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+        self.styles = [
+            NamedStyle('tpl_header', fill=fill('1976D2'), font=Font(color='FFFFFF', bold=True), border=border),
+            NamedStyle('tpl_plain', border=border),
+            NamedStyle('tpl_input', fill=fill('FFFDE7'), border=border),
+            NamedStyle('tpl_calc', fill=fill('E8F5E9'), border=border, number_format='#,##0'),
+            NamedStyle('tpl_rate', fill=fill('E8F5E9'), border=border, number_format='0.0%'),
+            NamedStyle('tpl_result', fill=fill('E3F2FD'), border=border, number_format='#,##0',
+                       font=Font(bold=True)),
+        ]
+
+    @property
+    def last_row(self) -> int:
+        """输入区最后一行行号"""
+        return self.rows + 1
+
+    def generate(self, filepath: str):
+        """生成模板并保存"""
+        wb = openpyxl.Workbook(write_only=self.write_only)
+        if not self.write_only:
+            wb.remove(wb.active)
+        for style in self.styles:
+            wb.add_named_style(style)
+
+        self._create_param_sheet(wb)
+        self._create_data_sheet(wb)
+        self._create_result_sheet(wb)
+        self._create_summary_sheet(wb)
+
+        for name, ref in build_defined_names(self.param_rows, self.role_rows).items():
+            wb.defined_names[name] = DefinedName(name, attr_text=ref)
+
+        wb.save(filepath)
+        print(f'带公式的Excel已生成: {filepath} ({self.rows}行)')
+
+    def _cell(self, ws, value=None, style='tpl_plain', **attrs):
+        """构造带样式的单元格（普通模式与write_only模式通用）"""
+        cell = WriteOnlyCell(ws, value=value)
+        if style is not None:
+            cell.style = style
+        for key, val in attrs.items():
+            setattr(cell, key, val)
+        return cell
+
+    def _header_row(self, ws, headers: List[str]) -> list:
+        return [self._cell(ws, h, style='tpl_header') for h in headers]
+
+    # ========== 1. 参数表 ==========
+    def _create_param_sheet(self, wb):
+        ws = wb.create_sheet(PARAM_SHEET)
+        for col, width in zip('ABCDEF', [15, 12, 30, 4, 14, 12]):
+            ws.column_dimensions[col].width = width
+
+        header = self._header_row(ws, ['参数名称', '参数值', '说明']) + [None]
+        header += self._header_row(ws, ['岗位代码', '过程激励比例'])
+        ws.append(header)
+
+        for i in range(max(len(self.param_rows), len(self.role_rows))):
+            row = [None, None, None, None]
+            if i < len(self.param_rows):
+                label, _, value, note = self.param_rows[i]
+                row[:3] = [
+                    self._cell(ws, label),
+                    self._cell(ws, value, style='tpl_input'),
+                    self._cell(ws, note),
+                ]
+            if i < len(self.role_rows):
+                code, rate = self.role_rows[i]
+                row += [self._cell(ws, code), self._cell(ws, rate, style='tpl_input')]
+            ws.append(row)
+
+    # ========== 2. 人员数据表 ==========
+    def _create_data_sheet(self, wb):
+        ws = wb.create_sheet(DATA_SHEET)
+        for c in range(1, len(DATA_HEADERS) + 1):
+            ws.column_dimensions[get_column_letter(c)].width = 10 if c < 5 else 9
+
+        # 数据验证 - 岗位下拉 / 是否下拉
+        last = self.last_row
+        role_dv = DataValidation(type='list', formula1=f'"{",".join(r.value for r in Role)}"')
+        role_dv.add(f'C2:C{last}')
+        yesno_dv = DataValidation(type='list', formula1='"是,否"')
+        yesno_dv.add(f'O2:R{last}')
+        ws.data_validations.append(role_dv)
+        ws.data_validations.append(yesno_dv)
+
+        # 输入区登记为表格，新增行时Excel自动扩展格式与验证
+        table = Table(displayName=DATA_TABLE_NAME,
+                      ref=f'A1:{get_column_letter(len(DATA_HEADERS))}{last}')
+        table.tableColumns = [TableColumn(id=i, name=h) for i, h in enumerate(DATA_HEADERS, 1)]
+        table.tableStyleInfo = TableStyleInfo(name='TableStyleLight1', showRowStripes=False)
+        with warnings.catch_warnings():
+            # write_only模式下的表格列已在上面手工登记
+            warnings.simplefilter('ignore', UserWarning)
+            ws.add_table(table)
+
+        ws.append(self._header_row(ws, DATA_HEADERS))
+        samples = SAMPLE_DATA if self.include_sample_data else []
+        for i in range(self.rows):
+            values = samples[i] if i < len(samples) else [None] * len(DATA_HEADERS)
+            ws.append([self._cell(ws, v, style='tpl_input') for v in values])
+
+    # ========== 3. 计算结果表(带公式) ==========
+    def _create_result_sheet(self, wb):
+        ws = wb.create_sheet(RESULT_SHEET)
+        for c, w in enumerate(RESULT_WIDTHS, 1):
+            ws.column_dimensions[get_column_letter(c)].width = w
+
+        ws.append(self._header_row(ws, RESULT_HEADERS))
+        styles = ['tpl_plain'] * 3 + ['tpl_calc', 'tpl_rate'] + ['tpl_calc'] * 8 + ['tpl_result']
+        for r in range(2, self.last_row + 1):
+            ws.append([
+                self._cell(ws, formula, style=style)
+                for formula, style in zip(build_result_formulas(r), styles)
+            ])
+
+    # ========== 4. 汇总表 ==========
+    def _create_summary_sheet(self, wb):
+        ws = wb.create_sheet(SUMMARY_SHEET)
+        ws.column_dimensions['A'].width = 15
+        ws.column_dimensions['B'].width = 15
+
+        def label(text, **font):
+            return self._cell(ws, text, style=None, font=Font(**font)) if font else text
+
+        rows = [
+            [label('2026上半年奖金汇总', size=16, bold=True)],
+            [],
+            # 整列引用：与模板行数无关，新增行无需改公式
+            [label('总人数:'), self._cell(ws, f'=COUNTA({DATA_SHEET}!B:B)-1', style=None,
+                                         font=Font(bold=True))],
+            [label('奖金总额:'), self._cell(ws, f'=SUM({RESULT_SHEET}!N:N)', style=None,
+                                          number_format='¥#,##0',
+                                          font=Font(bold=True, size=14, color='1976D2'))],
+            [],
+            [label('按岗位汇总', bold=True)],
+        ]
+        for text, role in ROLE_SUMMARY:
+            rows.append([
+                text,
+                self._cell(ws, f'=SUMIF({RESULT_SHEET}!C:C,"{role.value}",{RESULT_SHEET}!N:N)',
+                           style=None, number_format='#,##0'),
+            ])
+        for row in rows:
+            ws.append(row)
+
+
+def create_formula_template(
+    filepath: str = "bonus_with_formulas.xlsx",
+    rows: int = DEFAULT_ROWS,
+    write_only: bool = False,
+    include_sample_data: bool = True,
+    global_config: GlobalConfig = None,
+    role_config: RoleConfig = None
+):
+    """便捷函数：生成带公式的Excel模板"""
+    generator = FormulaTemplateGenerator(
+        rows=rows,
+        write_only=write_only,
+        include_sample_data=include_sample_data,
+        global_config=global_config,
+        role_config=role_config
+    )
+    generator.generate(filepath)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="生成带完整Excel公式的奖金计算模板")
+    parser.add_argument("-o", "--output", default="bonus_with_formulas.xlsx", help="输出文件路径")
+    parser.add_argument("-n", "--rows", type=int, default=DEFAULT_ROWS, help="输入区行数")
+    parser.add_argument("--write-only", action="store_true", help="流式写入（大模板推荐）")
+    parser.add_argument("--no-sample", action="store_true", help="不填入测试数据")
+    args = parser.parse_args(argv)
+
+    create_formula_template(
+        args.output,
+        rows=args.rows,
+        write_only=args.write_only,
+        include_sample_data=not args.no_sample
+    )
+    if not args.no_sample:
+        print(f'包含{min(len(SAMPLE_DATA), args.rows)}条测试数据，在腾讯文档打开后可直接查看计算结果')
+
+
+if __name__ == "__main__":
+    main()
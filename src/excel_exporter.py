@@ -7,14 +7,23 @@ from models import PersonData, BonusDetail, ValidationResult
 from bonus_engine import BonusCalculator
 from config import GlobalConfig, Role
 
-try:
-    import openpyxl
+import importlib.util
+
+# openpyxl 延迟到首次创建 ExcelExporter 时导入，只做计算的调用方不承担其导入开销
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+openpyxl = None
+
+
+def _load_openpyxl():
+    """导入openpyxl并绑定本模块使用的名称（仅首次调用生效）"""
+    global openpyxl, Font, PatternFill, Alignment, Border, Side, get_column_letter, DataValidation
+    if openpyxl is not None:
+        return
+    import openpyxl as _openpyxl
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
     from openpyxl.utils import get_column_letter
     from openpyxl.worksheet.datavalidation import DataValidation
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
+    openpyxl = _openpyxl
 
 
 class ExcelExporter:
@@ -23,6 +32,7 @@ class ExcelExporter:
     def __init__(self, config: GlobalConfig = None):
         if not OPENPYXL_AVAILABLE:
             raise ImportError("openpyxl is required for Excel export. Install it with: pip install openpyxl")
+        _load_openpyxl()
         
         # 样式定义（在__init__中初始化，确保openpyxl已导入）
         self.HEADER_FILL = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
@@ -75,6 +85,46 @@ class ExcelExporter:
         wb.save(filepath)
         print(f"结果已导出: {filepath}")
     
+    def export_diff(self, diff, filepath: str):
+        """导出两次结果对比（result_diff.ResultDiff）：汇总表（全体/按岗位/按区域）+ 变动明细"""
+        from result_diff import DIFF_HEADERS, SUMMARY_HEADERS
+        
+        wb = openpyxl.Workbook()
+        wb.remove(wb.active)
+        
+        # 汇总表
+        ws = wb.create_sheet("变动汇总")
+        ws['A1'] = "奖金变动汇总"
+        ws['A1'].font = Font(size=16, bold=True)
+        row = 3
+        for title, rows in (("全体", [diff.totals]), ("按岗位", diff.by_role), ("按区域", diff.by_region)):
+            ws.cell(row=row, column=1, value=title).font = Font(bold=True)
+            row = self._write_table(ws, row + 1, SUMMARY_HEADERS, rows) + 1
+        
+        # 明细表
+        ws = wb.create_sheet("变动明细")
+        self._write_table(ws, 1, DIFF_HEADERS, diff.rows())
+        ws.freeze_panes = 'C2'
+        
+        wb.save(filepath)
+        print(f"对比结果已导出: {filepath}")
+    
+    def _write_table(self, ws, start_row: int, headers: dict, rows: List[dict]) -> int:
+        """写表头和数据行（headers 为 字段 -> 列名），金额列设千分位格式，返回下一空行行号"""
+        fields = list(headers)
+        for col, header in enumerate(headers.values(), start=1):
+            cell = ws.cell(row=start_row, column=col, value=header)
+            cell.fill = self.HEADER_FILL
+            cell.font = self.HEADER_FONT
+        row = start_row + 1
+        for data in rows:
+            for col, f in enumerate(fields, start=1):
+                cell = ws.cell(row=row, column=col, value=data.get(f))
+                if isinstance(data.get(f), float):
+                    cell.number_format = '#,##0.00'
+            row += 1
+        return row
+    
     def _create_cover_sheet(self, wb):
         """创建首页"""
         ws = wb.create_sheet("首页")
@@ -0,0 +1,355 @@
+"""
+2026上半年奖金计算引擎 - 计算过程说明模块
+On-demand audit trace for an individual bonus result
+
+员工对奖金有疑问时，需要逐步给出推导：输入数据、月度系数、逐档门槛判断、封顶、叠加模式、分配比例。
+批量计算只保留金额（BonusDetail 不带推导文字），需要时对选定人员按编译后的规则重新推导一遍：
+
+    trace = calculator.explain(person)
+    trace.to_dict()   # export_to_dict 格式，另含"输入数据"、"计算过程"
+    trace.lines()     # 逐行文本
+
+推导按 rule_dsl.CompiledRules.plan 中该岗位的组件逐项进行，各步金额与批量计算逐位一致
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config import CompletionRateMode, month_label
+from models import PersonData, BonusDetail
+from bonus_engine import BonusCalculator
+from rule_dsl import CompiledRules, compile_rules
+
+# 组件类型 -> 奖金项
+COMPONENT_LABELS = {
+    'incentive': '过程激励',
+    'completion': '完成奖',
+    'region': '区域奖',
+    'national': '全国奖',
+    'subsidy': '固定补贴',
+    'input': 'CEO奖金',
+}
+
+# 结果为比率（文本中按百分比显示）的项目
+RATE_ITEMS = ('完成率',)
+
+FLAG_LABELS = {
+    'region_completed_90': '区域完成90%',
+    'region_completed_100': '区域完成100%',
+    'national_completed_90': '全国完成90%',
+    'national_completed_100': '全国完成100%',
+}
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def _pct(value: float) -> str:
+    return f"{value * 100:g}%"
+
+
+@dataclass
+class TraceStep:
+    """一步推导"""
+    component: str      # 奖金项
+    item: str           # 项目
+    formula: str        # 计算式或判断式
+    value: Any          # 结果
+    note: str = ''
+
+    def to_dict(self) -> Dict:
+        return {"奖金项": self.component, "项目": self.item, "计算式": self.formula,
+                "结果": self.value, "说明": self.note}
+
+
+@dataclass
+class AuditTrace:
+    """单人计算过程"""
+    detail: BonusDetail
+    inputs: Dict[str, Any]
+    steps: List[TraceStep] = field(default_factory=list)
+    export: Dict = field(default_factory=dict)  # BonusCalculator.export_to_dict(detail)
+
+    def to_dict(self) -> Dict:
+        result = dict(self.export)
+        result["输入数据"] = self.inputs
+        result["计算过程"] = [s.to_dict() for s in self.steps]
+        return result
+
+    def lines(self) -> List[str]:
+        lines = [f"{self.detail.name}（{self.detail.role.value}，{self.detail.org_unit}）"]
+        component = None
+        for s in self.steps:
+            if s.component != component:
+                component = s.component
+                lines.append(f"【{component}】")
+            if isinstance(s.value, float):
+                value = f"{s.value:.2%}" if s.item in RATE_ITEMS else _money(s.value)
+            else:
+                value = s.value
+            note = f"  ({s.note})" if s.note else ''
+            lines.append(f"  {s.item}: {s.formula} = {value}{note}")
+        return lines
+
+
+class _Explainer:
+    """按岗位组件逐项推导（与 rule_dsl 标量求值同一计算式）"""
+
+    def __init__(self, compiled: CompiledRules, calculator: BonusCalculator, person: PersonData):
+        self.compiled = compiled
+        self.calculator = calculator
+        self.person = person
+        self.period = compiled.period
+        self.steps: List[TraceStep] = []
+        self.totals = {'incentive_total': 0.0, 'completion_bonus_total': 0.0, 'region_bonus_total': 0.0,
+                       'national_bonus_total': 0.0, 'fixed_subsidy': 0.0, 'ceo_bonus': 0.0}
+
+    def step(self, component: str, item: str, formula: str, value: Any, note: str = ''):
+        self.steps.append(TraceStep(component, item, formula, value, note))
+
+    def run(self) -> List[TraceStep]:
+        for c in self.compiled.plan[self.person.role]:
+            getattr(self, f'_{c.type}')(c)
+        t = self.totals
+        grand_total = (t['incentive_total'] + t['completion_bonus_total'] + t['region_bonus_total']
+                       + t['national_bonus_total'] + t['fixed_subsidy'] + t['ceo_bonus'])
+        formula = ' + '.join(_money(v) for v in t.values())
+        self.step('合计', '奖金合计', f"过程激励 + 完成奖 + 区域奖 + 全国奖 + 固定补贴 + CEO奖金 = {formula}",
+                  grand_total)
+        return self.steps
+
+    def _incentive(self, c):
+        label = COMPONENT_LABELS['incentive']
+        revenue = self.person.month_revenue
+        values = []
+        for m in self.period.months:
+            amount, coeff = revenue.get(m, 0.0), self.period.coefficient(m)
+            value = amount * c.rate * coeff
+            values.append(value)
+            note = '' if m in revenue else '未填产值，按0计'
+            self.step(label, month_label(m), f"产值 {_money(amount)} × 激励比例 {_pct(c.rate)} × 时间系数 {coeff:g}",
+                      value, note)
+        total = sum(values)
+        self.totals['incentive_total'] = total
+        self.step(label, '小计', f"{len(values)}个月合计", total)
+        if self.compiled.global_config.include_payout_timing:
+            self.step(label, '即时发放', f"{_money(total)} × 50%", total * 0.5)
+            self.step(label, '回款后发放', f"{_money(total)} × 50%", total * 0.5)
+
+    def _completion(self, c):
+        label = COMPONENT_LABELS['completion']
+        person, calc = self.person, self.calculator
+        org = calc._org(person)
+
+        # 完成率
+        if org is not None:
+            completion_rate = org.completion_rate
+            self.step(label, '完成率', f"组织单元'{org.org_unit}'共享值", completion_rate,
+                      f"来源: {org.revenue_source}")
+        else:
+            completion_rate = calc._get_completion_rate(person)
+            if self.compiled.global_config.completion_rate_mode == CompletionRateMode.FROM_TARGET:
+                total = person.get_total_revenue(self.period.months)
+                if person.annual_target and person.annual_target > 0:
+                    formula = f"期间产值 {_money(total)} / 年度目标 {_money(person.annual_target)}"
+                    note = ''
+                else:
+                    formula, note = "未填年度目标", '按0计'
+            else:
+                formula = "手填完成率"
+                note = '' if person.completion_rate_manual is not None else '未填，按0计'
+            self.step(label, '完成率', formula, completion_rate, note)
+
+        # 基数
+        if org is not None:
+            company_revenue = org.company_revenue
+            source = f"组织单元'{org.org_unit}'共享值"
+        else:
+            company_revenue = person.get_company_revenue(self.period.months)
+            source = "手填分公司产值" if person.company_total_revenue is not None else "未填分公司产值，取本人期间产值"
+        self.step(label, '分公司产值', source, company_revenue)
+        base = company_revenue * c.rate
+        self.step(label, '完成奖基数', f"分公司产值 {_money(company_revenue)} × {_pct(c.rate)}", base)
+        if c.cap is not None:
+            capped = min(base, c.cap)
+            self.step(label, '封顶', f"min({_money(base)}, {_money(c.cap)})", capped,
+                      '已封顶' if base > c.cap else '未超封顶')
+            base = capped
+
+        # 逐档判断
+        bonuses = []
+        for tier in c.tiers:
+            rate_ok = completion_rate >= tier.completion
+            collection_ok = person.collection_rate >= tier.collection
+            value = base if rate_ok and collection_ok else 0.0
+            bonuses.append(value)
+            if rate_ok and collection_ok:
+                note = '达标'
+            else:
+                note = '、'.join(n for n, ok in (('完成率未达标', rate_ok), ('回款率未达标', collection_ok)) if not ok)
+            self.step(label, f"{tier.name}%档" if tier.name else '未命名档',
+                      f"完成率 {completion_rate:.2%} ≥ {_pct(tier.completion)} 且 "
+                      f"回款率 {person.collection_rate:.2%} ≥ {_pct(tier.collection)}", value, note)
+
+        # 叠加
+        if c.stacking == 'exclusive':
+            total = max(bonuses)
+            formula = f"max({', '.join(_money(b) for b in bonuses)})"
+            note = 'exclusive：只发最高档'
+        else:
+            total = sum(bonuses)
+            formula = ' + '.join(_money(b) for b in bonuses)
+            note = 'stack：各档叠加'
+        self.step(label, '叠加', formula, total, note)
+
+        if c.allocation:
+            ratio = person.personal_allocation_ratio
+            if ratio is not None:
+                total *= ratio
+                self.step(label, '个人分配', f"完成奖总额 × 分配比例 {ratio * 100:.1f}%", total)
+            else:
+                self.step(label, '个人分配', "未设置个人分配比例", total, '显示完成奖总额')
+        self.totals['completion_bonus_total'] += total
+        self.step(label, '小计', f"叠加模式 {c.stacking}", total)
+
+    def _flags(self, c):
+        label = COMPONENT_LABELS[c.output]
+        key = f'{c.output}_bonus_total'
+        if c.stacking == 'any':
+            flags = [(FLAG_LABELS[t.flag], getattr(self.person, t.flag)) for t in c.tiers]
+            hit = any(v for _, v in flags)
+            value = c.amount if hit else 0.0
+            self.totals[key] += value
+            self.step(label, '小计', ' 或 '.join(f"{name}={'是' if v else '否'}" for name, v in flags), value,
+                      f"任一达标发 {_money(c.amount)}")
+            return
+        values = []
+        for tier in c.tiers:
+            hit = getattr(self.person, tier.flag)
+            value = tier.amount if hit else 0.0
+            values.append(value)
+            self.step(label, f"{tier.name}%档" if tier.name else '未命名档', f"{FLAG_LABELS[tier.flag]}={'是' if hit else '否'}", value,
+                      f"达标发 {_money(tier.amount)}")
+        total = sum(values)
+        self.totals[key] += total
+        self.step(label, '小计', ' + '.join(_money(v) for v in values), total)
+
+    def _subsidy(self, c):
+        label = COMPONENT_LABELS['subsidy']
+        if c.per == 'month':
+            formula = f"{_money(c.unit)}/月 × {self.period.subsidy_month_count}个月"
+        elif c.per == 'half_year':
+            formula = f"半年额 {_money(c.unit)} × {self.period.subsidy_month_count}/6"
+        else:
+            formula = f"期间固定 {_money(c.unit)}"
+        self.totals['fixed_subsidy'] += c.amount
+        self.step(label, '补贴金额', formula, c.amount)
+
+    def _input(self, c):
+        label = COMPONENT_LABELS['input']
+        value = getattr(self.person, c.field)
+        self.totals[c.field] += value or 0.0
+        self.step(label, '手填金额', "人员数据", value or 0.0, '' if value is not None else '未填，按0计')
+
+
+def _inputs(person: PersonData, calculator: BonusCalculator, period) -> Dict[str, Any]:
+    inputs = {
+        "计算期间": period.name,
+        "岗位": person.role.value,
+        "月度产值": {month_label(m): person.month_revenue.get(m) for m in period.months},
+        "分公司产值(手填)": person.company_total_revenue,
+        "年度目标": person.annual_target,
+        "完成率(手填)": person.completion_rate_manual,
+        "回款率": person.collection_rate,
+        "个人分配比例": person.personal_allocation_ratio,
+        "完成标志": {label: getattr(person, f) for f, label in FLAG_LABELS.items()},
+        "CEO奖金": person.ceo_bonus,
+    }
+    org = calculator._org(person)
+    if org is not None:
+        inputs["组织单元汇总"] = {
+            "组织单元": org.org_unit,
+            "人数": org.member_count,
+            "分公司产值": org.company_revenue,
+            "年度目标": org.annual_target,
+            "完成率": org.completion_rate,
+            "产值来源": org.revenue_source,
+        }
+    return inputs
+
+
+def explain_person(
+    person: PersonData,
+    calculator: Optional[BonusCalculator] = None,
+    steps: Optional[List[TraceStep]] = None
+) -> AuditTrace:
+    """
+    单人计算过程
+
+    Args:
+        calculator: 计算器（配置、期间、组织单元汇总取自它）；rule_dsl.RuleCalculator 按其规则推导，
+                    其他计算器按默认规则（与内置规则一致）推导
+        steps: 计算器自行给出的推导（如 fixed_point 按分推导），给出时不再按规则推导
+
+    Returns:
+        AuditTrace，detail 为正常计算结果（含校验警告），steps 为逐步推导
+    """
+    calculator = calculator or BonusCalculator()
+    period = calculator.period
+    if steps is None:
+        compiled = getattr(calculator, 'rules', None)
+        if not isinstance(compiled, CompiledRules):
+            compiled = compile_rules(None, calculator.global_config, calculator.role_config, calculator.period)
+        period = compiled.period
+        steps = _Explainer(compiled, calculator, person).run()
+    detail, _ = calculator.calculate_person(person)
+    return AuditTrace(detail=detail, inputs=_inputs(person, calculator, period), steps=steps,
+                      export=calculator.export_to_dict(detail))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from batch_io import iter_roster
+    from config import load_config_file
+
+    parser = argparse.ArgumentParser(description="单人奖金计算过程说明")
+    parser.add_argument("input", help="人员名单文件（.csv/.xlsx/.ndjson）")
+    parser.add_argument("name", help="姓名")
+    parser.add_argument("-c", "--config", help="参数覆盖文件（JSON）")
+    parser.add_argument("--rules", help="规则文件（rule_dsl），默认内置规则")
+    parser.add_argument("--money", choices=('float', 'fen'), default='float',
+                        help="金额精度：float 浮点（默认）/ fen 整数分，按分推导并注明舍入规则")
+    parser.add_argument("--json", action="store_true", help="输出 JSON（export_to_dict 格式）")
+    args = parser.parse_args(argv)
+
+    try:
+        global_config, role_config = load_config_file(args.config) if args.config else (None, None)
+        person = next((p for p in iter_roster(args.input) if p.name == args.name), None)
+        if person is None:
+            raise ValueError(f"名单中没有'{args.name}'")
+        if args.rules and args.money == 'fen':
+            raise ValueError("规则文件按浮点计算，不能与 --money fen 同时使用")
+        if args.rules:
+            from rule_dsl import RuleCalculator
+            calculator = RuleCalculator(args.rules, global_config, role_config)
+        elif args.money == 'fen':
+            from fixed_point import FixedPointCalculator
+            calculator = FixedPointCalculator(global_config, role_config)
+        else:
+            calculator = BonusCalculator(global_config, role_config)
+        trace = calculator.explain(person)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(trace.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print('\n'.join(trace.lines()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,610 @@
+"""
+2026上半年奖金计算引擎 - 定点金额模块
+Exact fixed-point money arithmetic (integer fen) with int64 kernels
+
+浮点引擎中 产值×比例×系数、×分配比例 等运算按二进制浮点进行，各项相加后与工资系统逐分核对时
+会出现分位误差。本模块提供"分"模式：金额一律以整数分表示，比例/系数取 1e-8 精度的定点整数，
+乘除在整数上完成并按下表的舍入规则取整到分，合计为各项整数之和，与明细逐分相符。
+
+【舍入规则】（ROUNDING，可按组件覆盖）
+    monthly_incentive  月度激励 产值×比例×系数：四舍五入到分，激励合计 = 各月之和
+    completion_base    完成奖基数 分公司产值×比例（DM再封顶）：四舍五入到分
+    allocation         个人完成奖 完成奖×个人分配比例：向下取整，组内合计不超过完成奖总额
+    subsidy            常委补贴按补贴月数折算：四舍五入到分
+    incentive_split    50/50拆分：即时部分按此取整，余数计入回款后部分，两部分之和等于激励合计
+    取值：ROUND_HALF_UP（四舍五入，负数远离零）/ ROUND_HALF_EVEN（银行家舍入）/ ROUND_DOWN（向零截断）
+
+输入的元金额（产值、目标、CEO奖金、配置中的固定金额）先四舍五入到分。完成率仍为浮点比值，
+但由整数分合计求得，不再受逐月浮点累加影响。
+
+FixedPointCalculator（标量）与 FixedPointVectorizedCalculator（int64 数组）共用同一组整数运算，
+结果逐位相同；输出仍为元（分/100），接口与 BonusCalculator / VectorizedCalculator 一致
+"""
+import math
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import PersonData, BonusDetail, ValidationResult
+from config import (
+    GlobalConfig, RoleConfig, Role, PeriodConfig, CP_SUBSIDY_BASE_MONTHS,
+    CompletionBonusMode, CompletionRateMode, month_label
+)
+from bonus_engine import BonusCalculator
+from explain import AuditTrace, TraceStep, COMPONENT_LABELS, FLAG_LABELS, explain_person
+from vectorized_engine import VectorizedCalculator, RosterArrays, ROLE_ORDER, ROLE_CODES, SALES_ROLES
+
+FEN = 100             # 1元 = 100分
+RATE_SCALE = 10 ** 8  # 比例、系数的定点精度
+ROUNDING_MODES = (ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN)
+ROUNDING: Dict[str, str] = {
+    'monthly_incentive': ROUND_HALF_UP,
+    'completion_base': ROUND_HALF_UP,
+    'allocation': ROUND_DOWN,
+    'subsidy': ROUND_HALF_UP,
+    'incentive_split': ROUND_DOWN,
+}
+ROUNDING_LABELS = {ROUND_HALF_UP: '四舍五入到分', ROUND_HALF_EVEN: '银行家舍入到分', ROUND_DOWN: '向下取整到分'}
+# 以分计的结果字段（calculate_fen 的输出，calculate_arrays 中换算为元）
+AMOUNT_FIELDS = (
+    'incentive_total',
+    'completion_bonus_90', 'completion_bonus_100', 'completion_bonus_total',
+    'region_bonus_90', 'region_bonus_100', 'region_bonus_total',
+    'national_bonus_90', 'national_bonus_100', 'national_bonus_total',
+    'fixed_subsidy', 'ceo_bonus', 'grand_total',
+)
+MONEY_FIELDS = ('monthly_incentives',) + AMOUNT_FIELDS + ('incentive_immediate', 'incentive_after_collection')
+_TIE_EPSILON = 1e-6  # 元->分换算时吸收 x.xx5 类输入的二进制表示误差
+
+
+# ========== 整数运算 ==========
+
+def to_fixed(value: float, scale: int = FEN) -> int:
+    """浮点数 -> 定点整数（value×scale 四舍五入，负数远离零）"""
+    y = abs(value) * scale
+    units = math.floor(y)
+    if y - units >= 0.5 - _TIE_EPSILON:
+        units += 1
+    return -units if value < 0 else units
+
+
+def to_fixed_array(values: np.ndarray, scale: int = FEN) -> np.ndarray:
+    """to_fixed 的数组版本（NaN 视为0），返回 int64"""
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+    y = np.abs(values) * scale
+    units = np.floor(y)
+    units += y - units >= 0.5 - _TIE_EPSILON
+    return np.where(values < 0, -units, units).astype(np.int64)
+
+
+def mul_div(a, k: int, scale: int, rounding: str):
+    """
+    a × k / scale 取整（a 为整数或 int64 数组，k、scale 为非负整数）
+
+    先按 scale 拆分 a 再相乘，中间结果不超过 a×k/scale + k×scale，int64 下不溢出
+    """
+    negative = a < 0
+    a = abs(a)
+    high, low = divmod(a, scale)
+    quotient, remainder = divmod(low * k, scale)
+    quotient = quotient + high * k
+    if rounding == ROUND_HALF_UP:
+        quotient = quotient + (2 * remainder >= scale)
+    elif rounding == ROUND_HALF_EVEN:
+        quotient = quotient + ((2 * remainder > scale) | ((2 * remainder == scale) & (quotient % 2 == 1)))
+    return quotient - 2 * negative * quotient
+
+
+def fen_to_yuan(fen):
+    """分 -> 元（整数或数组）"""
+    return fen / FEN
+
+
+def resolve_rounding(rounding: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """默认舍入规则上叠加覆盖项，组件名或取值不合法时抛出 ValueError"""
+    resolved = dict(ROUNDING)
+    for component, mode in (rounding or {}).items():
+        if component not in ROUNDING:
+            raise ValueError(f"未知的舍入组件: {component}（可选: {', '.join(ROUNDING)}）")
+        if mode not in ROUNDING_MODES:
+            raise ValueError(f"未知的舍入方式: {mode}（可选: {', '.join(ROUNDING_MODES)}）")
+        resolved[component] = mode
+    return resolved
+
+
+class _FixedParams:
+    """配置中的比例、金额换算为定点整数（标量与向量化计算器共用）"""
+
+    def __init__(self, global_config: GlobalConfig, role_config: RoleConfig, period: PeriodConfig):
+        cfg = global_config
+        # 岗位 × 月份的 比例×系数
+        self.incentive_units = np.array(
+            [[to_fixed(role_config.incentive_rates.get(role, 0.0) * period.coefficient(m), RATE_SCALE)
+              for m in period.months] for role in ROLE_ORDER],
+            dtype=np.int64
+        )
+        self.completion_rate = to_fixed(role_config.completion_bonus_rate, RATE_SCALE)
+        self.dm_completion_rate = to_fixed(role_config.dm_completion_bonus_rate, RATE_SCALE)
+        self.dm_cap = to_fixed(cfg.dm_completion_bonus_cap)
+        self.region_90 = to_fixed(cfg.region_90_bonus)
+        self.region_100 = to_fixed(cfg.region_100_bonus)
+        self.dm_region = to_fixed(cfg.dm_region_bonus)
+        self.national_90 = to_fixed(cfg.national_90_bonus)
+        self.national_100 = to_fixed(cfg.national_100_bonus)
+        self.cp_subsidy = to_fixed(cfg.cp_subsidy)
+        self.sales_subsidy = to_fixed(cfg.sales_monthly_subsidy) * period.subsidy_month_count
+
+
+# ========== 标量计算 ==========
+
+class FixedPointCalculator(BonusCalculator):
+    """以分计算的标量计算器（接口同 BonusCalculator，金额为整数分/100）"""
+
+    def __init__(
+        self,
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        orgs=None,
+        rounding: Optional[Dict[str, str]] = None
+    ):
+        super().__init__(global_config, role_config, period, orgs)
+        self.rounding = resolve_rounding(rounding)
+        self.fixed = _FixedParams(self.global_config, self.role_config, self.period)
+
+    def _calculate(self, person: PersonData) -> BonusDetail:
+        # 提示信息、叠加模式等沿用浮点计算的明细，金额与完成率按分重算
+        detail = super()._calculate(person)
+        fen = self.calculate_fen(person)
+        detail.completion_rate = fen.pop('completion_rate')
+        for key, value in fen.items():
+            if key == 'monthly_incentives':
+                detail.monthly_incentives = {m: fen_to_yuan(v) for m, v in value.items()}
+            else:
+                setattr(detail, key, fen_to_yuan(value))
+        return detail
+
+    def explain(self, person: PersonData) -> AuditTrace:
+        """单人计算过程说明（按分推导，各步注明舍入规则，金额与 calculate_fen 逐分一致）"""
+        return explain_person(person, self, steps=_FenExplainer(self, person).run())
+
+    def calculate_fen(self, person: PersonData) -> Dict:
+        """
+        单人各项金额（整数分）
+
+        Returns:
+            MONEY_FIELDS 中的字段（monthly_incentives 为 月份 -> 分，CP为空；
+            未开启50/50拆分或CP时无 incentive_immediate/incentive_after_collection），另含 completion_rate
+        """
+        cfg = self.global_config
+        fixed = self.fixed
+        rounding = self.rounding
+        role = person.role
+        is_cp = role == Role.CP
+        result = dict.fromkeys(AMOUNT_FIELDS, 0)
+
+        # 过程激励：逐月取整后合计
+        months = self.period.months
+        revenue = [to_fixed(person.month_revenue.get(m, 0.0)) for m in months]
+        total_revenue = sum(revenue)
+        if not is_cp:
+            units = fixed.incentive_units[ROLE_CODES[role]].tolist()
+            monthly = [mul_div(r, k, RATE_SCALE, rounding['monthly_incentive']) for r, k in zip(revenue, units)]
+            result['monthly_incentives'] = dict(zip(months, monthly))
+            result['incentive_total'] = sum(monthly)
+            if cfg.include_payout_timing:
+                immediate = mul_div(result['incentive_total'], 1, 2, rounding['incentive_split'])
+                result['incentive_immediate'] = immediate
+                result['incentive_after_collection'] = result['incentive_total'] - immediate
+        else:
+            result['monthly_incentives'] = {}
+
+        # 完成奖
+        completion_rate = 0.0
+        if not is_cp:
+            org = self._org(person)
+            if org is not None:
+                completion_rate = org.completion_rate
+                company = to_fixed(org.company_revenue)
+            else:
+                if cfg.completion_rate_mode == CompletionRateMode.FROM_TARGET:
+                    target = to_fixed(person.annual_target or 0.0)
+                    completion_rate = total_revenue / target if target > 0 else 0.0
+                else:
+                    completion_rate = person.completion_rate_manual or 0.0
+                company = (to_fixed(person.company_total_revenue) if person.company_total_revenue is not None
+                           else total_revenue)
+            if role == Role.DM:
+                base = min(mul_div(company, fixed.dm_completion_rate, RATE_SCALE, rounding['completion_base']),
+                           fixed.dm_cap)
+                mode = cfg.dm_completion_bonus_mode
+            else:
+                base = mul_div(company, fixed.completion_rate, RATE_SCALE, rounding['completion_base'])
+                mode = cfg.other_completion_bonus_mode
+            if completion_rate >= 0.9 and person.collection_rate >= cfg.threshold_90:
+                result['completion_bonus_90'] = base
+            if completion_rate >= 1.0 and person.collection_rate >= cfg.threshold_100:
+                result['completion_bonus_100'] = base
+            if mode == CompletionBonusMode.EXCLUSIVE:
+                total = max(result['completion_bonus_90'], result['completion_bonus_100'])
+            else:
+                total = result['completion_bonus_90'] + result['completion_bonus_100']
+            if role != Role.DM and person.personal_allocation_ratio is not None:
+                total = mul_div(total, to_fixed(person.personal_allocation_ratio, RATE_SCALE), RATE_SCALE,
+                                rounding['allocation'])
+            result['completion_bonus_total'] = total
+        result['completion_rate'] = completion_rate
+
+        # 区域/全国奖、固定补贴
+        if is_cp:
+            result['region_bonus_90'] = fixed.region_90 if person.region_completed_90 else 0
+            result['region_bonus_100'] = fixed.region_100 if person.region_completed_100 else 0
+            result['region_bonus_total'] = result['region_bonus_90'] + result['region_bonus_100']
+            result['national_bonus_90'] = fixed.national_90 if person.national_completed_90 else 0
+            result['national_bonus_100'] = fixed.national_100 if person.national_completed_100 else 0
+            result['national_bonus_total'] = result['national_bonus_90'] + result['national_bonus_100']
+            result['fixed_subsidy'] = mul_div(fixed.cp_subsidy, self.period.subsidy_month_count,
+                                              CP_SUBSIDY_BASE_MONTHS, rounding['subsidy'])
+        elif role == Role.DM:
+            if person.region_completed_90 or person.region_completed_100:
+                result['region_bonus_total'] = fixed.dm_region
+        elif role in SALES_ROLES and self.role_config.has_fixed_subsidy.get(role, False):
+            result['fixed_subsidy'] = fixed.sales_subsidy
+
+        result['ceo_bonus'] = to_fixed(person.ceo_bonus or 0.0)
+        result['grand_total'] = (
+            result['incentive_total'] +
+            result['completion_bonus_total'] +
+            result['region_bonus_total'] +
+            result['national_bonus_total'] +
+            result['fixed_subsidy'] +
+            result['ceo_bonus']
+        )
+        return result
+
+
+# ========== 计算过程说明 ==========
+
+def _yuan(fen: int) -> str:
+    return f"{fen_to_yuan(fen):,.2f}"
+
+
+def _exact(a: int, k: int, scale: int) -> str:
+    """a×k/scale（分）未取整的元值，显示到0.0001元"""
+    return f"{a * k / scale / FEN:,.4f}"
+
+
+def _rate(units: int) -> str:
+    return f"{units / RATE_SCALE * 100:g}%"
+
+
+class _FenExplainer:
+    """按 FixedPointCalculator.calculate_fen 的整数运算逐步推导，结果以元显示"""
+
+    def __init__(self, calculator: FixedPointCalculator, person: PersonData):
+        self.calculator = calculator
+        self.person = person
+        self.steps: List[TraceStep] = []
+
+    def step(self, component: str, item: str, formula: str, fen: int, note: str = ''):
+        self.steps.append(TraceStep(component, item, formula, fen_to_yuan(fen), note))
+
+    def run(self) -> List[TraceStep]:
+        calc, person = self.calculator, self.person
+        is_cp = person.role == Role.CP
+        revenue = {m: to_fixed(person.month_revenue.get(m, 0.0)) for m in calc.period.months}
+        totals = {}
+        if not is_cp:
+            totals['incentive'] = self._incentive(revenue)
+            totals['completion'] = self._completion(sum(revenue.values()))
+        totals.update(self._flags())
+        ceo = to_fixed(person.ceo_bonus or 0.0)
+        self.step(COMPONENT_LABELS['input'], '手填金额', "人员数据，四舍五入到分", ceo,
+                  '' if person.ceo_bonus is not None else '未填，按0计')
+        parts = [totals.get(k, 0) for k in ('incentive', 'completion', 'region', 'national', 'subsidy')] + [ceo]
+        self.step('合计', '奖金合计', f"过程激励 + 完成奖 + 区域奖 + 全国奖 + 固定补贴 + CEO奖金 = "
+                  f"{' + '.join(_yuan(v) for v in parts)}", sum(parts), '各项整数分相加')
+        return self.steps
+
+    def _incentive(self, revenue: Dict[int, int]) -> int:
+        calc, person = self.calculator, self.person
+        label = COMPONENT_LABELS['incentive']
+        mode = calc.rounding['monthly_incentive']
+        units = calc.fixed.incentive_units[ROLE_CODES[person.role]].tolist()
+        total = 0
+        for (m, amount), k in zip(revenue.items(), units):
+            value = mul_div(amount, k, RATE_SCALE, mode)
+            total += value
+            note = ROUNDING_LABELS[mode] + ('' if m in person.month_revenue else '；未填产值，按0计')
+            self.step(label, month_label(m), f"产值 {_yuan(amount)} × 激励比例×时间系数 {_rate(k)}"
+                      f"（未取整 {_exact(amount, k, RATE_SCALE)}）", value, note)
+        self.step(label, '小计', f"{len(units)}个月已取整金额合计", total)
+        if calc.global_config.include_payout_timing:
+            split = calc.rounding['incentive_split']
+            immediate = mul_div(total, 1, 2, split)
+            self.step(label, '即时发放', f"{_yuan(total)} × 50%", immediate, ROUNDING_LABELS[split])
+            self.step(label, '回款后发放', f"{_yuan(total)} - {_yuan(immediate)}", total - immediate,
+                      '余数计入回款后部分')
+        return total
+
+    def _completion(self, total_revenue: int) -> int:
+        calc, person = self.calculator, self.person
+        cfg, fixed, rounding = calc.global_config, calc.fixed, calc.rounding
+        label = COMPONENT_LABELS['completion']
+
+        # 完成率与分公司产值
+        org = calc._org(person)
+        if org is not None:
+            completion_rate = org.completion_rate
+            company = to_fixed(org.company_revenue)
+            rate_formula, rate_note = f"组织单元'{org.org_unit}'共享值", f"来源: {org.revenue_source}"
+            source = f"组织单元'{org.org_unit}'共享值，四舍五入到分"
+        else:
+            if cfg.completion_rate_mode == CompletionRateMode.FROM_TARGET:
+                target = to_fixed(person.annual_target or 0.0)
+                completion_rate = total_revenue / target if target > 0 else 0.0
+                if target > 0:
+                    rate_formula, rate_note = f"期间产值 {_yuan(total_revenue)} / 年度目标 {_yuan(target)}", '按整数分计算'
+                else:
+                    rate_formula, rate_note = "未填年度目标", '按0计'
+            else:
+                completion_rate = person.completion_rate_manual or 0.0
+                rate_formula = "手填完成率"
+                rate_note = '' if person.completion_rate_manual is not None else '未填，按0计'
+            if person.company_total_revenue is not None:
+                company, source = to_fixed(person.company_total_revenue), "手填分公司产值，四舍五入到分"
+            else:
+                company, source = total_revenue, "未填分公司产值，取本人期间产值"
+        self.steps.append(TraceStep(label, '完成率', rate_formula, completion_rate, rate_note))
+        self.step(label, '分公司产值', source, company)
+
+        # 基数
+        base_mode = rounding['completion_base']
+        if person.role == Role.DM:
+            k, mode = fixed.dm_completion_rate, cfg.dm_completion_bonus_mode
+        else:
+            k, mode = fixed.completion_rate, cfg.other_completion_bonus_mode
+        base = mul_div(company, k, RATE_SCALE, base_mode)
+        self.step(label, '完成奖基数', f"分公司产值 {_yuan(company)} × {_rate(k)}（未取整 {_exact(company, k, RATE_SCALE)}）",
+                  base, ROUNDING_LABELS[base_mode])
+        if person.role == Role.DM:
+            capped = min(base, fixed.dm_cap)
+            self.step(label, '封顶', f"min({_yuan(base)}, {_yuan(fixed.dm_cap)})", capped,
+                      '已封顶' if base > fixed.dm_cap else '未超封顶')
+            base = capped
+
+        # 逐档判断
+        bonuses = []
+        for name, required, threshold in (('90', 0.9, cfg.threshold_90), ('100', 1.0, cfg.threshold_100)):
+            rate_ok = completion_rate >= required
+            collection_ok = person.collection_rate >= threshold
+            value = base if rate_ok and collection_ok else 0
+            bonuses.append(value)
+            if rate_ok and collection_ok:
+                note = '达标'
+            else:
+                note = '、'.join(n for n, ok in (('完成率未达标', rate_ok), ('回款率未达标', collection_ok)) if not ok)
+            self.step(label, f"{name}%档", f"完成率 {completion_rate:.2%} ≥ {required:.0%} 且 "
+                      f"回款率 {person.collection_rate:.2%} ≥ {threshold:.0%}", value, note)
+
+        # 叠加
+        if mode == CompletionBonusMode.EXCLUSIVE:
+            total = max(bonuses)
+            self.step(label, '叠加', f"max({', '.join(_yuan(b) for b in bonuses)})", total,
+                      'exclusive：只发最高档')
+        else:
+            total = sum(bonuses)
+            self.step(label, '叠加', ' + '.join(_yuan(b) for b in bonuses), total, 'stack：各档叠加')
+
+        if person.role != Role.DM:
+            ratio = person.personal_allocation_ratio
+            if ratio is not None:
+                units = to_fixed(ratio, RATE_SCALE)
+                allocation = rounding['allocation']
+                value = mul_div(total, units, RATE_SCALE, allocation)
+                self.step(label, '个人分配', f"完成奖总额 {_yuan(total)} × 分配比例 {_rate(units)}"
+                          f"（未取整 {_exact(total, units, RATE_SCALE)}）", value, ROUNDING_LABELS[allocation])
+                total = value
+            else:
+                self.step(label, '个人分配', "未设置个人分配比例", total, '显示完成奖总额')
+        self.step(label, '小计', f"叠加模式 {mode.value}", total)
+        return total
+
+    def _flags(self) -> Dict[str, int]:
+        """区域/全国奖、固定补贴"""
+        calc, person = self.calculator, self.person
+        fixed = calc.fixed
+        region, national = COMPONENT_LABELS['region'], COMPONENT_LABELS['national']
+        subsidy_label = COMPONENT_LABELS['subsidy']
+
+        def tiers(label: str, items) -> int:
+            values = []
+            for name, flag, amount in items:
+                hit = getattr(person, flag)
+                values.append(amount if hit else 0)
+                self.step(label, f"{name}%档", f"{FLAG_LABELS[flag]}={'是' if hit else '否'}", values[-1],
+                          f"达标发 {_yuan(amount)}")
+            self.step(label, '小计', ' + '.join(_yuan(v) for v in values), sum(values))
+            return sum(values)
+
+        totals = {}
+        if person.role == Role.CP:
+            totals['region'] = tiers(region, (('90', 'region_completed_90', fixed.region_90),
+                                              ('100', 'region_completed_100', fixed.region_100)))
+            totals['national'] = tiers(national, (('90', 'national_completed_90', fixed.national_90),
+                                                  ('100', 'national_completed_100', fixed.national_100)))
+            months = calc.period.subsidy_month_count
+            mode = calc.rounding['subsidy']
+            totals['subsidy'] = mul_div(fixed.cp_subsidy, months, CP_SUBSIDY_BASE_MONTHS, mode)
+            self.step(subsidy_label, '补贴金额', f"半年额 {_yuan(fixed.cp_subsidy)} × {months}/{CP_SUBSIDY_BASE_MONTHS}"
+                      f"（未取整 {_exact(fixed.cp_subsidy, months, CP_SUBSIDY_BASE_MONTHS)}）", totals['subsidy'],
+                      ROUNDING_LABELS[mode])
+        elif person.role == Role.DM:
+            hit = person.region_completed_90 or person.region_completed_100
+            totals['region'] = fixed.dm_region if hit else 0
+            self.step(region, '小计', f"{FLAG_LABELS['region_completed_90']}={'是' if person.region_completed_90 else '否'}"
+                      f" 或 {FLAG_LABELS['region_completed_100']}={'是' if person.region_completed_100 else '否'}",
+                      totals['region'], f"任一达标发 {_yuan(fixed.dm_region)}")
+        elif person.role in SALES_ROLES and calc.role_config.has_fixed_subsidy.get(person.role, False):
+            totals['subsidy'] = fixed.sales_subsidy
+            self.step(subsidy_label, '补贴金额', f"{_yuan(to_fixed(calc.global_config.sales_monthly_subsidy))}/月 × "
+                      f"{calc.period.subsidy_month_count}个月", totals['subsidy'])
+        return totals
+
+
+# ========== 向量化计算 ==========
+
+class FixedPointVectorizedCalculator(VectorizedCalculator):
+    """以分计算的向量化计算器（int64 数组，接口同 VectorizedCalculator）"""
+
+    def __init__(
+        self,
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        orgs=None,
+        rounding: Optional[Dict[str, str]] = None
+    ):
+        super().__init__(global_config, role_config, period, orgs)
+        self.rounding = resolve_rounding(rounding)
+        self.fixed = _FixedParams(self.global_config, self.role_config, self.period)
+
+    def calculate_arrays(
+        self,
+        roster: RosterArrays,
+        period_revenue: Optional[np.ndarray] = None,
+        total_revenue: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """同 VectorizedCalculator.calculate_arrays，金额为整数分/100（total_revenue 不使用，按分重新合计）"""
+        results = self.calculate_fen(roster, period_revenue)
+        for key in MONEY_FIELDS:
+            if key in results:
+                results[key] = fen_to_yuan(results[key])
+        return results
+
+    def calculate_fen(self, roster: RosterArrays, period_revenue: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        全体人员各项金额（int64 分）
+
+        Returns:
+            字段同 calculate_arrays，MONEY_FIELDS 中的字段为 int64 分
+        """
+        cfg = self.global_config
+        fixed = self.fixed
+        rounding = self.rounding
+        n = len(roster)
+        roles = roster.roles
+
+        is_cp = roles == ROLE_CODES[Role.CP]
+        is_dm = roles == ROLE_CODES[Role.DM]
+        is_other = ~(is_cp | is_dm)
+        zeros = np.zeros(n, dtype=np.int64)
+
+        # 过程激励：按月取整后合计（CP的比例为0）
+        months = self.period.months
+        revenue = period_revenue if period_revenue is not None else roster.period_revenue(months)
+        revenue = to_fixed_array(revenue)
+        units = fixed.incentive_units[roles]
+        units[is_cp] = 0
+        monthly = np.empty_like(revenue)
+        for j in range(len(months)):
+            monthly[:, j] = mul_div(revenue[:, j], units[:, j], RATE_SCALE, rounding['monthly_incentive'])
+        incentive_total = monthly.sum(axis=1)
+        total_revenue = revenue.sum(axis=1)
+
+        # 完成率、完成奖基数
+        if cfg.completion_rate_mode == CompletionRateMode.FROM_TARGET:
+            target = to_fixed_array(roster.annual_target)
+            completion_rate = np.divide(total_revenue, target, out=np.zeros(n), where=target > 0)
+        else:
+            completion_rate = np.nan_to_num(roster.completion_rate_manual, nan=0.0)
+        company = np.where(np.isnan(roster.company_revenue), total_revenue, to_fixed_array(roster.company_revenue))
+        if self.orgs:
+            has_org, org_values = self.org_arrays(roster)
+            has_org &= ~is_cp
+            completion_rate = np.where(has_org, org_values['completion_rate'], completion_rate)
+            company = np.where(has_org, to_fixed_array(org_values['company_revenue']), company)
+        completion_rate = np.where(is_cp, 0.0, completion_rate)
+        dm_base = np.minimum(mul_div(company, fixed.dm_completion_rate, RATE_SCALE, rounding['completion_base']),
+                             fixed.dm_cap)
+        other_base = mul_div(company, fixed.completion_rate, RATE_SCALE, rounding['completion_base'])
+        base = np.where(is_dm, dm_base, other_base)
+
+        # 完成奖
+        collection = roster.collection_rate
+        hit_90 = ~is_cp & (completion_rate >= 0.9) & (collection >= cfg.threshold_90)
+        hit_100 = ~is_cp & (completion_rate >= 1.0) & (collection >= cfg.threshold_100)
+        bonus_90 = np.where(hit_90, base, 0)
+        bonus_100 = np.where(hit_100, base, 0)
+        dm_exclusive = cfg.dm_completion_bonus_mode == CompletionBonusMode.EXCLUSIVE
+        other_exclusive = cfg.other_completion_bonus_mode == CompletionBonusMode.EXCLUSIVE
+        exclusive = np.where(is_dm, dm_exclusive, other_exclusive)
+        completion_total = np.where(exclusive, np.maximum(bonus_90, bonus_100), bonus_90 + bonus_100)
+
+        ratio = roster.allocation_ratio
+        allocate = is_other & ~np.isnan(ratio)
+        allocated = mul_div(completion_total, to_fixed_array(ratio, RATE_SCALE), RATE_SCALE, rounding['allocation'])
+        completion_total = np.where(allocate, allocated, completion_total)
+
+        # 区域/全国奖
+        region_90 = np.where(is_cp & roster.region_90, fixed.region_90, 0)
+        region_100 = np.where(is_cp & roster.region_100, fixed.region_100, 0)
+        dm_region = is_dm & (roster.region_90 | roster.region_100)
+        region_total = np.where(dm_region, fixed.dm_region, region_90 + region_100)
+        national_90 = np.where(is_cp & roster.national_90, fixed.national_90, 0)
+        national_100 = np.where(is_cp & roster.national_100, fixed.national_100, 0)
+        national_total = national_90 + national_100
+
+        # 固定补贴
+        subsidy_roles = [ROLE_CODES[r] for r in SALES_ROLES if self.role_config.has_fixed_subsidy.get(r, False)]
+        cp_subsidy = mul_div(fixed.cp_subsidy, self.period.subsidy_month_count, CP_SUBSIDY_BASE_MONTHS,
+                             rounding['subsidy'])
+        fixed_subsidy = np.where(is_cp, cp_subsidy, zeros)
+        fixed_subsidy = np.where(np.isin(roles, subsidy_roles), fixed.sales_subsidy, fixed_subsidy)
+
+        ceo_bonus = to_fixed_array(roster.ceo_bonus)
+
+        grand_total = (
+            incentive_total +
+            completion_total +
+            region_total +
+            national_total +
+            fixed_subsidy +
+            ceo_bonus
+        )
+
+        results = {
+            'monthly_incentives': monthly,
+            'has_incentive': ~is_cp,
+            'incentive_total': incentive_total,
+            'completion_bonus_90': bonus_90,
+            'completion_bonus_100': bonus_100,
+            'completion_bonus_total': completion_total,
+            'region_bonus_90': region_90,
+            'region_bonus_100': region_100,
+            'region_bonus_total': region_total,
+            'national_bonus_90': national_90,
+            'national_bonus_100': national_100,
+            'national_bonus_total': national_total,
+            'fixed_subsidy': fixed_subsidy,
+            'ceo_bonus': ceo_bonus,
+            'grand_total': grand_total,
+            'completion_rate': completion_rate,
+            'collection_rate': collection,
+        }
+        if cfg.include_payout_timing:
+            immediate = mul_div(incentive_total, 1, 2, rounding['incentive_split'])
+            results['incentive_immediate'] = immediate
+            results['incentive_after_collection'] = incentive_total - immediate
+        return results
+
+
+def calculate_bonus_batch_fen(
+    persons: List[PersonData],
+    config: GlobalConfig = None,
+    rounding: Optional[Dict[str, str]] = None
+) -> List[Tuple[BonusDetail, ValidationResult]]:
+    """便捷函数：以分为单位向量化批量计算奖金"""
+    calculator = FixedPointVectorizedCalculator(global_config=config, rounding=rounding)
+    return calculator.calculate_batch(persons)
@@ -0,0 +1,439 @@
+"""
+2026上半年奖金计算引擎 - Excel公式求值模块
+Pure-Python evaluator for the subset of Excel formulas used by the templates
+
+【支持范围】
+1. 运算符：+ - * / ^ & 以及 = <> < <= > >=
+2. 函数：IF, AND, OR, NOT, MIN, MAX, SUM, VLOOKUP(精确匹配)
+3. 引用：单元格(A1/$A$1)、跨表引用(人员数据!A1)、区域(A1:F1)、定义名称
+4. 语义：尽量贴近Excel —— 空单元格按上下文视为0/""，文本大于数字，
+   字符串比较不区分大小写，错误值(#VALUE!/#DIV/0!/#N/A)向上传播
+
+公式先编译为闭包树，同一公式可对任意多行数据重复求值
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ExcelError(Exception):
+    """Excel错误值（#VALUE!、#DIV/0!、#N/A、#NAME?）"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+    def __repr__(self):
+        return self.code
+
+
+class FormulaSyntaxError(ValueError):
+    """公式无法解析"""
+
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<ref>(?:(?:'[^']+'|[^\s!'"(),:=<>+\-*/^&]+)!)?\$?[A-Z]{1,3}\$?\d+(?::\$?[A-Z]{1,3}\$?\d+)?)(?![\w(])
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+  | (?P<op><>|<=|>=|[-+*/^&=<>(),])
+''', re.VERBOSE)
+
+_CELL_RE = re.compile(r'\$?([A-Z]{1,3})\$?(\d+)')
+
+# 二元运算符优先级（数字越大越优先）
+_BINARY_PRECEDENCE = {
+    '=': 1, '<>': 1, '<': 1, '<=': 1, '>': 1, '>=': 1,
+    '&': 2,
+    '+': 3, '-': 3,
+    '*': 4, '/': 4,
+    '^': 5,
+}
+
+
+def _tokenize(formula: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    while pos < len(formula):
+        m = _TOKEN_RE.match(formula, pos)
+        if not m:
+            raise FormulaSyntaxError(f"无法识别的字符 {formula[pos:pos + 10]!r} (位置{pos})")
+        kind = m.lastgroup
+        if kind != 'ws':
+            tokens.append((kind, m.group()))
+        pos = m.end()
+    return tokens
+
+
+def _split_ref(text: str) -> Tuple[Optional[str], str]:
+    """拆分 '表名'!A1 为 (表名, A1)"""
+    if '!' not in text:
+        return None, text
+    sheet, cell = text.rsplit('!', 1)
+    return sheet.strip("'"), cell
+
+
+def _parse_cell(cell: str) -> Tuple[str, int]:
+    col, row = _CELL_RE.fullmatch(cell).groups()
+    return col, int(row)
+
+
+def column_index(col: str) -> int:
+    """列字母转序号（A=1）"""
+    idx = 0
+    for ch in col:
+        idx = idx * 26 + ord(ch) - 64
+    return idx
+
+
+def column_letter(idx: int) -> str:
+    """列序号转字母（1=A）"""
+    letters = ''
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+# ========== Excel取值语义 ==========
+def _check(value):
+    if isinstance(value, ExcelError):
+        raise value
+    return value
+
+
+def to_number(value) -> float:
+    """算术上下文中的取值"""
+    value = _check(value)
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        raise ExcelError('#VALUE!')
+
+
+def to_bool(value) -> bool:
+    """逻辑上下文中的取值"""
+    value = _check(value)
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    upper = str(value).upper()
+    if upper in ('TRUE', 'FALSE'):
+        return upper == 'TRUE'
+    raise ExcelError('#VALUE!')
+
+
+def to_text(value) -> str:
+    value = _check(value)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _type_rank(value) -> int:
+    # Excel排序规则：数字 < 文本 < 逻辑值
+    if isinstance(value, bool):
+        return 2
+    if isinstance(value, str):
+        return 1
+    return 0
+
+
+def compare(left, right) -> int:
+    """按Excel规则比较两个值，返回 -1/0/1"""
+    left, right = _check(left), _check(right)
+    if left is None and right is None:
+        return 0
+    if left is None:
+        left = '' if isinstance(right, str) else (False if isinstance(right, bool) else 0)
+    if right is None:
+        right = '' if isinstance(left, str) else (False if isinstance(left, bool) else 0)
+
+    lr, rr = _type_rank(left), _type_rank(right)
+    if lr != rr:
+        return -1 if lr < rr else 1
+    if lr == 1:
+        left, right = left.lower(), right.lower()
+    return (left > right) - (left < right)
+
+
+def _flatten(values) -> List[Any]:
+    """展开区域参数；区域内的文本、逻辑值、空单元格被聚合函数忽略"""
+    flat = []
+    for v in values:
+        if isinstance(v, RangeValue):
+            for item in v.values():
+                _check(item)
+                if isinstance(item, (int, float)) and not isinstance(item, bool):
+                    flat.append(float(item))
+        else:
+            flat.append(to_number(v))
+    return flat
+
+
+class RangeValue:
+    """区域引用的求值结果（二维）"""
+
+    __slots__ = ('rows',)
+
+    def __init__(self, rows: List[List[Any]]):
+        self.rows = rows
+
+    def values(self):
+        for row in self.rows:
+            yield from row
+
+
+# ========== 函数 ==========
+def _fn_sum(*args):
+    return sum(_flatten(args))
+
+
+def _fn_min(*args):
+    values = _flatten(args)
+    return min(values) if values else 0.0
+
+
+def _fn_max(*args):
+    values = _flatten(args)
+    return max(values) if values else 0.0
+
+
+def _fn_vlookup(lookup, table, col_index, approximate=True):
+    if not isinstance(table, RangeValue):
+        raise ExcelError('#N/A')
+    col = int(to_number(col_index))
+    if to_bool(approximate):
+        raise ExcelError('#N/A')  # 模板只使用精确匹配
+    for row in table.rows:
+        if col > len(row):
+            raise ExcelError('#REF!')
+        if compare(row[0], lookup) == 0:
+            return row[col - 1]
+    raise ExcelError('#N/A')
+
+
+def _fn_not(value):
+    return not to_bool(value)
+
+
+# 惰性求值函数（参数以thunk形式传入）
+def _lazy_if(env, cond, then=None, otherwise=None):
+    if to_bool(cond(env)):
+        return then(env) if then is not None else True
+    return otherwise(env) if otherwise is not None else False
+
+
+def _lazy_and(env, *args):
+    result = True
+    for arg in args:
+        result = to_bool(arg(env)) and result
+    return result
+
+
+def _lazy_or(env, *args):
+    result = False
+    for arg in args:
+        result = to_bool(arg(env)) or result
+    return result
+
+
+_EAGER_FUNCTIONS: Dict[str, Callable] = {
+    'SUM': _fn_sum,
+    'MIN': _fn_min,
+    'MAX': _fn_max,
+    'VLOOKUP': _fn_vlookup,
+    'NOT': _fn_not,
+}
+
+_LAZY_FUNCTIONS: Dict[str, Callable] = {
+    'IF': _lazy_if,
+    'AND': _lazy_and,
+    'OR': _lazy_or,
+}
+
+
+def _binary(op: str, left, right):
+    if op == '+':
+        return to_number(left) + to_number(right)
+    if op == '-':
+        return to_number(left) - to_number(right)
+    if op == '*':
+        return to_number(left) * to_number(right)
+    if op == '/':
+        divisor = to_number(right)
+        dividend = to_number(left)
+        if divisor == 0:
+            raise ExcelError('#DIV/0!')
+        return dividend / divisor
+    if op == '^':
+        return to_number(left) ** to_number(right)
+    if op == '&':
+        return to_text(left) + to_text(right)
+    c = compare(left, right)
+    return {'=': c == 0, '<>': c != 0, '<': c < 0, '<=': c <= 0, '>': c > 0, '>=': c >= 0}[op]
+
+
+# ========== 求值环境 ==========
+class FormulaEnv:
+    """
+    求值环境接口
+
+    子类实现 get_cell / get_range / get_name，返回单元格原始值
+    （None 表示空单元格）
+    """
+
+    def get_cell(self, sheet: Optional[str], col: str, row: int):
+        raise NotImplementedError
+
+    def get_range(self, sheet: Optional[str], start: Tuple[str, int], end: Tuple[str, int]) -> RangeValue:
+        (c1, r1), (c2, r2) = start, end
+        return RangeValue([
+            [self.get_cell(sheet, column_letter(c), r) for c in range(column_index(c1), column_index(c2) + 1)]
+            for r in range(r1, r2 + 1)
+        ])
+
+    def get_name(self, name: str):
+        raise ExcelError('#NAME?')
+
+
+# ========== 解析与编译 ==========
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Tuple[Optional[str], Optional[str]]:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None, None
+
+    def take(self, expected: str = None) -> Tuple[str, str]:
+        kind, text = self.peek()
+        if kind is None or (expected is not None and text != expected):
+            raise FormulaSyntaxError(f"期望 {expected!r}，实际为 {text!r}")
+        self.pos += 1
+        return kind, text
+
+    def parse(self):
+        node = self.expression(0)
+        if self.pos != len(self.tokens):
+            raise FormulaSyntaxError(f"多余的内容: {self.peek()[1]!r}")
+        return node
+
+    def expression(self, min_prec: int):
+        left = self.unary()
+        while True:
+            kind, text = self.peek()
+            prec = _BINARY_PRECEDENCE.get(text) if kind == 'op' else None
+            if prec is None or prec < min_prec:
+                return left
+            self.take()
+            # Excel二元运算符均为左结合
+            right = self.expression(prec + 1)
+            left = (lambda op, l, r: lambda env: _binary(op, l(env), r(env)))(text, left, right)
+
+    def unary(self):
+        kind, text = self.peek()
+        if kind == 'op' and text in ('-', '+'):
+            self.take()
+            operand = self.unary()
+            if text == '-':
+                return lambda env: -to_number(operand(env))
+            return operand
+        return self.primary()
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'number':
+            value = float(text)
+            return lambda env: value
+        if kind == 'string':
+            value = text[1:-1].replace('""', '"')
+            return lambda env: value
+        if kind == 'ref':
+            return self._compile_ref(text)
+        if kind == 'name':
+            if self.peek()[1] == '(':
+                return self.call(text.upper())
+            upper = text.upper()
+            if upper in ('TRUE', 'FALSE'):
+                value = upper == 'TRUE'
+                return lambda env: value
+            return lambda env: env.get_name(text)
+        if text == '(':
+            node = self.expression(0)
+            self.take(')')
+            return node
+        raise FormulaSyntaxError(f"意外的符号: {text!r}")
+
+    def call(self, fname: str):
+        self.take('(')
+        args = []
+        if self.peek()[1] != ')':
+            while True:
+                args.append(self.expression(0))
+                if self.peek()[1] == ',':
+                    self.take(',')
+                    continue
+                break
+        self.take(')')
+
+        if fname in _LAZY_FUNCTIONS:
+            fn = _LAZY_FUNCTIONS[fname]
+            return lambda env: fn(env, *args)
+        if fname in _EAGER_FUNCTIONS:
+            fn = _EAGER_FUNCTIONS[fname]
+            return lambda env: fn(*[a(env) for a in args])
+        raise FormulaSyntaxError(f"不支持的函数: {fname}")
+
+    @staticmethod
+    def _compile_ref(text: str):
+        sheet, cells = _split_ref(text)
+        if ':' in cells:
+            start, end = (_parse_cell(c) for c in cells.split(':'))
+            return lambda env: env.get_range(sheet, start, end)
+        col, row = _parse_cell(cells)
+        return lambda env: env.get_cell(sheet, col, row)
+
+
+_COMPILED_CACHE: Dict[str, Callable] = {}
+
+
+def compile_formula(formula: str) -> Callable[[FormulaEnv], Any]:
+    """
+    编译公式为求值函数
+
+    Args:
+        formula: 以'='开头的公式文本（不带'='时视为公式主体）
+
+    Returns:
+        fn(env) -> 值；出错时抛出 ExcelError
+    """
+    compiled = _COMPILED_CACHE.get(formula)
+    if compiled is None:
+        body = formula[1:] if formula.startswith('=') else formula
+        compiled = _Parser(_tokenize(body)).parse()
+        _COMPILED_CACHE[formula] = compiled
+    return compiled
+
+
+def evaluate(formula: str, env: FormulaEnv):
+    """求值公式；Excel错误以 ExcelError 实例作为结果返回"""
+    try:
+        return compile_formula(formula)(env)
+    except ExcelError as e:
+        return e
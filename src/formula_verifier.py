@@ -0,0 +1,352 @@
+"""
+2026上半年奖金计算引擎 - 公式模板差异校验模块
+Differential verification of the Excel formula template against BonusCalculator
+
+【流程】
+1. 按随机种子生成人员数据（刻意覆盖门槛附近、缺失值等边界情况）
+2. 同一人员分别经 BonusCalculator 和模板公式（formula_eval纯Python求值）计算
+3. 逐项比对，汇总差异；每个差异附带 (种子, 序号) 便于复现
+4. 分块并行到多个进程，适合通宵跑百万级用例
+
+使用：
+    python formula_verifier.py --cases 1000000 --workers 8 --seed 42
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import GlobalConfig, RoleConfig, Role, DEFAULT_GLOBAL_CONFIG
+from models import PersonData, BonusDetail
+from bonus_engine import BonusCalculator
+from formula_eval import ExcelError, FormulaEnv, RangeValue, compile_formula
+from create_formula_template import (
+    DATA_SHEET, RESULT_HEADERS, ROLE_TABLE_NAME,
+    build_param_rows, build_role_rows, build_result_formulas
+)
+
+# 模板结果列 -> 引擎结果字段
+COMPARED_FIELDS: List[Tuple[str, str, Callable[[BonusDetail], float]]] = [
+    ('完成率', 'E', lambda d: d.completion_rate),
+    ('过程激励', 'F', lambda d: d.incentive_total),
+    ('完成奖小计', 'I', lambda d: d.completion_bonus_total),
+    ('区域奖', 'J', lambda d: d.region_bonus_total),
+    ('全国奖', 'K', lambda d: d.national_bonus_total),
+    ('固定补贴', 'L', lambda d: d.fixed_subsidy),
+    ('CEO奖金', 'M', lambda d: d.ceo_bonus),
+    ('奖金合计', 'N', lambda d: d.grand_total),
+]
+
+RESULT_COLUMNS = [chr(ord('A') + i) for i in range(len(RESULT_HEADERS))]
+
+REGIONS = ['华北', '华东', '华南', '西南', '西北', '东北']
+
+CHUNK_SEED_STRIDE = 2 ** 32  # 块种子 = 基础种子 × 步长 + 块序号，块数远小于步长
+
+
+@dataclass
+class Mismatch:
+    """单个差异"""
+    seed: int
+    index: int
+    name: str
+    role: str
+    field: str
+    engine_value: float
+    formula_value: object
+
+    def __str__(self):
+        return (f"[seed={self.seed} #{self.index}] {self.name}({self.role}) {self.field}: "
+                f"引擎={self.engine_value!r} 公式={self.formula_value!r}")
+
+
+@dataclass
+class VerificationReport:
+    """校验报告（可跨进程合并）"""
+    cases: int = 0
+    mismatched_cases: int = 0
+    field_mismatches: Dict[str, int] = field(default_factory=dict)
+    examples: List[Mismatch] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def merge(self, other: 'VerificationReport', max_examples: int):
+        self.cases += other.cases
+        self.mismatched_cases += other.mismatched_cases
+        for key, count in other.field_mismatches.items():
+            self.field_mismatches[key] = self.field_mismatches.get(key, 0) + count
+        room = max_examples - len(self.examples)
+        if room > 0:
+            self.examples.extend(other.examples[:room])
+
+    @property
+    def ok(self) -> bool:
+        return self.mismatched_cases == 0
+
+    def summary(self) -> str:
+        lines = [
+            f"用例数: {self.cases:,}  差异用例: {self.mismatched_cases:,}  "
+            f"耗时: {self.elapsed:.1f}s ({self.cases / self.elapsed if self.elapsed else 0:,.0f} 例/秒)"
+        ]
+        for name, count in sorted(self.field_mismatches.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {name}: {count:,}")
+        if self.examples:
+            lines.append("示例:")
+            lines.extend(f"  {m}" for m in self.examples)
+        return "\n".join(lines)
+
+
+class TemplateRowEnv(FormulaEnv):
+    """
+    模板单行求值环境
+
+    结果表公式只引用同一行，因此忽略行号，按列取值：
+    人员数据表取输入行，计算结果表取本行已算出的列
+    """
+
+    def __init__(self, names: Dict[str, object]):
+        self.names = names
+        self.data: Dict[str, object] = {}
+        self.results: Dict[str, object] = {}
+
+    def get_cell(self, sheet, col, row):
+        if sheet == DATA_SHEET:
+            return self.data.get(col)
+        value = self.results.get(col)
+        if isinstance(value, ExcelError):
+            raise value
+        return value
+
+    def get_name(self, name):
+        try:
+            return self.names[name]
+        except KeyError:
+            raise ExcelError('#NAME?')
+
+
+class TemplateEvaluator:
+    """按模板公式计算单人结果"""
+
+    def __init__(self, global_config: GlobalConfig = None, role_config: RoleConfig = None):
+        names: Dict[str, object] = {
+            code: value for _, code, value, _ in build_param_rows(global_config, role_config)
+        }
+        names[ROLE_TABLE_NAME] = RangeValue([list(row) for row in build_role_rows(role_config)])
+        self.env = TemplateRowEnv(names)
+        self.formulas = [compile_formula(f) for f in build_result_formulas(2)]
+
+    def evaluate_row(self, data: Dict[str, object]) -> Dict[str, object]:
+        env = self.env
+        env.data = data
+        env.results = {}
+        for col, formula in zip(RESULT_COLUMNS, self.formulas):
+            try:
+                env.results[col] = formula(env)
+            except ExcelError as e:
+                env.results[col] = e
+        return env.results
+
+
+def person_to_template_row(person: PersonData, index: int = 1) -> Dict[str, object]:
+    """PersonData -> 模板人员数据行（列字母 -> 单元格值，None为空单元格）"""
+    yes_no = lambda flag: '是' if flag else '否'
+    row = {
+        'A': index,
+        'B': person.name,
+        'C': person.role.value,
+        'D': person.region,
+        'E': person.org_unit,
+        'L': person.company_total_revenue,
+        'M': person.annual_target,
+        'N': person.collection_rate,
+        'O': yes_no(person.region_completed_90),
+        'P': yes_no(person.region_completed_100),
+        'Q': yes_no(person.national_completed_90),
+        'R': yes_no(person.national_completed_100),
+        'S': person.personal_allocation_ratio,
+        'T': person.ceo_bonus,
+    }
+    for m in range(1, 7):
+        row[chr(ord('E') + m)] = person.month_revenue.get(m)
+    return row
+
+
+def random_person(rng: random.Random, index: int, global_config: GlobalConfig = None) -> PersonData:
+    """生成一个随机人员，边界值（门槛附近、缺失值）出现概率较高"""
+    cfg = global_config or DEFAULT_GLOBAL_CONFIG
+    role = rng.choice(list(Role))
+    org = f"{rng.choice(REGIONS)}{rng.randint(1, 20)}分公司"
+
+    month_revenue = {}
+    for m in range(1, 7):
+        if rng.random() < 0.9:
+            month_revenue[m] = round(rng.uniform(0, 1_000_000), rng.choice([0, 2]))
+    total = sum(month_revenue.values())
+
+    company_revenue = None
+    if rng.random() < 0.8:
+        company_revenue = round(total * rng.uniform(1, 10), 2)
+
+    # 目标围绕0.9/1.0完成率分布，也覆盖缺失和0
+    target = None
+    roll = rng.random()
+    if roll < 0.1:
+        target = rng.choice([None, 0.0])
+    else:
+        base = company_revenue if company_revenue is not None and rng.random() < 0.5 else total
+        ratio = rng.choice([0.9, 1.0, rng.uniform(0.5, 1.5)])
+        target = round(base / ratio, 2) if base else rng.uniform(1, 1_000_000)
+
+    collection = rng.choice([
+        cfg.threshold_90, cfg.threshold_100,
+        cfg.threshold_90 - 0.001, cfg.threshold_100 - 0.001,
+        round(rng.uniform(0.5, 1.0), 3)
+    ])
+
+    return PersonData(
+        name=f"P{index}",
+        role=role,
+        region=org[:2],
+        org_unit=org,
+        month_revenue=month_revenue,
+        company_total_revenue=company_revenue,
+        annual_target=target,
+        collection_rate=collection,
+        region_completed_90=rng.random() < 0.5,
+        region_completed_100=rng.random() < 0.3,
+        national_completed_90=rng.random() < 0.5,
+        national_completed_100=rng.random() < 0.3,
+        personal_allocation_ratio=rng.choice([None, round(rng.random(), 3)]),
+        ceo_bonus=rng.choice([None, 0.0, float(rng.randint(0, 100_000))]),
+    )
+
+
+def _values_match(engine_value: float, formula_value, rel_tol: float, abs_tol: float) -> bool:
+    if formula_value is None or isinstance(formula_value, (str, ExcelError)):
+        return False
+    return abs(engine_value - formula_value) <= max(abs_tol, rel_tol * abs(engine_value))
+
+
+def verify_chunk(
+    seed: int,
+    cases: int,
+    global_config: GlobalConfig = None,
+    role_config: RoleConfig = None,
+    max_examples: int = 20,
+    rel_tol: float = 1e-9,
+    abs_tol: float = 0.005
+) -> VerificationReport:
+    """校验一个分块（单进程）"""
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    calculator = BonusCalculator(global_config=global_config, role_config=role_config)
+    evaluator = TemplateEvaluator(global_config, role_config)
+    report = VerificationReport()
+
+    for i in range(cases):
+        person = random_person(rng, i, global_config)
+        detail, _ = calculator.calculate_person(person, skip_validation=True)
+        results = evaluator.evaluate_row(person_to_template_row(person, i + 1))
+
+        mismatched = False
+        for label, col, getter in COMPARED_FIELDS:
+            engine_value = getter(detail)
+            formula_value = results.get(col)
+            if _values_match(engine_value, formula_value, rel_tol, abs_tol):
+                continue
+            mismatched = True
+            report.field_mismatches[label] = report.field_mismatches.get(label, 0) + 1
+            if len(report.examples) < max_examples:
+                report.examples.append(Mismatch(
+                    seed, i, person.name, person.role.value, label, engine_value, formula_value
+                ))
+        report.cases += 1
+        report.mismatched_cases += mismatched
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _verify_chunk_args(args) -> VerificationReport:
+    return verify_chunk(*args)
+
+
+def run_verification(
+    cases: int,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = 10000,
+    global_config: GlobalConfig = None,
+    role_config: RoleConfig = None,
+    max_examples: int = 20,
+    progress: bool = False
+) -> VerificationReport:
+    """
+    并行运行差异校验
+
+    Args:
+        cases: 用例总数
+        seed: 基础种子，第k块使用 seed × 2^32 + k（不同基础种子的各块互不重叠）
+        workers: 进程数（默认CPU核数；1表示不启用进程池）
+        chunk_size: 每块用例数
+
+    Returns:
+        合并后的校验报告
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = []
+    remaining, k = cases, 0
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        chunks.append((seed * CHUNK_SEED_STRIDE + k, n, global_config, role_config, max_examples))
+        remaining -= n
+        k += 1
+
+    start = time.perf_counter()
+    report = VerificationReport()
+    if workers == 1:
+        partials = map(_verify_chunk_args, chunks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        partials = executor.map(_verify_chunk_args, chunks)
+    try:
+        for partial in partials:
+            report.merge(partial, max_examples)
+            if progress:
+                print(f"\r已校验 {report.cases:,}/{cases:,}，差异 {report.mismatched_cases:,}",
+                      end='', file=sys.stderr, flush=True)
+    finally:
+        if workers != 1:
+            executor.shutdown(cancel_futures=True)
+    if progress:
+        print(file=sys.stderr)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="公式模板与计算引擎差异校验")
+    parser.add_argument("--cases", type=int, default=100000, help="用例总数")
+    parser.add_argument("--seed", type=int, default=0, help="基础随机种子")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="每块用例数")
+    parser.add_argument("--max-examples", type=int, default=20, help="最多输出的差异示例数")
+    args = parser.parse_args(argv)
+
+    report = run_verification(
+        args.cases,
+        seed=args.seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        max_examples=args.max_examples,
+        progress=True
+    )
+    print(report.summary())
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
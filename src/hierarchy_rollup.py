@@ -0,0 +1,296 @@
+"""
+2026上半年奖金计算引擎 - 层级汇总模块
+Hierarchical rollup (person -> org -> region -> national) deriving completion flags
+
+区域/全国完成标志（region_completed_90/100、national_completed_90/100）原为手填，
+核对需要把整个名单手工汇总一遍。本模块一遍读取名单，逐级汇总产值和目标：
+
+【组织单元】org_aggregation.OrgAggregator 的共享值（分公司产值、年度目标）
+【区域】    下属组织单元产值、目标之和（区域目标可单独给出）
+【全国】    各区域产值、目标之和（全国目标可单独给出）
+
+完成率 = 产值 / 目标，>=90%、>=100% 即得到对应完成标志，供常委、DM 的区域/全国奖使用。
+
+增量更新：update / remove 只重算该人所在（及原所在）的组织单元、这些组织单元所属的区域和全国，
+其余节点保持不变
+"""
+import math
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from config import GlobalConfig, RoleConfig, DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+from models import PersonData
+from org_aggregation import OrgAggregator, OrgEntry, OrgInput, OrgSummary
+
+# 完成标志字段 -> (层级, 档位)
+FLAG_FIELDS = {
+    'region_completed_90': ('region', 0.9),
+    'region_completed_100': ('region', 1.0),
+    'national_completed_90': ('national', 0.9),
+    'national_completed_100': ('national', 1.0),
+}
+
+
+@dataclass
+class LevelTotal:
+    """区域/全国汇总"""
+    name: str
+    revenue: float = 0.0
+    target: float = 0.0
+    org_count: int = 0
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def completion_rate(self) -> float:
+        return self.revenue / self.target if self.target > 0 else 0.0
+
+    @property
+    def completed_90(self) -> bool:
+        return self.completion_rate >= 0.9
+
+    @property
+    def completed_100(self) -> bool:
+        return self.completion_rate >= 1.0
+
+
+class CompletionRollup:
+    """
+    层级汇总器
+
+    add / add_all 一遍累计；读取 orgs、regions、national 时才计算有变动的节点。
+    incremental=True 时按姓名记录每人的贡献，可 update / remove（姓名需唯一）；
+    流式批量计算只需一次汇总时设为 False，内存与人数无关
+    """
+
+    def __init__(
+        self,
+        months: List[int],
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        org_inputs: Optional[Dict[str, OrgInput]] = None,
+        region_targets: Optional[Dict[str, float]] = None,
+        national_target: Optional[float] = None,
+        incremental: bool = True
+    ):
+        self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
+        self.role_config = role_config or DEFAULT_ROLE_CONFIG
+        self.region_targets = region_targets or {}
+        self.national_target = national_target
+        self.incremental = incremental
+        self._aggregator = OrgAggregator(months, self.global_config, self.role_config, org_inputs)
+
+        self._members: Dict[str, OrgEntry] = {}
+        self._orgs: Dict[str, OrgSummary] = {}
+        self._regions: Dict[str, LevelTotal] = {}
+        self._national = LevelTotal('全国')
+        self._dirty_orgs: Set[str] = set()
+
+    # ========== 累计 ==========
+    def add(self, person: PersonData):
+        entry = self._aggregator.entry(person)
+        if entry is None:
+            return
+        if self.incremental:
+            if person.name in self._members:
+                raise ValueError(f"人员'{person.name}'已汇总，修改请用 update")
+            self._members[person.name] = entry
+        self._aggregator.add_entry(entry)
+        self._dirty_orgs.add(entry[0])
+
+    def add_all(self, persons: Iterable[PersonData]) -> 'CompletionRollup':
+        for person in persons:
+            self.add(person)
+        return self
+
+    def remove(self, name: str):
+        """撤销一人的贡献"""
+        if not self.incremental:
+            raise RuntimeError("incremental=False 时不记录个人贡献，无法撤销")
+        entry = self._members.pop(name, None)
+        if entry is not None:
+            self._aggregator.add_entry(entry, sign=-1)
+            self._dirty_orgs.add(entry[0])
+
+    def update(self, person: PersonData):
+        """一人数据变动（产值、目标、组织单元、岗位等）后更新汇总"""
+        self.remove(person.name)
+        self.add(person)
+
+    # ========== 逐级计算 ==========
+    def _refresh(self):
+        """重算有变动的组织单元及其上级"""
+        if not self._dirty_orgs:
+            return
+        dirty_regions = set()
+        for org_unit in self._dirty_orgs:
+            old = self._orgs.pop(org_unit, None)
+            if old is not None:
+                dirty_regions.add(old.region)
+            summary = self._aggregator.summarize(org_unit)
+            if summary is not None:
+                self._orgs[org_unit] = summary
+                dirty_regions.add(summary.region)
+        self._dirty_orgs.clear()
+
+        # 只遍历变动区域的组织单元；区域数、组织单元数都远小于人数
+        members: Dict[str, List[OrgSummary]] = {region: [] for region in dirty_regions}
+        for org in self._orgs.values():
+            if org.region in members:
+                members[org.region].append(org)
+        for region, orgs in members.items():
+            if orgs:
+                self._regions[region] = self._sum_level(region, orgs, self.region_targets.get(region))
+            else:
+                self._regions.pop(region, None)
+
+        regions = [self._regions[name] for name in sorted(self._regions)]
+        national = LevelTotal('全国', org_count=sum(r.org_count for r in regions))
+        for region in regions:
+            national.revenue += region.revenue
+            national.target += region.target
+        if self.national_target is not None:
+            national.target = self.national_target
+        self._national = national
+
+    @staticmethod
+    def _sum_level(name: str, orgs: List[OrgSummary], target: Optional[float]) -> LevelTotal:
+        level = LevelTotal(name, org_count=len(orgs))
+        missing = 0
+        for org in sorted(orgs, key=lambda o: o.org_unit):  # 固定加法顺序，增量与全量结果一致
+            level.revenue += org.company_revenue
+            if org.annual_target is None:
+                missing += 1
+            else:
+                level.target += org.annual_target
+        if target is not None:
+            level.target = target
+        elif missing:
+            level.warnings.append(f"区域'{name}'有{missing}个组织单元未填年度目标，区域目标按已填部分合计")
+        return level
+
+    @property
+    def orgs(self) -> Dict[str, OrgSummary]:
+        """{组织单元: OrgSummary}（可直接传给 BonusCalculator(orgs=...)）"""
+        self._refresh()
+        return self._orgs
+
+    @property
+    def regions(self) -> Dict[str, LevelTotal]:
+        self._refresh()
+        return self._regions
+
+    @property
+    def national(self) -> LevelTotal:
+        self._refresh()
+        return self._national
+
+    # ========== 一致性核对 ==========
+    def verify(self, rel_tol: float = 1e-9) -> List[str]:
+        """
+        增量结果与按当前成员全量重算逐项比对，返回不一致的说明（空列表即一致）
+
+        产值、目标按 rel_tol 比较（撤销按减法更新，允许浮点舍入差异），其余字段须完全相同
+        """
+        if not self.incremental:
+            raise RuntimeError("incremental=False 时不记录个人贡献，无法核对")
+        fresh = CompletionRollup(self._aggregator.months, self.global_config, self.role_config,
+                                 self._aggregator.org_inputs, self.region_targets, self.national_target,
+                                 incremental=False)
+        for entry in self._members.values():
+            fresh._aggregator.add_entry(entry)
+            fresh._dirty_orgs.add(entry[0])
+
+        def close(a, b) -> bool:
+            if a is None or b is None:
+                return a is b
+            return math.isclose(a, b, rel_tol=rel_tol, abs_tol=1e-9)
+
+        problems = []
+        orgs, expected_orgs = self.orgs, fresh.orgs
+        for name in sorted(set(orgs) | set(expected_orgs)):
+            got, want = orgs.get(name), expected_orgs.get(name)
+            if got is None or want is None:
+                problems.append(f"组织单元'{name}'：增量{'缺失' if got is None else '多出'}")
+                continue
+            for f in ('member_count', 'region', 'revenue_source', 'warnings'):
+                if getattr(got, f) != getattr(want, f):
+                    problems.append(f"组织单元'{name}'.{f}：增量{getattr(got, f)!r}，全量{getattr(want, f)!r}")
+            for f in ('company_revenue', 'annual_target', 'completion_rate'):
+                if not close(getattr(got, f), getattr(want, f)):
+                    problems.append(f"组织单元'{name}'.{f}：增量{getattr(got, f)!r}，全量{getattr(want, f)!r}")
+
+        levels = [(self.national, fresh.national)]
+        regions, expected_regions = self.regions, fresh.regions
+        for name in sorted(set(regions) | set(expected_regions)):
+            if name not in regions or name not in expected_regions:
+                problems.append(f"区域'{name}'：增量{'缺失' if name not in regions else '多出'}")
+            else:
+                levels.append((regions[name], expected_regions[name]))
+        for got, want in levels:
+            if (got.org_count != want.org_count or got.warnings != want.warnings
+                    or not close(got.revenue, want.revenue) or not close(got.target, want.target)
+                    or (got.completed_90, got.completed_100) != (want.completed_90, want.completed_100)):
+                problems.append(f"'{got.name}'汇总：增量{got.revenue:,.2f}/{got.target:,.2f}"
+                                f"（{got.org_count}个组织单元），全量{want.revenue:,.2f}/{want.target:,.2f}"
+                                f"（{want.org_count}个组织单元）")
+        return problems
+
+    # ========== 完成标志 ==========
+    def flags(self, region: str) -> Dict[str, bool]:
+        """某区域人员的四个完成标志（区域无汇总数据时区域标志为False）"""
+        level = self.regions.get(region)
+        national = self.national
+        return {
+            'region_completed_90': bool(level and level.completed_90),
+            'region_completed_100': bool(level and level.completed_100),
+            'national_completed_90': national.completed_90,
+            'national_completed_100': national.completed_100,
+        }
+
+    def apply(self, person: PersonData) -> PersonData:
+        """返回完成标志替换为汇总结果的副本（原对象不变）"""
+        return replace(person, **self.flags(person.region))
+
+    def stale_flags(self, person: PersonData) -> List[str]:
+        """手填值与汇总结果不一致的标志字段"""
+        return [f for f, value in self.flags(person.region).items() if getattr(person, f) != value]
+
+    def apply_roster(self, roster):
+        """RosterArrays 的完成标志列替换为汇总结果（返回新对象，其余列共享）"""
+        by_region = {region: self.flags(region) for region in set(roster.regions)}
+        columns = {}
+        for f, key in (('region_completed_90', 'region_90'), ('region_completed_100', 'region_100'),
+                       ('national_completed_90', 'national_90'), ('national_completed_100', 'national_100')):
+            columns[key] = np.array([by_region[r][f] for r in roster.regions], dtype=bool)
+        return replace(roster, **columns)
+
+    def level_rows(self) -> List[Dict]:
+        """各级汇总表（全国、区域、组织单元）"""
+        def row(level, name, revenue, target, rate):
+            return {'level': level, 'name': name, 'revenue': revenue, 'target': target,
+                    'completion_rate': rate, 'completed_90': rate >= 0.9, 'completed_100': rate >= 1.0}
+
+        national = self.national
+        rows = [row('national', national.name, national.revenue, national.target, national.completion_rate)]
+        for name in sorted(self.regions):
+            level = self.regions[name]
+            rows.append(row('region', name, level.revenue, level.target, level.completion_rate))
+        for name in sorted(self.orgs):
+            org = self.orgs[name]
+            rows.append(row('org', name, org.company_revenue, org.annual_target or 0.0, org.completion_rate))
+        return rows
+
+
+def derive_completion_flags(
+    persons: List[PersonData],
+    months: List[int] = None,
+    config: GlobalConfig = None,
+    region_targets: Optional[Dict[str, float]] = None,
+    national_target: Optional[float] = None
+) -> List[PersonData]:
+    """便捷函数：按名单汇总，返回完成标志替换为汇总结果的人员列表"""
+    rollup = CompletionRollup(months or list(range(1, 7)), global_config=config, region_targets=region_targets,
+                              national_target=national_target, incremental=False).add_all(persons)
+    return [rollup.apply(p) for p in persons]
@@ -42,15 +42,17 @@ class PersonData:
     # CEO奖金 (手动输入)
     ceo_bonus: Optional[float] = None
     
-    def get_total_revenue(self) -> float:
-        """计算个人产值合计"""
-        return sum(self.month_revenue.values())
+    def get_total_revenue(self, months: Optional[List[int]] = None) -> float:
+        """计算个人产值合计（给出months时只合计这些月份）"""
+        if months is None:
+            return sum(self.month_revenue.values())
+        return sum(self.month_revenue.get(m, 0.0) for m in months)
     
-    def get_company_revenue(self) -> float:
+    def get_company_revenue(self, months: Optional[List[int]] = None) -> float:
         """获取分公司产值(若未设置则使用个人产值)"""
         if self.company_total_revenue is not None:
             return self.company_total_revenue
-        return self.get_total_revenue()
+        return self.get_total_revenue(months)
 
 
 @dataclass
@@ -0,0 +1,269 @@
+"""
+2026上半年奖金计算引擎 - 组织单元汇总模块
+Org-unit pre-aggregation of company revenue, completion rate and bonus bases
+
+同一分公司的副总、经理、销售原本各自计算分公司产值、完成率和完成奖基数；
+未填分公司产值时各人退回用个人产值，同一分公司内结果不一致。
+本模块先按组织单元汇总一次，各人计算时读取共享值：
+
+【分公司产值】组织单元级输入 > 成员填写的分公司产值（不一致时取出现最多的值并提示）
+              > 成员本期产值合计
+【目标】      组织单元级输入 > 成员填写的年度目标（同上）
+【完成率】    组织单元级输入 > 按配置：分公司产值/目标，或成员手填完成率（同上）
+
+常委(CP)不参与完成奖计算，不计入汇总
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import GlobalConfig, RoleConfig, Role, CompletionRateMode, DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+from models import PersonData
+
+# 成员填写值不一致时，提示中最多列出的取值个数
+CONFLICT_LIST_LIMIT = 5
+
+
+@dataclass
+class OrgInput:
+    """组织单元级输入（未给出的项由成员数据推导）"""
+    org_unit: str
+    company_revenue: Optional[float] = None
+    annual_target: Optional[float] = None
+    completion_rate: Optional[float] = None
+
+
+@dataclass
+class OrgSummary:
+    """组织单元汇总结果（成员共享）"""
+    org_unit: str
+    member_count: int
+    region: str                         # 成员所属区域（不一致时取人数最多的）
+    company_revenue: float
+    annual_target: Optional[float]
+    completion_rate: float
+    revenue_source: str                 # input / members_company / members_sum
+    dm_bonus_base: float                # min(分公司产值*DM完成奖比例, 封顶)
+    bonus_base: float                   # 分公司产值*完成奖比例（分配比例之前）
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def eligible_90(self) -> bool:
+        """完成率达到90%档（回款率门槛按个人判断）"""
+        return self.completion_rate >= 0.9
+
+    @property
+    def eligible_100(self) -> bool:
+        return self.completion_rate >= 1.0
+
+
+# 一个成员对所在组织单元的贡献：(组织单元, 区域, 本期产值合计, 分公司产值, 年度目标, 手填完成率)
+OrgEntry = Tuple[str, str, float, Optional[float], Optional[float], Optional[float]]
+
+
+class _OrgAccumulator:
+    __slots__ = ('members', 'revenue_total', 'regions', 'company_revenues', 'targets', 'manual_rates')
+
+    def __init__(self):
+        self.members = 0
+        self.revenue_total = 0.0
+        self.regions: Counter = Counter()
+        self.company_revenues: Counter = Counter()
+        self.targets: Counter = Counter()
+        self.manual_rates: Counter = Counter()
+
+
+def _count(values: Counter, value, sign: int):
+    if value is None:
+        return
+    values[value] += sign
+    if values[value] <= 0:
+        del values[value]
+
+
+def _most_common(values: Counter):
+    """出现最多的值，并列取较小的值（与累计顺序无关，增量撤销再累计后结果不变）"""
+    return min(values.items(), key=lambda item: (-item[1], item[0]))[0]
+
+
+def _consensus(values: Counter, org_unit: str, label: str, warnings: List[str]) -> Optional[float]:
+    """成员填写的共享值：取出现最多的（并列取较小的），不一致时提示"""
+    if not values:
+        return None
+    value = _most_common(values)
+    if len(values) > 1:
+        listed = '、'.join(f"{v:,.2f}" for v in sorted(values)[:CONFLICT_LIST_LIMIT])
+        if len(values) > CONFLICT_LIST_LIMIT:
+            listed += f"等{len(values)}个值"
+        warnings.append(f"组织单元'{org_unit}'成员填写的{label}不一致（{listed}），按{value:,.2f}计算")
+    return value
+
+
+class OrgAggregator:
+    """
+    组织单元汇总器
+
+    逐人 add（或按列 add_roster）累计，finalize 得到 {组织单元: OrgSummary}；
+    只保留每个组织单元的累计量，内存与人数无关，可用于流式批量计算的第一遍
+    """
+
+    def __init__(
+        self,
+        months: List[int],
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        org_inputs: Optional[Dict[str, OrgInput]] = None
+    ):
+        self.months = list(months)
+        self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
+        self.role_config = role_config or DEFAULT_ROLE_CONFIG
+        self.org_inputs = org_inputs or {}
+        self._orgs: Dict[str, _OrgAccumulator] = {}
+
+    def entry(self, person: PersonData) -> Optional[OrgEntry]:
+        """成员的贡献（CP不计入，返回None）"""
+        if person.role == Role.CP:
+            return None
+        return (person.org_unit, person.region, person.get_total_revenue(self.months),
+                person.company_total_revenue, person.annual_target, person.completion_rate_manual)
+
+    def add_entry(self, entry: OrgEntry, sign: int = 1):
+        """
+        累计（sign=1）或撤销（sign=-1）一个成员的贡献
+
+        撤销后产值合计按减法更新，与重新累计可能有浮点舍入差异；
+        组织单元成员减到0时整体移除，差异不会留存
+        """
+        org_unit, region, revenue_total, company_revenue, target, manual_rate = entry
+        acc = self._orgs.get(org_unit)
+        if acc is None:
+            if sign < 0:
+                raise KeyError(f"组织单元'{org_unit}'无可撤销的成员")
+            acc = self._orgs[org_unit] = _OrgAccumulator()
+        acc.members += sign
+        if acc.members <= 0:
+            del self._orgs[org_unit]
+            return
+        acc.revenue_total += revenue_total * sign
+        _count(acc.regions, region, sign)
+        _count(acc.company_revenues, company_revenue, sign)
+        _count(acc.targets, target, sign)
+        _count(acc.manual_rates, manual_rate, sign)
+
+    def add(self, person: PersonData):
+        entry = self.entry(person)
+        if entry is not None:
+            self.add_entry(entry)
+
+    def add_all(self, persons: Iterable[PersonData]) -> 'OrgAggregator':
+        for person in persons:
+            self.add(person)
+        return self
+
+    def add_roster(self, roster) -> 'OrgAggregator':
+        """按列累计 RosterArrays（缺失值为NaN），结果与逐人 add 相同"""
+        from vectorized_engine import ROLE_CODES, period_total
+
+        def opt(value):
+            return None if value != value else value  # NaN -> None
+
+        totals = period_total(roster.period_revenue(self.months)).tolist()
+        cp = ROLE_CODES[Role.CP]
+        for i, code in enumerate(roster.roles.tolist()):
+            if code == cp:
+                continue
+            self.add_entry((roster.org_units[i], roster.regions[i], totals[i],
+                            opt(float(roster.company_revenue[i])), opt(float(roster.annual_target[i])),
+                            opt(float(roster.completion_rate_manual[i]))))
+        return self
+
+    def finalize(self) -> Dict[str, OrgSummary]:
+        """计算各组织单元的共享值"""
+        return {org_unit: self.summarize(org_unit) for org_unit in self._orgs}
+
+    def summarize(self, org_unit: str) -> Optional[OrgSummary]:
+        """单个组织单元的共享值（无成员时返回None）"""
+        cfg = self.global_config
+        role_cfg = self.role_config
+        acc = self._orgs.get(org_unit)
+        if acc is None:
+            return None
+        given = self.org_inputs.get(org_unit) or OrgInput(org_unit)
+        warnings: List[str] = []
+
+        if given.company_revenue is not None:
+            company_revenue, source = given.company_revenue, 'input'
+        else:
+            company_revenue = _consensus(acc.company_revenues, org_unit, '分公司产值', warnings)
+            source = 'members_company'
+            if company_revenue is None:
+                company_revenue, source = acc.revenue_total, 'members_sum'
+
+        target = given.annual_target
+        if target is None:
+            target = _consensus(acc.targets, org_unit, '年度目标', warnings)
+
+        if given.completion_rate is not None:
+            completion_rate = given.completion_rate
+        elif cfg.completion_rate_mode == CompletionRateMode.FROM_TARGET:
+            completion_rate = company_revenue / target if target and target > 0 else 0.0
+        else:
+            completion_rate = _consensus(acc.manual_rates, org_unit, '手填完成率', warnings) or 0.0
+
+        region = _most_common(acc.regions) if acc.regions else ''
+        if len(acc.regions) > 1:
+            warnings.append(f"组织单元'{org_unit}'成员分属多个区域（{'、'.join(sorted(acc.regions))}），按{region}汇总")
+
+        return OrgSummary(
+            org_unit=org_unit,
+            member_count=acc.members,
+            region=region,
+            company_revenue=company_revenue,
+            annual_target=target,
+            completion_rate=completion_rate,
+            revenue_source=source,
+            dm_bonus_base=min(company_revenue * role_cfg.dm_completion_bonus_rate, cfg.dm_completion_bonus_cap),
+            bonus_base=company_revenue * role_cfg.completion_bonus_rate,
+            warnings=warnings,
+        )
+
+
+def read_org_inputs(path: str, fmt: Optional[str] = None) -> Dict[str, OrgInput]:
+    """
+    读取组织单元级输入（CSV/XLSX/NDJSON）
+
+    列：组织单元(org_unit)、分公司产值(company_revenue)、年度目标(annual_target)、完成率(completion_rate)
+    """
+    from batch_io import ROSTER_FORMATS, detect_format, iter_records, to_float
+
+    aliases = {
+        'org_unit': ['org_unit', 'org', '组织单元'],
+        'company_revenue': ['company_revenue', 'company_total_revenue', '分公司产值', '分公司总产值'],
+        'annual_target': ['annual_target', 'target', '年度目标'],
+        'completion_rate': ['completion_rate', '完成率'],
+    }
+    lookup = {alias.lower(): key for key, names in aliases.items() for alias in names}
+    inputs = {}
+    for record in iter_records(path, fmt or detect_format(path, ROSTER_FORMATS)):
+        fields = {lookup.get(str(k).strip().lower()): v for k, v in record.items() if k is not None}
+        org_unit = str(fields.get('org_unit') or '').strip()
+        if not org_unit:
+            continue
+        inputs[org_unit] = OrgInput(
+            org_unit=org_unit,
+            company_revenue=to_float(fields.get('company_revenue')),
+            annual_target=to_float(fields.get('annual_target')),
+            completion_rate=to_float(fields.get('completion_rate')),
+        )
+    return inputs
+
+
+def aggregate_orgs(
+    persons: Iterable[PersonData],
+    months: List[int] = None,
+    config: GlobalConfig = None,
+    org_inputs: Optional[Dict[str, OrgInput]] = None
+) -> Dict[str, OrgSummary]:
+    """便捷函数：按组织单元汇总"""
+    return OrgAggregator(months or list(range(1, 7)), global_config=config,
+                         org_inputs=org_inputs).add_all(persons).finalize()
@@ -0,0 +1,378 @@
+"""
+2026上半年奖金计算引擎 - 奖金总额预测模块
+Monte Carlo payout forecasting from partial-period revenue
+
+半年过半时财务需要"按目前走势，奖金总额大概落在什么区间"。本模块以已发生月份的实际产值为基础，
+按可配置的分布抽样剩余月份产值，模拟成千上万个完整期间，给出总额及按岗位、区域的分位数。
+
+【抽样】剩余每月产值 = 个人已发生月份月均产值 × drift × 组织单元冲击 × 个人波动
+        - lognormal：个人波动 ~ 对数正态（均值为1，sigma 为对数标准差）
+        - normal：   个人波动 ~ N(1, sigma)，截断于0
+        - bootstrap：从本人已发生月份中有放回抽取（sigma 不用）
+        组织单元冲击 ~ 对数正态（均值为1，org_sigma），同一模拟同一月份内同组织单元成员共享
+【计算】多个模拟纵向拼接为一个大名单，一次 calculate_arrays；多进程分块并行
+【内存】每块算完立即按 总额/岗位/区域 归约为每个模拟一行，逐人结果不保留，
+        内存 = 块大小 × 人数（与模拟次数无关）+ 模拟次数 × 分组数
+
+区域/全国完成标志、分公司产值沿用名单填写值，不随模拟变化
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from config import GlobalConfig, RoleConfig, PeriodConfig, Role, DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+from models import PersonData
+from vectorized_engine import ROLE_CODES, ROLE_ORDER, RosterArrays, VectorizedCalculator, period_total
+
+DISTRIBUTIONS = ('lognormal', 'normal', 'bootstrap')
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class RevenueModel:
+    """剩余月份产值的抽样分布"""
+    distribution: str = 'lognormal'
+    drift: float = 1.0          # 剩余月份相对已发生月均的倍数
+    sigma: float = 0.25         # 个人逐月波动
+    org_sigma: float = 0.0      # 组织单元共同冲击（0=不加）
+
+    def __post_init__(self):
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"未知的分布: {self.distribution}（可选: {', '.join(DISTRIBUTIONS)}）")
+        if self.sigma < 0 or self.org_sigma < 0:
+            raise ValueError("sigma / org_sigma 不能为负数")
+
+
+def _lognormal(rng: np.random.Generator, sigma: float, size) -> np.ndarray:
+    """均值为1的对数正态"""
+    if sigma == 0:
+        return np.ones(size)
+    return np.exp(rng.normal(-sigma * sigma / 2, sigma, size))
+
+
+@dataclass
+class ForecastResult:
+    """预测结果：每个模拟一行的分组总额"""
+    simulations: int
+    actual_months: List[int]
+    forecast_months: List[int]
+    metric: str
+    total: np.ndarray                                       # (模拟次数,)
+    by_role: Dict[str, np.ndarray] = field(default_factory=dict)
+    by_region: Dict[str, np.ndarray] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def percentile_rows(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> List[Dict]:
+        """分位数表：全部、各岗位、各区域各一行"""
+        groups = [('total', '全部', self.total)]
+        groups += [('role', name, values) for name, values in self.by_role.items()]
+        groups += [('region', name, values) for name, values in self.by_region.items()]
+        rows = []
+        for group, name, values in groups:
+            row = {'group': group, 'name': name, 'mean': float(values.mean())}
+            for q, v in zip(percentiles, np.percentile(values, percentiles)):
+                row[f'p{q:g}'] = float(v)
+            rows.append(row)
+        return rows
+
+
+# ========== 模拟（工作进程内执行） ==========
+class _Simulator:
+    """持有名单与配置，按块模拟；工作进程初始化时构建一次"""
+
+    def __init__(self, roster: RosterArrays, global_config: GlobalConfig, role_config: RoleConfig,
+                 period: PeriodConfig, actual_months: List[int], models: Dict[int, RevenueModel],
+                 metric: str, batch_size: int):
+        self.calculator = VectorizedCalculator(global_config, role_config, period)
+        self.metric = metric
+        n = len(roster)
+        self.n = n
+        months = period.months
+        self.actual_cols = [j for j, m in enumerate(months) if m in actual_months]
+        self.forecast_cols = [j for j, m in enumerate(months) if m not in actual_months]
+        self.revenue = np.array(roster.period_revenue(months))
+        actual = self.revenue[:, self.actual_cols]
+        self.actual = actual
+        self.base = actual.mean(axis=1) if self.actual_cols else np.zeros(n)
+
+        # 各人所用分布：岗位编码 -> 行下标
+        self.models = [(model, np.flatnonzero(np.isin(roster.roles, codes)))
+                       for model, codes in _group_models(models)]
+        _, self.org_index = np.unique(np.asarray(roster.org_units, dtype=object), return_inverse=True)
+        self.org_count = int(self.org_index.max()) + 1 if n else 0
+        self.role_index = roster.roles.astype(np.int64)
+        self.region_names, self.region_index = np.unique(np.asarray(roster.regions, dtype=object),
+                                                         return_inverse=True)
+        self.batch_size = batch_size
+        self.tiled = _tile(roster, batch_size)
+
+    def simulate(self, seed: np.random.SeedSequence, count: int) -> np.ndarray:
+        """
+        模拟 count 个期间
+
+        Returns:
+            (count, 1 + 岗位数 + 区域数)：总额、各岗位、各区域
+        """
+        rng = np.random.default_rng(seed)
+        n, roles, regions = self.n, len(ROLE_ORDER), len(self.region_names)
+        out = np.zeros((count, 1 + roles + regions))
+        done = 0
+        while done < count:
+            k = min(self.batch_size, count - done)
+            revenue = np.tile(self.revenue, (k, 1))
+            for j in self.forecast_cols:
+                revenue[:, j] = self._sample_month(rng, k)
+            roster = self.tiled if k == self.batch_size else _tile_slice(self.tiled, k * n)
+            results = self.calculator.calculate_arrays(roster, revenue, period_total(revenue))
+            values = results[self.metric].reshape(k, n)
+
+            sim = np.repeat(np.arange(k), n)
+            out[done:done + k, 0] = values.sum(axis=1)
+            out[done:done + k, 1:1 + roles] = np.bincount(
+                sim * roles + np.tile(self.role_index, k), weights=values.ravel(), minlength=k * roles
+            ).reshape(k, roles)
+            out[done:done + k, 1 + roles:] = np.bincount(
+                sim * regions + np.tile(self.region_index, k), weights=values.ravel(), minlength=k * regions
+            ).reshape(k, regions)
+            done += k
+        return out
+
+    def _sample_month(self, rng: np.random.Generator, k: int) -> np.ndarray:
+        """k 个模拟的某个剩余月份产值，按模拟纵向拼接 (k*n,)"""
+        n = self.n
+        month = np.empty((k, n))
+        for model, rows in self.models:
+            if not len(rows):
+                continue
+            if model.distribution == 'bootstrap':
+                if not self.actual_cols:
+                    raise ValueError("bootstrap 需要至少一个已发生月份")
+                pick = rng.integers(0, len(self.actual_cols), (k, len(rows)))
+                values = self.actual[rows[None, :], pick]
+            else:
+                if model.distribution == 'lognormal':
+                    noise = _lognormal(rng, model.sigma, (k, len(rows)))
+                else:
+                    noise = np.maximum(rng.normal(1.0, model.sigma, (k, len(rows))), 0.0)
+                values = self.base[rows] * noise
+            values = values * model.drift
+            if model.org_sigma:
+                shock = _lognormal(rng, model.org_sigma, (k, self.org_count))
+                values = values * shock[:, self.org_index[rows]]
+            month[:, rows] = values
+        return month.ravel()
+
+
+def _group_models(models: Dict[int, RevenueModel]):
+    """相同分布的岗位合并，减少抽样调用"""
+    grouped: Dict[int, List] = {}
+    for code, model in models.items():
+        grouped.setdefault(id(model), [model, []])[1].append(code)
+    return [(model, codes) for model, codes in grouped.values()]
+
+
+def _tile(roster: RosterArrays, k: int) -> RosterArrays:
+    """名单纵向重复 k 次（产值由调用方另行传入）"""
+    return replace(
+        roster,
+        names=roster.names * k,
+        roles=np.tile(roster.roles, k),
+        regions=roster.regions * k,
+        org_units=roster.org_units * k,
+        revenue=np.empty((0, 0)),
+        **{name: np.tile(getattr(roster, name), k) for name in (
+            'company_revenue', 'annual_target', 'completion_rate_manual', 'collection_rate',
+            'region_90', 'region_100', 'national_90', 'national_100', 'allocation_ratio', 'ceo_bonus')}
+    )
+
+
+def _tile_slice(roster: RosterArrays, rows: int) -> RosterArrays:
+    """重复名单的前 rows 行（最后一块不满时用）"""
+    values = {}
+    for name in ('names', 'roles', 'regions', 'org_units', 'company_revenue', 'annual_target',
+                 'completion_rate_manual', 'collection_rate', 'region_90', 'region_100',
+                 'national_90', 'national_100', 'allocation_ratio', 'ceo_bonus'):
+        values[name] = getattr(roster, name)[:rows]
+    return replace(roster, **values)
+
+
+_simulator: Optional[_Simulator] = None
+
+
+def _init_worker(*args):
+    global _simulator
+    _simulator = _Simulator(*args)
+
+
+def _simulate_task(seed: np.random.SeedSequence, count: int) -> np.ndarray:
+    return _simulator.simulate(seed, count)
+
+
+# ========== 预测器 ==========
+class PayoutForecaster:
+    """奖金总额蒙特卡洛预测"""
+
+    def __init__(
+        self,
+        roster: Union[RosterArrays, List[PersonData]],
+        actual_months: Sequence[int],
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        model: RevenueModel = None,
+        role_models: Optional[Dict[Role, RevenueModel]] = None,
+        metric: str = 'grand_total'
+    ):
+        """
+        Args:
+            roster: 名单（PersonData 列表或 RosterArrays），已发生月份填实际产值
+            actual_months: 已发生月份；期间内其余月份按分布抽样
+            model: 默认抽样分布
+            role_models: 按岗位覆盖的抽样分布
+            metric: 预测的金额字段（calculate_arrays 的结果字段）
+        """
+        self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
+        self.role_config = role_config or DEFAULT_ROLE_CONFIG
+        self.period = period or PeriodConfig.from_global_config(self.global_config)
+        self.actual_months = [m for m in self.period.months if m in set(actual_months)]
+        unknown = set(actual_months) - set(self.period.months)
+        if unknown:
+            raise ValueError(f"已发生月份不在计算期间内: {sorted(unknown)}")
+        self.forecast_months = [m for m in self.period.months if m not in set(actual_months)]
+        model = model or RevenueModel()
+        self.models = {ROLE_CODES[r]: (role_models or {}).get(r, model) for r in ROLE_ORDER}
+        self.metric = metric
+        if not isinstance(roster, RosterArrays):
+            roster = RosterArrays.from_persons(roster, self.period.months)
+        self.roster = roster
+
+    def simulate(
+        self,
+        simulations: int = 10000,
+        seed: Optional[int] = None,
+        workers: Optional[int] = None,
+        batch_rows: int = 50_000,
+        sims_per_task: int = 200
+    ) -> ForecastResult:
+        """
+        运行模拟
+
+        Args:
+            simulations: 模拟次数
+            seed: 随机种子；相同种子、相同 sims_per_task 时结果与进程数无关
+            workers: 进程数（默认CPU核数，1=当前进程内执行）
+            batch_rows: 一次 calculate_arrays 的行数上限（模拟数 × 人数），决定内存占用；
+                        过大时数组超出CPU缓存反而变慢，至少按一个模拟计算
+            sims_per_task: 每个并行任务的模拟次数
+
+        Raises:
+            ValueError: 模拟次数小于1
+        """
+        if simulations < 1:
+            raise ValueError(f"模拟次数至少为1: {simulations}")
+        start = time.perf_counter()
+        n = max(len(self.roster), 1)
+        batch_size = max(1, min(sims_per_task, batch_rows // n))
+        init_args = (self.roster, self.global_config, self.role_config, self.period,
+                     self.actual_months, self.models, self.metric, batch_size)
+        counts = [min(sims_per_task, simulations - i) for i in range(0, simulations, sims_per_task)]
+        seeds = np.random.SeedSequence(seed).spawn(len(counts))
+
+        rows = []
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(counts) == 1:
+            simulator = _Simulator(*init_args)
+            rows = [simulator.simulate(s, c) for s, c in zip(seeds, counts)]
+        else:
+            # 在途任务数有上限，结果按提交顺序收集
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as executor:
+                for s, c in zip(seeds, counts):
+                    pending.append(executor.submit(_simulate_task, s, c))
+                    if len(pending) >= workers * 2:
+                        rows.append(pending.popleft().result())
+                while pending:
+                    rows.append(pending.popleft().result())
+        table = np.vstack(rows)
+
+        roles = len(ROLE_ORDER)
+        present_roles = set(self.roster.roles.tolist())
+        region_names = np.unique(np.asarray(self.roster.regions, dtype=object)).tolist()
+        return ForecastResult(
+            simulations=simulations,
+            actual_months=list(self.actual_months),
+            forecast_months=list(self.forecast_months),
+            metric=self.metric,
+            total=table[:, 0],
+            by_role={ROLE_ORDER[c].value: table[:, 1 + c] for c in range(roles) if c in present_roles},
+            by_region={name: table[:, 1 + roles + j] for j, name in enumerate(region_names)},
+            elapsed=time.perf_counter() - start,
+        )
+
+
+def forecast_payouts(
+    persons: List[PersonData],
+    actual_months: Sequence[int],
+    simulations: int = 10000,
+    model: RevenueModel = None,
+    config: GlobalConfig = None,
+    seed: Optional[int] = None
+) -> ForecastResult:
+    """便捷函数：奖金总额预测"""
+    return PayoutForecaster(persons, actual_months, global_config=config, model=model).simulate(simulations, seed)
+
+
+# ========== 命令行 ==========
+def main(argv: Optional[List[str]] = None) -> int:
+    from batch_io import iter_roster
+    from config import load_config_file
+
+    parser = argparse.ArgumentParser(description="按已发生月份产值蒙特卡洛预测奖金总额")
+    parser.add_argument("input", help="人员名单文件（.csv/.xlsx/.ndjson/.brst）")
+    parser.add_argument("-a", "--actual-months", required=True, help="已发生月份，如 1,2,3")
+    parser.add_argument("-n", "--simulations", type=int, default=10000, help="模拟次数")
+    parser.add_argument("-d", "--distribution", choices=DISTRIBUTIONS, default='lognormal', help="抽样分布")
+    parser.add_argument("--drift", type=float, default=1.0, help="剩余月份相对已发生月均的倍数")
+    parser.add_argument("--sigma", type=float, default=0.25, help="个人逐月波动")
+    parser.add_argument("--org-sigma", type=float, default=0.0, help="组织单元共同冲击")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("-w", "--workers", type=int, help="进程数（默认CPU核数）")
+    parser.add_argument("-c", "--config", help="参数覆盖文件（JSON）")
+    args = parser.parse_args(argv)
+
+    try:
+        actual_months = [int(m) for m in args.actual_months.split(',') if m.strip()]
+        model = RevenueModel(args.distribution, args.drift, args.sigma, args.org_sigma)
+        global_config, role_config = load_config_file(args.config) if args.config else (None, None)
+        with ExitStack() as stack:
+            if args.input.endswith('.brst'):
+                from binary_roster import load_binary_roster
+                roster = stack.enter_context(load_binary_roster(args.input)).to_arrays()
+            else:
+                roster = list(iter_roster(args.input))
+            forecaster = PayoutForecaster(roster, actual_months, global_config, role_config, model=model)
+            result = forecaster.simulate(args.simulations, args.seed, args.workers)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    print(f"已发生月份: {result.actual_months}  预测月份: {result.forecast_months}  "
+          f"模拟 {result.simulations:,} 次，耗时 {result.elapsed:.1f}s")
+    rows = result.percentile_rows()
+    columns = [k for k in rows[0] if k not in ('group', 'name')]
+    print(f"{'分组':<14}" + ''.join(f"{c:>18}" for c in columns))
+    for row in rows:
+        print(f"{row['name']:<14}" + ''.join(f"{row[c]:>18,.0f}" for c in columns))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
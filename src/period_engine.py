@@ -0,0 +1,95 @@
+"""
+2026上半年奖金计算引擎 - 多期间计算模块
+Run several periods (H1/H2/full year/rolling) over one shared roster
+
+【说明】
+- 名单只转换、校验一次：RosterArrays 按所有期间月份的并集建列，
+  各期间从中取自己的月份列（连续月份为视图，不复制）
+- 月份集合相同的期间（如同一期间的不同系数方案）共用产值合计，只算一次
+- iter_results 逐期间产出结果，调用方处理完一个期间即可释放，
+  内存占用与期间数无关；结果与单独用 VectorizedCalculator(period=...) 计算逐位相同
+"""
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from config import GlobalConfig, RoleConfig, PeriodConfig, DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+from models import PersonData, ValidationResult
+from validators import BonusValidator
+from vectorized_engine import RosterArrays, VectorizedCalculator, period_total
+
+# summarize 汇总的金额字段
+SUMMARY_FIELDS = ('incentive_total', 'completion_bonus_total', 'region_bonus_total',
+                  'national_bonus_total', 'fixed_subsidy', 'ceo_bonus', 'grand_total')
+
+
+class MultiPeriodCalculator:
+    """多期间计算器"""
+
+    def __init__(
+        self,
+        periods: Sequence[PeriodConfig],
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None
+    ):
+        if not periods:
+            raise ValueError("至少需要一个计算期间")
+        names = [p.name for p in periods]
+        if len(set(names)) != len(names):
+            raise ValueError(f"期间名称重复: {names}")
+        self.periods = list(periods)
+        self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
+        self.role_config = role_config or DEFAULT_ROLE_CONFIG
+
+        # 所有期间月份的并集，保持首次出现的顺序
+        self.months: List[int] = list(dict.fromkeys(m for p in self.periods for m in p.months))
+        self.validator = BonusValidator(self.global_config, valid_months=self.months)
+        self._calculators = {
+            p.name: VectorizedCalculator(self.global_config, self.role_config, p) for p in self.periods
+        }
+
+    def calculator(self, name: str) -> VectorizedCalculator:
+        """指定期间的单期间计算器（用于 to_details / result_rows）"""
+        return self._calculators[name]
+
+    def build_roster(self, persons: List[PersonData]) -> RosterArrays:
+        """PersonData 列表 -> 覆盖全部期间月份的 RosterArrays"""
+        return RosterArrays.from_persons(persons, self.months)
+
+    def validate(self, persons: List[PersonData]) -> List[ValidationResult]:
+        """按全部期间月份校验一次，各期间共用"""
+        return [self.validator.validate_person(p) for p in persons]
+
+    def iter_results(self, roster: RosterArrays) -> Iterator[Tuple[PeriodConfig, Dict[str, np.ndarray]]]:
+        """
+        逐期间计算
+
+        Yields:
+            (期间, calculate_arrays 结果)
+        """
+        totals: Dict[Tuple[int, ...], np.ndarray] = {}
+        for period in self.periods:
+            revenue = roster.period_revenue(period.months)
+            key = tuple(period.months)
+            if key not in totals:
+                totals[key] = period_total(revenue)
+            yield period, self._calculators[period.name].calculate_arrays(roster, revenue, totals[key])
+
+    def summarize(self, roster: RosterArrays) -> List[Dict]:
+        """各期间金额合计（只保留汇总值，不保留逐人结果）"""
+        summary = []
+        for period, results in self.iter_results(roster):
+            row = {'period': period.name, 'months': list(period.months), 'persons': len(roster)}
+            row.update({f: float(results[f].sum()) for f in SUMMARY_FIELDS})
+            summary.append(row)
+        return summary
+
+
+def calculate_periods(
+    persons: List[PersonData],
+    periods: Sequence[PeriodConfig],
+    config: GlobalConfig = None
+) -> List[Dict]:
+    """便捷函数：多期间汇总"""
+    calculator = MultiPeriodCalculator(periods, global_config=config)
+    return calculator.summarize(calculator.build_roster(persons))
@@ -0,0 +1,465 @@
+"""
+2026上半年奖金计算引擎 - 结果对比模块
+Run-to-run result diff matched by person key
+
+参数或名单变动后，需要知道谁多了、谁少了、为什么；原先只能导出两份表格人工比对。
+本模块读取两次批量计算的结果（batch_cli 输出的 csv/xlsx/ndjson/parquet/arrow，或 detail_to_row 的行），
+按人员键（默认姓名，可加组织单元等）哈希连接，耗时与行数成线性：
+
+【逐人】 各奖金项变动、完成奖/区域奖/全国奖档位得失、岗位/区域/组织单元/叠加模式变化，新增、减少的人员
+【汇总】 全体及按岗位、区域：人数、变动/新增/减少/增加/减少奖金人数、两次合计及各奖金项变动
+
+输出：write_csv（明细或汇总）、excel_exporter.ExcelExporter.export_diff、to_dict（接口返回）
+"""
+import argparse
+import csv
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_io import RESULT_FORMATS, detect_format, iter_records, to_float
+
+# 奖金项（结果字段 -> 名称），grand_total 放最后
+COMPONENTS = {
+    'incentive_total': '过程激励',
+    'completion_bonus_total': '完成奖',
+    'region_bonus_total': '区域奖',
+    'national_bonus_total': '全国奖',
+    'fixed_subsidy': '固定补贴',
+    'ceo_bonus': 'CEO奖金',
+    'grand_total': '合计',
+}
+
+# 档位（结果字段 -> 名称），金额由0变为非0即获得该档
+TIERS = {
+    'completion_bonus_90': '完成奖90%档',
+    'completion_bonus_100': '完成奖100%档',
+    'region_bonus_90': '区域奖90%档',
+    'region_bonus_100': '区域奖100%档',
+    'national_bonus_90': '全国奖90%档',
+    'national_bonus_100': '全国奖100%档',
+}
+
+# 逐人比较的文本属性
+ATTRIBUTES = {
+    'role': '岗位',
+    'region': '区域',
+    'org_unit': '组织单元',
+    'completion_bonus_mode': '叠加模式',
+}
+
+GROUP_FIELDS = ('role', 'region')
+STATUS_LABELS = {'changed': '变动', 'added': '新增', 'removed': '减少'}
+DEFAULT_KEY = ('name',)
+DEFAULT_TOLERANCE = 0.005  # 半分以内的差异视为浮点误差
+
+AMOUNT_FIELDS = tuple(COMPONENTS) + tuple(TIERS)
+
+# 明细行字段 -> 中文列名（CSV用英文字段名，Excel用中文列名）
+DIFF_HEADERS = {
+    'status': '变动类型',
+    'name': '姓名',
+    'role': '岗位',
+    'region': '区域',
+    'org_unit': '组织单元',
+    'old_total': '原合计',
+    'new_total': '新合计',
+    'delta': '变动',
+    **{f'delta_{f}': f'{label}变动' for f, label in COMPONENTS.items() if f != 'grand_total'},
+    'tiers_gained': '获得档位',
+    'tiers_lost': '失去档位',
+    'changes': '属性变化',
+    'reasons': '原因',
+}
+
+SUMMARY_HEADERS = {
+    'group': '分组',
+    'people': '人数',
+    'changed': '变动人数',
+    'added': '新增',
+    'removed': '减少',
+    'gained': '奖金增加人数',
+    'lost': '奖金减少人数',
+    'old_total': '原合计',
+    'new_total': '新合计',
+    'delta': '变动',
+    **{f'delta_{f}': f'{label}变动' for f, label in COMPONENTS.items() if f != 'grand_total'},
+}
+
+
+def _amount(value) -> float:
+    if value is None or value == '':
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return to_float(value) or 0.0
+
+
+def _money(value: float) -> str:
+    return f"{value:+,.2f}"
+
+
+# ========== 结果集 ==========
+def _amount_column(values: Sequence) -> np.ndarray:
+    """金额列 -> float64（空为0；CSV文本先整体转换，含千分位等格式时逐个解析）"""
+    try:
+        return np.array([v if v else 0.0 for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_amount(v) for v in values], dtype=np.float64)
+
+
+class ResultSet:
+    """一次计算的结果：按列保存比较所需字段，按人员键建哈希索引"""
+
+    def __init__(self, columns: Dict[str, Sequence], key: Sequence[str] = DEFAULT_KEY):
+        """columns 为 {结果字段: 值列表}，缺少的字段按空处理"""
+        self.key = tuple(key)
+        n = max((len(v) for v in columns.values()), default=0)
+        self.texts: Dict[str, List[str]] = {}
+        for f in self._text_fields(self.key):
+            values = columns.get(f)
+            if values is None:
+                self.texts[f] = [''] * n
+            elif all(type(v) is str for v in values):
+                self.texts[f] = list(values)
+            else:
+                self.texts[f] = ['' if v is None else str(v) for v in values]
+        self.amounts = {f: _amount_column(columns[f]) if f in columns else np.zeros(n) for f in AMOUNT_FIELDS}
+        self.keys: List[Tuple[str, ...]] = list(zip(*(self.texts[f] for f in self.key)))
+
+        self.index: Dict[Tuple[str, ...], int] = dict(zip(self.keys, range(len(self.keys))))
+        if len(self.index) != len(self.keys):
+            seen = set()
+            duplicates = [k for k in self.keys if k in seen or seen.add(k)]
+            sample = ', '.join('/'.join(k) for k in duplicates[:5])
+            raise ValueError(f"人员键 {'+'.join(self.key)} 有{len(duplicates)}处重复（如 {sample}），"
+                             f"请加上组织单元等字段区分")
+
+    @staticmethod
+    def _text_fields(key: Tuple[str, ...]) -> List[str]:
+        return list(dict.fromkeys(key + ('name',) + tuple(ATTRIBUTES)))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], key: Sequence[str] = DEFAULT_KEY) -> 'ResultSet':
+        """由结果行（detail_to_row / VectorizedCalculator.result_rows）构建"""
+        rows = rows if isinstance(rows, list) else list(rows)
+        fields = cls._text_fields(tuple(key)) + list(AMOUNT_FIELDS)
+        return cls({f: [r.get(f) for r in rows] for f in fields}, key)
+
+    @classmethod
+    def from_file(cls, path: str, key: Sequence[str] = DEFAULT_KEY, sheet: Optional[str] = None) -> 'ResultSet':
+        """读取结果文件（csv/xlsx/ndjson/parquet/arrow），只保留需要的列"""
+        fmt = detect_format(path, RESULT_FORMATS)
+        wanted = cls._text_fields(tuple(key)) + list(AMOUNT_FIELDS)
+        if fmt in ('parquet', 'arrow'):
+            from columnar_export import read_results
+            table = read_results(path, fmt=fmt)
+            columns = table.select([c for c in table.column_names if c in wanted]).to_pydict()
+        elif fmt == 'csv':
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
+                rows = list(reader)
+            transposed = list(zip(*rows)) if rows else [()] * len(header)  # 结果CSV各行列数一致
+            columns = {name: transposed[j] for j, name in enumerate(header) if name in wanted}
+        else:
+            rows = list(iter_records(path, fmt, sheet))
+            columns = {f: [r.get(f) for r in rows] for f in wanted if rows and f in rows[0]}
+        missing = [f for f in key if f not in columns]
+        if missing:
+            raise ValueError(f"{path}: 结果中没有人员键字段 {', '.join(missing)}")
+        return cls(columns, key)
+
+    def value(self, field_name: str, i: int):
+        if field_name in self.amounts:
+            return float(self.amounts[field_name][i])
+        return self.texts[field_name][i]
+
+
+# ========== 逐人变动 ==========
+@dataclass
+class PersonDiff:
+    """一人的变动"""
+    key: Tuple[str, ...]
+    status: str                                   # changed / added / removed
+    name: str
+    role: str
+    region: str
+    org_unit: str
+    old_total: Optional[float]
+    new_total: Optional[float]
+    deltas: Dict[str, float] = field(default_factory=dict)           # 奖金项字段 -> 变动（只含有变动的项）
+    tiers_gained: List[str] = field(default_factory=list)
+    tiers_lost: List[str] = field(default_factory=list)
+    changes: Dict[str, Tuple[str, str]] = field(default_factory=dict)  # 属性 -> (原值, 新值)
+
+    @property
+    def delta(self) -> float:
+        return self.deltas.get('grand_total', 0.0)
+
+    def reasons(self) -> str:
+        """变动原因：属性变化、档位得失、各奖金项变动"""
+        parts = []
+        if self.status != 'changed':
+            parts.append(STATUS_LABELS[self.status] + '人员')
+        parts += [f"{ATTRIBUTES[f]} {old or '空'}→{new or '空'}" for f, (old, new) in self.changes.items()]
+        parts += [f"获得{t}" for t in self.tiers_gained]
+        parts += [f"失去{t}" for t in self.tiers_lost]
+        parts += [f"{COMPONENTS[f]}{_money(v)}" for f, v in self.deltas.items() if f != 'grand_total']
+        return '；'.join(parts)
+
+    def to_row(self) -> Dict:
+        row = {
+            'status': self.status,
+            'name': self.name,
+            'role': self.role,
+            'region': self.region,
+            'org_unit': self.org_unit,
+            'old_total': self.old_total,
+            'new_total': self.new_total,
+            'delta': self.delta,
+        }
+        for f in COMPONENTS:
+            if f != 'grand_total':
+                row[f'delta_{f}'] = self.deltas.get(f, 0.0)
+        row['tiers_gained'] = '、'.join(self.tiers_gained)
+        row['tiers_lost'] = '、'.join(self.tiers_lost)
+        row['changes'] = '；'.join(f"{ATTRIBUTES[f]}: {old}→{new}" for f, (old, new) in self.changes.items())
+        row['reasons'] = self.reasons()
+        return row
+
+
+@dataclass
+class ResultDiff:
+    """两次结果的对比"""
+    key: Tuple[str, ...]
+    persons: List[PersonDiff]          # 有变动的人员，按变动绝对值降序
+    unchanged: int
+    totals: Dict
+    by_group: Dict[str, List[Dict]]    # 'role' / 'region' -> 汇总行
+
+    @property
+    def by_role(self) -> List[Dict]:
+        return self.by_group['role']
+
+    @property
+    def by_region(self) -> List[Dict]:
+        return self.by_group['region']
+
+    def rows(self) -> List[Dict]:
+        return [p.to_row() for p in self.persons]
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict:
+        """接口返回格式（limit 限制明细条数，汇总不受影响）"""
+        persons = self.persons if limit is None else self.persons[:limit]
+        return {
+            'key': list(self.key),
+            'totals': self.totals,
+            'by_role': self.by_role,
+            'by_region': self.by_region,
+            'unchanged': self.unchanged,
+            'persons': [p.to_row() for p in persons],
+            'truncated': len(persons) < len(self.persons),
+        }
+
+    def write_csv(self, path: str, table: str = 'persons'):
+        """写CSV：table 为 persons（逐人明细）/ role / region（汇总）"""
+        if table == 'persons':
+            fields, rows = list(DIFF_HEADERS), self.rows()
+        elif table in self.by_group:
+            fields, rows = list(SUMMARY_HEADERS), [self.totals] + self.by_group[table]
+        else:
+            raise ValueError(f"未知的表: {table}（可选: persons, {', '.join(self.by_group)}）")
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+# ========== 对比 ==========
+def _summaries(labels: List[str], status: np.ndarray, old_total: np.ndarray, new_total: np.ndarray,
+               deltas: Dict[str, np.ndarray], tolerance: float) -> List[Dict]:
+    """按标签分组汇总（status: 0=不变 1=变动 2=新增 3=减少）"""
+    names, codes = np.unique(np.asarray(labels, dtype=object), return_inverse=True)
+    size = len(names)
+    delta = deltas['grand_total']
+
+    def count(mask):
+        return np.bincount(codes[mask], minlength=size)
+
+    def total(values):
+        return np.bincount(codes, weights=values, minlength=size)
+
+    columns = {
+        'people': np.bincount(codes, minlength=size),
+        'changed': count(status == 1),
+        'added': count(status == 2),
+        'removed': count(status == 3),
+        'gained': count(delta > tolerance),
+        'lost': count(delta < -tolerance),
+        'old_total': total(old_total),
+        'new_total': total(new_total),
+        'delta': total(delta),
+    }
+    for f, values in deltas.items():
+        if f != 'grand_total':
+            columns[f'delta_{f}'] = total(values)
+    rows = []
+    for i, name in enumerate(names.tolist()):
+        row = {'group': name}
+        row.update({k: (int(v[i]) if v.dtype.kind in 'iu' else float(v[i])) for k, v in columns.items()})
+        rows.append(row)
+    return rows
+
+
+def diff_result_sets(old: ResultSet, new: ResultSet, tolerance: float = DEFAULT_TOLERANCE) -> ResultDiff:
+    """
+    对比两次结果（哈希连接：旧结果建索引，逐行查找新结果）
+
+    Args:
+        tolerance: 金额差异不超过该值视为未变
+    """
+    if old.key != new.key:
+        raise ValueError(f"两次结果的人员键不一致: {old.key} / {new.key}")
+    index = old.index
+    new_idx, old_idx, added = [], [], []
+    for j, k in enumerate(new.keys):
+        i = index.get(k)
+        if i is None:
+            added.append(j)
+        else:
+            new_idx.append(j)
+            old_idx.append(i)
+    matched_old = np.zeros(len(old), dtype=bool)
+    matched_old[old_idx] = True
+    removed = np.flatnonzero(~matched_old)
+    new_idx, old_idx, added = np.array(new_idx, dtype=np.intp), np.array(old_idx, dtype=np.intp), \
+        np.array(added, dtype=np.intp)
+
+    # 匹配人员：奖金项、档位、属性
+    deltas = {f: new.amounts[f][new_idx] - old.amounts[f][old_idx] for f in COMPONENTS}
+    moved = np.zeros(len(new_idx), dtype=bool)
+    for values in deltas.values():
+        moved |= np.abs(values) > tolerance
+    gained = {f: (old.amounts[f][old_idx] <= tolerance) & (new.amounts[f][new_idx] > tolerance) for f in TIERS}
+    lost = {f: (old.amounts[f][old_idx] > tolerance) & (new.amounts[f][new_idx] <= tolerance) for f in TIERS}
+    for f in TIERS:
+        moved |= gained[f] | lost[f]
+    attribute_changed = {}
+    for f in ATTRIBUTES:
+        old_values, new_values = old.texts[f], new.texts[f]
+        changed = np.fromiter((old_values[i] != new_values[j] for i, j in zip(old_idx.tolist(), new_idx.tolist())),
+                              dtype=bool, count=len(new_idx))
+        attribute_changed[f] = changed
+        moved |= changed
+
+    persons = []
+
+    def person(result: ResultSet, i: int, status: str, old_total, new_total) -> PersonDiff:
+        return PersonDiff(key=result.keys[i], status=status, name=result.texts['name'][i],
+                          role=result.texts['role'][i], region=result.texts['region'][i],
+                          org_unit=result.texts['org_unit'][i], old_total=old_total, new_total=new_total)
+
+    for k in np.flatnonzero(moved).tolist():
+        i, j = int(old_idx[k]), int(new_idx[k])
+        p = person(new, j, 'changed', old.value('grand_total', i), new.value('grand_total', j))
+        p.deltas = {f: float(v[k]) for f, v in deltas.items() if abs(v[k]) > tolerance}
+        p.tiers_gained = [label for f, label in TIERS.items() if gained[f][k]]
+        p.tiers_lost = [label for f, label in TIERS.items() if lost[f][k]]
+        p.changes = {f: (old.texts[f][i], new.texts[f][j]) for f in ATTRIBUTES if attribute_changed[f][k]}
+        persons.append(p)
+    for j in added.tolist():
+        p = person(new, j, 'added', None, new.value('grand_total', j))
+        p.deltas = {f: new.value(f, j) for f in COMPONENTS if abs(new.amounts[f][j]) > tolerance}
+        p.tiers_gained = [label for f, label in TIERS.items() if new.amounts[f][j] > tolerance]
+        persons.append(p)
+    for i in removed.tolist():
+        p = person(old, i, 'removed', old.value('grand_total', i), None)
+        p.deltas = {f: -old.value(f, i) for f in COMPONENTS if abs(old.amounts[f][i]) > tolerance}
+        p.tiers_lost = [label for f, label in TIERS.items() if old.amounts[f][i] > tolerance]
+        persons.append(p)
+    persons.sort(key=lambda p: -abs(p.delta))
+
+    # 汇总：匹配、新增、减少三段拼接，新增/减少的变动即其全部金额
+    status = np.concatenate([np.where(moved, 1, 0), np.full(len(added), 2), np.full(len(removed), 3)])
+    zeros_added, zeros_removed = np.zeros(len(added)), np.zeros(len(removed))
+    old_total = np.concatenate([old.amounts['grand_total'][old_idx], zeros_added,
+                                old.amounts['grand_total'][removed]])
+    new_total = np.concatenate([new.amounts['grand_total'][new_idx], new.amounts['grand_total'][added],
+                                zeros_removed])
+    all_deltas = {f: np.concatenate([deltas[f], new.amounts[f][added], -old.amounts[f][removed]])
+                  for f in COMPONENTS}
+    by_group = {}
+    for g in GROUP_FIELDS:
+        labels = ([new.texts[g][j] for j in new_idx.tolist()] + [new.texts[g][j] for j in added.tolist()]
+                  + [old.texts[g][i] for i in removed.tolist()])
+        by_group[g] = _summaries(labels, status, old_total, new_total, all_deltas, tolerance)
+    totals = _summaries(['全体'] * len(status), status, old_total, new_total, all_deltas, tolerance)
+    totals = totals[0] if totals else {'group': '全体', **{k: 0 for k in SUMMARY_HEADERS if k != 'group'}}
+
+    return ResultDiff(key=old.key, persons=persons, unchanged=int(np.sum(status == 0)), totals=totals,
+                      by_group=by_group)
+
+
+def diff_results(
+    old,
+    new,
+    key: Sequence[str] = DEFAULT_KEY,
+    tolerance: float = DEFAULT_TOLERANCE
+) -> ResultDiff:
+    """便捷函数：对比两次结果（old/new 为结果文件路径或结果行列表）"""
+    def load(source):
+        return ResultSet.from_file(source, key) if isinstance(source, str) else ResultSet.from_rows(source, key)
+
+    return diff_result_sets(load(old), load(new), tolerance)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="两次奖金计算结果对比")
+    parser.add_argument("old", help="原结果文件（batch_cli 输出）")
+    parser.add_argument("new", help="新结果文件")
+    parser.add_argument("-o", "--output", help="对比明细输出（.csv/.xlsx；xlsx 含汇总表）")
+    parser.add_argument("--key", default=','.join(DEFAULT_KEY), help="人员键字段，逗号分隔（默认 name）")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="视为未变的最大金额差")
+    parser.add_argument("-n", "--top", type=int, default=10, help="显示变动最大的人数")
+    args = parser.parse_args(argv)
+
+    xlsx = bool(args.output) and args.output.lower().endswith('.xlsx')
+    try:
+        diff = diff_results(args.old, args.new, tuple(k.strip() for k in args.key.split(',')), args.tolerance)
+        if args.output:
+            if xlsx:
+                from excel_exporter import ExcelExporter
+                ExcelExporter().export_diff(diff, args.output)
+            else:
+                diff.write_csv(args.output)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    t = diff.totals
+    print(f"原合计 ¥{t['old_total']:,.2f} → 新合计 ¥{t['new_total']:,.2f}（{_money(t['delta'])}）")
+    print(f"变动 {t['changed']:,} 人，新增 {t['added']:,} 人，减少 {t['removed']:,} 人，未变 {diff.unchanged:,} 人\n")
+    for g, label in (('role', '岗位'), ('region', '区域')):
+        print(f"{label:<12}{'人数':>8}{'变动':>8}{'增加':>8}{'减少':>8}{'变动金额':>20}")
+        for row in diff.by_group[g]:
+            print(f"{row['group']:<12}{row['people']:>10,}{row['changed']:>10,}{row['gained']:>10,}"
+                  f"{row['lost']:>10,}{row['delta']:>22,.2f}")
+        print()
+    if diff.persons:
+        print(f"变动最大的{min(args.top, len(diff.persons))}人：")
+        for p in diff.persons[:args.top]:
+            print(f"  {p.name:<12}{p.role:<12}{_money(p.delta):>16}  {p.reasons()}")
+    if args.output and not xlsx:  # xlsx 由 ExcelExporter 提示
+        print(f"\n对比结果已导出: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,703 @@
+"""
+2026上半年奖金计算引擎 - 规则DSL模块
+Declarative bonus rules compiled to scalar and vectorized evaluators
+
+各岗位规则原写在 BonusCalculator._calculate_cp/_dm/_management/_sales 中，政策调整就要改代码、
+并同步改向量化引擎。本模块以数据（JSON；装有PyYAML时也可用YAML）描述规则：
+
+    roles       岗位 -> 组件名列表（按顺序求值）
+    components  组件名 -> 组件定义
+    period      可选，计算期间 {name, months, time_coefficients, subsidy_months}
+
+【组件类型】
+    incentive   过程激励：Σ 月产值 × rate × 月度系数（每个岗位至多一个）
+    completion  完成奖：基数 = 分公司产值 × rate（可用 cap 封顶），tiers 逐档判断完成率、回款率门槛；
+                stacking 为 stack（叠加）/ exclusive（取最高档）；allocation 为 true 时乘个人分配比例；
+                pending 按 stacking 给出待确认提示（{role} 替换为岗位编码）
+    flags       按人员完成标志发固定金额：output 为 region / national；
+                stacking 为 stack（逐档发 amount）/ any（任一标志为真发组件的 amount）
+    subsidy     固定补贴：per 为 month（× 补贴月数）/ half_year（半年额按补贴月数折算）/ period（原额）；
+                when 为假时不发
+    input       人员数据中的手填金额（field: ceo_bonus）
+
+取值可为常数，或 "$参数名" 引用 GlobalConfig / RoleConfig 字段：按岗位的字典参数（incentive_rates 等）
+取本岗位的值，枚举取其 value。
+
+compile_rules 按（规则内容, 配置, 期间）缓存编译结果：标量求值器为每个岗位预先绑定常数的步骤列表，
+向量化求值器按岗位编码查表广播。默认规则 rules/default_rules.json 与手写规则结果逐位一致
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from enum import Enum
+from functools import reduce
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from config import (
+    GlobalConfig, RoleConfig, PeriodConfig, Role,
+    DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+)
+from models import PersonData, BonusDetail, ValidationResult
+from bonus_engine import BonusCalculator
+from vectorized_engine import ROLE_ORDER, ROLE_CODES, RosterArrays, VectorizedCalculator, period_total
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules')
+DEFAULT_RULES_PATH = os.path.join(RULES_DIR, 'default_rules.json')
+
+COMPONENT_TYPES = ('incentive', 'completion', 'flags', 'subsidy', 'input')
+TIER_NAMES = ('90', '100')  # BonusDetail 中有分档字段的档位
+FLAG_OUTPUTS = ('region', 'national')
+SUBSIDY_PERIODS = ('month', 'half_year', 'period')
+INPUT_FIELDS = ('ceo_bonus',)
+
+# PersonData 完成标志字段 -> RosterArrays 列
+FLAG_COLUMNS = {
+    'region_completed_90': 'region_90',
+    'region_completed_100': 'region_100',
+    'national_completed_90': 'national_90',
+    'national_completed_100': 'national_100',
+}
+
+COMPILE_CACHE_SIZE = 32
+
+_GLOBAL_PARAMS = {f.name for f in fields(GlobalConfig)}
+_ROLE_PARAMS = {f.name for f in fields(RoleConfig)}
+
+
+class RuleError(ValueError):
+    """规则定义错误（消息中给出出错位置）"""
+
+
+# ========== 读取 ==========
+def load_rules(path: str) -> Dict:
+    """读取规则文件（.json；.yaml/.yml 需安装PyYAML）"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8') as f:
+        if ext in ('.yaml', '.yml'):
+            if yaml is None:
+                raise ImportError("读取YAML规则需要安装PyYAML: pip install pyyaml")
+            rules = yaml.safe_load(f)
+        else:
+            rules = json.load(f)
+    if not isinstance(rules, dict):
+        raise RuleError(f"{path}: 规则文件顶层应为对象")
+    return rules
+
+
+def rules_period(rules: Dict) -> Optional[PeriodConfig]:
+    """规则中的 period 段（未定义时为None）"""
+    spec = rules.get('period')
+    if spec is None:
+        return None
+    if not isinstance(spec, dict) or not spec.get('months'):
+        raise RuleError("period: 应为对象且给出 months")
+    try:
+        return PeriodConfig(
+            name=str(spec.get('name', 'H1')),
+            months=[int(m) for m in spec['months']],
+            time_coefficients={int(m): float(c) for m, c in (spec.get('time_coefficients') or {}).items()},
+            subsidy_months=spec.get('subsidy_months'),
+        )
+    except (TypeError, ValueError) as e:
+        raise RuleError(f"period: {e}")
+
+
+# ========== 取值 ==========
+class _Resolver:
+    """按岗位解析 "$参数名" 引用"""
+
+    def __init__(self, role: Role, global_config: GlobalConfig, role_config: RoleConfig):
+        self.role = role
+        self.global_config = global_config
+        self.role_config = role_config
+
+    def value(self, value, where: str):
+        if isinstance(value, str) and value.startswith('$'):
+            name = value[1:]
+            if name in _GLOBAL_PARAMS:
+                value = getattr(self.global_config, name)
+            elif name in _ROLE_PARAMS:
+                value = getattr(self.role_config, name)
+            else:
+                raise RuleError(f"{where}: 未知参数 {value}")
+            if isinstance(value, dict):
+                if self.role in value:
+                    value = value[self.role]
+                elif value and all(isinstance(v, bool) for v in value.values()):
+                    value = False  # 开关类参数未列出的岗位视为关闭
+                else:
+                    raise RuleError(f"{where}: {name} 未设置岗位 {self.role.value}")
+        if isinstance(value, Enum):
+            value = value.value
+        return value
+
+    def number(self, value, where: str) -> float:
+        value = self.value(value, where)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RuleError(f"{where}: 应为数值: {value!r}")
+        return value
+
+    def flag(self, value, where: str) -> bool:
+        value = self.value(value, where)
+        if not isinstance(value, bool):
+            raise RuleError(f"{where}: 应为true/false: {value!r}")
+        return value
+
+    def choice(self, value, options: Tuple[str, ...], where: str) -> str:
+        value = self.value(value, where)
+        if value not in options:
+            raise RuleError(f"{where}: 应为 {'/'.join(options)} 之一: {value!r}")
+        return value
+
+
+# ========== 组件 ==========
+@dataclass
+class _Tier:
+    name: Optional[str]
+    completion: float = 0.0   # completion 组件
+    collection: float = 0.0
+    flag: str = ''            # flags 组件
+    amount: float = 0.0
+
+
+@dataclass
+class _Component:
+    """按岗位解析后的组件（常数已代入）"""
+    name: str
+    type: str
+    rate: float = 0.0
+    cap: Optional[float] = None
+    tiers: Tuple[_Tier, ...] = ()
+    stacking: str = ''
+    allocation: bool = False
+    pending: Tuple[str, ...] = ()
+    output: str = ''
+    amount: float = 0.0
+    unit: float = 0.0         # subsidy 折算前金额
+    per: str = ''
+    field: str = ''
+
+
+def _parse_component(name: str, spec, role: Role, resolver: _Resolver, period: PeriodConfig) -> Optional[_Component]:
+    """解析一个组件；subsidy 的 when 为假时返回None"""
+    where = f"components.{name}"
+    if not isinstance(spec, dict):
+        raise RuleError(f"{where}: 应为对象")
+    kind = spec.get('type')
+    if kind not in COMPONENT_TYPES:
+        raise RuleError(f"{where}.type: 应为 {'/'.join(COMPONENT_TYPES)} 之一: {kind!r}")
+
+    def required(key):
+        if key not in spec:
+            raise RuleError(f"{where}: 缺少 {key}")
+        return spec[key]
+
+    def tier_list():
+        tiers = required('tiers')
+        if not isinstance(tiers, list) or not tiers:
+            raise RuleError(f"{where}.tiers: 应为非空列表")
+        for i, tier in enumerate(tiers):
+            if not isinstance(tier, dict):
+                raise RuleError(f"{where}.tiers[{i}]: 应为对象")
+            if tier.get('name') is not None and str(tier['name']) not in TIER_NAMES:
+                raise RuleError(f"{where}.tiers[{i}].name: 应为 {'/'.join(TIER_NAMES)} 之一: {tier['name']!r}")
+        names = [str(t['name']) for t in tiers if t.get('name') is not None]
+        if len(names) != len(set(names)):
+            raise RuleError(f"{where}.tiers: 档位名重复")
+        return tiers
+
+    if kind == 'incentive':
+        return _Component(name, kind, rate=resolver.number(required('rate'), f"{where}.rate"))
+
+    if kind == 'completion':
+        if role == Role.CP:
+            raise RuleError(f"{where}: 常委不参与完成奖（完成率、组织单元汇总均不含常委）")
+        tiers = tuple(
+            _Tier(name=None if t.get('name') is None else str(t['name']),
+                  completion=resolver.number(t.get('completion'), f"{where}.tiers[{i}].completion"),
+                  collection=resolver.number(t.get('collection', 0.0), f"{where}.tiers[{i}].collection"))
+            for i, t in enumerate(tier_list())
+        )
+        cap = spec.get('cap')
+        stacking = resolver.choice(spec.get('stacking', 'stack'), ('stack', 'exclusive'), f"{where}.stacking")
+        pending = spec.get('pending') or {}
+        if not isinstance(pending, dict):
+            raise RuleError(f"{where}.pending: 应为 {{叠加模式: 提示}}")
+        message = pending.get(stacking)
+        return _Component(
+            name, kind,
+            rate=resolver.number(required('rate'), f"{where}.rate"),
+            cap=None if cap is None else resolver.number(cap, f"{where}.cap"),
+            tiers=tiers,
+            stacking=stacking,
+            allocation=resolver.flag(spec.get('allocation', False), f"{where}.allocation"),
+            pending=(message.replace('{role}', role.value),) if message else (),
+        )
+
+    if kind == 'flags':
+        output = resolver.choice(required('output'), FLAG_OUTPUTS, f"{where}.output")
+        stacking = resolver.choice(spec.get('stacking', 'stack'), ('stack', 'any'), f"{where}.stacking")
+        tiers = []
+        for i, t in enumerate(tier_list()):
+            flag = t.get('flag')
+            if flag not in FLAG_COLUMNS:
+                raise RuleError(f"{where}.tiers[{i}].flag: 应为 {'/'.join(FLAG_COLUMNS)} 之一: {flag!r}")
+            amount = (resolver.number(t.get('amount'), f"{where}.tiers[{i}].amount")
+                      if stacking == 'stack' else 0.0)
+            tiers.append(_Tier(name=None if t.get('name') is None else str(t['name']), flag=flag, amount=amount))
+        amount = resolver.number(required('amount'), f"{where}.amount") if stacking == 'any' else 0.0
+        return _Component(name, kind, tiers=tuple(tiers), stacking=stacking, output=output, amount=amount)
+
+    if kind == 'subsidy':
+        if not resolver.flag(spec.get('when', True), f"{where}.when"):
+            return None
+        unit = resolver.number(required('amount'), f"{where}.amount")
+        per = resolver.choice(spec.get('per', 'period'), SUBSIDY_PERIODS, f"{where}.per")
+        if per == 'month':
+            amount = unit * period.subsidy_month_count
+        elif per == 'half_year':
+            amount = unit * period.cp_subsidy_factor
+        else:
+            amount = unit
+        return _Component(name, kind, amount=amount, unit=unit, per=per)
+
+    # input
+    return _Component(name, kind, field=resolver.choice(required('field'), INPUT_FIELDS, f"{where}.field"))
+
+
+# ========== 标量求值 ==========
+def _scalar_step(component: _Component, period: PeriodConfig, payout_timing: bool) -> Callable:
+    """组件 -> step(calculator, person, detail)"""
+    c = component
+    if c.type == 'incentive':
+        rate = c.rate
+        coeffs = [(m, period.coefficient(m)) for m in period.months]
+
+        def step(calc, person, detail):
+            revenue = person.month_revenue
+            detail.monthly_incentives = {m: revenue.get(m, 0.0) * rate * coeff for m, coeff in coeffs}
+            detail.incentive_total = sum(detail.monthly_incentives.values())
+            if payout_timing:
+                detail.incentive_immediate = detail.incentive_total * 0.5
+                detail.incentive_after_collection = detail.incentive_total * 0.5
+        return step
+
+    if c.type == 'completion':
+        rate, cap, tiers, pending = c.rate, c.cap, c.tiers, list(c.pending)
+        exclusive = c.stacking == 'exclusive'
+
+        def step(calc, person, detail):
+            org = calc._org(person)
+            completion_rate = org.completion_rate if org else calc._get_completion_rate(person)
+            detail.completion_rate = completion_rate
+            company_revenue = org.company_revenue if org else person.get_company_revenue(period.months)
+            base = company_revenue * rate
+            if cap is not None:
+                base = min(base, cap)
+            bonuses = []
+            for tier in tiers:
+                hit = completion_rate >= tier.completion and person.collection_rate >= tier.collection
+                value = base if hit else 0.0
+                bonuses.append(value)
+                if tier.name:
+                    key = f'completion_bonus_{tier.name}'
+                    setattr(detail, key, getattr(detail, key) + value)
+            total = max(bonuses) if exclusive else sum(bonuses)
+            detail.completion_bonus_mode = c.stacking
+            detail.pending_confirmations.extend(pending)
+            if c.allocation:
+                ratio = person.personal_allocation_ratio
+                if ratio is not None:
+                    total *= ratio
+                    detail.warnings.append(f"完成奖已按个人分配比例{ratio*100:.1f}%计算")
+                else:
+                    detail.warnings.append("未设置个人分配比例，显示完成奖总额")
+            detail.completion_bonus_total += total
+        return step
+
+    if c.type == 'flags':
+        total_key = f'{c.output}_bonus_total'
+        if c.stacking == 'any':
+            flags, amount = [t.flag for t in c.tiers], c.amount
+
+            def step(calc, person, detail):
+                if any(getattr(person, f) for f in flags):
+                    setattr(detail, total_key, getattr(detail, total_key) + amount)
+            return step
+
+        def step(calc, person, detail):
+            values = []
+            for tier in c.tiers:
+                value = tier.amount if getattr(person, tier.flag) else 0.0
+                values.append(value)
+                if tier.name:
+                    key = f'{c.output}_bonus_{tier.name}'
+                    setattr(detail, key, getattr(detail, key) + value)
+            setattr(detail, total_key, getattr(detail, total_key) + sum(values))
+        return step
+
+    if c.type == 'subsidy':
+        amount = c.amount
+
+        def step(calc, person, detail):
+            detail.fixed_subsidy += amount
+        return step
+
+    # input
+    key = c.field
+
+    def step(calc, person, detail):
+        setattr(detail, key, getattr(detail, key) + (getattr(person, key) or 0.0))
+    return step
+
+
+# ========== 编译结果 ==========
+class CompiledRules:
+    """
+    编译后的规则
+
+    plan[岗位] 为解析后的组件列表；evaluate 为标量求值，calculate_arrays 为向量化求值
+    """
+
+    def __init__(
+        self,
+        rules: Dict,
+        global_config: GlobalConfig,
+        role_config: RoleConfig,
+        period: Optional[PeriodConfig] = None
+    ):
+        self.global_config = global_config
+        self.role_config = role_config
+        self.period = period or rules_period(rules) or PeriodConfig.from_global_config(global_config)
+        self.plan = self._build_plan(rules)
+
+        payout_timing = global_config.include_payout_timing
+        self._steps = {role: [_scalar_step(c, self.period, payout_timing) for c in components]
+                       for role, components in self.plan.items()}
+        self._allocation = {role: any(c.allocation for c in components) for role, components in self.plan.items()}
+        self._modes = {role: next((c.stacking for c in components if c.type == 'completion'), '')
+                       for role, components in self.plan.items()}
+        self._pending = {role: [m for c in components for m in c.pending] for role, components in self.plan.items()}
+        self._tables = self._build_tables()
+
+    def _build_plan(self, rules: Dict) -> Dict[Role, List[_Component]]:
+        roles = rules.get('roles')
+        components = rules.get('components')
+        if not isinstance(roles, dict) or not roles:
+            raise RuleError("roles: 应为 {岗位: [组件名]}")
+        if not isinstance(components, dict):
+            raise RuleError("components: 应为 {组件名: 定义}")
+        known = {r.value: r for r in Role}
+        unknown = sorted(set(roles) - set(known))
+        if unknown:
+            raise RuleError(f"roles: 未知岗位 {', '.join(unknown)}（新岗位需先在 config.Role 中登记）")
+        missing = [r for r in known if r not in roles]
+        if missing:
+            raise RuleError(f"roles: 未定义岗位 {', '.join(missing)}（无奖金的岗位请给出空列表）")
+
+        plan = {}
+        for code, names in roles.items():
+            role = known[code]
+            if not isinstance(names, list):
+                raise RuleError(f"roles.{code}: 应为组件名列表")
+            resolver = _Resolver(role, self.global_config, self.role_config)
+            parsed = []
+            for name in names:
+                if name not in components:
+                    raise RuleError(f"roles.{code}: 未定义的组件 {name}")
+                component = _parse_component(name, components[name], role, resolver, self.period)
+                if component is not None:
+                    parsed.append(component)
+            for kind in ('incentive', 'completion'):
+                if sum(c.type == kind for c in parsed) > 1:
+                    raise RuleError(f"roles.{code}: {kind} 组件至多一个")
+            plan[role] = parsed
+        return plan
+
+    def _build_tables(self) -> List[Tuple[_Component, Dict[str, np.ndarray]]]:
+        """
+        向量化查表：每个组件名一组按岗位编码索引的参数表
+
+        返回 [(首个解析结果, {参数: 数组})]，数组长度为岗位数，不使用该组件的岗位 applies 为False
+        """
+        size = len(ROLE_ORDER)
+        grouped: Dict[str, List[Tuple[Role, _Component]]] = OrderedDict()
+        for role, components in self.plan.items():
+            for c in components:
+                grouped.setdefault(c.name, []).append((role, c))
+
+        tables = []
+        for name, members in grouped.items():
+            first = members[0][1]
+            table = {'applies': np.zeros(size, dtype=bool), 'rate': np.zeros(size), 'cap': np.full(size, np.inf),
+                     'exclusive': np.zeros(size, dtype=bool), 'allocation': np.zeros(size, dtype=bool),
+                     'amount': np.zeros(size)}
+            n_tiers = len(first.tiers)
+            for k in range(n_tiers):
+                table[f'completion_{k}'] = np.full(size, np.inf)
+                table[f'collection_{k}'] = np.full(size, np.inf)
+                table[f'amount_{k}'] = np.zeros(size)
+            for role, c in members:
+                # 同名组件各岗位只有取值可能不同，档位结构一致
+                i = ROLE_CODES[role]
+                table['applies'][i] = True
+                table['rate'][i] = c.rate
+                if c.cap is not None:
+                    table['cap'][i] = c.cap
+                table['exclusive'][i] = c.stacking == 'exclusive'
+                table['allocation'][i] = c.allocation
+                table['amount'][i] = c.amount
+                for k, tier in enumerate(c.tiers):
+                    table[f'completion_{k}'][i] = tier.completion
+                    table[f'collection_{k}'][i] = tier.collection
+                    table[f'amount_{k}'][i] = tier.amount
+            tables.append((first, table))
+        return tables
+
+    # ========== 标量 ==========
+    def evaluate(self, calculator: BonusCalculator, person: PersonData) -> BonusDetail:
+        """单人求值（calculator 提供组织单元汇总与完成率口径）"""
+        role = person.role
+        detail = BonusDetail(
+            name=person.name,
+            role=role,
+            region=person.region,
+            org_unit=person.org_unit,
+            collection_rate=person.collection_rate,
+            personal_allocation_ratio=person.personal_allocation_ratio if self._allocation[role] else None
+        )
+        for step in self._steps[role]:
+            step(calculator, person, detail)
+        detail.calculate_total()
+        return detail
+
+    # ========== 向量化 ==========
+    def calculate_arrays(
+        self,
+        calculator: VectorizedCalculator,
+        roster: RosterArrays,
+        period_revenue: Optional[np.ndarray] = None,
+        total_revenue: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """全体求值，返回值同 VectorizedCalculator.calculate_arrays"""
+        n = len(roster)
+        roles = roster.roles
+        months = self.period.months
+        revenue = period_revenue if period_revenue is not None else roster.period_revenue(months)
+        coeffs = np.array([self.period.coefficient(m) for m in months])
+        collection = roster.collection_rate
+        ratio = roster.allocation_ratio
+        has_ratio = ~np.isnan(ratio)
+
+        zeros = np.zeros(n)
+        out = {key: zeros.copy() for key in (
+            'incentive_total', 'completion_bonus_90', 'completion_bonus_100', 'completion_bonus_total',
+            'region_bonus_90', 'region_bonus_100', 'region_bonus_total',
+            'national_bonus_90', 'national_bonus_100', 'national_bonus_total',
+            'fixed_subsidy', 'ceo_bonus', 'completion_rate')}
+        monthly = np.zeros((n, len(months)))
+        has_incentive = np.zeros(n, dtype=bool)
+        inputs = None
+
+        for c, table in self._tables:
+            applies = table['applies'][roles]
+            if c.type == 'incentive':
+                values = revenue * table['rate'][roles][:, None] * coeffs
+                total = zeros.copy()
+                for m in range(len(months)):
+                    total = total + values[:, m]
+                # 每人至多一个过程激励组件，直接按掩码取值
+                monthly = np.where(applies[:, None], values, monthly)
+                out['incentive_total'] = np.where(applies, total, out['incentive_total'])
+                has_incentive |= applies
+
+            elif c.type == 'completion':
+                if inputs is None:
+                    if total_revenue is None:
+                        total_revenue = period_total(revenue)
+                    inputs = calculator.completion_inputs(roster, total_revenue)
+                completion_rate = inputs['completion_rate']
+                out['completion_rate'] = np.where(applies, completion_rate, out['completion_rate'])
+                base = np.minimum(inputs['company_revenue'] * table['rate'][roles], table['cap'][roles])
+                bonuses = []
+                for k, tier in enumerate(c.tiers):
+                    hit = (applies & (completion_rate >= table[f'completion_{k}'][roles])
+                           & (collection >= table[f'collection_{k}'][roles]))
+                    value = np.where(hit, base, 0.0)
+                    bonuses.append(value)
+                    if tier.name:
+                        out[f'completion_bonus_{tier.name}'] += value
+                total = np.where(table['exclusive'][roles], reduce(np.maximum, bonuses), reduce(np.add, bonuses))
+                total = np.where(table['allocation'][roles] & has_ratio, total * np.nan_to_num(ratio), total)
+                out['completion_bonus_total'] += total
+
+            elif c.type == 'flags':
+                total_key = f'{c.output}_bonus_total'
+                if c.stacking == 'any':
+                    hit = applies & reduce(np.logical_or, [getattr(roster, FLAG_COLUMNS[t.flag]) for t in c.tiers])
+                    out[total_key] += np.where(hit, table['amount'][roles], 0.0)
+                else:
+                    values = []
+                    for k, tier in enumerate(c.tiers):
+                        value = np.where(applies & getattr(roster, FLAG_COLUMNS[tier.flag]),
+                                         table[f'amount_{k}'][roles], 0.0)
+                        values.append(value)
+                        if tier.name:
+                            out[f'{c.output}_bonus_{tier.name}'] += value
+                    out[total_key] += reduce(np.add, values)
+
+            elif c.type == 'subsidy':
+                out['fixed_subsidy'] += table['amount'][roles]
+
+            else:  # input
+                out[c.field] += np.where(applies, np.nan_to_num(getattr(roster, c.field), nan=0.0), 0.0)
+
+        grand_total = (
+            out['incentive_total'] +
+            out['completion_bonus_total'] +
+            out['region_bonus_total'] +
+            out['national_bonus_total'] +
+            out['fixed_subsidy'] +
+            out['ceo_bonus']
+        )
+
+        results = dict(out, monthly_incentives=monthly, has_incentive=has_incentive,
+                       grand_total=grand_total, collection_rate=collection)
+        if self.global_config.include_payout_timing:
+            results['incentive_immediate'] = out['incentive_total'] * 0.5
+            results['incentive_after_collection'] = out['incentive_total'] * 0.5
+        return results
+
+    def allocation_mask(self, roster: RosterArrays) -> np.ndarray:
+        table = np.array([self._allocation[r] for r in ROLE_ORDER])
+        return table[roster.roles]
+
+    def completion_modes(self, roster: RosterArrays) -> List[str]:
+        return [self._modes[ROLE_ORDER[code]] for code in roster.roles.tolist()]
+
+    def engine_messages(self, roster: RosterArrays, orgs) -> Tuple[List[List[str]], List[List[str]]]:
+        """每人的提示（与标量求值文案、顺序一致）"""
+        orgs = orgs or {}
+        warnings, pending = [], []
+        for code, ratio, org_unit in zip(roster.roles.tolist(), roster.allocation_ratio.tolist(), roster.org_units):
+            role = ROLE_ORDER[code]
+            row = []
+            if self._allocation[role]:
+                if ratio == ratio:  # 非NaN
+                    row.append(f"完成奖已按个人分配比例{ratio*100:.1f}%计算")
+                else:
+                    row.append("未设置个人分配比例，显示完成奖总额")
+            if role != Role.CP:
+                org = orgs.get(org_unit)
+                if org is not None:
+                    row.extend(org.warnings)
+            warnings.append(row)
+            pending.append(list(self._pending[role]))
+        return warnings, pending
+
+
+# ========== 编译缓存 ==========
+_COMPILED: 'OrderedDict[str, CompiledRules]' = OrderedDict()
+
+
+def compile_rules(
+    rules: Union[Dict, str, None] = None,
+    global_config: GlobalConfig = None,
+    role_config: RoleConfig = None,
+    period: PeriodConfig = None
+) -> CompiledRules:
+    """
+    编译规则（结果按规则内容、配置、期间缓存，最多保留 COMPILE_CACHE_SIZE 份）
+
+    Args:
+        rules: 规则字典或文件路径，默认 rules/default_rules.json
+        period: 计算期间，默认取规则中的 period 段，再默认上半年
+    """
+    if rules is None:
+        rules = DEFAULT_RULES_PATH
+    if isinstance(rules, str):
+        rules = load_rules(rules)
+    global_config = global_config or DEFAULT_GLOBAL_CONFIG
+    role_config = role_config or DEFAULT_ROLE_CONFIG
+
+    content = json.dumps(rules, sort_keys=True, ensure_ascii=False, default=str)
+    key = hashlib.sha256('\n'.join(
+        (content, repr(global_config), repr(role_config), repr(period))).encode('utf-8')).hexdigest()
+    compiled = _COMPILED.get(key)
+    if compiled is not None:
+        _COMPILED.move_to_end(key)
+        return compiled
+    compiled = CompiledRules(rules, global_config, role_config, period)
+    _COMPILED[key] = compiled
+    while len(_COMPILED) > COMPILE_CACHE_SIZE:
+        _COMPILED.popitem(last=False)
+    return compiled
+
+
+# ========== 计算器 ==========
+class RuleCalculator(BonusCalculator):
+    """按规则定义计算的标量计算器（接口同 BonusCalculator）"""
+
+    def __init__(
+        self,
+        rules: Union[Dict, str, None] = None,
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        orgs=None
+    ):
+        self.rules = compile_rules(rules, global_config, role_config, period)
+        super().__init__(self.rules.global_config, self.rules.role_config, self.rules.period, orgs)
+
+    def _calculate(self, person: PersonData) -> BonusDetail:
+        return self.rules.evaluate(self, person)
+
+
+class RuleVectorizedCalculator(VectorizedCalculator):
+    """按规则定义计算的向量化计算器（接口同 VectorizedCalculator）"""
+
+    def __init__(
+        self,
+        rules: Union[Dict, str, None] = None,
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        orgs=None
+    ):
+        self.rules = compile_rules(rules, global_config, role_config, period)
+        super().__init__(self.rules.global_config, self.rules.role_config, self.rules.period, orgs)
+
+    def calculate_arrays(
+        self,
+        roster: RosterArrays,
+        period_revenue: Optional[np.ndarray] = None,
+        total_revenue: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        return self.rules.calculate_arrays(self, roster, period_revenue, total_revenue)
+
+    def allocation_mask(self, roster: RosterArrays) -> np.ndarray:
+        return self.rules.allocation_mask(roster)
+
+    def completion_modes(self, roster: RosterArrays) -> List[str]:
+        return self.rules.completion_modes(roster)
+
+    def engine_messages(self, roster: RosterArrays) -> Tuple[List[List[str]], List[List[str]]]:
+        return self.rules.engine_messages(roster, self.orgs)
+
+
+def calculate_with_rules(
+    persons: List[PersonData],
+    rules: Union[Dict, str, None] = None,
+    config: GlobalConfig = None
+) -> List[Tuple[BonusDetail, ValidationResult]]:
+    """便捷函数：按规则文件向量化批量计算"""
+    return RuleVectorizedCalculator(rules, global_config=config).calculate_batch(persons)
@@ -0,0 +1,355 @@
+"""
+2026上半年奖金计算引擎 - 计算记录模块
+Persisted calculation runs with content-addressed snapshots (SQLite)
+
+奖金发放后需要追溯"这批数字由哪份名单、哪套参数算出"，以往只能重算。本模块把每次批量计算存为一条运行记录：
+
+    calculation_runs   运行记录：时间、标签、参数快照、名单指纹、人数/合计/新增快照数、运行诊断（分组提示、耗时）
+    params_snapshots   参数快照（config_to_dict 格式的JSON，另含计算选项、规则、组织单元输入）
+    person_snapshots   人员输入快照（计算时的 PersonData，各字段一列，月度产值为JSON）
+    result_snapshots   结果行（batch_io.RESULT_FIELDS 各占一列，含校验/提示等逐人诊断）
+    run_items          运行 -> 第 seq 人的输入快照、结果快照
+
+快照按内容哈希（blake2b-128）寻址：名单中未变的人员只存一次，人员与参数都未变时结果也只存一次，
+后续运行只增加 run_items 引用。快照表只插入不修改（触发器拦截 UPDATE/DELETE）。
+查询历史结果直接读表，不重新计算。
+
+使用：
+    python batch_cli.py roster.csv -o results.csv --store runs.db --label "6月初版"
+    python run_store.py runs.db                        # 运行记录列表
+    python run_store.py runs.db 3                      # 运行详情（参数、诊断）
+    python run_store.py runs.db 3 -o results.csv       # 导出当时的结果
+    python run_store.py runs.db 3 -o roster.ndjson --inputs   # 导出当时的名单，可直接重算
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import sqlite3
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models import PersonData
+from config import (
+    GlobalConfig, RoleConfig, Role, config_to_dict, global_config_from_dict, role_config_from_dict
+)
+from batch_io import (
+    RESULT_FIELDS, RESULT_TEXT_FIELDS, RESULT_BOOL_FIELDS,
+    person_to_record, open_result_writer
+)
+
+_SNAPSHOT_TABLES = ('params_snapshots', 'person_snapshots', 'result_snapshots')
+# PersonData 字段 -> 列类型（month_revenue 另存为JSON）
+PERSON_COLUMNS: Dict[str, str] = {
+    'name': 'TEXT', 'role': 'TEXT', 'region': 'TEXT', 'org_unit': 'TEXT',
+    'company_total_revenue': 'REAL', 'annual_target': 'REAL', 'completion_rate_manual': 'REAL',
+    'collection_rate': 'REAL',
+    'region_completed_90': 'INTEGER', 'region_completed_100': 'INTEGER',
+    'national_completed_90': 'INTEGER', 'national_completed_100': 'INTEGER',
+    'personal_allocation_ratio': 'REAL', 'ceo_bonus': 'REAL',
+}
+_RUN_COLUMNS = ("id, created_at, label, lower(hex(params_hash)) AS params_hash, "
+                "lower(hex(input_hash)) AS input_hash, rows, invalid_rows, grand_total, new_persons, new_results")
+_RESULT_COLUMNS = ', '.join(
+    f"{f} {'TEXT' if f in RESULT_TEXT_FIELDS else 'INTEGER' if f in RESULT_BOOL_FIELDS else 'REAL'}"
+    for f in RESULT_FIELDS
+)
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS params_snapshots (
+    hash BLOB PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS person_snapshots (
+    hash BLOB PRIMARY KEY,
+    {', '.join(f'{f} {t}' for f, t in PERSON_COLUMNS.items())},
+    month_revenue TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS result_snapshots (
+    hash BLOB PRIMARY KEY,
+    {_RESULT_COLUMNS}
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS calculation_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    label TEXT,
+    params_hash BLOB NOT NULL REFERENCES params_snapshots(hash),
+    input_hash BLOB,
+    rows INTEGER,
+    invalid_rows INTEGER,
+    grand_total REAL,
+    new_persons INTEGER,
+    new_results INTEGER,
+    diagnostics TEXT
+);
+
+CREATE TABLE IF NOT EXISTS run_items (
+    run_id INTEGER NOT NULL REFERENCES calculation_runs(id),
+    seq INTEGER NOT NULL,
+    person_hash BLOB NOT NULL REFERENCES person_snapshots(hash),
+    result_hash BLOB NOT NULL REFERENCES result_snapshots(hash),
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+""" + ''.join(f"""
+CREATE TRIGGER IF NOT EXISTS {table}_no_update BEFORE UPDATE ON {table}
+BEGIN SELECT RAISE(ABORT, '快照不可修改'); END;
+CREATE TRIGGER IF NOT EXISTS {table}_no_delete BEFORE DELETE ON {table}
+BEGIN SELECT RAISE(ABORT, '快照不可删除'); END;
+""" for table in _SNAPSHOT_TABLES)
+
+
+def _dumps(data) -> str:
+    """规范JSON（键序固定、无多余空白），同一内容得到同一哈希"""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def _digest(values: List) -> bytes:
+    """一行快照值的内容哈希（repr 对 str/float/None/bool 是确定的，浮点为最短往返表示）"""
+    return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).digest()
+
+
+def _person_values(person: PersonData) -> List:
+    """PersonData -> person_snapshots 各列的值（不含hash）"""
+    values = [getattr(person, f) for f in PERSON_COLUMNS]
+    values[1] = person.role.value
+    values.append(json.dumps(sorted(person.month_revenue.items())))
+    return values
+
+
+def _person_from_values(values) -> PersonData:
+    fields = dict(zip(PERSON_COLUMNS, values))
+    fields['role'] = Role(fields['role'])
+    for f, column_type in PERSON_COLUMNS.items():
+        if column_type == 'INTEGER':
+            fields[f] = bool(fields[f])
+    return PersonData(month_revenue={m: v for m, v in json.loads(values[-1])}, **fields)
+
+
+class RunRecorder:
+    """
+    一次运行的写入器（由 RunStore.begin_run 创建）
+
+    整个运行在一个事务中写入：finish 时提交，abort 或中途出错时回滚，不留半条记录
+    """
+
+    def __init__(self, conn: sqlite3.Connection, run_id: int):
+        self._conn = conn
+        self.run_id = run_id
+        self.rows = 0
+        self._input = hashlib.blake2b(digest_size=16)
+        self._changes = {'person_snapshots': 0, 'result_snapshots': 0}
+
+    def add(self, persons: List[PersonData], rows: List[Dict]):
+        """追加一块人员与结果行（同序，rows 为 detail_to_row / result_rows 的输出）"""
+        persons_data, results_data, items = [], [], []
+        for person, row in zip(persons, rows):
+            person_values = _person_values(person)
+            person_hash = _digest(person_values)
+            values = [row[f] for f in RESULT_FIELDS]
+            result_hash = _digest(values)
+            persons_data.append([person_hash] + person_values)
+            results_data.append([result_hash] + values)
+            items.append((self.run_id, self.rows, person_hash, result_hash))
+            self._input.update(person_hash)
+            self.rows += 1
+        conn = self._conn
+        before = conn.total_changes
+        conn.executemany(
+            f"INSERT OR IGNORE INTO person_snapshots VALUES ({', '.join('?' * (len(PERSON_COLUMNS) + 2))})",
+            persons_data
+        )
+        self._changes['person_snapshots'] += conn.total_changes - before
+        before = conn.total_changes
+        conn.executemany(
+            f"INSERT OR IGNORE INTO result_snapshots VALUES ({', '.join('?' * (len(RESULT_FIELDS) + 1))})",
+            results_data
+        )
+        self._changes['result_snapshots'] += conn.total_changes - before
+        conn.executemany("INSERT INTO run_items VALUES (?, ?, ?, ?)", items)
+
+    def finish(self, invalid_rows: int, grand_total: float, diagnostics: Optional[Dict] = None) -> int:
+        """写入统计与运行诊断并提交，返回运行id"""
+        self._conn.execute(
+            "UPDATE calculation_runs SET input_hash = ?, rows = ?, invalid_rows = ?, grand_total = ?, "
+            "new_persons = ?, new_results = ?, diagnostics = ? WHERE id = ?",
+            (self._input.digest(), self.rows, invalid_rows, grand_total,
+             self._changes['person_snapshots'], self._changes['result_snapshots'],
+             _dumps(diagnostics or {}), self.run_id)
+        )
+        self._conn.commit()
+        return self.run_id
+
+    def abort(self):
+        self._conn.rollback()
+
+
+class RunStore:
+    """计算记录库（SQLite 单文件）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA cache_size = -131072")  # 128MB：快照表按哈希随机读写
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ========== 写入 ==========
+    def begin_run(
+        self,
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        options: Optional[Dict] = None,
+        label: Optional[str] = None
+    ) -> RunRecorder:
+        """
+        开始记录一次运行
+
+        Args:
+            global_config, role_config: 本次使用的参数
+            options: 影响结果的其他输入（引擎、金额精度、规则、组织单元输入等），随参数快照保存
+            label: 备注，如 "6月初版"
+        """
+        params = config_to_dict(global_config, role_config)
+        params['options'] = options or {}
+        params_text = _dumps(params)
+        params_hash = hashlib.blake2b(params_text.encode('utf-8'), digest_size=16).digest()
+        conn = self._conn
+        conn.execute("BEGIN")
+        conn.execute("INSERT OR IGNORE INTO params_snapshots VALUES (?, ?)", (params_hash, params_text))
+        cursor = conn.execute(
+            "INSERT INTO calculation_runs (created_at, label, params_hash) VALUES (?, ?, ?)",
+            (datetime.datetime.now().isoformat(timespec='seconds'), label, params_hash)
+        )
+        return RunRecorder(conn, cursor.lastrowid)
+
+    # ========== 查询 ==========
+    def list_runs(self) -> List[Dict]:
+        """全部运行记录（不含参数与诊断正文，哈希为十六进制），按id升序"""
+        cursor = self._conn.execute(f"SELECT {_RUN_COLUMNS} FROM calculation_runs ORDER BY id")
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, values)) for values in cursor]
+
+    def get_run(self, run_id: int) -> Dict:
+        """运行记录，含参数快照（params）与运行诊断（diagnostics）；不存在时抛出 ValueError"""
+        cursor = self._conn.execute(
+            f"SELECT {_RUN_COLUMNS}, diagnostics, (SELECT data FROM params_snapshots p "
+            "WHERE p.hash = r.params_hash) AS params FROM calculation_runs r WHERE id = ?", (run_id,)
+        )
+        values = cursor.fetchone()
+        if values is None:
+            raise ValueError(f"运行记录不存在: {run_id}")
+        run = dict(zip([c[0] for c in cursor.description], values))
+        run['params'] = json.loads(run['params'])
+        run['diagnostics'] = json.loads(run['diagnostics']) if run['diagnostics'] else {}
+        return run
+
+    def params(self, run_id: int) -> Tuple[GlobalConfig, RoleConfig]:
+        """运行使用的参数（可直接用于重算或对比）"""
+        params = self.get_run(run_id)['params']
+        return global_config_from_dict(params['global']), role_config_from_dict(params['role'])
+
+    def iter_results(self, run_id: int) -> Iterator[Dict]:
+        """按原顺序读取结果行（字段同 batch_io.RESULT_FIELDS）"""
+        cursor = self._conn.execute(
+            f"SELECT {', '.join('r.' + f for f in RESULT_FIELDS)} FROM run_items i "
+            "JOIN result_snapshots r ON r.hash = i.result_hash WHERE i.run_id = ? ORDER BY i.seq", (run_id,)
+        )
+        for values in cursor:
+            row = dict(zip(RESULT_FIELDS, values))
+            for f in RESULT_BOOL_FIELDS:
+                row[f] = bool(row[f])
+            yield row
+
+    def results(self, run_id: int) -> List[Dict]:
+        """结果行列表，可直接传给 result_diff.diff_results 对比两次运行"""
+        self.get_run(run_id)
+        return list(self.iter_results(run_id))
+
+    def persons(self, run_id: int) -> List[PersonData]:
+        """运行时的输入名单（按原顺序）"""
+        self.get_run(run_id)
+        cursor = self._conn.execute(
+            f"SELECT {', '.join('p.' + f for f in PERSON_COLUMNS)}, p.month_revenue FROM run_items i "
+            "JOIN person_snapshots p ON p.hash = i.person_hash WHERE i.run_id = ? ORDER BY i.seq", (run_id,)
+        )
+        return [_person_from_values(values) for values in cursor]
+
+    def export_results(self, run_id: int, path: str) -> int:
+        """导出历史结果（csv/xlsx/ndjson/parquet/arrow），返回行数"""
+        self.get_run(run_id)
+        with open_result_writer(path) as writer:
+            batch = []
+            for row in self.iter_results(run_id):
+                batch.append(row)
+                if len(batch) >= 5000:
+                    writer.write_rows(batch)
+                    batch = []
+            writer.write_rows(batch)
+        return writer.rows_written
+
+    def export_inputs(self, run_id: int, path: str) -> int:
+        """导出运行时的名单（ndjson，batch_cli 可直接读取），返回人数"""
+        persons = self.persons(run_id)
+        with open(path, 'w', encoding='utf-8') as f:
+            for person in persons:
+                f.write(json.dumps(person_to_record(person), ensure_ascii=False) + '\n')
+        return len(persons)
+
+
+# ========== 命令行 ==========
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="奖金计算记录查询")
+    parser.add_argument("database", help="计算记录库（batch_cli --store 写入）")
+    parser.add_argument("run_id", nargs='?', type=int, help="运行id，省略时列出全部运行")
+    parser.add_argument("-o", "--output", help="导出该次运行的结果（.csv/.xlsx/.ndjson/.parquet/.arrow）")
+    parser.add_argument("--inputs", action="store_true", help="导出该次运行的输入名单（.ndjson）而非结果")
+    args = parser.parse_args(argv)
+
+    try:
+        with RunStore(args.database) as store:
+            if args.run_id is None:
+                for run in store.list_runs():
+                    print(f"#{run['id']:<4} {run['created_at']}  {run['rows'] or 0:>8,}人  "
+                          f"¥{run['grand_total'] or 0:,.2f}  新增人员快照{run['new_persons'] or 0:,}  "
+                          f"名单{(run['input_hash'] or '')[:8]}  参数{run['params_hash'][:8]}  {run['label'] or ''}")
+                return 0
+            if args.output:
+                if args.inputs:
+                    count = store.export_inputs(args.run_id, args.output)
+                else:
+                    count = store.export_results(args.run_id, args.output)
+                print(f"已导出 {count:,} 行: {args.output}")
+                return 0
+            run = store.get_run(args.run_id)
+    except (ValueError, ImportError, OSError, sqlite3.Error) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    print(f"运行 #{run['id']}  {run['created_at']}  {run['label'] or ''}")
+    print(f"人数: {run['rows']:,}  校验未通过: {run['invalid_rows']:,}  奖金合计: ¥{run['grand_total']:,.2f}")
+    print(f"名单指纹: {run['input_hash']}  参数快照: {run['params_hash']}")
+    print(f"新增快照: 人员 {run['new_persons']:,}  结果 {run['new_results']:,}")
+    print("计算选项: " + json.dumps(run['params']['options'], ensure_ascii=False))
+    for notice in run['diagnostics'].get('notices', []):
+        print(f"⚠️ {notice}")
+    warnings = run['diagnostics'].get('group_warnings', [])
+    for warning in warnings[:10]:
+        print(f"⚠️ {warning}")
+    if len(warnings) > 10:
+        print(f"⚠️ ……共{len(warnings)}个组织单元分配比例合计超过100%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""
+2026上半年奖金计算引擎 - 参数敏感性分析模块
+Sensitivity and marginal-cost analysis of bonus parameters
+
+回答"门槛每动0.01、某月系数每动0.01、DM封顶每动1000，奖金总额变多少"。
+名单只扫描一次：算一遍基准结果并缓存每人的中间量（产值、比例、完成率、完成奖基数、达标情况），
+各参数的变动量都由这些数组直接得出，不为每个参数重跑一遍：
+
+【解析】与产值/金额成线性的部分（月度系数、过程激励比例、完成奖比例、固定补贴、区域/全国奖金额），
+        变动量 = 步长 × 边际系数
+【差分】分段或阶梯的部分（回款门槛、DM完成奖比例与封顶、叠加模式），
+        在缓存数组上重算受影响的完成奖，得到 ±步长 的精确变动量
+
+另列出离档位边界（完成率0.9/1.0、回款门槛）最近的人员及跨过边界时的奖金变动。
+
+使用：
+    python sensitivity.py roster.csv
+    python sensitivity.py roster.csv --top 20 --window 0.01
+"""
+import argparse
+import sys
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from config import (
+    GlobalConfig, RoleConfig, PeriodConfig, Role, CompletionBonusMode,
+    DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+)
+from models import PersonData
+from vectorized_engine import ROLE_CODES, ROLE_ORDER, SALES_ROLES, RosterArrays, VectorizedCalculator, period_total
+
+# 默认步长
+DEFAULT_STEPS = {
+    'threshold_90': 0.01,
+    'threshold_100': 0.01,
+    'time_coefficients': 0.01,
+    'incentive_rates': 0.001,
+    'completion_bonus_rate': 0.001,
+    'dm_completion_bonus_rate': 0.001,
+    'dm_completion_bonus_cap': 1000.0,
+    'cp_subsidy': 1000.0,
+    'sales_monthly_subsidy': 100.0,
+    'region_90_bonus': 1000.0,
+    'region_100_bonus': 1000.0,
+    'national_90_bonus': 1000.0,
+    'national_100_bonus': 1000.0,
+    'dm_region_bonus': 1000.0,
+}
+
+# 档位边界：名称 -> 说明
+BOUNDARIES = {
+    'completion_90': '完成率90%',
+    'completion_100': '完成率100%',
+    'collection_90': '90%档回款门槛',
+    'collection_100': '100%档回款门槛',
+}
+
+
+@dataclass
+class SensitivityReport:
+    """敏感性分析结果"""
+    base_total: float
+    params: List[Dict] = field(default_factory=list)       # 参数, 当前值, 步长, 增加/减少一步的总额变动, 方法
+    boundaries: List[Dict] = field(default_factory=list)   # 临界人员
+
+
+class SensitivityAnalyzer:
+    """参数敏感性分析"""
+
+    def __init__(
+        self,
+        roster: Union[RosterArrays, List[PersonData]],
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        steps: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            roster: 名单（PersonData 列表或 RosterArrays）
+            steps: 覆盖默认步长（键同 DEFAULT_STEPS）
+        """
+        self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
+        self.role_config = role_config or DEFAULT_ROLE_CONFIG
+        self.period = period or PeriodConfig.from_global_config(self.global_config)
+        self.steps = {**DEFAULT_STEPS, **(steps or {})}
+        if not isinstance(roster, RosterArrays):
+            roster = RosterArrays.from_persons(roster, self.period.months)
+        self.roster = roster
+        self._scan()
+
+    # ========== 一次扫描 ==========
+    def _scan(self):
+        """基准计算 + 缓存每人中间量"""
+        cfg = self.global_config
+        roster = self.roster
+        calculator = VectorizedCalculator(self.global_config, self.role_config, self.period)
+        self.revenue = roster.period_revenue(self.period.months)
+        total_revenue = period_total(self.revenue)
+        self.results = calculator.calculate_arrays(roster, self.revenue, total_revenue)
+        inputs = calculator.completion_inputs(roster, total_revenue)
+
+        roles = roster.roles
+        self.is_cp = roles == ROLE_CODES[Role.CP]
+        self.is_dm = roles == ROLE_CODES[Role.DM]
+        self.is_other = ~(self.is_cp | self.is_dm)
+        self.completion_rate = inputs['completion_rate']
+        self.company_revenue = inputs['company_revenue']
+        self.dm_base = inputs['dm_base']
+        self.other_base = inputs['other_base']
+        self.collection = roster.collection_rate
+        ratio = roster.allocation_ratio
+        self.ratio_factor = np.where(self.is_other & ~np.isnan(ratio), np.nan_to_num(ratio), 1.0)
+        rate_table = np.array([self.role_config.incentive_rates.get(r, 0.0) for r in ROLE_ORDER])
+        self.rates = np.where(self.is_cp, 0.0, rate_table[roles])
+
+        self.base_total = float(self.results['grand_total'].sum())
+        self.base_completion = self._completion_total(cfg.threshold_90, cfg.threshold_100)
+
+    def _completion_total(
+        self,
+        threshold_90: float,
+        threshold_100: float,
+        dm_base: Optional[np.ndarray] = None,
+        other_base: Optional[np.ndarray] = None,
+        dm_mode: Optional[CompletionBonusMode] = None,
+        other_mode: Optional[CompletionBonusMode] = None,
+        completion_90: Optional[np.ndarray] = None,
+        completion_100: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """按缓存量重算每人完成奖（公式同 VectorizedCalculator.calculate_arrays）"""
+        cfg = self.global_config
+        dm_base = self.dm_base if dm_base is None else dm_base
+        other_base = self.other_base if other_base is None else other_base
+        dm_mode = dm_mode or cfg.dm_completion_bonus_mode
+        other_mode = other_mode or cfg.other_completion_bonus_mode
+        if completion_90 is None:
+            completion_90 = self.completion_rate >= 0.9
+        if completion_100 is None:
+            completion_100 = self.completion_rate >= 1.0
+
+        base = np.where(self.is_dm, dm_base, other_base)
+        hit_90 = ~self.is_cp & completion_90 & (self.collection >= threshold_90)
+        hit_100 = ~self.is_cp & completion_100 & (self.collection >= threshold_100)
+        bonus_90 = np.where(hit_90, base, 0.0)
+        bonus_100 = np.where(hit_100, base, 0.0)
+        exclusive = np.where(self.is_dm, dm_mode == CompletionBonusMode.EXCLUSIVE,
+                             other_mode == CompletionBonusMode.EXCLUSIVE)
+        total = np.where(exclusive, np.maximum(bonus_90, bonus_100), bonus_90 + bonus_100)
+        return total * self.ratio_factor
+
+    def _paid_tiers(self) -> np.ndarray:
+        """基准参数下每人发放的完成奖档数（exclusive 至多1档，stack 至多2档）"""
+        cfg = self.global_config
+        hit_90 = ~self.is_cp & (self.completion_rate >= 0.9) & (self.collection >= cfg.threshold_90)
+        hit_100 = ~self.is_cp & (self.completion_rate >= 1.0) & (self.collection >= cfg.threshold_100)
+        exclusive = np.where(self.is_dm, cfg.dm_completion_bonus_mode == CompletionBonusMode.EXCLUSIVE,
+                             cfg.other_completion_bonus_mode == CompletionBonusMode.EXCLUSIVE)
+        return np.where(exclusive, hit_90 | hit_100, hit_90.astype(int) + hit_100)
+
+    def _completion_delta(self, **changes) -> float:
+        return float((self._completion_total(**{
+            'threshold_90': self.global_config.threshold_90,
+            'threshold_100': self.global_config.threshold_100,
+            **changes
+        }) - self.base_completion).sum())
+
+    # ========== 参数变动量 ==========
+    def param_rows(self) -> List[Dict]:
+        cfg = self.global_config
+        role_cfg = self.role_config
+        steps = self.steps
+        rows: List[Dict] = []
+
+        def add(param, value, step, up, down, method):
+            rows.append({'param': param, 'value': value, 'step': step,
+                         'delta_up': float(up), 'delta_down': None if down is None else float(down),
+                         'method': method})
+
+        def linear(param, value, step, marginal):
+            add(param, value, step, marginal * step, -marginal * step, 'analytic')
+
+        # 回款门槛（阶梯）
+        for name in ('threshold_90', 'threshold_100'):
+            step = steps[name]
+            value = getattr(cfg, name)
+            add(name, value, step,
+                self._completion_delta(**{name: value + step}),
+                self._completion_delta(**{name: value - step}), 'finite')
+
+        # 月度系数、过程激励比例（线性）
+        step = steps['time_coefficients']
+        weighted = self.revenue * self.rates[:, None]
+        for j, month in enumerate(self.period.months):
+            linear(f'time_coefficients.{month}', self.period.coefficient(month), step, weighted[:, j].sum())
+        step = steps['incentive_rates']
+        coeffs = np.array([self.period.coefficient(m) for m in self.period.months])
+        person_revenue = self.revenue @ coeffs
+        for role in ROLE_ORDER:
+            if role == Role.CP:
+                continue  # 常委无过程激励
+            mask = self.roster.roles == ROLE_CODES[role]
+            linear(f'incentive_rates.{role.value}', role_cfg.incentive_rates.get(role, 0.0), step,
+                   person_revenue[mask].sum())
+
+        # 完成奖比例（线性：完成奖 = 分公司产值 × 比例 × 发放档数 × 分配比例）
+        paid = np.where(self.is_other, self._paid_tiers() * self.ratio_factor * self.company_revenue, 0.0)
+        linear('completion_bonus_rate', role_cfg.completion_bonus_rate, steps['completion_bonus_rate'], paid.sum())
+
+        # DM完成奖比例与封顶（分段线性）
+        dm_rate = role_cfg.dm_completion_bonus_rate
+        dm_cap = cfg.dm_completion_bonus_cap
+        step = steps['dm_completion_bonus_rate']
+        add('dm_completion_bonus_rate', dm_rate, step,
+            self._completion_delta(dm_base=np.minimum(self.company_revenue * (dm_rate + step), dm_cap)),
+            self._completion_delta(dm_base=np.minimum(self.company_revenue * (dm_rate - step), dm_cap)), 'finite')
+        step = steps['dm_completion_bonus_cap']
+        uncapped = self.company_revenue * dm_rate
+        add('dm_completion_bonus_cap', dm_cap, step,
+            self._completion_delta(dm_base=np.minimum(uncapped, dm_cap + step)),
+            self._completion_delta(dm_base=np.minimum(uncapped, dm_cap - step)), 'finite')
+
+        # 叠加模式（切换到另一种）
+        for name, current in (('dm_completion_bonus_mode', cfg.dm_completion_bonus_mode),
+                              ('other_completion_bonus_mode', cfg.other_completion_bonus_mode)):
+            other = (CompletionBonusMode.STACK if current == CompletionBonusMode.EXCLUSIVE
+                     else CompletionBonusMode.EXCLUSIVE)
+            key = 'dm_mode' if name.startswith('dm') else 'other_mode'
+            add(name, current.value, other.value, self._completion_delta(**{key: other}), None, 'finite')
+
+        # 固定补贴、区域/全国奖（线性，按人数）
+        roster = self.roster
+        subsidy_roles = [ROLE_CODES[r] for r in SALES_ROLES if role_cfg.has_fixed_subsidy.get(r, False)]
+        cp_count = int(self.is_cp.sum())
+        linear('cp_subsidy', cfg.cp_subsidy, steps['cp_subsidy'], cp_count * self.period.cp_subsidy_factor)
+        linear('sales_monthly_subsidy', cfg.sales_monthly_subsidy, steps['sales_monthly_subsidy'],
+               int(np.isin(roster.roles, subsidy_roles).sum()) * self.period.subsidy_month_count)
+        dm_region = self.is_dm & (roster.region_90 | roster.region_100)
+        for name, flags in (('region_90_bonus', roster.region_90), ('region_100_bonus', roster.region_100),
+                            ('national_90_bonus', roster.national_90), ('national_100_bonus', roster.national_100)):
+            linear(name, getattr(cfg, name), steps[name], int((self.is_cp & flags).sum()))
+        linear('dm_region_bonus', cfg.dm_region_bonus, steps['dm_region_bonus'], int(dm_region.sum()))
+        return rows
+
+    # ========== 临界人员 ==========
+    def boundary_rows(self, top: int = 20, window: float = 0.02) -> List[Dict]:
+        """
+        离档位边界最近的人员（每个边界最多 top 人，距离不超过 window，常委不参与）
+
+        at_stake 为跨过该边界（其余条件不变）时本人完成奖的变动
+        """
+        cfg = self.global_config
+        completion_90 = self.completion_rate >= 0.9
+        completion_100 = self.completion_rate >= 1.0
+        checks = {
+            'completion_90': (self.completion_rate, 0.9, {'completion_90': ~completion_90}),
+            'completion_100': (self.completion_rate, 1.0, {'completion_100': ~completion_100}),
+            # 回款门槛：把门槛移到本人回款率的另一侧
+            'collection_90': (self.collection, cfg.threshold_90, None),
+            'collection_100': (self.collection, cfg.threshold_100, None),
+        }
+        roster = self.roster
+        rows = []
+        for boundary, (values, threshold, flipped) in checks.items():
+            gap = values - threshold
+            candidates = np.flatnonzero(~self.is_cp & (np.abs(gap) <= window))
+            if not len(candidates):
+                continue
+            if flipped is not None:
+                at_stake = self._completion_total(cfg.threshold_90, cfg.threshold_100, **flipped)
+            else:
+                # 已达门槛者改为未达，未达者改为已达
+                passed = values >= threshold
+                key = 'threshold_90' if boundary == 'collection_90' else 'threshold_100'
+                lowered = self._completion_total(**{'threshold_90': cfg.threshold_90,
+                                                    'threshold_100': cfg.threshold_100, key: -np.inf})
+                raised = self._completion_total(**{'threshold_90': cfg.threshold_90,
+                                                   'threshold_100': cfg.threshold_100, key: np.inf})
+                at_stake = np.where(passed, raised, lowered)
+            at_stake = at_stake - self.base_completion
+            # 距离相同时金额大的在前
+            order = candidates[np.lexsort((-np.abs(at_stake[candidates]), np.abs(gap[candidates])))][:top]
+            for i in order.tolist():
+                rows.append({
+                    'boundary': boundary,
+                    'name': roster.names[i],
+                    'role': ROLE_ORDER[roster.roles[i]].value,
+                    'region': roster.regions[i],
+                    'org_unit': roster.org_units[i],
+                    'value': float(values[i]),
+                    'threshold': float(threshold),
+                    'gap': float(gap[i]),
+                    'at_stake': float(at_stake[i]),
+                })
+        return rows
+
+    def report(self, top: int = 20, window: float = 0.02) -> SensitivityReport:
+        return SensitivityReport(self.base_total, self.param_rows(), self.boundary_rows(top, window))
+
+
+def analyze_sensitivity(
+    persons: List[PersonData],
+    config: GlobalConfig = None,
+    top: int = 20
+) -> SensitivityReport:
+    """便捷函数：参数敏感性分析"""
+    return SensitivityAnalyzer(persons, global_config=config).report(top)
+
+
+# ========== 命令行 ==========
+def main(argv: Optional[List[str]] = None) -> int:
+    from batch_io import iter_roster
+    from config import load_config_file
+
+    parser = argparse.ArgumentParser(description="奖金参数敏感性分析")
+    parser.add_argument("input", help="人员名单文件（.csv/.xlsx/.ndjson/.brst）")
+    parser.add_argument("-c", "--config", help="参数覆盖文件（JSON）")
+    parser.add_argument("-n", "--top", type=int, default=10, help="每个边界列出的人数")
+    parser.add_argument("--window", type=float, default=0.02, help="距边界的最大距离")
+    args = parser.parse_args(argv)
+
+    try:
+        global_config, role_config = load_config_file(args.config) if args.config else (None, None)
+        with ExitStack() as stack:
+            if args.input.endswith('.brst'):
+                from binary_roster import load_binary_roster
+                roster = stack.enter_context(load_binary_roster(args.input)).to_arrays()
+            else:
+                roster = list(iter_roster(args.input))
+            report = SensitivityAnalyzer(roster, global_config, role_config).report(args.top, args.window)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    print(f"基准奖金合计: ¥{report.base_total:,.2f}\n")
+    print(f"{'参数':<30}{'当前值':>14}{'步长':>12}{'+1步':>20}{'-1步':>20}  方法")
+    for row in report.params:
+        down = f"{row['delta_down']:>20,.2f}" if row['delta_down'] is not None else f"{'':>20}"
+        print(f"{row['param']:<30}{row['value']!s:>14}{row['step']!s:>12}{row['delta_up']:>20,.2f}{down}  "
+              f"{row['method']}")
+    print()
+    for boundary, label in BOUNDARIES.items():
+        rows = [r for r in report.boundaries if r['boundary'] == boundary]
+        if not rows:
+            continue
+        print(f"【{label}】临界人员")
+        for r in rows:
+            print(f"  {r['name']:<12}{r['role']:<12}{r['org_unit']:<14}"
+                  f"{r['value']:.4f} (差 {r['gap']:+.4f})  跨过边界奖金变动 ¥{r['at_stake']:,.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,8 +10,10 @@ from config import Role, GlobalConfig
 class BonusValidator:
     """奖金数据校验器"""
     
-    def __init__(self, config: GlobalConfig = None):
+    def __init__(self, config: GlobalConfig = None, valid_months: Optional[List[int]] = None):
         self.config = config or GlobalConfig()
+        # 允许出现的月份键，默认为上半年1-6月
+        self.valid_months = set(valid_months) if valid_months is not None else set(range(1, 7))
     
     def validate_person(self, person: PersonData) -> ValidationResult:
         """校验单人数据"""
@@ -75,9 +77,9 @@ class BonusValidator:
             if revenue < 0:
                 result.add_error(f"{month}月产值不能为负数: {revenue}")
         
-        # 检查月份有效性 (1-6月)
+        # 检查月份有效性 (默认1-6月，按计算期间)
         for month in person.month_revenue.keys():
-            if month < 1 or month > 6:
+            if month not in self.valid_months:
                 result.add_error(f"无效的月份: {month}")
         
         # 非常委岗位需要分公司产值
@@ -0,0 +1,476 @@
+"""
+2026上半年奖金计算引擎 - 向量化计算模块
+Vectorized (NumPy) batch calculation engine
+
+【设计原则】
+1. 规则与 BonusCalculator 逐项一致，结果逐位相同（加法顺序与标量版本保持一致）
+2. 人员数据先转为列式数组(RosterArrays)，按岗位用掩码一次性计算全体
+3. 输出为按字段组织的列（dict of arrays），批量导出无需逐人构造对象；
+   需要时也可还原为 BonusDetail 列表，与 calculate_batch 接口兼容
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import PersonData, BonusDetail, ValidationResult
+from config import (
+    GlobalConfig, RoleConfig, Role, PeriodConfig,
+    CompletionBonusMode, CompletionRateMode,
+    DEFAULT_GLOBAL_CONFIG, DEFAULT_ROLE_CONFIG
+)
+from validators import BonusValidator
+from org_aggregation import OrgSummary
+from batch_io import result_fields, join_messages
+
+MONTHS = list(range(1, 7))
+
+# 岗位编码：数组中以 ROLE_ORDER 的下标表示岗位
+ROLE_ORDER: List[Role] = list(Role)
+ROLE_CODES: Dict[Role, int] = {role: i for i, role in enumerate(ROLE_ORDER)}
+SALES_ROLES = (Role.SALES_USER, Role.SALES_NEW, Role.SALES_EDU)
+
+
+def period_total(revenue: np.ndarray) -> np.ndarray:
+    """逐月累加产值合计（加法顺序与标量版本一致）"""
+    total = np.zeros(len(revenue))
+    for m in range(revenue.shape[1]):
+        total = total + revenue[:, m]
+    return total
+
+
+@dataclass
+class RosterArrays:
+    """列式人员数据（缺失值以 NaN 表示）"""
+    names: List[str]
+    roles: np.ndarray                   # int8, ROLE_ORDER 下标
+    regions: List[str]
+    org_units: List[str]
+    revenue: np.ndarray                 # (n, len(months)) 月度产值
+    company_revenue: np.ndarray         # 分公司产值, NaN=未填
+    annual_target: np.ndarray           # NaN=未填
+    completion_rate_manual: np.ndarray  # NaN=未填
+    collection_rate: np.ndarray
+    region_90: np.ndarray               # bool
+    region_100: np.ndarray
+    national_90: np.ndarray
+    national_100: np.ndarray
+    allocation_ratio: np.ndarray        # NaN=未填
+    ceo_bonus: np.ndarray               # NaN=未填
+    months: List[int] = field(default_factory=lambda: list(MONTHS))  # revenue 各列对应的月份键
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_persons(cls, persons: List[PersonData], months: Optional[List[int]] = None) -> 'RosterArrays':
+        """由 PersonData 列表构建（months 为要保留的月份键，默认1-6月）"""
+        def opt(value):
+            return np.nan if value is None else value
+
+        months = list(months) if months is not None else list(MONTHS)
+        column = {m: j for j, m in enumerate(months)}
+        n = len(persons)
+        revenue = np.zeros((n, len(months)), dtype=np.float64)
+        for i, p in enumerate(persons):
+            for month, value in p.month_revenue.items():
+                j = column.get(month)
+                if j is not None:
+                    revenue[i, j] = value
+
+        return cls(
+            names=[p.name for p in persons],
+            roles=np.array([ROLE_CODES[p.role] for p in persons], dtype=np.int8),
+            regions=[p.region for p in persons],
+            org_units=[p.org_unit for p in persons],
+            revenue=revenue,
+            company_revenue=np.array([opt(p.company_total_revenue) for p in persons], dtype=np.float64),
+            annual_target=np.array([opt(p.annual_target) for p in persons], dtype=np.float64),
+            completion_rate_manual=np.array([opt(p.completion_rate_manual) for p in persons], dtype=np.float64),
+            collection_rate=np.array([p.collection_rate for p in persons], dtype=np.float64),
+            region_90=np.array([p.region_completed_90 for p in persons], dtype=bool),
+            region_100=np.array([p.region_completed_100 for p in persons], dtype=bool),
+            national_90=np.array([p.national_completed_90 for p in persons], dtype=bool),
+            national_100=np.array([p.national_completed_100 for p in persons], dtype=bool),
+            allocation_ratio=np.array([opt(p.personal_allocation_ratio) for p in persons], dtype=np.float64),
+            ceo_bonus=np.array([opt(p.ceo_bonus) for p in persons], dtype=np.float64),
+            months=months,
+        )
+
+    def period_revenue(self, months: List[int]) -> np.ndarray:
+        """
+        按期间月份取产值列 (n, len(months))
+
+        期间月份在 self.months 中连续且同序时返回视图，否则复制；名单中没有的月份为0
+        """
+        index = {m: j for j, m in enumerate(self.months)}
+        cols = [index.get(m) for m in months]
+        if None not in cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            return self.revenue[:, cols[0]:cols[0] + len(cols)]
+        out = np.zeros((len(self), len(months)))
+        for k, j in enumerate(cols):
+            if j is not None:
+                out[:, k] = self.revenue[:, j]
+        return out
+
+    def role_values(self) -> List[str]:
+        return [ROLE_ORDER[code].value for code in self.roles.tolist()]
+
+
+class VectorizedCalculator:
+    """向量化奖金计算引擎"""
+
+    def __init__(
+        self,
+        global_config: GlobalConfig = None,
+        role_config: RoleConfig = None,
+        period: PeriodConfig = None,
+        orgs: Optional[Dict[str, OrgSummary]] = None
+    ):
+        self.global_config = global_config or DEFAULT_GLOBAL_CONFIG
+        self.role_config = role_config or DEFAULT_ROLE_CONFIG
+        self.period = period or PeriodConfig.from_global_config(self.global_config)
+        self.orgs = orgs  # 同 BonusCalculator.orgs
+        self.validator = BonusValidator(self.global_config, valid_months=self.period.months)
+
+    def calculate_arrays(
+        self,
+        roster: RosterArrays,
+        period_revenue: Optional[np.ndarray] = None,
+        total_revenue: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        计算全体人员奖金
+
+        Args:
+            roster: 列式人员数据
+            period_revenue: 本期间各月产值 (n, 月数)，多期间共用名单时由调用方预先取好
+            total_revenue: 本期间产值合计，同上
+
+        Returns:
+            字段名 -> 数组，字段名与 BonusDetail 属性一致，
+            另含 monthly_incentives (n, 月数) 与 has_incentive (CP为False)
+        """
+        cfg = self.global_config
+        role_cfg = self.role_config
+        n = len(roster)
+        roles = roster.roles
+
+        is_cp = roles == ROLE_CODES[Role.CP]
+        is_dm = roles == ROLE_CODES[Role.DM]
+        is_other = ~(is_cp | is_dm)
+        zeros = np.zeros(n)
+
+        # 过程激励：按月 产值*比例*系数，逐月累加（与标量版本加法顺序一致）
+        rate_table = np.array([role_cfg.incentive_rates.get(r, 0.0) for r in ROLE_ORDER])
+        rates = np.where(is_cp, 0.0, rate_table[roles])
+        months = self.period.months
+        revenue = period_revenue if period_revenue is not None else roster.period_revenue(months)
+        coeffs = np.array([self.period.coefficient(m) for m in months])
+        monthly = revenue * rates[:, None] * coeffs
+        incentive_total = zeros.copy()
+        for m in range(len(months)):
+            incentive_total = incentive_total + monthly[:, m]
+
+        # 完成率、完成奖基数
+        if total_revenue is None:
+            total_revenue = period_total(revenue)
+        inputs = self.completion_inputs(roster, total_revenue)
+        completion_rate = inputs['completion_rate']
+        dm_base = inputs['dm_base']
+        other_base = inputs['other_base']
+
+        # 完成奖
+        base = np.where(is_dm, dm_base, other_base)
+
+        collection = roster.collection_rate
+        hit_90 = ~is_cp & (completion_rate >= 0.9) & (collection >= cfg.threshold_90)
+        hit_100 = ~is_cp & (completion_rate >= 1.0) & (collection >= cfg.threshold_100)
+        bonus_90 = np.where(hit_90, base, 0.0)
+        bonus_100 = np.where(hit_100, base, 0.0)
+
+        dm_exclusive = cfg.dm_completion_bonus_mode == CompletionBonusMode.EXCLUSIVE
+        other_exclusive = cfg.other_completion_bonus_mode == CompletionBonusMode.EXCLUSIVE
+        exclusive = np.where(is_dm, dm_exclusive, other_exclusive)
+        completion_total = np.where(exclusive, np.maximum(bonus_90, bonus_100), bonus_90 + bonus_100)
+
+        ratio = roster.allocation_ratio
+        has_ratio = ~np.isnan(ratio)
+        completion_total = np.where(is_other & has_ratio, completion_total * np.nan_to_num(ratio), completion_total)
+
+        # 区域/全国奖
+        region_90 = np.where(is_cp & roster.region_90, cfg.region_90_bonus, 0.0)
+        region_100 = np.where(is_cp & roster.region_100, cfg.region_100_bonus, 0.0)
+        dm_region = is_dm & (roster.region_90 | roster.region_100)
+        region_total = np.where(dm_region, cfg.dm_region_bonus, region_90 + region_100)
+        national_90 = np.where(is_cp & roster.national_90, cfg.national_90_bonus, 0.0)
+        national_100 = np.where(is_cp & roster.national_100, cfg.national_100_bonus, 0.0)
+        national_total = national_90 + national_100
+
+        # 固定补贴
+        subsidy_roles = [ROLE_CODES[r] for r in SALES_ROLES if role_cfg.has_fixed_subsidy.get(r, False)]
+        fixed_subsidy = np.where(is_cp, cfg.cp_subsidy * self.period.cp_subsidy_factor, 0.0)
+        fixed_subsidy = np.where(np.isin(roles, subsidy_roles),
+                                 cfg.sales_monthly_subsidy * self.period.subsidy_month_count, fixed_subsidy)
+
+        ceo_bonus = np.nan_to_num(roster.ceo_bonus, nan=0.0)
+
+        grand_total = (
+            incentive_total +
+            completion_total +
+            region_total +
+            national_total +
+            fixed_subsidy +
+            ceo_bonus
+        )
+
+        results = {
+            'monthly_incentives': monthly,
+            'has_incentive': ~is_cp,
+            'incentive_total': incentive_total,
+            'completion_bonus_90': bonus_90,
+            'completion_bonus_100': bonus_100,
+            'completion_bonus_total': completion_total,
+            'region_bonus_90': region_90,
+            'region_bonus_100': region_100,
+            'region_bonus_total': region_total,
+            'national_bonus_90': national_90,
+            'national_bonus_100': national_100,
+            'national_bonus_total': national_total,
+            'fixed_subsidy': fixed_subsidy,
+            'ceo_bonus': ceo_bonus,
+            'grand_total': grand_total,
+            'completion_rate': completion_rate,
+            'collection_rate': collection,
+        }
+        if cfg.include_payout_timing:
+            results['incentive_immediate'] = incentive_total * 0.5
+            results['incentive_after_collection'] = incentive_total * 0.5
+        return results
+
+    def completion_inputs(self, roster: RosterArrays, total_revenue: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        完成率与完成奖基数（有组织单元汇总时取共享值）
+
+        Returns:
+            completion_rate（CP为0）、company_revenue、dm_base（已封顶）、other_base
+        """
+        cfg = self.global_config
+        role_cfg = self.role_config
+        is_cp = roster.roles == ROLE_CODES[Role.CP]
+        if cfg.completion_rate_mode == CompletionRateMode.FROM_TARGET:
+            target = roster.annual_target
+            has_target = target > 0  # NaN比较为False
+            completion_rate = np.divide(total_revenue, target, out=np.zeros(len(roster)), where=has_target)
+        else:
+            completion_rate = np.nan_to_num(roster.completion_rate_manual, nan=0.0)
+        company_revenue = np.where(np.isnan(roster.company_revenue), total_revenue, roster.company_revenue)
+        dm_base = np.minimum(company_revenue * role_cfg.dm_completion_bonus_rate, cfg.dm_completion_bonus_cap)
+        other_base = company_revenue * role_cfg.completion_bonus_rate
+
+        # 组织单元共享值：每个组织单元查一次表，再按人广播
+        if self.orgs:
+            has_org, org_values = self.org_arrays(roster)
+            has_org &= ~is_cp
+            completion_rate = np.where(has_org, org_values['completion_rate'], completion_rate)
+            company_revenue = np.where(has_org, org_values['company_revenue'], company_revenue)
+            dm_base = np.where(has_org, org_values['dm_bonus_base'], dm_base)
+            other_base = np.where(has_org, org_values['bonus_base'], other_base)
+        completion_rate = np.where(is_cp, 0.0, completion_rate)
+        return {
+            'completion_rate': completion_rate,
+            'company_revenue': company_revenue,
+            'dm_base': dm_base,
+            'other_base': other_base,
+        }
+
+    def org_arrays(self, roster: RosterArrays) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        组织单元汇总值按人展开
+
+        Returns:
+            (是否有汇总, {字段: 每人的值})
+        """
+        names, index = np.unique(np.asarray(roster.org_units, dtype=object), return_inverse=True)
+        fields = ('completion_rate', 'company_revenue', 'dm_bonus_base', 'bonus_base')
+        table = {f: np.zeros(len(names)) for f in fields}
+        found = np.zeros(len(names), dtype=bool)
+        for i, name in enumerate(names.tolist()):
+            org = self.orgs.get(name)
+            if org is not None:
+                found[i] = True
+                for f in fields:
+                    table[f][i] = getattr(org, f)
+        return found[index], {f: values[index] for f, values in table.items()}
+
+    def allocation_mask(self, roster: RosterArrays) -> np.ndarray:
+        """完成奖按个人分配比例计算的人员（副总经理、部门经理、销售）"""
+        return ~np.isin(roster.roles, [ROLE_CODES[Role.CP], ROLE_CODES[Role.DM]])
+
+    def completion_modes(self, roster: RosterArrays) -> List[str]:
+        """各人使用的叠加模式"""
+        dm_code = ROLE_CODES[Role.DM]
+        dm_mode = self.global_config.dm_completion_bonus_mode.value
+        other_mode = self.global_config.other_completion_bonus_mode.value
+        return ['' if code == ROLE_CODES[Role.CP] else (dm_mode if code == dm_code else other_mode)
+                for code in roster.roles.tolist()]
+
+    def engine_messages(self, roster: RosterArrays) -> Tuple[List[List[str]], List[List[str]]]:
+        """
+        引擎产生的提示（与标量版本文案一致）
+
+        Returns:
+            (warnings, pending_confirmations)，每人一个列表
+        """
+        cfg = self.global_config
+        dm_pending = (["DM完成奖使用exclusive模式（仅发最高档）[待业务确认]"]
+                      if cfg.dm_completion_bonus_mode == CompletionBonusMode.EXCLUSIVE else [])
+        other_stack = cfg.other_completion_bonus_mode == CompletionBonusMode.STACK
+
+        orgs = self.orgs or {}
+
+        warnings, pending = [], []
+        for code, ratio, org_unit in zip(roster.roles.tolist(), roster.allocation_ratio.tolist(), roster.org_units):
+            role = ROLE_ORDER[code]
+            if role == Role.CP:
+                warnings.append([])
+                pending.append([])
+                continue
+            if role == Role.DM:
+                warnings.append([])
+                pending.append(list(dm_pending))
+            else:
+                if ratio == ratio:  # 非NaN
+                    warnings.append([f"完成奖已按个人分配比例{ratio*100:.1f}%计算"])
+                else:
+                    warnings.append(["未设置个人分配比例，显示完成奖总额"])
+                pending.append(
+                    [f"{role.value}完成奖使用stack模式（90%+100%叠加）[待业务确认]"] if other_stack else []
+                )
+            org = orgs.get(org_unit)
+            if org is not None and org.warnings:
+                warnings[-1].extend(org.warnings)
+        return warnings, pending
+
+    def calculate_batch(
+        self,
+        persons: List[PersonData],
+        skip_validation: bool = False
+    ) -> List[Tuple[BonusDetail, ValidationResult]]:
+        """批量计算（与 BonusCalculator.calculate_batch 返回格式一致）"""
+        validations = {} if skip_validation else self.validator.validate_batch(persons)
+        roster = RosterArrays.from_persons(persons, self.period.months)
+        details = self.to_details(roster, self.calculate_arrays(roster), persons)
+
+        results = []
+        for person, detail in zip(persons, details):
+            validation = validations.get(person.name, ValidationResult())
+            detail.warnings.extend(validation.warnings)
+            results.append((detail, validation))
+        return results
+
+    def to_details(
+        self,
+        roster: RosterArrays,
+        results: Dict[str, np.ndarray],
+        persons: Optional[List[PersonData]] = None
+    ) -> List[BonusDetail]:
+        """将数组结果还原为 BonusDetail 列表"""
+        scalar_fields = [
+            'incentive_total', 'completion_bonus_90', 'completion_bonus_100', 'completion_bonus_total',
+            'region_bonus_90', 'region_bonus_100', 'region_bonus_total',
+            'national_bonus_90', 'national_bonus_100', 'national_bonus_total',
+            'fixed_subsidy', 'ceo_bonus', 'grand_total', 'completion_rate', 'collection_rate',
+        ]
+        if 'incentive_immediate' in results:
+            scalar_fields += ['incentive_immediate', 'incentive_after_collection']
+        columns = {f: results[f].tolist() for f in scalar_fields}
+        monthly = results['monthly_incentives'].tolist()
+        has_incentive = results['has_incentive'].tolist()
+        ratios = roster.allocation_ratio.tolist()
+        modes = self.completion_modes(roster)
+        allocation = self.allocation_mask(roster).tolist()
+        warnings, pending = self.engine_messages(roster)
+
+        details = []
+        for i in range(len(roster)):
+            role = ROLE_ORDER[roster.roles[i]]
+            ratio = ratios[i] if ratios[i] == ratios[i] else None
+            values = {f: columns[f][i] for f in scalar_fields}
+            if not has_incentive[i] and 'incentive_immediate' in values:
+                # 常委无过程激励，不做50/50拆分
+                values['incentive_immediate'] = values['incentive_after_collection'] = None
+            detail = BonusDetail(
+                name=roster.names[i],
+                role=role,
+                region=roster.regions[i],
+                org_unit=roster.org_units[i],
+                monthly_incentives=dict(zip(self.period.months, monthly[i])) if has_incentive[i] else {},
+                completion_bonus_mode=modes[i],
+                personal_allocation_ratio=ratio if allocation[i] else None,
+                warnings=warnings[i],
+                pending_confirmations=pending[i],
+                **values
+            )
+            details.append(detail)
+        return details
+
+    def result_rows(
+        self,
+        roster: RosterArrays,
+        results: Dict[str, np.ndarray],
+        validations: List[ValidationResult]
+    ) -> List[Dict]:
+        """
+        向量化结果 -> 批量导出结果行（与 batch_io.detail_to_row(..., months=period.months) 输出一致）
+
+        Args:
+            roster: 列式人员数据
+            results: calculate_arrays(roster) 的返回值
+            validations: 与roster同序的校验结果
+        """
+        n = len(roster)
+        columns = {
+            'name': roster.names,
+            'role': roster.role_values(),
+            'region': roster.regions,
+            'org_unit': roster.org_units,
+            'completion_bonus_mode': self.completion_modes(roster),
+        }
+        monthly = results['monthly_incentives']
+        has_incentive = results['has_incentive']
+        for j, m in enumerate(self.period.months):
+            columns[f'incentive_m{m}'] = monthly[:, j].tolist()
+        for key in ('incentive_total', 'completion_bonus_90', 'completion_bonus_100', 'completion_bonus_total',
+                    'region_bonus_90', 'region_bonus_100', 'region_bonus_total',
+                    'national_bonus_90', 'national_bonus_100', 'national_bonus_total',
+                    'fixed_subsidy', 'ceo_bonus', 'grand_total', 'completion_rate', 'collection_rate'):
+            columns[key] = results[key].tolist()
+        for key in ('incentive_immediate', 'incentive_after_collection'):
+            if key in results:
+                columns[key] = [v if inc else None for v, inc in zip(results[key].tolist(), has_incentive.tolist())]
+            else:
+                columns[key] = [None] * n
+
+        columns['personal_allocation_ratio'] = [
+            r if other and r == r else None
+            for r, other in zip(roster.allocation_ratio.tolist(), self.allocation_mask(roster).tolist())
+        ]
+
+        engine_warnings, pending = self.engine_messages(roster)
+        columns['is_valid'] = [v.is_valid for v in validations]
+        columns['errors'] = [join_messages(v.errors) for v in validations]
+        columns['warnings'] = [join_messages(w + v.warnings) for w, v in zip(engine_warnings, validations)]
+        columns['pending_confirmations'] = [join_messages(p) for p in pending]
+
+        fields = result_fields(self.period.months)
+        return [dict(zip(fields, values)) for values in zip(*(columns[f] for f in fields))]
+
+
+def calculate_bonus_batch_vectorized(
+    persons: List[PersonData],
+    config: GlobalConfig = None
+) -> List[Tuple[BonusDetail, ValidationResult]]:
+    """便捷函数：向量化批量计算奖金"""
+    calculator = VectorizedCalculator(global_config=config)
+    return calculator.calculate_batch(persons)
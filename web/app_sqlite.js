@@ -2,6 +2,13 @@
 class APIClient {
     constructor() {
         this.baseURL = window.location.origin;
+        // 工作区由页面地址的 ?workspace= 指定，缺省为 default（接口不带前缀）
+        const workspace = new URLSearchParams(window.location.search).get('workspace');
+        this.apiRoot = workspace ? `/api/workspaces/${encodeURIComponent(workspace)}` : '/api';
+    }
+    
+    apiPath(path) {
+        return path.replace(/^\/api/, this.apiRoot);
     }
     
     async request(method, path, data = null) {
@@ -17,11 +24,14 @@ class APIClient {
         }
         
         try {
-            const response = await fetch(`${this.baseURL}${path}`, options);
+            const response = await fetch(`${this.baseURL}${this.apiPath(path)}`, options);
             const result = await response.json();
             
             if (!response.ok) {
-                throw new Error(result.message || `HTTP ${response.status}`);
+                const error = new Error(result.message || `HTTP ${response.status}`);
+                error.status = response.status;
+                error.data = result;
+                throw error;
             }
             
             return result;
@@ -36,6 +46,10 @@ class APIClient {
         return await this.request('GET', '/api/persons');
     }
     
+    async getPersonsChanges(since = 0) {
+        return await this.request('GET', `/api/persons/changes?since=${since}`);
+    }
+    
     async createPerson(data) {
         return await this.request('POST', '/api/persons', data);
     }
@@ -44,6 +58,11 @@ class APIClient {
         return await this.request('PUT', `/api/persons/${id}`, data);
     }
     
+    // 批量部分更新：updates 为 [{id, row_version, ...修改的字段}]
+    async patchPersons(updates, atomic = false) {
+        return await this.request('PATCH', '/api/persons', { updates, atomic });
+    }
+    
     async deletePerson(id) {
         return await this.request('DELETE', `/api/persons/${id}`);
     }
@@ -56,6 +75,43 @@ class APIClient {
     async updateParams(data) {
         return await this.request('POST', '/api/params', data);
     }
+    
+    async getParamsVersions() {
+        return await this.request('GET', '/api/params/versions');
+    }
+    
+    async activateParamsVersion(version) {
+        return await this.request('POST', `/api/params/versions/${version}/activate`);
+    }
+    
+    // 服务端汇总（group_by: role / region / org）
+    async getSummary(groupBy = 'role', paramsVersion = null) {
+        const query = paramsVersion ? `&params_version=${paramsVersion}` : '';
+        return await this.request('GET', `/api/summary?group_by=${groupBy}${query}`);
+    }
+    
+    // 服务端计算结果（按参数版本+人员版本缓存）
+    async getResults(paramsVersion = null) {
+        const query = paramsVersion ? `?params_version=${paramsVersion}` : '';
+        return await this.request('GET', `/api/results${query}`);
+    }
+    
+    // 后台任务（job: {type: 'calculate'|'export'|'sweep', ...}）
+    async createJob(job) {
+        return await this.request('POST', '/api/jobs', job);
+    }
+    
+    async getJob(id) {
+        return await this.request('GET', `/api/jobs/${id}`);
+    }
+    
+    async cancelJob(id) {
+        return await this.request('POST', `/api/jobs/${id}/cancel`);
+    }
+    
+    jobDownloadURL(id) {
+        return `${this.baseURL}${this.apiPath(`/api/jobs/${id}/download`)}`;
+    }
 }
 
 // 全局变量
@@ -85,9 +141,67 @@ const ROLE_CONFIG = {
 // ============ 初始化 ============
 document.addEventListener('DOMContentLoaded', () => {
     bindEvents();
-    loadData();
+    loadData().then(subscribeEvents);
 });
 
+// ============ 数据变更推送 ============
+let eventSource = null;
+
+function subscribeEvents() {
+    if (!window.EventSource || eventSource) return;
+    // 断线后浏览器自动重连并携带 Last-Event-ID，服务端补发错过的事件
+    eventSource = new EventSource(api.apiPath('/api/events'));
+    
+    eventSource.addEventListener('person_created', e => upsertPerson(JSON.parse(e.data).person));
+    eventSource.addEventListener('person_updated', e => upsertPerson(JSON.parse(e.data).person));
+    eventSource.addEventListener('person_deleted', e => removePerson(JSON.parse(e.data).id));
+    eventSource.addEventListener('params_version', e => {
+        const data = JSON.parse(e.data);
+        if (data.version === params.version) return;
+        params = data.params;
+        syncParamsToUI();
+        calculate();
+    });
+    // 错过的事件已无法补齐，全量刷新
+    eventSource.addEventListener('resync', () => loadData());
+    eventSource.onopen = () => updateConnectionStatus('online');
+    eventSource.onerror = () => updateConnectionStatus('loading');
+}
+
+function upsertPerson(person) {
+    if (!person) return;
+    const index = persons.findIndex(p => p.id === person.id);
+    if (index >= 0) {
+        persons[index] = person;
+    } else {
+        persons.unshift(person);  // 与服务端按创建时间倒序一致
+    }
+    calculate();
+}
+
+function removePerson(id) {
+    const index = persons.findIndex(p => p.id === id);
+    if (index < 0) return;
+    persons.splice(index, 1);
+    calculate();
+}
+
+// 增量同步游标（服务端 changes 表的 seq）
+let syncCursor = null;
+
+function applyChanges(changes, full) {
+    if (full) {
+        persons = changes.upserts;
+    } else {
+        const deleted = new Set(changes.deleted);
+        const updated = new Map(changes.upserts.map(p => [p.id, p]));
+        persons = persons.filter(p => !deleted.has(p.id) && !updated.has(p.id)).concat(changes.upserts);
+    }
+    // 与 GET /api/persons 一致：按创建时间倒序
+    persons.sort((a, b) => (b.created_at || '').localeCompare(a.created_at || '') || b.id - a.id);
+    syncCursor = changes.cursor;
+}
+
 async function loadData() {
     try {
         updateConnectionStatus('loading');
@@ -99,10 +213,10 @@ async function loadData() {
             syncParamsToUI();
         }
         
-        // 加载人员
-        const personsResult = await api.getPersons();
-        if (personsResult.status === 'success') {
-            persons = personsResult.data;
+        // 加载人员：首次全量（since=0），之后只取游标之后的变更
+        const changesResult = await api.getPersonsChanges(syncCursor || 0);
+        if (changesResult.status === 'success') {
+            applyChanges(changesResult, !syncCursor);
         }
         
         updateConnectionStatus('online');
@@ -209,7 +323,8 @@ async function syncParamsFromUI() {
 
 async function saveParams() {
     try {
-        await api.updateParams(params);
+        const result = await api.updateParams(params);
+        params.version = result.version;
         calculate();
     } catch (error) {
         console.error('保存参数失败:', error);
@@ -531,17 +646,26 @@ async function savePerson() {
     try {
         const editId = document.getElementById('edit-id').value;
         if (editId) {
-            await api.updatePerson(parseInt(editId), person);
+            const current = persons.find(p => p.id === parseInt(editId));
+            const result = await api.updatePerson(parseInt(editId), { ...person, row_version: current.row_version });
+            upsertPerson({ ...current, ...person, row_version: result.row_version });
             showToast('人员信息已更新');
         } else {
-            await api.createPerson(person);
+            const result = await api.createPerson(person);
+            upsertPerson({ ...person, id: result.id });
             showToast('人员已添加');
         }
         
         closeModal();
-        await loadData();
     } catch (error) {
         console.error('保存人员失败:', error);
+        if (error.status === 409) {
+            // 他人已修改：显示最新数据，由用户确认后重新编辑
+            upsertPerson(error.data.person);
+            closeModal();
+            showToast('该人员已被他人修改，已刷新为最新数据，请重新编辑', 'error');
+            return;
+        }
         showToast('保存失败: ' + error.message, 'error');
     }
 }
@@ -551,8 +675,8 @@ async function deletePerson(id) {
     
     try {
         await api.deletePerson(id);
+        removePerson(id);
         showToast('人员已删除');
-        await loadData();
     } catch (error) {
         console.error('删除人员失败:', error);
         showToast('删除失败: ' + error.message, 'error');
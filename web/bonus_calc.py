@@ -0,0 +1,204 @@
+"""
+奖金计算器 Web 服务 - 服务端计算
+与 app_sqlite.js 中 calculatePerson 的规则逐项一致，供服务端缓存结果使用
+
+Web 部署目录是自包含的（Dockerfile 只复制 web/），因此这里不依赖 src/ 下的计算引擎；
+修改 app_sqlite.js 中的计算规则时需同步修改本文件
+"""
+from typing import Dict, List
+
+# 岗位配置（同 app_sqlite.js ROLE_CONFIG）
+ROLE_CONFIG = {
+    'CP': {'name': '常委', 'rate': 0, 'hasRegion': True, 'hasNational': True, 'hasSubsidy': True},
+    'DM': {'name': '总经理', 'rate': 0.004, 'hasRegion': True, 'hasNational': False, 'hasSubsidy': False},
+    'VP': {'name': '副总经理', 'rate': 0.004, 'hasRegion': False, 'hasNational': False, 'hasSubsidy': False},
+    'MGR': {'name': '部门经理', 'rate': 0.01, 'hasRegion': False, 'hasNational': False, 'hasSubsidy': False},
+    'SALES_USER': {'name': '销售-用户部', 'rate': 0.02, 'hasRegion': False, 'hasNational': False, 'hasSubsidy': False},
+    'SALES_NEW': {'name': '销售-新购', 'rate': 0.03, 'hasRegion': False, 'hasNational': False, 'hasSubsidy': True},
+    'SALES_EDU': {'name': '销售-高校', 'rate': 0.03, 'hasRegion': False, 'hasNational': False, 'hasSubsidy': True},
+}
+
+# 结果中的金额字段（同 calculatePerson 返回值）
+AMOUNT_FIELDS = ['incentive', 'completionBonus90', 'completionBonus100', 'completionBonusTotal',
+                 'regionBonus', 'nationalBonus', 'subsidy', 'ceoBonus', 'total']
+
+
+def calculate_person(person: Dict, params: Dict) -> Dict:
+    """计算单人奖金（person 为 persons 表的一行，revenue 已解析为列表）"""
+    role = person['role']
+    config = ROLE_CONFIG[role]
+    result = dict(person)
+    result.update({
+        'roleName': config['name'],
+        'incentive': 0,
+        'completionBonus90': 0,
+        'completionBonus100': 0,
+        'completionBonusTotal': 0,
+        'regionBonus': 0,
+        'nationalBonus': 0,
+        'subsidy': 0,
+        'ceoBonus': person.get('ceo_bonus') or 0,
+        'total': 0,
+        'completionRate': 0,
+    })
+
+    # 产值合计
+    revenue = person.get('revenue') or []
+    total_rev = 0
+    for rev in revenue:
+        total_rev += rev or 0
+    result['totalRevenue'] = total_rev
+
+    # 分公司完成率
+    company_rev = person.get('company_revenue') or total_rev
+    target = person.get('target') or 0
+    result['completionRate'] = company_rev / target if target > 0 else 0
+
+    # 过程激励
+    if config['rate'] > 0:
+        coefficients = params['coefficients']
+        incentive = 0
+        for i, rev in enumerate(revenue[:len(coefficients)]):
+            incentive += (rev or 0) * config['rate'] * coefficients[i]
+        result['incentive'] = incentive
+
+    # 完成奖
+    if role != 'CP':
+        collection_rate = person.get('collection_rate') or 0
+        ratio = person.get('ratio') or 1
+
+        if result['completionRate'] >= 0.9 and collection_rate >= params['threshold_90']:
+            if role == 'DM':
+                result['completionBonus90'] = min(company_rev * 0.004, 40000)
+            else:
+                result['completionBonus90'] = company_rev * 0.015 * ratio
+
+        if result['completionRate'] >= 1.0 and collection_rate >= params['threshold_100']:
+            if role == 'DM':
+                result['completionBonus100'] = min(company_rev * 0.004, 40000)
+            else:
+                result['completionBonus100'] = company_rev * 0.015 * ratio
+
+        mode = params['dm_mode'] if role == 'DM' else params['other_mode']
+        if mode == 'exclusive':
+            result['completionBonusTotal'] = max(result['completionBonus90'], result['completionBonus100'])
+        else:
+            result['completionBonusTotal'] = result['completionBonus90'] + result['completionBonus100']
+
+    # 区域奖
+    if config['hasRegion']:
+        if role == 'CP':
+            if person.get('region_90'):
+                result['regionBonus'] += 30000
+            if person.get('region_100'):
+                result['regionBonus'] += 30000
+        elif role == 'DM':
+            if person.get('region_90') or person.get('region_100'):
+                result['regionBonus'] = 40000
+
+    # 全国奖
+    if config['hasNational'] and role == 'CP':
+        if person.get('national_90'):
+            result['nationalBonus'] += 40000
+        if person.get('national_100'):
+            result['nationalBonus'] += 40000
+
+    # 固定补贴
+    if role == 'CP':
+        result['subsidy'] = params['cp_subsidy']
+    elif role in ('SALES_NEW', 'SALES_EDU'):
+        result['subsidy'] = params['sales_subsidy'] * 6
+
+    # 总计
+    result['total'] = (result['incentive'] + result['completionBonusTotal']
+                       + result['regionBonus'] + result['nationalBonus']
+                       + result['subsidy'] + result['ceoBonus'])
+    return result
+
+
+def calculate_all(persons: List[Dict], params: Dict) -> List[Dict]:
+    """批量计算，顺序与输入一致"""
+    return [calculate_person(p, params) for p in persons]
+
+
+def _money(value) -> str:
+    return f"{value:,.2f}"
+
+
+def explain_person(person: Dict, params: Dict) -> Dict:
+    """
+    单人计算过程（按需推导，calculate_all 不生成）
+    
+    Returns:
+        {"result": calculate_person 的结果, "steps": [{"item", "formula", "value", "note"}]}
+        steps 逐项重演 calculate_person 的计算式，各项金额与 result 一致
+    """
+    role = person['role']
+    config = ROLE_CONFIG[role]
+    result = calculate_person(person, params)
+    steps = []
+    
+    def step(item, formula, value, note=''):
+        steps.append({'item': item, 'formula': formula, 'value': value, 'note': note})
+    
+    # 产值与完成率
+    revenue = person.get('revenue') or []
+    step('产值合计', ' + '.join(_money(rev or 0) for rev in revenue) or '未填产值', result['totalRevenue'])
+    company_rev = person.get('company_revenue') or result['totalRevenue']
+    target = person.get('target') or 0
+    if target > 0:
+        step('完成率', f"分公司产值 {_money(company_rev)} / 目标 {_money(target)}", result['completionRate'],
+             '' if person.get('company_revenue') else '未填分公司产值，取本人产值合计')
+    else:
+        step('完成率', '未填目标', result['completionRate'], '按0计')
+    
+    # 过程激励
+    if config['rate'] > 0:
+        coefficients = params['coefficients']
+        for i, rev in enumerate(revenue[:len(coefficients)]):
+            step(f"{i + 1}月过程激励", f"产值 {_money(rev or 0)} × {config['rate'] * 100:g}% × 系数 {coefficients[i]:g}",
+                 (rev or 0) * config['rate'] * coefficients[i])
+        step('过程激励小计', '各月合计', result['incentive'])
+    
+    # 完成奖
+    if role != 'CP':
+        collection_rate = person.get('collection_rate') or 0
+        ratio = person.get('ratio') or 1
+        if role == 'DM':
+            base = f"min({_money(company_rev)} × 0.4%, 40,000.00)"
+        else:
+            base = f"{_money(company_rev)} × 1.5%" + (f" × 分配比例 {ratio:g}" if ratio != 1 else '')
+        for tier, key, threshold in ((0.9, 'completionBonus90', params['threshold_90']),
+                                     (1.0, 'completionBonus100', params['threshold_100'])):
+            rate_ok = result['completionRate'] >= tier
+            collection_ok = collection_rate >= threshold
+            note = '达标' if rate_ok and collection_ok else '、'.join(
+                n for n, ok in (('完成率未达标', rate_ok), ('回款率未达标', collection_ok)) if not ok)
+            step(f"{tier * 100:g}%档完成奖",
+                 f"完成率 {result['completionRate']:.2%} ≥ {tier:.0%} 且 回款率 {collection_rate:.2%} ≥ {threshold:.0%}"
+                 f" → {base}", result[key], note)
+        mode = params['dm_mode'] if role == 'DM' else params['other_mode']
+        amounts = (_money(result['completionBonus90']), _money(result['completionBonus100']))
+        formula = f"max({', '.join(amounts)})" if mode == 'exclusive' else ' + '.join(amounts)
+        step('完成奖小计', formula, result['completionBonusTotal'], f"叠加模式 {mode}")
+    
+    # 区域/全国奖
+    def flags(*keys):
+        return '、'.join(f"{k}={'是' if person.get(k) else '否'}" for k in keys)
+    
+    if config['hasRegion']:
+        note = '90%、100%各30,000.00' if role == 'CP' else '任一达标40,000.00'
+        step('区域奖', flags('region_90', 'region_100'), result['regionBonus'], note)
+    if config['hasNational'] and role == 'CP':
+        step('全国奖', flags('national_90', 'national_100'), result['nationalBonus'], '90%、100%各40,000.00')
+    
+    # 补贴、CEO奖金
+    if role == 'CP':
+        step('固定补贴', '常委半年补贴', result['subsidy'])
+    elif role in ('SALES_NEW', 'SALES_EDU'):
+        step('固定补贴', f"{_money(params['sales_subsidy'])}/月 × 6个月", result['subsidy'])
+    step('CEO奖金', '手填金额', result['ceoBonus'])
+    
+    step('合计', ' + '.join(_money(result[k]) for k in ('incentive', 'completionBonusTotal', 'regionBonus',
+                                                        'nationalBonus', 'subsidy', 'ceoBonus')), result['total'])
+    return {'result': result, 'steps': steps}
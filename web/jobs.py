@@ -0,0 +1,514 @@
+"""
+奖金计算器 Web 服务 - 后台任务
+全公司计算、导出和参数方案对比在进程池中运行，不占用HTTP请求线程
+
+- 任务记录保存在 SQLite（jobs/jobs.db），进度、状态、结果摘要由工作进程直接写入，
+  服务重启后仍可查询历史任务
+- 并发数即进程池大小，超出的任务排队；排队数也有上限
+- 每个工作进程设置地址空间上限（RLIMIT_AS），单个任务内存失控只会让该任务失败
+- 取消：排队中的任务直接取消；运行中的任务由工作进程在更新进度时检查取消标记后自行退出
+"""
+import csv
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bonus_calc import AMOUNT_FIELDS, calculate_person
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+JOB_TYPES = ('calculate', 'export', 'sweep')
+EXPORT_FORMATS = ('csv', 'xlsx', 'parquet')
+# 同时运行的任务数（进程池大小）
+JOB_WORKERS = 2
+# 排队+运行中任务数上限，超出时拒绝提交
+MAX_PENDING_JOBS = 50
+# 单个工作进程的地址空间上限（MB）
+JOB_MEMORY_LIMIT_MB = 1024
+# 方案对比最多方案数
+MAX_SWEEP_SCENARIOS = 500
+# 进度写入间隔（人）
+PROGRESS_EVERY = 2000
+# 已结束任务及其结果文件的保留天数
+JOB_RETENTION_DAYS = 7
+
+# 导出列：(结果字段, 表头)
+EXPORT_COLUMNS = [
+    ('name', '姓名'), ('roleName', '岗位'), ('region', '区域'), ('org', '组织单元'),
+    ('totalRevenue', '产值合计'), ('completionRate', '完成率'), ('incentive', '过程激励'),
+    ('completionBonus90', '90%完成奖'), ('completionBonus100', '100%完成奖'),
+    ('completionBonusTotal', '完成奖小计'), ('regionBonus', '区域奖'), ('nationalBonus', '全国奖'),
+    ('subsidy', '固定补贴'), ('ceoBonus', 'CEO奖金'), ('total', '奖金合计'),
+]
+
+CONTENT_TYPES = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class JobCancelled(Exception):
+    """运行中的任务被取消"""
+
+
+def init_jobs_table(jobs_db: str):
+    """建表"""
+    with sqlite3.connect(jobs_db) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                workspace TEXT NOT NULL,
+                type TEXT NOT NULL,
+                options TEXT,  -- JSON
+                status TEXT NOT NULL DEFAULT 'queued',  -- queued/running/succeeded/failed/cancelled
+                progress REAL DEFAULT 0,
+                message TEXT,
+                result TEXT,  -- JSON 结果摘要
+                output_path TEXT,
+                output_format TEXT,
+                cancel_requested INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_workspace ON jobs (workspace, id)")
+        conn.commit()
+
+
+def validate_job(job_type: str, options: Dict):
+    """提交前检查任务参数，不合法时抛出 ValueError"""
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(JOB_TYPES)}")
+    if job_type == 'export':
+        fmt = options.get('format', 'xlsx')
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        if fmt == 'xlsx' and not OPENPYXL_AVAILABLE:
+            raise ValueError("openpyxl is required for xlsx export. Install it with: pip install openpyxl")
+        if fmt == 'parquet' and not PYARROW_AVAILABLE:
+            raise ValueError("pyarrow is required for parquet export. Install it with: pip install pyarrow")
+    if job_type == 'sweep':
+        scenarios = expand_scenarios(options)
+        if not scenarios:
+            raise ValueError("sweep requires 'scenarios' or 'grid'")
+        if len(scenarios) > MAX_SWEEP_SCENARIOS:
+            raise ValueError(f"too many scenarios: {len(scenarios)} (max {MAX_SWEEP_SCENARIOS})")
+
+
+def expand_scenarios(options: Dict) -> List[Dict]:
+    """
+    方案列表：scenarios 直接给出，或 grid 按参数取值做笛卡尔积
+
+        {"scenarios": [{"name": "A", "params": {"threshold_90": 0.8}}]}
+        {"grid": {"threshold_90": [0.8, 0.85], "dm_mode": ["exclusive", "stack"]}}
+    """
+    scenarios = [{"name": s.get('name') or f"#{i + 1}", "params": s.get('params', {})}
+                 for i, s in enumerate(options.get('scenarios') or [])]
+    grid = options.get('grid') or {}
+    if grid:
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            overrides = dict(zip(keys, values))
+            name = ', '.join(f"{k}={v}" for k, v in overrides.items())
+            scenarios.append({"name": name, "params": overrides})
+    return scenarios
+
+
+# ========== 工作进程 ==========
+_memory_limit_mb: Optional[int] = None  # 本工作进程的内存上限（用于错误信息）
+
+
+def _init_worker(memory_limit_mb: Optional[int]):
+    """工作进程初始化：设置地址空间上限（每个进程同一时刻只跑一个任务，即单任务上限）"""
+    global _memory_limit_mb
+    if resource is None or not memory_limit_mb:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        _memory_limit_mb = memory_limit_mb
+    except (ValueError, OSError):
+        pass  # 硬上限更低或平台不支持时保持原样
+
+
+class JobContext:
+    """工作进程内的任务状态读写"""
+
+    def __init__(self, jobs_db: str, job_id: int):
+        self.jobs_db = jobs_db
+        self.job_id = job_id
+
+    def _execute(self, sql: str, args: tuple = ()) -> int:
+        """执行一条更新，返回影响行数"""
+        with sqlite3.connect(self.jobs_db, timeout=30) as conn:
+            return conn.execute(sql, args).rowcount
+
+    def start(self) -> bool:
+        """标记开始；排队期间已被取消时返回 False"""
+        return self._execute("""
+            UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'queued' AND cancel_requested = 0
+        """, (self.job_id,)) > 0
+
+    def progress(self, progress: float, message: str = ''):
+        """写入进度并检查取消标记"""
+        updated = self._execute("""
+            UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND cancel_requested = 0
+        """, (progress, message, self.job_id))
+        if not updated:
+            raise JobCancelled()
+
+    def finish(self, status: str, message: str = '', result: Optional[Dict] = None,
+               output_path: Optional[str] = None, output_format: Optional[str] = None):
+        self._execute("""
+            UPDATE jobs SET status = ?, message = ?, result = ?, output_path = ?, output_format = ?,
+                progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, message, json.dumps(result, ensure_ascii=False) if result is not None else None,
+              output_path, output_format, status, self.job_id))
+
+
+def load_snapshot(db_path: str, params_version: Optional[int]) -> Tuple[List[Dict], Dict]:
+    """
+    从工作区数据库读取人员与参数（同一读事务内）
+
+    人员一次读完即结束事务，任务运行期间不阻塞写入
+    """
+    with sqlite3.connect(db_path, isolation_level=None, timeout=30) as conn:
+        conn.row_factory = sqlite3.Row
+        conn.execute("BEGIN")
+        try:
+            if params_version is None:
+                params_version = conn.execute("SELECT version FROM params WHERE id = 1").fetchone()[0]
+            row = conn.execute("SELECT * FROM params_versions WHERE version = ?", (params_version,)).fetchone()
+            if row is None:
+                raise ValueError(f"Params version not found: {params_version}")
+            persons_version = conn.execute(
+                "SELECT value FROM meta WHERE key = 'persons_version'").fetchone()[0]
+            persons = []
+            for person_row in conn.execute("SELECT * FROM persons ORDER BY created_at DESC"):
+                person = dict(person_row)
+                person['revenue'] = json.loads(person['revenue'] or '[]')
+                persons.append(person)
+        finally:
+            conn.execute("COMMIT")
+    params = dict(row)
+    params['coefficients'] = json.loads(params['coefficients'])
+    params['persons_version'] = persons_version
+    return persons, params
+
+
+def _iter_results(ctx: JobContext, persons: List[Dict], params: Dict,
+                  start: float = 0.0, span: float = 1.0) -> Iterator[Dict]:
+    """逐人计算，每 PROGRESS_EVERY 人写一次进度"""
+    total = len(persons)
+    for i, person in enumerate(persons):
+        if i % PROGRESS_EVERY == 0:
+            ctx.progress(start + span * i / max(total, 1), f"{i}/{total}")
+        yield calculate_person(person, params)
+
+
+def _totals(results: Iterator[Dict]) -> Dict:
+    totals = {'count': 0, **{f: 0 for f in AMOUNT_FIELDS}}
+    for r in results:
+        totals['count'] += 1
+        for f in AMOUNT_FIELDS:
+            totals[f] += r[f]
+    return totals
+
+
+def _write_json(path: str, results: Iterator[Dict]) -> Dict:
+    """逐条写出JSON数组，同时累计合计"""
+    totals = {'count': 0, **{f: 0 for f in AMOUNT_FIELDS}}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for r in results:
+            if totals['count']:
+                f.write(',\n')
+            f.write(json.dumps(r, ensure_ascii=False))
+            totals['count'] += 1
+            for field in AMOUNT_FIELDS:
+                totals[field] += r[field]
+        f.write(']\n')
+    return totals
+
+
+def _export(path: str, fmt: str, results: Iterator[Dict]) -> int:
+    """流式导出，返回行数"""
+    keys = [k for k, _ in EXPORT_COLUMNS]
+    headers = [h for _, h in EXPORT_COLUMNS]
+    count = 0
+    if fmt == 'csv':
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for r in results:
+                writer.writerow([r.get(k) for k in keys])
+                count += 1
+    elif fmt == 'xlsx':
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("奖金计算结果")
+        ws.append(headers)
+        try:
+            for r in results:
+                ws.append([r.get(k) for k in keys])
+                count += 1
+        except BaseException:
+            ws.close()  # 结束写入器，避免中途取消时残留未关闭的临时文件
+            raise
+        wb.save(path)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        batch: List[Dict] = []
+
+        def flush():
+            nonlocal writer
+            table = pa.Table.from_pylist([{k: r.get(k) for k in keys} for r in batch])
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+
+        for r in results:
+            batch.append(r)
+            count += 1
+            if len(batch) >= PROGRESS_EVERY * 5:
+                flush()
+                batch = []
+        if batch or writer is None:
+            flush()
+        writer.close()
+    return count
+
+
+def run_job(jobs_db: str, job_id: int, db_path: str, job_type: str, options: Dict, output_base: str):
+    """工作进程入口：执行任务并把状态写回 jobs 表"""
+    ctx = JobContext(jobs_db, job_id)
+    if not ctx.start():
+        return
+    output_path = None
+    try:
+        persons, params = load_snapshot(db_path, options.get('params_version'))
+        summary = {'params_version': params['version'], 'persons_version': params['persons_version']}
+
+        if job_type == 'calculate':
+            output_path, fmt = f"{output_base}.json", 'json'
+            summary['totals'] = _write_json(output_path, _iter_results(ctx, persons, params))
+
+        elif job_type == 'export':
+            fmt = options.get('format', 'xlsx')
+            output_path = f"{output_base}.{fmt}"
+            summary['rows'] = _export(output_path, fmt, _iter_results(ctx, persons, params))
+
+        else:
+            scenarios = expand_scenarios(options)
+            rows = []
+            for i, scenario in enumerate(scenarios):
+                scenario_params = {**params, **scenario['params']}
+                span = 1 / len(scenarios)
+                rows.append({**scenario, 'totals': _totals(
+                    _iter_results(ctx, persons, scenario_params, i * span, span))})
+            output_path, fmt = f"{output_base}.json", 'json'
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False)
+            summary['scenarios'] = rows
+
+        ctx.finish('succeeded', '', summary, output_path, fmt)
+    except JobCancelled:
+        _remove(output_path)
+        ctx.finish('cancelled', 'Cancelled')
+    except MemoryError:
+        _remove(output_path)
+        ctx.finish('failed', f"Memory limit exceeded ({_memory_limit_mb} MB)")
+    except Exception as e:
+        _remove(output_path)
+        ctx.finish('failed', f"{type(e).__name__}: {e}")
+
+
+def _remove(path: Optional[str]):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+# ========== 主进程调度 ==========
+class JobManager:
+    """
+    后台任务调度
+
+    进程池在首次提交任务时才创建；工作进程异常退出（如被系统杀掉）导致进程池损坏时，
+    受影响的任务记为失败，下次提交时重建进程池
+    """
+
+    def __init__(self, directory: str, workers: int = JOB_WORKERS,
+                 memory_limit_mb: Optional[int] = JOB_MEMORY_LIMIT_MB):
+        self.directory = directory
+        self.jobs_db = os.path.join(directory, 'jobs.db')
+        self.workers = workers
+        self.memory_limit_mb = memory_limit_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        init_jobs_table(self.jobs_db)
+        self._recover()
+
+    def _recover(self):
+        """启动时：上次进程中未完成的任务记为失败，清理过期任务"""
+        with sqlite3.connect(self.jobs_db) as conn:
+            conn.execute("""
+                UPDATE jobs SET status = 'failed', message = 'Interrupted by server restart',
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE status IN ('queued', 'running')
+            """)
+            expired = conn.execute("""
+                SELECT id, output_path FROM jobs
+                WHERE finished_at < datetime('now', ?)
+            """, (f'-{JOB_RETENTION_DAYS} days',)).fetchall()
+            for job_id, output_path in expired:
+                _remove(output_path)
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            conn.commit()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 服务是多线程的，fork 出的子进程可能继承被其他线程持有的锁，统一用 spawn
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(self.memory_limit_mb,)
+            )
+        return self._executor
+
+    def submit(self, workspace: str, db_path: str, job_type: str, options: Dict) -> int:
+        """
+        提交任务，返回任务id
+
+        Raises:
+            ValueError: 参数不合法
+            OverflowError: 排队任务已满
+        """
+        validate_job(job_type, options)
+        with self._lock:
+            pending = sum(1 for f in self._futures.values() if not f.done())
+            if pending >= MAX_PENDING_JOBS:
+                raise OverflowError(f"Too many pending jobs (max {MAX_PENDING_JOBS})")
+            with sqlite3.connect(self.jobs_db) as conn:
+                job_id = conn.execute("""
+                    INSERT INTO jobs (workspace, type, options) VALUES (?, ?, ?)
+                """, (workspace, job_type, json.dumps(options, ensure_ascii=False))).lastrowid
+                conn.commit()
+            args = (self.jobs_db, job_id, db_path, job_type, options,
+                    os.path.join(self.directory, f"job_{job_id}"))
+            try:
+                future = self._get_executor().submit(run_job, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                future = self._get_executor().submit(run_job, *args)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        return job_id
+
+    def _on_done(self, job_id: int, future: Future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # 工作进程自身已处理任务内的异常，这里只会是进程池层面的故障
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+            with sqlite3.connect(self.jobs_db) as conn:
+                conn.execute("""
+                    UPDATE jobs SET status = 'failed', message = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status IN ('queued', 'running')
+                """, (f"Worker process failed: {type(error).__name__}", job_id))
+                conn.commit()
+
+    def get(self, job_id: int, workspace: Optional[str] = None) -> Optional[Dict]:
+        """任务详情；指定 workspace 时只返回属于该工作区的任务"""
+        with sqlite3.connect(self.jobs_db) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (workspace is not None and row['workspace'] != workspace):
+            return None
+        return self._job_dict(row)
+
+    def list(self, workspace: str, limit: int = 50) -> List[Dict]:
+        """工作区最近的任务（新任务在前，不含结果摘要）"""
+        with sqlite3.connect(self.jobs_db) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("""
+                SELECT * FROM jobs WHERE workspace = ? ORDER BY id DESC LIMIT ?
+            """, (workspace, limit)).fetchall()
+        jobs = []
+        for row in rows:
+            job = self._job_dict(row)
+            job.pop('result')
+            jobs.append(job)
+        return jobs
+
+    def cancel(self, job_id: int) -> bool:
+        """取消任务；任务已结束时返回 False"""
+        with sqlite3.connect(self.jobs_db) as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET cancel_requested = 1
+                WHERE id = ? AND status IN ('queued', 'running')
+            """, (job_id,))
+            conn.commit()
+            if not cursor.rowcount:
+                return False
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            with sqlite3.connect(self.jobs_db) as conn:
+                conn.execute("""
+                    UPDATE jobs SET status = 'cancelled', message = 'Cancelled', finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (job_id,))
+                conn.commit()
+        return True
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _job_dict(self, row) -> Dict:
+        job = dict(row)
+        job['options'] = json.loads(job['options'] or '{}')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        job['downloadable'] = job['status'] == 'succeeded' and bool(job['output_path'])
+        job.pop('output_path')
+        return job
+
+    def output(self, job_id: int, workspace: str) -> Optional[Tuple[str, str]]:
+        """已完成任务的结果文件 (路径, 格式)"""
+        with sqlite3.connect(self.jobs_db) as conn:
+            row = conn.execute("""
+                SELECT output_path, output_format FROM jobs
+                WHERE id = ? AND workspace = ? AND status = 'succeeded'
+            """, (job_id, workspace)).fetchone()
+        if row is None or not row[0] or not os.path.exists(row[0]):
+            return None
+        return row[0], row[1]
+
@@ -0,0 +1,112 @@
+"""
+奖金计算器 Web 服务 - 结果对比
+两个参数版本（或两次结果）按人员id哈希连接，给出逐人变动、档位得失和按岗位/区域的汇总
+
+与 src/result_diff.py 口径一致，字段为 calculatePerson 的结果字段；Web 部署目录自包含，不依赖 src/
+"""
+from typing import Dict, List, Optional
+
+# 奖金项（calculatePerson 结果字段 -> 名称），total 放最后
+COMPONENTS = {
+    'incentive': '过程激励',
+    'completionBonusTotal': '完成奖',
+    'regionBonus': '区域奖',
+    'nationalBonus': '全国奖',
+    'subsidy': '固定补贴',
+    'ceoBonus': 'CEO奖金',
+    'total': '合计',
+}
+TIERS = {'completionBonus90': '完成奖90%档', 'completionBonus100': '完成奖100%档'}
+ATTRIBUTES = {'role': '岗位', 'region': '区域', 'org': '组织单元'}
+GROUP_FIELDS = ('role', 'region')
+TOLERANCE = 0.005  # 半分以内的差异视为浮点误差
+
+
+def _summary_row(group: str) -> Dict:
+    row = {'group': group, 'people': 0, 'changed': 0, 'added': 0, 'removed': 0, 'gained': 0, 'lost': 0,
+           'old_total': 0.0, 'new_total': 0.0}
+    row.update({f'delta_{f}': 0.0 for f in COMPONENTS})
+    return row
+
+
+def diff_results(old_results: List[Dict], new_results: List[Dict], limit: Optional[int] = None) -> Dict:
+    """
+    对比两次结果（calculate_all 的输出），按 id 匹配
+
+    Returns:
+        {"totals", "by_role", "by_region", "unchanged", "persons", "truncated"}，
+        persons 为有变动的人员，按合计变动绝对值降序，limit 限制条数（汇总不受影响）
+    """
+    old_index = {r['id']: r for r in old_results}
+    totals = _summary_row('全体')
+    groups = {g: {} for g in GROUP_FIELDS}
+    persons = []
+    unchanged = 0
+
+    def entry(status: str, old: Optional[Dict], new: Optional[Dict]):
+        current = new if new is not None else old
+        deltas = {f: (new[f] if new else 0) - (old[f] if old else 0) for f in COMPONENTS}
+        rows = [totals] + [groups[g].setdefault(current.get(g) or '', _summary_row(current.get(g) or ''))
+                           for g in GROUP_FIELDS]
+        for row in rows:
+            row['people'] += 1
+            if status != 'unchanged':
+                row[status] += 1
+            if deltas['total'] > TOLERANCE:
+                row['gained'] += 1
+            elif deltas['total'] < -TOLERANCE:
+                row['lost'] += 1
+            row['old_total'] += old['total'] if old else 0
+            row['new_total'] += new['total'] if new else 0
+            for f, value in deltas.items():
+                row[f'delta_{f}'] += value
+        if status == 'unchanged':
+            return
+        gained = [label for f, label in TIERS.items() if (new and new[f] > TOLERANCE) and not (old and old[f] > TOLERANCE)]
+        lost = [label for f, label in TIERS.items() if (old and old[f] > TOLERANCE) and not (new and new[f] > TOLERANCE)]
+        changes = {ATTRIBUTES[f]: [old.get(f), new.get(f)] for f in ATTRIBUTES
+                   if old and new and old.get(f) != new.get(f)}
+        persons.append({
+            'id': current['id'],
+            'name': current.get('name'),
+            'role': current.get('role'),
+            'region': current.get('region'),
+            'org': current.get('org'),
+            'status': status,
+            'old_total': old['total'] if old else None,
+            'new_total': new['total'] if new else None,
+            'delta': round(deltas['total'], 2),
+            'deltas': {f: round(v, 2) for f, v in deltas.items() if abs(v) > TOLERANCE and f != 'total'},
+            'tiers_gained': gained,
+            'tiers_lost': lost,
+            'changes': changes,
+        })
+
+    for new in new_results:
+        old = old_index.pop(new['id'], None)
+        if old is None:
+            entry('added', None, new)
+            continue
+        changed = (any(abs(new[f] - old[f]) > TOLERANCE for f in COMPONENTS)
+                   or any((new[f] > TOLERANCE) != (old[f] > TOLERANCE) for f in TIERS)
+                   or any(new.get(f) != old.get(f) for f in ATTRIBUTES))
+        if not changed:
+            unchanged += 1
+        entry('changed' if changed else 'unchanged', old, new)
+    for old in old_index.values():
+        entry('removed', old, None)
+
+    for row in [totals] + [row for g in GROUP_FIELDS for row in groups[g].values()]:
+        for f in row:
+            if isinstance(row[f], float):
+                row[f] = round(row[f], 2)
+    persons.sort(key=lambda p: -abs(p['delta']))
+    shown = persons if limit is None else persons[:limit]
+    return {
+        'totals': totals,
+        'by_role': [groups['role'][k] for k in sorted(groups['role'])],
+        'by_region': [groups['region'][k] for k in sorted(groups['region'])],
+        'unchanged': unchanged,
+        'persons': shown,
+        'truncated': len(shown) < len(persons),
+    }
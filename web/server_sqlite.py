@@ -7,27 +7,87 @@
 import http.server
 import socketserver
 import os
+import re
 import sys
 import json
 import sqlite3
 import datetime
 import urllib.parse
+import threading
+import queue
+import shutil
+from collections import OrderedDict, deque
 from http import HTTPStatus
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+from bonus_calc import ROLE_CONFIG, calculate_all, explain_person
+from jobs import JobManager, CONTENT_TYPES
+from result_diff import diff_results
+
+try:
+    import orjson  # 可选：更快的JSON编码，未安装时使用标准库 json
+except ImportError:
+    orjson = None
 
 PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 DB_FILE = os.path.join(DIRECTORY, 'bonus_data.db')
+WORKSPACE_DIR = os.path.join(DIRECTORY, 'workspaces')
+JOB_DIR = os.path.join(DIRECTORY, 'jobs')
 LOG_FILE = os.path.join(DIRECTORY, 'access.log')
 
+# SSE 心跳间隔（秒），防止代理因空闲断开连接
+EVENT_HEARTBEAT = 15
+# 每个连接一个线程，事件流连接大多处于空闲等待，用较小的线程栈降低内存占用
+THREAD_STACK_SIZE = 512 * 1024
+
+# 工作区：每个业务单元一个SQLite文件，default 即 DB_FILE
+DEFAULT_WORKSPACE = 'default'
+WORKSPACE_NAME = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# 同时保持打开（已完成建表/迁移）的工作区数
+MAX_OPEN_WORKSPACES = 64
+# 计算结果缓存的总行数上限（所有工作区共享，每行约2KB，默认约400MB），可用环境变量 BONUS_RESULT_CACHE_ROWS 调整；
+# 单个工作区的结果超过上限时仍缓存这一条（淘汰其余条目），内存上限为 max(上限, 最大工作区的结果)
+RESULT_CACHE_MAX_ROWS = int(os.environ.get('BONUS_RESULT_CACHE_ROWS', 200000))
+
+# 流式响应每攒够这么多字节发送一个分块
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 人员可编辑字段（PATCH 部分更新只接受这些字段）
+PERSON_FIELDS = ['name', 'role', 'region', 'org', 'revenue', 'company_revenue', 'target',
+                 'collection_rate', 'ratio', 'region_90', 'region_100', 'national_90',
+                 'national_100', 'ceo_bonus']
+
+# 参数快照中保存的字段（不含 version/updated_at）
+PARAM_FIELDS = ['coefficients', 'threshold_90', 'threshold_100', 'dm_mode', 'other_mode',
+                'cp_subsidy', 'sales_subsidy']
+
+def json_bytes(data: Any) -> bytes:
+    """编码为UTF-8 JSON（优先 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class PersonConflict(Exception):
+    """人员已被他人修改（row_version 不一致）"""
+    
+    def __init__(self, current: Dict):
+        super().__init__("Person was modified by another user")
+        self.current = current
+
+
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, name: str = DEFAULT_WORKSPACE):
         self.db_path = db_path
+        self.name = name  # 工作区名，用作缓存键和事件归属
         self.init_database()
     
     def init_database(self):
         """初始化数据库表"""
         with sqlite3.connect(self.db_path) as conn:
+            # WAL：流式读取人员列表期间不阻塞写入
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS persons (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,9 +106,13 @@ class DatabaseManager:
                     national_100 INTEGER DEFAULT 0,
                     ceo_bonus REAL DEFAULT 0,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    row_version INTEGER NOT NULL DEFAULT 1  -- 每次修改加1，用于乐观并发控制
                 )
             """)
+            person_columns = [row[1] for row in conn.execute("PRAGMA table_info(persons)")]
+            if 'row_version' not in person_columns:
+                conn.execute("ALTER TABLE persons ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1")
             
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS params (
@@ -70,19 +134,185 @@ class DatabaseManager:
                 VALUES (1, '[1.15, 1.15, 1.10, 1.00, 0.90, 0.85]')
             """)
             
+            # 参数历史：每次修改生成一个不可变版本，params 表(id=1)保存当前生效的版本
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS params_versions (
+                    version INTEGER PRIMARY KEY AUTOINCREMENT,
+                    coefficients TEXT,
+                    threshold_90 REAL,
+                    threshold_100 REAL,
+                    dm_mode TEXT,
+                    other_mode TEXT,
+                    cp_subsidy REAL,
+                    sales_subsidy REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(params)")]
+            if 'version' not in columns:
+                conn.execute("ALTER TABLE params ADD COLUMN version INTEGER")
+            if conn.execute("SELECT COUNT(*) FROM params_versions").fetchone()[0] == 0:
+                # 旧库升级：当前参数作为第1版
+                conn.execute("""
+                    INSERT INTO params_versions (
+                        coefficients, threshold_90, threshold_100, dm_mode, other_mode,
+                        cp_subsidy, sales_subsidy
+                    )
+                    SELECT coefficients, threshold_90, threshold_100, dm_mode, other_mode,
+                           cp_subsidy, sales_subsidy
+                    FROM params WHERE id = 1
+                """)
+                conn.execute("UPDATE params SET version = 1 WHERE id = 1")
+            
+            # 人员数据版本号：persons 表每次增删改由触发器加1，用作结果缓存的键
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('persons_version', 0)")
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS persons_version_{event.lower()}
+                    AFTER {event} ON persons
+                    BEGIN
+                        UPDATE meta SET value = value + 1 WHERE key = 'persons_version';
+                    END
+                """)
+            
+            # 变更日志：每人只保留最近一条（删除为墓碑），增量同步的游标即 seq
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    person_id INTEGER NOT NULL,
+                    op TEXT NOT NULL,  -- insert / update / delete
+                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_person ON changes (person_id)")
+            if conn.execute("SELECT COUNT(*) FROM changes").fetchone()[0] == 0:
+                # 旧库升级：已有人员记为插入，since=0 即可拿到全量
+                conn.execute("INSERT INTO changes (person_id, op) SELECT id, 'insert' FROM persons ORDER BY id")
+            for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS persons_changes_{event.lower()}
+                    AFTER {event} ON persons
+                    BEGIN
+                        DELETE FROM changes WHERE person_id = {row}.id;
+                        INSERT INTO changes (person_id, op) VALUES ({row}.id, '{event.lower()}');
+                    END
+                """)
+            
             conn.commit()
     
     def get_persons(self) -> List[Dict]:
         """获取所有人员"""
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT * FROM persons ORDER BY created_at DESC")
-            persons = []
-            for row in cursor.fetchall():
+            return self._fetch_persons(conn)
+    
+    def iter_persons(self) -> Iterator[Dict]:
+        """逐行读取所有人员（顺序同 get_persons），用于流式响应"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.row_factory = sqlite3.Row
+            for row in conn.execute("SELECT * FROM persons ORDER BY created_at DESC"):
                 person = dict(row)
                 person['revenue'] = json.loads(person['revenue'] or '[]')
-                persons.append(person)
-            return persons
+                yield person
+        finally:
+            conn.close()
+    
+    def _fetch_persons(self, conn) -> List[Dict]:
+        cursor = conn.execute("SELECT * FROM persons ORDER BY created_at DESC")
+        persons = []
+        for row in cursor.fetchall():
+            person = dict(row)
+            person['revenue'] = json.loads(person['revenue'] or '[]')
+            persons.append(person)
+        return persons
+    
+    def get_persons_snapshot(self) -> Tuple[List[Dict], int]:
+        """在同一个读事务中获取所有人员及其版本号，保证两者一致"""
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN")
+            try:
+                version = self._persons_version(conn)
+                persons = self._fetch_persons(conn)
+            finally:
+                conn.execute("COMMIT")
+            return persons, version
+    
+    def get_changes(self, since: int = 0) -> Dict:
+        """
+        获取游标 since 之后的人员变更
+        
+        同一人多次修改只返回当前数据；删除只返回id（墓碑）
+        
+        Returns:
+            {"cursor": 最新游标, "upserts": [人员], "deleted": [id]}
+        """
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN")
+            try:
+                cursor = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+                rows = conn.execute("""
+                    SELECT c.seq, c.person_id, c.op, p.*
+                    FROM changes c LEFT JOIN persons p ON p.id = c.person_id
+                    WHERE c.seq > ?
+                    ORDER BY c.seq
+                """, (since,)).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        
+        upserts, deleted = [], []
+        for row in rows:
+            if row['op'] == 'delete' or row['id'] is None:
+                deleted.append(row['person_id'])
+            else:
+                person = {key: row[key] for key in row.keys() if key not in ('seq', 'person_id', 'op')}
+                person['revenue'] = json.loads(person['revenue'] or '[]')
+                upserts.append(person)
+        return {"cursor": cursor, "upserts": upserts, "deleted": deleted}
+    
+    def get_group_stats(self, column: str) -> List[Dict]:
+        """
+        按列分组统计输入数据（column 须为受信任的列名）
+        
+        Returns:
+            [{"key", "count", "revenue_total", "company_revenue_total", "target_total",
+              "avg_collection_rate", "region_90_count", ...}]
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                SELECT
+                    COALESCE({column}, '') AS key,
+                    COUNT(*) AS count,
+                    COALESCE(SUM((SELECT SUM(value) FROM json_each(persons.revenue))), 0) AS revenue_total,
+                    COALESCE(SUM(company_revenue), 0) AS company_revenue_total,
+                    COALESCE(SUM(target), 0) AS target_total,
+                    AVG(collection_rate) AS avg_collection_rate,
+                    SUM(region_90 != 0) AS region_90_count,
+                    SUM(region_100 != 0) AS region_100_count,
+                    SUM(national_90 != 0) AS national_90_count,
+                    SUM(national_100 != 0) AS national_100_count
+                FROM persons
+                GROUP BY COALESCE({column}, '')
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_persons_version(self) -> int:
+        """获取人员数据版本号"""
+        with sqlite3.connect(self.db_path) as conn:
+            return self._persons_version(conn)
+    
+    def _persons_version(self, conn) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'persons_version'").fetchone()
+        return row[0] if row else 0
     
     def get_person(self, person_id: int) -> Dict:
         """获取单个人员"""
@@ -125,16 +355,22 @@ class DatabaseManager:
             return cursor.lastrowid
     
     def update_person(self, person_id: int, data: Dict) -> bool:
-        """更新人员"""
+        """
+        更新人员
+        
+        data 带 row_version 时按乐观并发更新：与库中版本不一致则抛出 PersonConflict；
+        不带时直接覆盖
+        """
+        expected = data.get('row_version')
         with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
+            cursor = conn.execute(f"""
                 UPDATE persons SET
                     name = ?, role = ?, region = ?, org = ?, revenue = ?,
                     company_revenue = ?, target = ?, collection_rate = ?,
                     ratio = ?, region_90 = ?, region_100 = ?,
                     national_90 = ?, national_100 = ?, ceo_bonus = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
+                    row_version = row_version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?{" AND row_version = ?" if expected is not None else ""}
             """, (
                 data.get('name', ''),
                 data.get('role', ''),
@@ -151,10 +387,82 @@ class DatabaseManager:
                 data.get('national_100', 0),
                 data.get('ceo_bonus', 0),
                 person_id
-            ))
+            ) + ((expected,) if expected is not None else ()))
             conn.commit()
+            if cursor.rowcount == 0 and expected is not None:
+                conn.row_factory = sqlite3.Row
+                current = conn.execute("SELECT * FROM persons WHERE id = ?", (person_id,)).fetchone()
+                if current:
+                    raise PersonConflict(self._person_dict(current))
             return cursor.rowcount > 0
     
+    def patch_persons(self, updates: List[Dict], atomic: bool = False) -> Dict:
+        """
+        批量部分更新，一个事务一次提交
+        
+        每行须带 id 和读取时的 row_version，只更新给出的字段；row_version 与库中不一致
+        （期间被他人修改）的行不更新，作为冲突返回当前数据。
+        atomic=True 时任一行冲突或出错则整批不更新
+        
+        Returns:
+            {"updated": [更新后的人员], "conflicts": [{"id", "row_version", "person"}],
+             "errors": [{"id", "message"}], "rolled_back": bool}
+        """
+        updated_ids, conflicts, errors = [], [], []
+        updated = []
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for update in updates:
+                    person_id = update.get('id')
+                    expected = update.get('row_version')
+                    fields = {k: v for k, v in update.items() if k not in ('id', 'row_version')}
+                    unknown = sorted(set(fields) - set(PERSON_FIELDS))
+                    if not isinstance(person_id, int) or not isinstance(expected, int):
+                        errors.append({"id": person_id, "message": "id and row_version are required"})
+                        continue
+                    if unknown:
+                        errors.append({"id": person_id, "message": f"Unknown fields: {', '.join(unknown)}"})
+                        continue
+                    
+                    assignments = ''.join(f"{key} = ?, " for key in fields)
+                    values = [json.dumps(v) if k == 'revenue' else v for k, v in fields.items()]
+                    cursor = conn.execute(f"""
+                        UPDATE persons SET {assignments}row_version = row_version + 1,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ? AND row_version = ?
+                    """, (*values, person_id, expected))
+                    if cursor.rowcount:
+                        updated_ids.append(person_id)
+                        continue
+                    current = conn.execute("SELECT * FROM persons WHERE id = ?", (person_id,)).fetchone()
+                    if current is None:
+                        errors.append({"id": person_id, "message": "Person not found"})
+                    else:
+                        conflicts.append({"id": person_id, "row_version": current['row_version'],
+                                          "person": self._person_dict(current)})
+                
+                rolled_back = atomic and bool(conflicts or errors)
+                if rolled_back:
+                    conn.execute("ROLLBACK")
+                else:
+                    if updated_ids:
+                        rows = conn.execute("""
+                            SELECT * FROM persons WHERE id IN (SELECT value FROM json_each(?))
+                        """, (json.dumps(updated_ids),)).fetchall()
+                        updated = [self._person_dict(row) for row in rows]
+                    conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return {"updated": updated, "conflicts": conflicts, "errors": errors, "rolled_back": rolled_back}
+    
+    def _person_dict(self, row) -> Dict:
+        person = dict(row)
+        person['revenue'] = json.loads(person['revenue'] or '[]')
+        return person
+    
     def delete_person(self, person_id: int) -> bool:
         """删除人员"""
         with sqlite3.connect(self.db_path) as conn:
@@ -174,26 +482,86 @@ class DatabaseManager:
                 return params
             return self.get_default_params()
     
-    def update_params(self, data: Dict) -> bool:
-        """更新参数配置"""
+    def update_params(self, data: Dict) -> int:
+        """
+        更新参数配置：生成新的参数版本并设为当前版本
+        
+        与当前版本内容相同时不生成新版本
+        
+        Returns:
+            当前生效的版本号
+        """
+        values = self.normalize_params(data)
         with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            current = conn.execute("SELECT * FROM params WHERE id = 1").fetchone()
+            if current and current['version'] is not None and self._row_values(current) == values:
+                return current['version']
+            
             cursor = conn.execute("""
-                UPDATE params SET
-                    coefficients = ?, threshold_90 = ?, threshold_100 = ?,
-                    dm_mode = ?, other_mode = ?, cp_subsidy = ?,
-                    sales_subsidy = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = 1
-            """, (
-                json.dumps(data.get('coefficients', [1.15, 1.15, 1.10, 1.00, 0.90, 0.85])),
-                data.get('threshold_90', 0.85),
-                data.get('threshold_100', 0.90),
-                data.get('dm_mode', 'exclusive'),
-                data.get('other_mode', 'stack'),
-                data.get('cp_subsidy', 60000),
-                data.get('sales_subsidy', 800)
-            ))
+                INSERT INTO params_versions (
+                    coefficients, threshold_90, threshold_100, dm_mode, other_mode,
+                    cp_subsidy, sales_subsidy
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, self._values_tuple(values))
+            version = cursor.lastrowid
+            self._set_current_params(conn, values, version)
             conn.commit()
-            return cursor.rowcount > 0
+            return version
+    
+    def get_params_versions(self) -> List[Dict]:
+        """获取参数历史版本（新版本在前）"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute("SELECT * FROM params_versions ORDER BY version DESC")
+            return [self._version_dict(row) for row in cursor.fetchall()]
+    
+    def get_params_version(self, version: int) -> Optional[Dict]:
+        """获取指定版本的参数"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM params_versions WHERE version = ?", (version,)).fetchone()
+            return self._version_dict(row) if row else None
+    
+    def activate_params_version(self, version: int) -> bool:
+        """切换当前参数到已有版本（不生成新版本）"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM params_versions WHERE version = ?", (version,)).fetchone()
+            if not row:
+                return False
+            self._set_current_params(conn, self._row_values(row), version)
+            conn.commit()
+            return True
+    
+    def normalize_params(self, data: Dict) -> Dict:
+        """补齐默认值，返回参数快照字段"""
+        defaults = self.get_default_params()
+        return {key: data.get(key, defaults[key]) for key in PARAM_FIELDS}
+    
+    def _row_values(self, row) -> Dict:
+        values = {key: row[key] for key in PARAM_FIELDS}
+        values['coefficients'] = json.loads(values['coefficients'])
+        return values
+    
+    def _values_tuple(self, values: Dict) -> tuple:
+        return tuple(json.dumps(values[key]) if key == 'coefficients' else values[key]
+                     for key in PARAM_FIELDS)
+    
+    def _version_dict(self, row) -> Dict:
+        params = self._row_values(row)
+        params['version'] = row['version']
+        params['created_at'] = row['created_at']
+        return params
+    
+    def _set_current_params(self, conn, values: Dict, version: int):
+        conn.execute("""
+            UPDATE params SET
+                coefficients = ?, threshold_90 = ?, threshold_100 = ?,
+                dm_mode = ?, other_mode = ?, cp_subsidy = ?,
+                sales_subsidy = ?, version = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = 1
+        """, self._values_tuple(values) + (version,))
     
     def get_default_params(self) -> Dict:
         """获取默认参数"""
@@ -207,6 +575,308 @@ class DatabaseManager:
             'sales_subsidy': 800
         }
 
+class ResultCache:
+    """
+    计算结果缓存（LRU），键以 (工作区, 参数版本, 人员数据版本) 开头
+    
+    参数版本和人员版本都只增不改，同一个键对应的结果永远不变，无需失效处理；
+    在历史参数版本之间切换时直接命中缓存。
+    所有工作区共用一个缓存，条目数和总权重（weigh 计算，如结果行数）都有上限，
+    工作区再多内存占用也有界；单条超过权重上限时只保留这一条（其余全部淘汰），
+    超大工作区连续查询仍能命中，内存不超过 max(权重上限, 该条权重)
+    """
+    
+    def __init__(self, max_entries: int = 32, max_weight: Optional[int] = None, weigh=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigh = weigh or (lambda value: 1)
+        self._entries: "OrderedDict[tuple, Tuple[Any, int]]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.oversized = 0  # 超过权重上限、单独缓存的次数
+    
+    def get(self, key: tuple) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: tuple, results: Any):
+        weight = self.weigh(results)
+        with self._lock:
+            if self.max_weight is not None and weight > self.max_weight:
+                self.oversized += 1
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            self._entries[key] = (results, weight)
+            self._weight += weight
+            # 最新一条始终保留（超过权重上限时淘汰到只剩它）
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or (
+                    self.max_weight is not None and self._weight > self.max_weight)):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._weight -= evicted
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "weight": self._weight, "max_weight": self.max_weight,
+                    "hits": self.hits, "misses": self.misses, "oversized": self.oversized}
+
+
+RESULT_CACHE = ResultCache(max_entries=256, max_weight=RESULT_CACHE_MAX_ROWS, weigh=len)
+SUMMARY_CACHE = ResultCache(max_entries=256)
+
+
+class WorkspaceManager:
+    """
+    工作区管理：一个服务进程同时服务多个业务单元的名单
+    
+    每个工作区一个SQLite文件（default 为原 bonus_data.db，其余在 workspaces/ 目录下），
+    数据、参数版本、变更游标互相隔离。打开过的工作区按 LRU 保留 DatabaseManager，
+    建表/迁移只在打开时执行一次；超过 max_open 时淘汰最久未用的，下次访问再打开
+    """
+    
+    def __init__(self, default_path: str, directory: str, max_open: int = MAX_OPEN_WORKSPACES):
+        self.default_path = default_path
+        self.directory = directory
+        self.max_open = max_open
+        self._open: "OrderedDict[str, DatabaseManager]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def path_for(self, name: str) -> str:
+        if name == DEFAULT_WORKSPACE:
+            return self.default_path
+        if not WORKSPACE_NAME.match(name):
+            raise ValueError("Invalid workspace name (letters, digits, '-' and '_', up to 64 chars)")
+        return os.path.join(self.directory, f"{name}.db")
+    
+    def exists(self, name: str) -> bool:
+        return name == DEFAULT_WORKSPACE or os.path.exists(self.path_for(name))
+    
+    def get(self, name: str = DEFAULT_WORKSPACE) -> Optional[DatabaseManager]:
+        """获取工作区数据库；工作区不存在时返回 None"""
+        with self._lock:
+            db = self._open.get(name)
+            if db is not None:
+                self._open.move_to_end(name)
+                return db
+            if not self.exists(name):
+                return None
+            return self._open_locked(name)
+    
+    def create(self, name: str) -> bool:
+        """创建工作区，已存在时返回 False"""
+        with self._lock:
+            if self.exists(name):
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            self._open_locked(name)
+            return True
+    
+    def list(self) -> List[Dict]:
+        """所有工作区（default 在前）"""
+        names = [DEFAULT_WORKSPACE]
+        if os.path.isdir(self.directory):
+            names += sorted(f[:-3] for f in os.listdir(self.directory)
+                            if f.endswith('.db') and WORKSPACE_NAME.match(f[:-3]) and f[:-3] != DEFAULT_WORKSPACE)
+        with self._lock:
+            return [{"name": name, "open": name in self._open} for name in names]
+    
+    def _open_locked(self, name: str) -> DatabaseManager:
+        db = DatabaseManager(self.path_for(name), name)
+        self._open[name] = db
+        while len(self._open) > self.max_open:
+            self._open.popitem(last=False)
+        return db
+
+
+def split_workspace(path: str) -> Tuple[str, str]:
+    """/api/workspaces/{name}/xxx -> (name, /api/xxx)；不带前缀的路径属于 default 工作区"""
+    parts = path.split('/', 4)
+    if len(parts) >= 5 and parts[1:3] == ['api', 'workspaces'] and parts[4]:
+        return parts[3], '/api/' + parts[4]
+    return DEFAULT_WORKSPACE, path
+
+# 汇总维度 -> persons 表列名
+SUMMARY_GROUPS = {'role': 'role', 'region': 'region', 'org': 'org'}
+# 汇总的奖金组成（calculatePerson 结果字段）
+SUMMARY_AMOUNTS = ['incentive', 'completionBonusTotal', 'regionBonus', 'nationalBonus',
+                   'subsidy', 'ceoBonus', 'total']
+
+
+def get_results(db: DatabaseManager, params_version: Optional[int] = None) -> Optional[Dict]:
+    """
+    获取指定参数版本（默认当前版本）下全体人员的计算结果
+    
+    Returns:
+        {"params_version", "persons_version", "cached", "results"}；参数版本不存在时返回 None
+    """
+    if params_version is None:
+        params_version = db.get_params()['version']
+    
+    persons_version = db.get_persons_version()
+    results = RESULT_CACHE.get((db.name, params_version, persons_version))
+    cached = results is not None
+    if not cached:
+        params = db.get_params_version(params_version)
+        if params is None:
+            return None
+        persons, persons_version = db.get_persons_snapshot()
+        results = calculate_all(persons, params)
+        RESULT_CACHE.put((db.name, params_version, persons_version), results)
+    
+    return {
+        "params_version": params_version,
+        "persons_version": persons_version,
+        "cached": cached,
+        "results": results
+    }
+
+
+class EventBroker:
+    """
+    数据变更事件广播（Server-Sent Events）
+    
+    事件带自增id并保留最近 history 条，客户端断线重连时携带 Last-Event-ID 即可补齐错过的事件；
+    错过的事件已不在历史中，或客户端消费过慢导致队列溢出时，发送 resync 事件要求其全量刷新。
+    事件id在所有工作区间全局递增，订阅者只收到所属工作区的事件
+    """
+    
+    def __init__(self, history: int = 1000, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._history: deque = deque(maxlen=history)  # (工作区, 事件)
+        self._subscribers: List["EventSubscriber"] = []
+        self._lock = threading.Lock()
+        self._last_id = 0
+    
+    def publish(self, event_type: str, data: Dict, workspace: str = DEFAULT_WORKSPACE) -> int:
+        """广播事件，返回事件id"""
+        with self._lock:
+            self._last_id += 1
+            event = (self._last_id, event_type, json.dumps(data, ensure_ascii=False))
+            self._history.append((workspace, event))
+            subscribers = [s for s in self._subscribers if s.workspace == workspace]
+        for subscriber in subscribers:
+            subscriber.push(event)
+        return event[0]
+    
+    def subscribe(self, last_event_id: Optional[int] = None,
+                  workspace: str = DEFAULT_WORKSPACE) -> "EventSubscriber":
+        """订阅事件；last_event_id 之后的历史事件会先放入队列"""
+        subscriber = EventSubscriber(self.queue_size, workspace)
+        with self._lock:
+            if last_event_id is not None and last_event_id > self._last_id:
+                # 服务重启后事件id从头计数，客户端持有的id已无意义
+                subscriber.overflowed = True
+            elif last_event_id is not None and last_event_id < self._last_id:
+                # 连续性按全局id判断，再只补发本工作区的事件
+                missed = [(ws, e) for ws, e in self._history if e[0] > last_event_id]
+                if not missed or missed[0][1][0] != last_event_id + 1:
+                    subscriber.overflowed = True
+                for ws, event in missed:
+                    if ws == workspace:
+                        subscriber.push(event)
+            self._subscribers.append(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: "EventSubscriber"):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+    
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+class EventSubscriber:
+    """单个事件流连接的待发送队列"""
+    
+    def __init__(self, queue_size: int, workspace: str = DEFAULT_WORKSPACE):
+        self.queue: "queue.Queue[Tuple[int, str, str]]" = queue.Queue(maxsize=queue_size)
+        self.workspace = workspace
+        self.overflowed = False
+    
+    def push(self, event: Tuple[int, str, str]):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # 客户端跟不上：丢弃积压，改为通知其全量刷新
+            self.overflowed = True
+            with self.queue.mutex:
+                self.queue.queue.clear()
+
+
+EVENTS = EventBroker()
+
+
+def get_summary(db: DatabaseManager, group_by: str = 'role',
+                params_version: Optional[int] = None) -> Optional[Dict]:
+    """
+    按岗位/区域/组织单元汇总
+    
+    人数、产值、目标、回款率、区域/全国完成标记等输入侧统计在SQLite中聚合；
+    奖金组成取自 get_results 的缓存结果。汇总本身也按 (工作区, 参数版本, 人员版本, 维度) 缓存，
+    数据未变时看板加载与人数无关
+    
+    Returns:
+        {"params_version", "persons_version", "cached", "group_by", "totals", "groups"}；
+        参数版本不存在时返回 None
+    """
+    if group_by not in SUMMARY_GROUPS:
+        raise ValueError(f"group_by must be one of: {', '.join(SUMMARY_GROUPS)}")
+    if params_version is None:
+        params_version = db.get_params()['version']
+    
+    key = (db.name, params_version, db.get_persons_version(), group_by)
+    summary = SUMMARY_CACHE.get(key)
+    if summary is not None:
+        return {**summary, "cached": True}
+    
+    computed = get_results(db, params_version)
+    if computed is None:
+        return None
+    
+    groups = {}
+    for stats in db.get_group_stats(SUMMARY_GROUPS[group_by]):
+        if group_by == 'role':
+            stats['name'] = ROLE_CONFIG.get(stats['key'], {}).get('name', stats['key'])
+        stats.update({field: 0 for field in SUMMARY_AMOUNTS})
+        groups[stats['key']] = stats
+    # 统计读取期间人员数据有变化时，SQL统计与缓存结果可能不是同一版本，本次不缓存
+    consistent = db.get_persons_version() == computed['persons_version']
+    totals = {'count': 0, **{field: 0 for field in SUMMARY_AMOUNTS}}
+    column = SUMMARY_GROUPS[group_by]
+    for r in computed['results']:
+        group = groups.get(r.get(column) or '')
+        for field in SUMMARY_AMOUNTS:
+            totals[field] += r[field]
+            if group is not None:
+                group[field] += r[field]
+        totals['count'] += 1
+    for group in groups.values():
+        group['average'] = group['total'] / group['count'] if group['count'] else 0
+    totals['average'] = totals['total'] / totals['count'] if totals['count'] else 0
+    
+    summary = {
+        "params_version": computed['params_version'],
+        "persons_version": computed['persons_version'],
+        "group_by": group_by,
+        "totals": totals,
+        "groups": sorted(groups.values(), key=lambda g: g['total'], reverse=True)
+    }
+    if consistent:
+        SUMMARY_CACHE.put((db.name, params_version, computed['persons_version'], group_by), summary)
+    return {**summary, "cached": False}
+
+
 def log_request(client_ip, method, path, user_agent, referer="", status_code=200):
     """记录详细的访问日志"""
     log_entry = {
@@ -247,8 +917,14 @@ def get_device_type(user_agent):
         return "🖥️ Unknown"
 
 class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
+    workspaces = None  # 所有请求共享的 WorkspaceManager
+    jobs = None  # 后台任务 JobManager（服务启动时创建；未启动服务直接使用处理器时首次请求创建）
+    _jobs_lock = threading.Lock()  # 两个并发的首次请求不能各建一个 JobManager（后建的会把前者的任务记为中断）
+    db = None  # 当前请求所属工作区的 DatabaseManager（由 resolve_workspace 设置）
+    
     def __init__(self, *args, **kwargs):
-        self.db = DatabaseManager(DB_FILE)
+        if BonusAPIHandler.workspaces is None:
+            BonusAPIHandler.workspaces = WorkspaceManager(DB_FILE, WORKSPACE_DIR)
         super().__init__(*args, directory=DIRECTORY, **kwargs)
     
     def log_message(self, format, *args):
@@ -264,6 +940,12 @@ class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
         parsed_path = urllib.parse.urlparse(self.path)
         path = parsed_path.path
         
+        if split_workspace(path)[1] == '/api/events':
+            log_request(client_ip, "GET", self.path, user_agent, referer)
+            if self.resolve_workspace(path):
+                self.handle_event_stream()
+            return
+        
         if path.startswith('/api/'):
             self.handle_api_request('GET', path, parsed_path.query)
         else:
@@ -304,6 +986,21 @@ class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
         
         log_request(client_ip, "PUT", self.path, user_agent, "", 200)
     
+    def do_PATCH(self):
+        """处理PATCH请求"""
+        client_ip = self.get_client_ip()
+        user_agent = self.headers.get('User-Agent', '')
+        
+        parsed_path = urllib.parse.urlparse(self.path)
+        path = parsed_path.path
+        
+        if path.startswith('/api/'):
+            content_length = int(self.headers.get('Content-Length', 0))
+            patch_data = self.rfile.read(content_length).decode('utf-8')
+            self.handle_api_request('PATCH', path, patch_data)
+        
+        log_request(client_ip, "PATCH", self.path, user_agent, "", 200)
+    
     def do_DELETE(self):
         """处理DELETE请求"""
         client_ip = self.get_client_ip()
@@ -317,17 +1014,96 @@ class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
         
         log_request(client_ip, "DELETE", self.path, user_agent, "", 200)
     
+    def resolve_workspace(self, path: str) -> Optional[str]:
+        """
+        按路径前缀选定工作区数据库（设置 self.db），返回去掉前缀后的路径
+        
+        工作区不存在或名称无效时直接发送错误响应并返回 None
+        """
+        name, path = split_workspace(path)
+        try:
+            db = self.workspaces.get(name)
+        except ValueError as e:
+            self.send_json_response({"status": "error", "message": str(e)}, 400)
+            return None
+        if db is None:
+            self.send_json_response({"status": "error", "message": "Workspace not found"}, 404)
+            return None
+        self.db = db
+        return path
+    
     def handle_api_request(self, method: str, path: str, data: str):
         """处理API请求"""
         try:
+            if path == '/api/workspaces':
+                if method == 'GET':
+                    self.send_json_response({"status": "success", "data": self.workspaces.list()})
+                elif method == 'POST':
+                    name = (json.loads(data) if data else {}).get('name', '')
+                    try:
+                        created = self.workspaces.create(name)
+                    except ValueError as e:
+                        self.send_json_response({"status": "error", "message": str(e)}, 400)
+                        return
+                    if created:
+                        self.send_json_response({"status": "success", "name": name}, 201)
+                    else:
+                        self.send_json_response({"status": "error", "message": "Workspace already exists"}, 409)
+                return
+            
+            path = self.resolve_workspace(path)
+            if path is None:
+                return
+            
             if path == '/api/persons':
                 if method == 'GET':
-                    persons = self.db.get_persons()
-                    self.send_json_response({"status": "success", "data": persons})
+                    self.send_json_stream({"status": "success"}, "data", self.db.iter_persons())
                 elif method == 'POST':
                     post_data = json.loads(data) if data else {}
                     person_id = self.db.create_person(post_data)
+                    self.publish_person_event('person_created', person_id)
                     self.send_json_response({"status": "success", "id": person_id})
+                elif method == 'PATCH':
+                    patch_data = json.loads(data) if data else {}
+                    updates = patch_data.get('updates')
+                    if not isinstance(updates, list):
+                        self.send_json_response({"status": "error", "message": "'updates' must be a list"}, 400)
+                        return
+                    result = self.db.patch_persons(updates, atomic=bool(patch_data.get('atomic')))
+                    if result['updated']:
+                        persons_version = self.db.get_persons_version()
+                        for person in result['updated']:
+                            EVENTS.publish('person_updated', {"id": person['id'], "persons_version": persons_version,
+                                                              "person": person}, self.db.name)
+                    if result['rolled_back']:
+                        self.send_json_response({"status": "conflict", **result}, 409)
+                    else:
+                        status = "success" if not (result['conflicts'] or result['errors']) else "partial"
+                        self.send_json_response({"status": status, **result})
+            
+            elif path == '/api/persons/changes':
+                if method == 'GET':
+                    query = urllib.parse.parse_qs(data)
+                    since = int(query.get('since', ['0'])[0] or 0)
+                    changes = self.db.get_changes(since)
+                    self.send_json_response({"status": "success", **changes})
+            
+            elif path.startswith('/api/persons/') and path.endswith('/explain'):
+                if method == 'GET':
+                    person_id = int(path.split('/')[-2])
+                    query = urllib.parse.parse_qs(data)
+                    version = int(query['params_version'][0]) if 'params_version' in query else None
+                    person = self.db.get_person(person_id)
+                    params = self.db.get_params_version(version) if version is not None else self.db.get_params()
+                    if person is None:
+                        self.send_json_response({"status": "error", "message": "Person not found"}, 404)
+                    elif params is None:
+                        self.send_json_response({"status": "error", "message": "Params version not found"}, 404)
+                    else:
+                        self.send_json_response({"status": "success", "params_version": params.get('version'),
+                                                 "data": explain_person(person, params)})
+                else:
+                    self.send_json_response({"status": "error", "message": "API endpoint not found"}, 404)
             
             elif path.startswith('/api/persons/'):
                 person_id = int(path.split('/')[-1])
@@ -339,14 +1115,21 @@ class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
                         self.send_json_response({"status": "error", "message": "Person not found"}, 404)
                 elif method == 'PUT':
                     put_data = json.loads(data) if data else {}
-                    success = self.db.update_person(person_id, put_data)
+                    try:
+                        success = self.db.update_person(person_id, put_data)
+                    except PersonConflict as e:
+                        self.send_json_response({"status": "conflict", "message": str(e), "person": e.current}, 409)
+                        return
                     if success:
-                        self.send_json_response({"status": "success"})
+                        person = self.publish_person_event('person_updated', person_id)
+                        self.send_json_response({"status": "success",
+                                                 "row_version": person['row_version'] if person else None})
                     else:
                         self.send_json_response({"status": "error", "message": "Person not found"}, 404)
                 elif method == 'DELETE':
                     success = self.db.delete_person(person_id)
                     if success:
+                        self.publish_person_event('person_deleted', person_id)
                         self.send_json_response({"status": "success"})
                     else:
                         self.send_json_response({"status": "error", "message": "Person not found"}, 404)
@@ -357,8 +1140,77 @@ class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_json_response({"status": "success", "data": params})
                 elif method == 'POST':
                     params_data = json.loads(data) if data else {}
-                    success = self.db.update_params(params_data)
-                    self.send_json_response({"status": "success" if success else "error"})
+                    version = self.db.update_params(params_data)
+                    self.publish_params_event()
+                    self.send_json_response({"status": "success", "version": version})
+            
+            elif path == '/api/params/versions':
+                if method == 'GET':
+                    versions = self.db.get_params_versions()
+                    self.send_json_response({"status": "success", "data": versions})
+            
+            elif path.startswith('/api/params/versions/'):
+                parts = path.split('/')
+                version = int(parts[4])
+                if method == 'GET' and len(parts) == 5:
+                    params = self.db.get_params_version(version)
+                    if params:
+                        self.send_json_response({"status": "success", "data": params})
+                    else:
+                        self.send_json_response({"status": "error", "message": "Params version not found"}, 404)
+                elif method == 'POST' and parts[5:] == ['activate']:
+                    if self.db.activate_params_version(version):
+                        self.publish_params_event()
+                        self.send_json_response({"status": "success", "version": version})
+                    else:
+                        self.send_json_response({"status": "error", "message": "Params version not found"}, 404)
+                else:
+                    self.send_json_response({"status": "error", "message": "API endpoint not found"}, 404)
+            
+            elif path == '/api/results':
+                if method == 'GET':
+                    query = urllib.parse.parse_qs(data)
+                    version = int(query['params_version'][0]) if 'params_version' in query else None
+                    result = get_results(self.db, version)
+                    if result:
+                        results = result.pop('results')
+                        self.send_json_stream({"status": "success", **result}, "results", results)
+                    else:
+                        self.send_json_response({"status": "error", "message": "Params version not found"}, 404)
+            
+            elif path == '/api/results/diff':
+                if method == 'GET':
+                    query = urllib.parse.parse_qs(data)
+                    if 'from' not in query:
+                        self.send_json_response({"status": "error", "message": "Missing 'from' params version"}, 400)
+                        return
+                    old = get_results(self.db, int(query['from'][0]))
+                    new = get_results(self.db, int(query['to'][0]) if 'to' in query else None)
+                    limit = int(query['limit'][0]) if 'limit' in query else 100
+                    if old is None or new is None:
+                        self.send_json_response({"status": "error", "message": "Params version not found"}, 404)
+                    else:
+                        diff = diff_results(old['results'], new['results'], limit)
+                        self.send_json_response({"status": "success", "from": old['params_version'],
+                                                 "to": new['params_version'], "data": diff})
+            
+            elif path == '/api/jobs' or path.startswith('/api/jobs/'):
+                self.handle_jobs_request(method, path, data)
+            
+            elif path == '/api/summary':
+                if method == 'GET':
+                    query = urllib.parse.parse_qs(data)
+                    group_by = query.get('group_by', ['role'])[0]
+                    version = int(query['params_version'][0]) if 'params_version' in query else None
+                    try:
+                        summary = get_summary(self.db, group_by, version)
+                    except ValueError as e:
+                        self.send_json_response({"status": "error", "message": str(e)}, 400)
+                        return
+                    if summary:
+                        self.send_json_response({"status": "success", **summary})
+                    else:
+                        self.send_json_response({"status": "error", "message": "Params version not found"}, 404)
             
             else:
                 self.send_json_response({"status": "error", "message": "API endpoint not found"}, 404)
@@ -367,14 +1219,175 @@ class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
             print(f"API Error: {e}")
             self.send_json_response({"status": "error", "message": str(e)}, 500)
     
+    def handle_jobs_request(self, method: str, path: str, data: str):
+        """
+        后台任务接口
+        
+        POST /api/jobs                  提交 {"type": "calculate"|"export"|"sweep", ...}
+        GET  /api/jobs                  本工作区最近的任务
+        GET  /api/jobs/{id}             进度/状态/结果摘要
+        POST /api/jobs/{id}/cancel      取消（DELETE /api/jobs/{id} 同）
+        GET  /api/jobs/{id}/download    下载结果文件
+        """
+        with BonusAPIHandler._jobs_lock:
+            if BonusAPIHandler.jobs is None:
+                BonusAPIHandler.jobs = JobManager(JOB_DIR)
+        jobs = BonusAPIHandler.jobs
+        parts = path.split('/')
+        
+        if len(parts) == 3:
+            if method == 'GET':
+                self.send_json_response({"status": "success", "data": jobs.list(self.db.name)})
+            elif method == 'POST':
+                options = json.loads(data) if data else {}
+                job_type = options.pop('type', '')
+                try:
+                    job_id = jobs.submit(self.db.name, self.db.db_path, job_type, options)
+                except ValueError as e:
+                    self.send_json_response({"status": "error", "message": str(e)}, 400)
+                    return
+                except OverflowError as e:
+                    self.send_json_response({"status": "error", "message": str(e)}, 429)
+                    return
+                self.send_json_response({"status": "success", "id": job_id}, 202)
+            return
+        
+        job_id = int(parts[3])
+        job = jobs.get(job_id, self.db.name)
+        if job is None:
+            self.send_json_response({"status": "error", "message": "Job not found"}, 404)
+        elif method == 'GET' and len(parts) == 4:
+            self.send_json_response({"status": "success", "data": job})
+        elif (method == 'DELETE' and len(parts) == 4) or (method == 'POST' and parts[4:] == ['cancel']):
+            if jobs.cancel(job_id):
+                self.send_json_response({"status": "success"})
+            else:
+                self.send_json_response({"status": "error", "message": f"Job already {job['status']}"}, 409)
+        elif method == 'GET' and parts[4:] == ['download']:
+            output = jobs.output(job_id, self.db.name)
+            if output is None:
+                self.send_json_response({"status": "error", "message": "Job result not available"}, 404)
+            else:
+                self.send_file_response(output[0], CONTENT_TYPES[output[1]],
+                                        f"bonus_job_{job_id}.{output[1]}")
+        else:
+            self.send_json_response({"status": "error", "message": "API endpoint not found"}, 404)
+    
+    def publish_person_event(self, event_type: str, person_id: int) -> Optional[Dict]:
+        """广播人员变更（删除事件只带id），返回广播的人员数据"""
+        data = {"id": person_id, "persons_version": self.db.get_persons_version()}
+        if event_type != 'person_deleted':
+            data["person"] = self.db.get_person(person_id)
+        EVENTS.publish(event_type, data, self.db.name)
+        return data.get("person")
+    
+    def publish_params_event(self):
+        """广播当前参数版本"""
+        params = self.db.get_params()
+        EVENTS.publish('params_version', {"version": params.get('version'), "params": params}, self.db.name)
+    
+    def handle_event_stream(self):
+        """GET /api/events：Server-Sent Events 长连接"""
+        last_event_id = self.headers.get('Last-Event-ID')
+        if last_event_id is None:
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            last_event_id = query.get('last_event_id', [None])[0]
+        try:
+            last_id = int(last_event_id) if last_event_id else None
+            invalid_id = False
+        except ValueError:
+            last_id, invalid_id = None, True
+        subscriber = EVENTS.subscribe(last_id, self.db.name)
+        if invalid_id:
+            subscriber.overflowed = True  # 无法识别的事件id：按断档处理，通知客户端重新同步
+        
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('X-Accel-Buffering', 'no')  # 关闭nginx缓冲
+        self.end_headers()
+        try:
+            self.wfile.write(b"retry: 3000\n\n")
+            self.wfile.flush()
+            while True:
+                if subscriber.overflowed:
+                    subscriber.overflowed = False
+                    self.wfile.write(b"event: resync\ndata: {}\n\n")
+                    self.wfile.flush()
+                try:
+                    event_id, event_type, payload = subscriber.queue.get(timeout=EVENT_HEARTBEAT)
+                except queue.Empty:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    self.wfile.write(f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+        finally:
+            EVENTS.unsubscribe(subscriber)
+    
     def send_json_response(self, data: Dict, status_code: int = 200):
         """发送JSON响应"""
-        response = json.dumps(data, ensure_ascii=False)
+        response = json_bytes(data)
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(response.encode('utf-8'))))
+        self.send_header('Content-Length', str(len(response)))
         self.end_headers()
-        self.wfile.write(response.encode('utf-8'))
+        self.wfile.write(response)
+    
+    def send_json_stream(self, head: Dict, key: str, rows: Iterable[Dict], status_code: int = 200):
+        """
+        流式发送 {**head, key: [rows...]}：逐行编码，攒够 STREAM_CHUNK_SIZE 写出一块
+        
+        HTTP/1.1 客户端使用分块传输（Transfer-Encoding: chunked），HTTP/1.0 客户端以关闭连接结束响应；
+        内存占用与行数无关。响应发出后出错无法再改状态码，只能断开连接，客户端会收到不完整的JSON
+        """
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            self.protocol_version = 'HTTP/1.1'  # 仅本响应；发送完即关闭连接，不影响其他响应
+        self.close_connection = True
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        
+        def write(data: bytes):
+            if chunked:
+                self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+            else:
+                self.wfile.write(data)
+        
+        buffer = bytearray(json_bytes(head)[:-1])
+        buffer += b', "' if head else b'{"'
+        buffer += key.encode('utf-8') + b'": ['
+        try:
+            for i, row in enumerate(rows):
+                if i:
+                    buffer += b','
+                buffer += json_bytes(row)
+                if len(buffer) >= STREAM_CHUNK_SIZE:
+                    write(bytes(buffer))
+                    buffer.clear()
+            buffer += b']}'
+            write(bytes(buffer))
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+        except Exception as e:
+            print(f"Stream Error: {e}")
+    
+    def send_file_response(self, file_path: str, content_type: str, filename: str):
+        """分块发送文件（下载）"""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(os.path.getsize(file_path)))
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.end_headers()
+        with open(file_path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
     
     def get_client_ip(self):
         """获取客户端真实IP"""
@@ -391,40 +1404,65 @@ class BonusAPIHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
         # 添加CORS支持
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.send_header('Cache-Control', 'no-cache')
         super().end_headers()
 
+class ThreadingServer(socketserver.ThreadingTCPServer):
+    """多线程服务器：事件流长连接不阻塞其他请求"""
+    allow_reuse_address = True
+    daemon_threads = True
+
 if __name__ == '__main__':
     # 创建日志文件
     if not os.path.exists(LOG_FILE):
         with open(LOG_FILE, 'w', encoding='utf-8') as f:
             f.write("")
     
-    # 初始化数据库
-    db = DatabaseManager(DB_FILE)
+    # 初始化数据库（default 工作区）
+    BonusAPIHandler.workspaces = WorkspaceManager(DB_FILE, WORKSPACE_DIR)
+    BonusAPIHandler.workspaces.get(DEFAULT_WORKSPACE)
+    BonusAPIHandler.jobs = JobManager(JOB_DIR)  # 进程池在首次提交任务时才创建
     
-    with socketserver.TCPServer(("", PORT), BonusAPIHandler) as httpd:
+    threading.stack_size(THREAD_STACK_SIZE)
+    with ThreadingServer(("", PORT), BonusAPIHandler) as httpd:
         print(f"=" * 60)
         print(f"🚀 奖金计算器服务已启动 (SQLite版本)")
         print(f"=" * 60)
         print(f"📍 前端访问: http://localhost:{PORT}")
         print(f"📍 局域网访问: http://0.0.0.0:{PORT}")
-        print(f"💾 数据库: {DB_FILE}")
+        print(f"💾 数据库: {DB_FILE}（其他工作区: {WORKSPACE_DIR}）")
         print(f"📊 访问日志: {LOG_FILE}")
         print(f"=" * 60)
         print(f"🔌 API接口:")
         print(f"  GET    /api/persons      # 获取所有人员")
         print(f"  POST   /api/persons      # 创建人员")
-        print(f"  PUT    /api/persons/{{id}} # 更新人员")
+        print(f"  GET    /api/persons/changes?since=c  # 游标之后的增量变更")
+        print(f"  PATCH  /api/persons      # 批量部分更新（按 row_version 检测冲突）")
+        print(f"  PUT    /api/persons/{{id}} # 更新人员（带 row_version 时检测冲突）")
         print(f"  DELETE /api/persons/{{id}} # 删除人员")
+        print(f"  GET    /api/persons/{{id}}/explain[?params_version=v] # 单人计算过程")
         print(f"  GET    /api/params       # 获取参数")
-        print(f"  POST   /api/params       # 更新参数")
+        print(f"  POST   /api/params       # 更新参数（生成新版本）")
+        print(f"  GET    /api/params/versions            # 参数历史版本")
+        print(f"  POST   /api/params/versions/{{v}}/activate # 切换到历史版本")
+        print(f"  GET    /api/results[?params_version=v] # 计算结果（按版本缓存）")
+        print(f"  GET    /api/results/diff?from=v1[&to=v2][&limit=n] # 两个参数版本的结果对比")
+        print(f"  GET    /api/summary?group_by=role|region|org # 汇总看板")
+        print(f"  GET    /api/events       # 数据变更事件流（SSE）")
+        print(f"  POST   /api/jobs         # 提交后台任务（calculate/export/sweep）")
+        print(f"  GET    /api/jobs/{{id}}    # 任务进度；POST .../cancel 取消，GET .../download 下载结果")
+        print(f"  GET    /api/workspaces   # 工作区列表")
+        print(f"  POST   /api/workspaces   # 创建工作区 {{\"name\": ...}}")
+        print(f"  以上接口加前缀 /api/workspaces/{{name}}/ 即作用于指定工作区，如 /api/workspaces/east/persons")
         print(f"=" * 60)
         print(f"按 Ctrl+C 停止服务")
         print(f"=" * 60)
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
-            print("\n服务已停止")
\ No newline at end of file
+            print("\n服务已停止")
+        finally:
+            if BonusAPIHandler.jobs is not None:
+                BonusAPIHandler.jobs.shutdown()
\ No newline at end of file